@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""标注读写的微基准：VOC / YOLO / CreateML 的解析与序列化"""
+
+import glob
+import os
+import random
+
+import synthetic
+from libs.create_ml_io import CreateMLReader, CreateMLWriter, get_create_ml_store
+from libs.pascal_voc_io import PascalVocReader, PascalVocWriter
+from libs.yolo_io import YoloReader, YOLOWriter
+
+IMG_SIZE = [synthetic.IMAGE_SIZE[1], synthetic.IMAGE_SIZE[0], 3]
+
+
+def bench_voc_read(benchmark, voc_dir):
+    paths = sorted(glob.glob(os.path.join(voc_dir, '*.xml')))
+
+    def read_all():
+        return sum(len(PascalVocReader(path).get_shapes()) for path in paths)
+
+    assert benchmark(read_all) == len(paths) * 20
+
+
+def bench_voc_write(benchmark, tmp_path):
+    boxes = synthetic.random_boxes(random.Random(0), 50)
+    target = str(tmp_path / 'image.xml')
+
+    def write():
+        writer = PascalVocWriter('bench', 'image.jpg', IMG_SIZE)
+        for x1, y1, x2, y2, label in boxes:
+            writer.add_bnd_box(x1, y1, x2, y2, label, 0)
+        writer.save(target)
+
+    benchmark(write)
+    assert len(PascalVocReader(target).get_shapes()) == len(boxes)
+
+
+def bench_yolo_read(benchmark, yolo_dir):
+    paths = sorted(glob.glob(os.path.join(yolo_dir, '*.txt')))
+    paths = [path for path in paths if os.path.basename(path) != 'classes.txt']
+
+    def read_all():
+        return sum(len(YoloReader(path, None, img_size=IMG_SIZE).get_shapes()) for path in paths)
+
+    assert benchmark(read_all) == len(paths) * 20
+
+
+def bench_yolo_write(benchmark, tmp_path):
+    boxes = synthetic.random_boxes(random.Random(0), 50)
+    classes = list(synthetic.CLASS_NAMES)
+    target = str(tmp_path / 'image.txt')
+
+    def write():
+        writer = YOLOWriter('bench', 'image.jpg', IMG_SIZE)
+        for x1, y1, x2, y2, label in boxes:
+            writer.add_bnd_box(x1, y1, x2, y2, label, 0)
+        writer.save(classes, target)
+
+    benchmark(write)
+    with open(target) as f:
+        assert len(f.readlines()) == len(boxes)
+
+
+def bench_create_ml_write(benchmark, tmp_path):
+    """在已有N张图片的CreateML文件中更新一张图片的标注"""
+    rng = random.Random(0)
+    output_file = str(tmp_path / 'annotations.json')
+    names = synthetic.image_names(synthetic.scaled(500))
+    for name in names:
+        CreateMLWriter('bench', name, IMG_SIZE, synthetic.create_ml_shapes(synthetic.random_boxes(rng, 10)),
+                       output_file).write()
+    shapes = synthetic.create_ml_shapes(synthetic.random_boxes(rng, 10))
+    counter = iter(range(10 ** 9))
+
+    def write():
+        CreateMLWriter('bench', names[next(counter) % len(names)], IMG_SIZE, shapes, output_file).write()
+
+    benchmark(write)
+    get_create_ml_store(output_file).flush()
+    reader = CreateMLReader(output_file, os.path.join(str(tmp_path), names[0]))
+    assert len(reader.get_shapes()) == 10
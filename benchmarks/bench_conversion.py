@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""数据集转换与训练集筛选的微基准"""
+
+import os
+
+import synthetic
+from libs.pascal_to_yolo_converter import PascalToYOLOConverter
+from libs.training_history_manager import TrainingHistoryManager
+from libs.utils import natural_sort
+
+
+def bench_pascal_to_yolo(benchmark, voc_dir, tmp_path):
+    counter = iter(range(10 ** 9))
+
+    def convert():
+        converter = PascalToYOLOConverter(voc_dir, str(tmp_path), f"dataset_{next(counter)}",
+                                          train_ratio=0.8, use_class_config=False)
+        return converter.convert()
+
+    success, _ = benchmark.pedantic(convert, rounds=3, iterations=1)
+    assert success
+
+
+def bench_filter_untrained_images(benchmark, tmp_path):
+    """历史中有一半图片已训练时，筛选未训练图片"""
+    images = [os.path.join(str(tmp_path), name) for name in synthetic.image_names(synthetic.scaled(500))]
+    manager = TrainingHistoryManager(str(tmp_path / 'training_history.json'))
+    manager.add_training_session('bench', str(tmp_path), images[::2])
+
+    untrained = benchmark(manager.filter_untrained_images, images)
+    assert len(untrained) == len(images) // 2
+
+
+def bench_natural_sort(benchmark):
+    names = synthetic.image_names(synthetic.scaled(10000))
+    names.reverse()
+
+    def sort():
+        items = list(names)
+        natural_sort(items, key=lambda s: s.lower())
+        return items
+
+    assert benchmark(sort)[:3] == ['IMG_0.jpg', 'IMG_1.jpg', 'IMG_2.jpg']
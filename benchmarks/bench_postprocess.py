@@ -0,0 +1,22 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""检测后处理的微基准：NMS与标注优化（去除高重叠框）"""
+
+import pytest
+
+import synthetic
+from libs.ai_assistant.confidence_filter import ConfidenceFilter
+
+
+@pytest.mark.parametrize('count', [100, 1000])
+def bench_nms(benchmark, count):
+    detections = synthetic.detections(synthetic.scaled(count))
+    kept = benchmark(ConfidenceFilter().apply_nms, detections, 0.45)
+    assert 0 < len(kept) <= len(detections)
+
+
+@pytest.mark.parametrize('count', [50, 300])
+def bench_optimize_for_annotation(benchmark, count):
+    detections = synthetic.detections(synthetic.scaled(count), clustered=False)
+    kept = benchmark(ConfidenceFilter().optimize_for_annotation, detections, 10, 0.8)
+    assert 0 < len(kept) <= len(detections)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+比较两次pytest-benchmark结果，输出Markdown报告
+
+    python benchmarks/compare_baselines.py baseline.json current.json --threshold 20
+
+任一基准的统计值（默认median）变慢超过阈值百分比时以非零状态退出，可用于CI。
+"""
+
+import argparse
+import json
+import sys
+
+DEFAULT_THRESHOLD = 20.0
+DEFAULT_STAT = 'median'
+
+
+def load_stats(path, stat=DEFAULT_STAT):
+    """读取pytest-benchmark的JSON结果: {基准全名: 统计值(秒)}"""
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    return {bench['fullname']: bench['stats'][stat] for bench in data.get('benchmarks', [])}
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """
+    逐项比较，返回 (行列表, 是否有退化)
+
+    每行为 (名称, 基线秒数, 当前秒数, 变化百分比, 状态)，只在一侧出现的基准变化为None。
+    """
+    rows = []
+    regressed = False
+    for name in sorted(set(baseline) | set(current)):
+        before, after = baseline.get(name), current.get(name)
+        if before is None or after is None:
+            rows.append((name, before, after, None, 'new' if before is None else 'removed'))
+            continue
+        change = (after - before) / before * 100 if before else 0.0
+        if change > threshold:
+            status = 'regression'
+            regressed = True
+        elif change < -threshold:
+            status = 'improvement'
+        else:
+            status = 'ok'
+        rows.append((name, before, after, change, status))
+    return rows, regressed
+
+
+def _format_time(seconds):
+    if seconds is None:
+        return '-'
+    if seconds >= 1:
+        return f"{seconds:.3f} s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.3f} ms"
+    return f"{seconds * 1e6:.1f} µs"
+
+
+def format_report(rows, threshold=DEFAULT_THRESHOLD, stat=DEFAULT_STAT):
+    """生成Markdown表格"""
+    lines = [f"| benchmark | baseline ({stat}) | current ({stat}) | change | status |",
+             "|---|---:|---:|---:|---|"]
+    for name, before, after, change, status in rows:
+        change_text = '-' if change is None else f"{change:+.1f}%"
+        marker = ' ⚠️' if status == 'regression' else ''
+        lines.append(f"| `{name}` | {_format_time(before)} | {_format_time(after)} | "
+                     f"{change_text} | {status}{marker} |")
+    regressions = sum(1 for row in rows if row[4] == 'regression')
+    lines.append("")
+    lines.append(f"{regressions} regression(s) over {threshold:g}% threshold.")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('baseline', help='基线结果JSON（pytest --benchmark-json 或 --benchmark-save 的输出）')
+    parser.add_argument('current', help='当前结果JSON')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f'判定为退化的变慢百分比，默认{DEFAULT_THRESHOLD:g}')
+    parser.add_argument('--stat', default=DEFAULT_STAT, choices=('min', 'median', 'mean'),
+                        help='比较使用的统计值')
+    args = parser.parse_args(argv)
+
+    rows, regressed = compare(load_stats(args.baseline, args.stat), load_stats(args.current, args.stat),
+                              args.threshold)
+    print(format_report(rows, args.threshold, args.stat))
+    return 1 if regressed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,28 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+import sys
+
+import pytest
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, '..'))
+sys.path.insert(0, dir_name)
+
+import synthetic  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def voc_dir(tmp_path_factory):
+    """200×SCALE个VOC标注（每个20个框）及对应图片"""
+    folder = str(tmp_path_factory.mktemp('voc'))
+    synthetic.write_voc_dataset(folder, synthetic.scaled(200), 20, with_images=True)
+    return folder
+
+
+@pytest.fixture(scope='session')
+def yolo_dir(tmp_path_factory):
+    """200×SCALE个YOLO标签（每个20个框）"""
+    folder = str(tmp_path_factory.mktemp('yolo'))
+    synthetic.write_yolo_dataset(folder, synthetic.scaled(200), 20)
+    return folder
@@ -0,0 +1,310 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+离屏GUI交互延迟测试
+
+用离屏Qt平台驱动MainWindow，在合成目录（不同图片尺寸 × 不同标注框数量）上测量:
+    open_next_image.call         open_next_image() 调用本身（解码、加载标注）
+    open_next_image.first_paint  从切换图片到画布第一次绘制完成
+    open_next_image.settled      从切换图片到画布绘制稳定（含延迟的缩放调整）
+    paint                        Canvas.paintEvent 单帧耗时
+    hover.handler                Canvas.mouseMoveEvent 处理耗时
+    hover.repaint                悬停引起的重绘耗时
+
+    python benchmarks/gui_latency.py --boxes 1,100,1000,5000 --megapixels 1,12,100 --output gui.json
+    python benchmarks/gui_latency.py --compare gui_before.json --output gui_after.json
+
+结果JSON与pytest-benchmark的格式兼容，可以直接用compare_baselines.py比较，
+适合在升级Qt/PyQt或修改绘制代码前后各运行一次。
+使用临时HOME目录运行，不会改动用户的labelImg设置。
+"""
+
+import argparse
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import numpy as np
+from PIL import Image
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, '..'))
+sys.path.insert(0, dir_name)
+
+import synthetic  # noqa: E402
+from compare_baselines import compare, format_report  # noqa: E402
+from libs.pascal_voc_io import PascalVocWriter  # noqa: E402
+
+from PyQt5.QtCore import QEvent, QObject, QPointF, Qt, QT_VERSION_STR, PYQT_VERSION_STR  # noqa: E402
+from PyQt5.QtGui import QMouseEvent  # noqa: E402
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+
+DEFAULT_BOXES = (1, 100, 1000, 5000)
+DEFAULT_MEGAPIXELS = (1, 12, 100)
+DEFAULT_REPEATS = 5
+DEFAULT_FRAMES = 30
+DEFAULT_HOVER_MOVES = 200
+WINDOW_SIZE = (1280, 800)
+
+# 画布在这段时间内没有再绘制即认为切换图片已稳定（load_file中的缩放调整延迟50ms）
+SETTLE_QUIET_SECONDS = 0.15
+SETTLE_TIMEOUT_SECONDS = 30.0
+
+
+def image_dimensions(megapixels):
+    """4:3图片的宽高"""
+    height = max(1, int(round((megapixels * 1e6 * 3 / 4) ** 0.5)))
+    return max(1, int(round(height * 4 / 3))), height
+
+
+def write_image(path, megapixels):
+    """写出指定像素数的JPEG（渐变内容，解码开销与像素数成正比而文件不会过大）"""
+    width, height = image_dimensions(megapixels)
+    gradient = Image.radial_gradient('L')
+    Image.merge('RGB', (gradient, gradient.transpose(Image.ROTATE_90), Image.linear_gradient('L'))) \
+        .resize((width, height), Image.BILINEAR).save(path, quality=90)
+    return width, height
+
+
+def make_scenario(root, megapixels, boxes, images, seed=0):
+    """生成一个场景目录: images张相同尺寸的图片，每张带boxes个框的VOC标注"""
+    folder = os.path.join(root, f"mp{megapixels:g}_boxes{boxes}")
+    os.makedirs(folder, exist_ok=True)
+    rng = random.Random(seed)
+    names = [f"image_{i:04d}.jpg" for i in range(images)]
+    first = os.path.join(folder, names[0])
+    width, height = write_image(first, megapixels)
+    for name in names:
+        image_path = os.path.join(folder, name)
+        if image_path != first:
+            shutil.copyfile(first, image_path)
+        writer = PascalVocWriter(os.path.basename(folder), name, [height, width, 3], local_img_path=image_path)
+        for x1, y1, x2, y2, label in synthetic.random_boxes(rng, boxes, max(width, 21), max(height, 21)):
+            writer.add_bnd_box(min(x1, width - 1), min(y1, height - 1), min(x2, width), min(y2, height), label, 0)
+        writer.save(os.path.splitext(image_path)[0] + '.xml')
+    return folder
+
+
+def summarize(samples):
+    """延迟分布统计（秒）"""
+    values = np.asarray(samples, dtype=np.float64)
+    if not len(values):
+        return {'rounds': 0}
+    return {'rounds': int(len(values)), 'min': float(values.min()), 'max': float(values.max()),
+            'mean': float(values.mean()), 'median': float(np.median(values)),
+            'stddev': float(values.std()), 'p95': float(np.percentile(values, 95)),
+            'p99': float(np.percentile(values, 99))}
+
+
+class PaintProbe(QObject):
+    """
+    拦截画布的Paint事件并计时
+
+    事件过滤器在Qt已准备好绘制时被调用，直接在这里调用paintEvent并吞掉事件，
+    这样既能测到单帧耗时，也能知道每帧完成的时刻。
+    """
+
+    def __init__(self, canvas):
+        super().__init__(canvas)
+        self.canvas = canvas
+        self.durations = []
+        self.finished_at = []
+        canvas.installEventFilter(self)
+
+    def eventFilter(self, obj, event):
+        if obj is self.canvas and event.type() == QEvent.Paint:
+            start = time.perf_counter()
+            self.canvas.paintEvent(event)
+            end = time.perf_counter()
+            self.durations.append(end - start)
+            self.finished_at.append(end)
+            return True
+        return False
+
+    def reset(self):
+        self.durations = []
+        self.finished_at = []
+
+
+def wait_settled(app, probe, start, quiet=SETTLE_QUIET_SECONDS, timeout=SETTLE_TIMEOUT_SECONDS):
+    """处理事件直到画布安静，返回 (第一帧完成时刻, 最后一帧完成时刻)，没有绘制时为None"""
+    deadline = start + timeout
+    while True:
+        app.processEvents()
+        now = time.perf_counter()
+        last = probe.finished_at[-1] if probe.finished_at else start
+        if now - last >= quiet or now >= deadline:
+            break
+        time.sleep(0.001)
+    if not probe.finished_at:
+        return None, None
+    return probe.finished_at[0], probe.finished_at[-1]
+
+
+def measure_navigation(app, win, probe, repeats):
+    """依次切换到下一张图片，记录调用耗时、首帧和稳定时刻"""
+    samples = {'open_next_image.call': [], 'open_next_image.first_paint': [], 'open_next_image.settled': []}
+    for _ in range(repeats):
+        probe.reset()
+        start = time.perf_counter()
+        win.open_next_image()
+        samples['open_next_image.call'].append(time.perf_counter() - start)
+        first, last = wait_settled(app, probe, start)
+        if first is not None:
+            samples['open_next_image.first_paint'].append(first - start)
+            samples['open_next_image.settled'].append(last - start)
+    return samples
+
+
+def measure_paint(app, canvas, probe, frames):
+    """同步重绘画布frames次"""
+    probe.reset()
+    for _ in range(frames):
+        canvas.repaint()
+    app.processEvents()
+    return {'paint': list(probe.durations)}
+
+
+def measure_hover(app, canvas, probe, moves, seed=0):
+    """在画布上随机移动鼠标（不按键），分别记录处理耗时和由此引起的重绘"""
+    rng = random.Random(seed)
+    handler = []
+    probe.reset()
+    for _ in range(moves):
+        pos = QPointF(rng.uniform(0, canvas.width() - 1), rng.uniform(0, canvas.height() - 1))
+        event = QMouseEvent(QEvent.MouseMove, pos, Qt.NoButton, Qt.NoButton, Qt.NoModifier)
+        start = time.perf_counter()
+        canvas.mouseMoveEvent(event)
+        handler.append(time.perf_counter() - start)
+        app.processEvents()
+    return {'hover.handler': handler, 'hover.repaint': list(probe.durations)}
+
+
+def run_scenario(app, win, folder, repeats=DEFAULT_REPEATS, frames=DEFAULT_FRAMES,
+                 hover_moves=DEFAULT_HOVER_MOVES):
+    """在一个场景目录上运行全部测量，返回 {操作: [秒, ...]}"""
+    probe = PaintProbe(win.canvas)
+    try:
+        # 与“打开目录”相同：标注保存在图片目录（否则自动保存会弹出选择保存目录的对话框）
+        # 打开目录会加载第一张图片，之后的切换才计入
+        win.default_save_dir = folder
+        win.import_dir_images(folder)
+        wait_settled(app, probe, time.perf_counter())
+        samples = measure_navigation(app, win, probe, repeats)
+        samples.update(measure_paint(app, win.canvas, probe, frames))
+        samples.update(measure_hover(app, win.canvas, probe, hover_moves))
+    finally:
+        win.canvas.removeEventFilter(probe)
+        probe.deleteLater()
+    return samples
+
+
+def machine_info():
+    return {'python': platform.python_version(), 'platform': platform.platform(),
+            'processor': platform.processor() or platform.machine(), 'qt': QT_VERSION_STR,
+            'pyqt': PYQT_VERSION_STR, 'qpa': os.environ.get('QT_QPA_PLATFORM', '')}
+
+
+def build_report(results):
+    """
+    生成与pytest-benchmark兼容的结果
+
+    Args:
+        results: [(场景参数dict, {操作: [秒, ...]}), ...]
+    """
+    benchmarks = []
+    for params, samples in results:
+        scenario = f"mp{params['megapixels']:g}_boxes{params['boxes']}"
+        for operation, values in samples.items():
+            benchmarks.append({'name': operation, 'fullname': f"{scenario}::{operation}",
+                               'group': scenario, 'params': dict(params), 'stats': summarize(values)})
+    return {'machine_info': machine_info(), 'datetime': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'benchmarks': benchmarks}
+
+
+def format_table(report):
+    """Markdown表格（毫秒）"""
+    lines = ["| scenario | operation | n | p50 ms | p95 ms | p99 ms | max ms |",
+             "|---|---|---:|---:|---:|---:|---:|"]
+    for bench in report['benchmarks']:
+        stats = bench['stats']
+        if not stats['rounds']:
+            lines.append(f"| {bench['group']} | {bench['name']} | 0 | - | - | - | - |")
+            continue
+        lines.append(f"| {bench['group']} | {bench['name']} | {stats['rounds']} | {stats['median'] * 1e3:.2f} | "
+                     f"{stats['p95'] * 1e3:.2f} | {stats['p99'] * 1e3:.2f} | {stats['max'] * 1e3:.2f} |")
+    return "\n".join(lines)
+
+
+def _parse_numbers(text, cast):
+    return [cast(value) for value in text.split(',') if value.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='离屏GUI交互延迟测试')
+    parser.add_argument('--boxes', default=','.join(map(str, DEFAULT_BOXES)), help='每张图片的框数，逗号分隔')
+    parser.add_argument('--megapixels', default=','.join(map(str, DEFAULT_MEGAPIXELS)),
+                        help='图片像素数（百万），逗号分隔')
+    parser.add_argument('--repeats', type=int, default=DEFAULT_REPEATS, help='每个场景切换图片的次数')
+    parser.add_argument('--frames', type=int, default=DEFAULT_FRAMES, help='每个场景重绘的帧数')
+    parser.add_argument('--hover-moves', type=int, default=DEFAULT_HOVER_MOVES, help='每个场景的鼠标移动次数')
+    parser.add_argument('--output', help='结果JSON路径')
+    parser.add_argument('--compare', help='与之前的结果JSON比较（按中位数）')
+    parser.add_argument('--threshold', type=float, default=20.0, help='比较时判定为退化的变慢百分比')
+    args = parser.parse_args(argv)
+
+    import json
+
+    work_dir = tempfile.mkdtemp(prefix='labelImg_gui_bench_')
+    # 隔离用户设置（MainWindow关闭时会保存设置）
+    os.environ['HOME'] = os.environ['USERPROFILE'] = os.path.join(work_dir, 'home')
+    os.makedirs(os.environ['HOME'])
+    from labelImg import MainWindow
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    win = MainWindow(None, os.path.join(dir_name, '..', 'data', 'predefined_classes.txt'), None)
+    win.resize(*WINDOW_SIZE)
+    win.show()
+    app.processEvents()
+
+    results = []
+    try:
+        for megapixels in _parse_numbers(args.megapixels, float):
+            for boxes in _parse_numbers(args.boxes, int):
+                folder = make_scenario(os.path.join(work_dir, 'data'), megapixels, boxes, args.repeats + 1)
+                print(f"mp={megapixels:g} boxes={boxes} ...", file=sys.stderr, flush=True)
+                samples = run_scenario(app, win, folder, args.repeats, args.frames, args.hover_moves)
+                results.append(({'megapixels': megapixels, 'boxes': boxes}, samples))
+                shutil.rmtree(folder, ignore_errors=True)
+    finally:
+        win.close()
+        app.processEvents()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = build_report(results)
+    print(format_table(report))
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = {bench['fullname']: bench['stats']['median'] for bench in json.load(f)['benchmarks']
+                        if bench['stats'].get('rounds')}
+        current = {bench['fullname']: bench['stats']['median'] for bench in report['benchmarks']
+                   if bench['stats'].get('rounds')}
+        rows, regressed = compare(baseline, current, args.threshold)
+        print()
+        print(format_report(rows, args.threshold))
+        return 1 if regressed else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
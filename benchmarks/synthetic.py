@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+基准测试用的合成数据集
+
+生成固定随机种子的Pascal VOC / YOLO / CreateML标注和小尺寸图片，
+规模由环境变量 LABELIMG_BENCH_SCALE 放大（默认1）。
+"""
+
+import os
+import random
+
+from PIL import Image
+
+from libs.pascal_voc_io import PascalVocWriter
+from libs.yolo_io import YOLOWriter
+
+SCALE = max(1, int(os.environ.get('LABELIMG_BENCH_SCALE', '1')))
+
+CLASS_NAMES = ['person', 'car', 'bicycle', 'dog', 'cat', 'bus', 'truck', 'traffic light']
+IMAGE_SIZE = (640, 480)
+
+
+def scaled(count):
+    return count * SCALE
+
+
+def random_boxes(rng, count, width=IMAGE_SIZE[0], height=IMAGE_SIZE[1]):
+    """count个随机框 (x_min, y_min, x_max, y_max, 类别)"""
+    boxes = []
+    for _ in range(count):
+        x1, y1 = rng.randint(0, width - 20), rng.randint(0, height - 20)
+        x2, y2 = rng.randint(x1 + 10, min(width, x1 + 300)), rng.randint(y1 + 10, min(height, y1 + 300))
+        boxes.append((x1, y1, x2, y2, rng.choice(CLASS_NAMES)))
+    return boxes
+
+
+def image_names(count):
+    """模拟相机导出的文件名（自然排序与字典序不同）"""
+    return [f"IMG_{i}.jpg" for i in range(count)]
+
+
+def write_images(folder, names, size=(64, 48)):
+    """写出小尺寸JPEG（只用于需要图片文件的流程，尺寸不影响标注坐标）"""
+    os.makedirs(folder, exist_ok=True)
+    image = Image.new('RGB', size, (120, 130, 140))
+    paths = []
+    for name in names:
+        path = os.path.join(folder, name)
+        image.save(path)
+        paths.append(path)
+    return paths
+
+
+def write_voc_dataset(folder, image_count, boxes_per_image, seed=0, with_images=False):
+    """写出VOC数据集，返回XML路径列表"""
+    rng = random.Random(seed)
+    os.makedirs(folder, exist_ok=True)
+    names = image_names(image_count)
+    if with_images:
+        write_images(folder, names)
+    xml_paths = []
+    for name in names:
+        writer = PascalVocWriter(os.path.basename(folder), name, [IMAGE_SIZE[1], IMAGE_SIZE[0], 3],
+                                 local_img_path=os.path.join(folder, name))
+        for x1, y1, x2, y2, label in random_boxes(rng, boxes_per_image):
+            writer.add_bnd_box(x1, y1, x2, y2, label, 0)
+        xml_path = os.path.join(folder, os.path.splitext(name)[0] + '.xml')
+        writer.save(xml_path)
+        xml_paths.append(xml_path)
+    return xml_paths
+
+
+def write_yolo_dataset(folder, image_count, boxes_per_image, seed=0):
+    """写出YOLO标签和classes.txt，返回标签路径列表"""
+    rng = random.Random(seed)
+    os.makedirs(folder, exist_ok=True)
+    classes = list(CLASS_NAMES)
+    label_paths = []
+    for name in image_names(image_count):
+        writer = YOLOWriter(os.path.basename(folder), name, [IMAGE_SIZE[1], IMAGE_SIZE[0], 3])
+        for x1, y1, x2, y2, label in random_boxes(rng, boxes_per_image):
+            writer.add_bnd_box(x1, y1, x2, y2, label, 0)
+        label_path = os.path.join(folder, os.path.splitext(name)[0] + '.txt')
+        writer.save(classes, label_path)
+        label_paths.append(label_path)
+    return label_paths
+
+
+def create_ml_shapes(boxes):
+    """CreateMLWriter使用的shape字典"""
+    return [{'label': label, 'points': ((x1, y1), (x2, y1), (x2, y2), (x1, y2))}
+            for x1, y1, x2, y2, label in boxes]
+
+
+def detections(count, seed=0, clustered=True):
+    """
+    合成检测结果（Detection列表）
+
+    clustered为True时框聚集在少数目标附近，模拟NMS前的大量重叠候选框。
+    """
+    from libs.ai_assistant.yolo_predictor import Detection
+
+    rng = random.Random(seed)
+    width, height = IMAGE_SIZE
+    centers = [(rng.uniform(50, width - 50), rng.uniform(50, height - 50)) for _ in range(max(1, count // 20))]
+    results = []
+    for i in range(count):
+        if clustered:
+            cx, cy = rng.choice(centers)
+            cx, cy = cx + rng.gauss(0, 6), cy + rng.gauss(0, 6)
+        else:
+            cx, cy = rng.uniform(0, width), rng.uniform(0, height)
+        w, h = rng.uniform(20, 120), rng.uniform(20, 120)
+        class_id = rng.randrange(len(CLASS_NAMES))
+        results.append(Detection(bbox=(cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2),
+                                 confidence=rng.random(), class_id=class_id, class_name=CLASS_NAMES[class_id],
+                                 image_width=width, image_height=height))
+    return results
@@ -8,12 +8,16 @@ from libs.hashableQListWidgetItem import HashableQListWidgetItem
 from libs.ustr import ustr
 from libs.create_ml_io import JSON_EXT
 from libs.create_ml_io import CreateMLReader
+from libs.create_ml_io import flush_create_ml_stores
 from libs.yolo_io import TXT_EXT
 from libs.yolo_io import YoloReader
 from libs.pascal_voc_io import XML_EXT
 from libs.pascal_voc_io import PascalVocReader
 from libs.toolBar import ToolBar
 from libs.labelFile import LabelFile, LabelFileError, LabelFileFormat
+from libs.annotation_saver import AnnotationSaveQueue
+from libs.annotation_database import (AnnotationBox, AnnotationDatabase, SOURCE_AI, SOURCE_MANUAL,
+                                      default_database_path)
 from libs.colorDialog import ColorDialog
 from libs.labelDialog import LabelDialog
 from libs.lightWidget import LightWidget
@@ -22,12 +26,17 @@ from libs.canvas import Canvas
 from libs.stringBundle import StringBundle
 from libs.shape import Shape, DEFAULT_LINE_COLOR, DEFAULT_FILL_COLOR
 from libs.settings import Settings
+from libs import perf_trace
 import argparse
 import codecs
+import logging
+import multiprocessing
 import os.path
 import platform
 import shutil
+import sqlite3
 import sys
+import threading
 import webbrowser as wb
 from functools import partial
 
@@ -57,6 +66,8 @@ from libs.ai_assistant_panel import AIAssistantPanel, CollapsibleAIPanel
 from libs.ai_assistant import YOLOPredictor, ModelManager, BatchProcessor, ConfidenceFilter
 from libs.batch_operations import BatchOperations, BatchOperationsDialog
 from libs.shortcut_manager import ShortcutManager, ShortcutConfigDialog
+from libs.diagnostics_dialog import DiagnosticsDialog
+from libs.refresh_scheduler import RefreshScheduler
 
 
 def get_resource_path(relative_path):
@@ -108,6 +119,9 @@ def get_initial_predefined_classes_path():
 
 __appname__ = 'labelImg'
 
+# 设置日志
+logger = logging.getLogger(__name__)
+
 # Material Design样式表
 MATERIAL_STYLE = """
 /* 主窗口样式 */
@@ -483,7 +497,18 @@ class MainWindow(QMainWindow, WindowMixin):
 
         # For loading all image under a directory
         self.m_img_list = []
+
+        # 状态栏、标签统计、类别下拉框等面板合并刷新：调用方只标记，事件循环下一轮统一刷新一次
+        self.ui_refresh = RefreshScheduler(self)
+        self._annotation_stats = self.calculate_annotation_statistics()
+        self.ui_refresh.register('combo_box', self._refresh_combo_box)
+        self.ui_refresh.register('label_stats', self._refresh_label_stats)
+        self.ui_refresh.register('annotation_stats', self._refresh_annotation_stats)
+        self.ui_refresh.register('switch_buttons', self._refresh_switch_buttons)
+        self.ui_refresh.register('status_bar', self._refresh_status_bar)
         self.dir_name = None
+        # 项目标注数据库，启用后打开目录时创建
+        self.annotation_db = None
         self.label_hist = []
         self.last_open_dir = None
         self.cur_img_idx = 0
@@ -1139,6 +1164,10 @@ class MainWindow(QMainWindow, WindowMixin):
         shortcut_config = action('⌨️ 快捷键配置', self.show_shortcut_config_dialog,
                                  'Ctrl+K', 'shortcut_config', '配置快捷键')
 
+        # 性能诊断动作
+        diagnostics = action('⏱️ 性能诊断', self.show_diagnostics_dialog,
+                             None, 'diagnostics', '查看各操作的耗时分布并导出trace')
+
         # 重置删除确认设置动作
         reset_delete_confirmation = action('🔄 重置删除确认', self.reset_delete_confirmation_settings,
                                           None, 'reset_confirmation', '恢复删除确认对话框显示')
@@ -1198,6 +1227,13 @@ class MainWindow(QMainWindow, WindowMixin):
             settings.get(SETTING_PAINT_LABEL, False))
         self.display_label_option.triggered.connect(
             self.toggle_paint_labels_option)
+        # 项目标注数据库：在图片目录下维护SQLite索引，用于全数据集查询
+        self.annotation_db_option = QAction('🗄️ 项目标注数据库', self)
+        self.annotation_db_option.setCheckable(True)
+        self.annotation_db_option.setChecked(settings.get(SETTING_ANNOTATION_DB, False))
+        self.annotation_db_option.triggered.connect(self.toggle_annotation_database)
+        dataset_statistics = action('📊 数据集统计', self.show_dataset_statistics,
+                                    None, 'dataset_statistics', '从项目标注数据库查看全数据集统计')
 
         add_actions(self.menus.file,
                     (open, open_dir, change_save_dir, open_annotation, copy_prev_bounding, self.menus.recentFiles, save, save_format, save_as, None, export_yolo, export_model, None, close, reset_all, delete_image, quit))
@@ -1216,7 +1252,9 @@ class MainWindow(QMainWindow, WindowMixin):
         add_actions(self.menus.tools, (
             ai_predict_current, ai_predict_batch, ai_toggle_panel, None,
             batch_operations, batch_copy, batch_delete, None,
-            shortcut_config, reset_delete_confirmation))
+            self.annotation_db_option, dataset_statistics, None,
+            shortcut_config, reset_delete_confirmation, None,
+            diagnostics))
 
         self.menus.file.aboutToShow.connect(self.update_file_menu)
 
@@ -1368,6 +1406,12 @@ class MainWindow(QMainWindow, WindowMixin):
         # 初始化批量操作系统
         self.setup_batch_operations()
 
+        # 初始化后台标注保存队列
+        self.setup_save_queue()
+
+        # 性能诊断对话框（首次打开时创建）
+        self.diagnostics_dialog = None
+
         # 初始化快捷键管理系统
         self.setup_shortcut_manager()
 
@@ -1414,11 +1458,13 @@ class MainWindow(QMainWindow, WindowMixin):
             self.label_stats_label.setText(f'📊 标签统计: {total_count} 个')
 
     def update_label_stats(self):
-        """更新标签统计信息"""
+        """标记标签统计需要刷新（同时刷新状态栏）"""
+        self.ui_refresh.mark('label_stats')
+        self.update_status_bar_info()
+
+    def _refresh_label_stats(self):
         total_count = self.label_list.count()
         self.label_stats_label.setText(f'📊 标签统计: {total_count} 个')
-        # 同时更新状态栏信息
-        self.update_status_bar_info()
 
     def setup_quick_actions_panel(self):
         """设置快捷操作面板"""
@@ -1667,6 +1713,118 @@ class MainWindow(QMainWindow, WindowMixin):
         except Exception as e:
             print(f"[ERROR] 批量操作初始化失败: {str(e)}")
 
+    def setup_save_queue(self):
+        """初始化后台标注保存队列（自动保存时不阻塞界面）"""
+        self.save_queue = AnnotationSaveQueue(self)
+        # 标注文件路径 -> 提交保存时的图片路径
+        self.pending_save_images = {}
+        self.save_queue.save_finished.connect(self.on_annotation_saved)
+        self.save_queue.save_failed.connect(self.on_annotation_save_failed)
+
+    def toggle_annotation_database(self, checked):
+        """启用/停用项目标注数据库"""
+        if checked:
+            self.open_annotation_database()
+        else:
+            self.close_annotation_database()
+
+    def open_annotation_database(self, image_paths=None):
+        """
+        为当前图片目录打开项目标注数据库，并在后台同步有变化的标注文件
+
+        image_paths为目录中的全部图片；为None时在后台线程重新扫描目录
+        （文件列表可能只显示查询结果的一部分图片）。
+        """
+        self.close_annotation_database()
+        if not self.dir_name or not self.annotation_db_option.isChecked():
+            return
+        try:
+            database = AnnotationDatabase(default_database_path(self.dir_name))
+        except (OSError, sqlite3.Error) as e:
+            self.statusBar().showMessage(f'❌ 无法打开项目标注数据库: {e}')
+            return
+        self.annotation_db = database
+        threading.Thread(target=self._sync_annotation_database,
+                         args=(database, self.dir_name, image_paths, self.default_save_dir),
+                         name="AnnotationDatabaseSync", daemon=True).start()
+
+    def _sync_annotation_database(self, database, dir_name, image_paths, save_dir):
+        """后台线程：同步项目标注数据库"""
+        try:
+            if image_paths is None:
+                image_paths = self.scan_all_images(dir_name)
+            stats = database.sync(image_paths, save_dir)
+            logger.debug(f"项目标注数据库同步完成: {stats}")
+        except sqlite3.Error as e:
+            # 同步过程中切换目录会关闭数据库
+            logger.debug(f"项目标注数据库同步中止: {e}")
+
+    def close_annotation_database(self):
+        """关闭项目标注数据库"""
+        if self.annotation_db is not None:
+            self.annotation_db.close()
+            self.annotation_db = None
+
+    def record_annotation_in_database(self, save_func, annotation_file_path, image_shape, label_file):
+        """包装保存函数：标注文件写入后同步更新项目标注数据库"""
+        database = self.annotation_db
+        image_path = self.file_path
+        boxes = []
+        for shape in self.canvas.shapes:
+            xs = [p.x() for p in shape.points]
+            ys = [p.y() for p in shape.points]
+            ai_generated = getattr(shape, 'ai_generated', False)
+            boxes.append(AnnotationBox(shape.label, min(xs), min(ys), max(xs), max(ys), shape.difficult,
+                                       SOURCE_AI if ai_generated else SOURCE_MANUAL,
+                                       getattr(shape, 'ai_confidence', None) if ai_generated else None))
+
+        def save_and_record():
+            save_func()
+            try:
+                database.record_annotation(image_path, annotation_file_path, boxes, image_shape,
+                                           label_file.verified)
+            except sqlite3.Error as e:
+                # 数据库只是索引，失败时下次同步会从标注文件恢复
+                logger.error(f"更新项目标注数据库失败: {e}")
+
+        return save_and_record
+
+    def show_dataset_statistics(self, _value=False):
+        """显示项目标注数据库中的全数据集统计"""
+        if self.annotation_db is None:
+            QMessageBox.information(self, '数据集统计', '请先打开图片目录并在"工具"菜单中启用项目标注数据库')
+            return
+        try:
+            class_counts = self.annotation_db.class_counts()
+            images_per_class = self.annotation_db.images_per_class()
+            histogram = self.annotation_db.box_size_histogram()
+            image_count = self.annotation_db.image_count()
+        except sqlite3.Error as e:
+            QMessageBox.warning(self, '数据集统计', f'查询项目标注数据库失败: {e}')
+            return
+
+        lines = [f'图片: {image_count} 张    标注框: {sum(class_counts.values())} 个', '', '类别 (标注框 / 图片):']
+        lines += [f'  {name}: {count} / {images_per_class.get(name, 0)}' for name, count in class_counts.items()]
+        lines += ['', '标注框尺寸 (sqrt面积, 像素):']
+        lines += [f'  {low}-{high if high is not None else "∞"}: {count}' for low, high, count in histogram]
+        QMessageBox.information(self, '数据集统计', '\n'.join(lines))
+
+    def on_annotation_saved(self, annotation_file_path):
+        """后台保存完成"""
+        self.pending_save_images.pop(annotation_file_path, None)
+        self.statusBar().showMessage('Saved to  %s' % annotation_file_path)
+        # 保存后更新切换按钮状态和状态栏信息
+        self.update_switch_button_state()
+        self.update_status_bar_info()
+
+    def on_annotation_save_failed(self, annotation_file_path, error):
+        """后台保存失败：在状态栏提示，若仍是当前图片则重新标记为未保存"""
+        image_path = self.pending_save_images.pop(annotation_file_path, None)
+        self.statusBar().showMessage('❌ 保存标注失败: %s (%s)' % (annotation_file_path, error))
+        self.statusBar().show()
+        if image_path is not None and image_path == self.file_path:
+            self.set_dirty()
+
     def setup_shortcut_manager(self):
         """初始化快捷键管理系统"""
         try:
@@ -1805,7 +1963,14 @@ class MainWindow(QMainWindow, WindowMixin):
         print(f"[DEBUG] 最终确保状态栏可见: {status_bar.isVisible()}")
 
     def update_status_bar_info(self):
-        """更新状态栏信息"""
+        """标记状态栏需要刷新"""
+        self.ui_refresh.mark('annotation_stats', 'status_bar')
+
+    def _refresh_annotation_stats(self):
+        """每轮刷新只扫描一次全部图片的标注状态，供状态栏和切换按钮共用"""
+        self._annotation_stats = self.calculate_annotation_statistics()
+
+    def _refresh_status_bar(self):
         # 更新图片信息
         if hasattr(self, 'image') and not self.image.isNull():
             width, height = self.image.width(), self.image.height()
@@ -1835,7 +2000,7 @@ class MainWindow(QMainWindow, WindowMixin):
             self.zoom_info_label.setText(zoom_text)
 
         # 更新详细的标注进度信息
-        stats = self.calculate_annotation_statistics()
+        stats = self._annotation_stats
 
         # 更新进度标签（优化显示格式）
         if stats["total"] > 0:
@@ -2691,6 +2856,10 @@ class MainWindow(QMainWindow, WindowMixin):
         self.canvas.load_shapes(s)
 
     def update_combo_box(self):
+        """标记类别下拉框需要刷新"""
+        self.ui_refresh.mark('combo_box')
+
+    def _refresh_combo_box(self):
         # Get the unique labels and add them to the Combobox.
         items_text_list = [str(self.label_list.item(i).text())
                            for i in range(self.label_list.count())]
@@ -2702,7 +2871,7 @@ class MainWindow(QMainWindow, WindowMixin):
 
         self.combo_box.update_items(unique_text_list)
 
-    def save_labels(self, annotation_file_path):
+    def save_labels(self, annotation_file_path, asynchronous=False):
         annotation_file_path = ustr(annotation_file_path)
         if self.label_file is None:
             self.label_file = LabelFile()
@@ -2717,26 +2886,58 @@ class MainWindow(QMainWindow, WindowMixin):
                         difficult=s.difficult)
 
         shapes = [format_shape(shape) for shape in self.canvas.shapes]
+        # The loaded image already knows its size; don't make the writers decode it again
+        image_shape = None
+        if not self.image.isNull():
+            image_shape = [self.image.height(), self.image.width(),
+                           1 if self.image.isGrayscale() else 3]
+        label_file = self.label_file
+        if asynchronous:
+            # Snapshot everything the writer reads so the GUI can move on
+            label_file = LabelFile()
+            label_file.verified = self.label_file.verified
         # Can add different annotation formats here
+        if self.label_file_format == LabelFileFormat.PASCAL_VOC:
+            if annotation_file_path[-4:].lower() != ".xml":
+                annotation_file_path += XML_EXT
+            save_func = partial(label_file.save_pascal_voc_format, annotation_file_path, shapes, self.file_path,
+                                self.image_data, self.line_color.getRgb(), self.fill_color.getRgb(),
+                                image_shape=image_shape)
+        elif self.label_file_format == LabelFileFormat.YOLO:
+            if annotation_file_path[-4:].lower() != ".txt":
+                annotation_file_path += TXT_EXT
+            # YOLOWriter appends unseen labels to the class list; do it here so
+            # label_hist keeps stable class indices when the writer gets a copy
+            for shape in shapes:
+                if shape['label'] not in self.label_hist:
+                    self.label_hist.append(shape['label'])
+            class_list = list(self.label_hist) if asynchronous else self.label_hist
+            save_func = partial(label_file.save_yolo_format, annotation_file_path, shapes, self.file_path,
+                                self.image_data, class_list, self.line_color.getRgb(), self.fill_color.getRgb(),
+                                image_shape=image_shape)
+        elif self.label_file_format == LabelFileFormat.CREATE_ML:
+            if annotation_file_path[-5:].lower() != ".json":
+                annotation_file_path += JSON_EXT
+            save_func = partial(label_file.save_create_ml_format, annotation_file_path, shapes, self.file_path,
+                                self.image_data, self.label_hist, self.line_color.getRgb(), self.fill_color.getRgb(),
+                                image_shape=image_shape)
+        else:
+            def save_func():
+                label_file.save(annotation_file_path, shapes, self.file_path, self.image_data,
+                                self.line_color.getRgb(), self.fill_color.getRgb())
+
+        if self.annotation_db is not None:
+            save_func = self.record_annotation_in_database(save_func, annotation_file_path, image_shape, label_file)
+        # 在实际执行写入的线程中计时（异步保存时为后台线程）
+        save_func = perf_trace.timed('save')(save_func)
+
+        if asynchronous:
+            self.pending_save_images[annotation_file_path] = self.file_path
+            self.save_queue.enqueue(annotation_file_path, save_func)
+            return True
+
         try:
-            if self.label_file_format == LabelFileFormat.PASCAL_VOC:
-                if annotation_file_path[-4:].lower() != ".xml":
-                    annotation_file_path += XML_EXT
-                self.label_file.save_pascal_voc_format(annotation_file_path, shapes, self.file_path, self.image_data,
-                                                       self.line_color.getRgb(), self.fill_color.getRgb())
-            elif self.label_file_format == LabelFileFormat.YOLO:
-                if annotation_file_path[-4:].lower() != ".txt":
-                    annotation_file_path += TXT_EXT
-                self.label_file.save_yolo_format(annotation_file_path, shapes, self.file_path, self.image_data, self.label_hist,
-                                                 self.line_color.getRgb(), self.fill_color.getRgb())
-            elif self.label_file_format == LabelFileFormat.CREATE_ML:
-                if annotation_file_path[-5:].lower() != ".json":
-                    annotation_file_path += JSON_EXT
-                self.label_file.save_create_ml_format(annotation_file_path, shapes, self.file_path, self.image_data,
-                                                      self.label_hist, self.line_color.getRgb(), self.fill_color.getRgb())
-            else:
-                self.label_file.save(annotation_file_path, shapes, self.file_path, self.image_data,
-                                     self.line_color.getRgb(), self.fill_color.getRgb())
+            save_func()
             # Fix Unicode encoding error for Chinese paths
             try:
                 print(
@@ -2994,6 +3195,7 @@ class MainWindow(QMainWindow, WindowMixin):
         for item, shape in self.items_to_shapes.items():
             item.setCheckState(Qt.Checked if value else Qt.Unchecked)
 
+    @perf_trace.timed('load_file')
     def load_file(self, file_path=None):
         """Load the specified file, or the last opened file if None."""
         self.reset_state()
@@ -3036,7 +3238,9 @@ class MainWindow(QMainWindow, WindowMixin):
             else:
                 # Load image:
                 # read data first and store for saving into label file.
-                self.image_data = read(unicode_file_path, None)
+                # read()解码图片（QImageReader，按EXIF旋转）
+                with perf_trace.span('load_file.decode'):
+                    self.image_data = read(unicode_file_path, None)
                 self.label_file = None
                 self.canvas.verified = False
 
@@ -3071,7 +3275,8 @@ class MainWindow(QMainWindow, WindowMixin):
             # 只有当加载的是图片文件（而不是标注文件）时，才查找对应的标注文件
             # 这避免了重复加载同一个标注文件的问题
             if not self.label_file:
-                self.show_bounding_box_from_annotation_file(self.file_path)
+                with perf_trace.span('load_file.labels'):
+                    self.show_bounding_box_from_annotation_file(self.file_path)
 
             # 更新按钮状态
             self.update_switch_button_state()
@@ -3178,7 +3383,7 @@ class MainWindow(QMainWindow, WindowMixin):
         if self.auto_saving.isChecked():
             if self.default_save_dir is not None:
                 if self.dirty is True:
-                    self.save_file()
+                    self.save_file(asynchronous=True)
             else:
                 self.change_save_dir_dialog()
                 return
@@ -3270,6 +3475,10 @@ class MainWindow(QMainWindow, WindowMixin):
         }
 
     def update_switch_button_state(self):
+        """标记切换到未标注图片按钮和删除当前图片按钮需要刷新"""
+        self.ui_refresh.mark('annotation_stats', 'switch_buttons')
+
+    def _refresh_switch_buttons(self):
         """
         更新切换到未标注图片按钮和删除当前图片按钮的状态
         """
@@ -3279,8 +3488,7 @@ class MainWindow(QMainWindow, WindowMixin):
             self.switch_unannotated_button.setEnabled(has_images)
 
             if has_images:
-                # 使用新的统计方法
-                stats = self.calculate_annotation_statistics()
+                stats = self._annotation_stats
                 unannotated_count = stats['unannotated']
 
                 if unannotated_count > 0:
@@ -3344,9 +3552,7 @@ class MainWindow(QMainWindow, WindowMixin):
 
         except Exception as e:
             error_msg = f"智能预测触发失败: {str(e)}"
-            print(f"[ERROR] {error_msg}")
-            import traceback
-            traceback.print_exc()
+            logger.exception(error_msg)
 
     def _execute_smart_prediction(self):
         """
@@ -3355,26 +3561,24 @@ class MainWindow(QMainWindow, WindowMixin):
         try:
             # 检查当前图片是否已经标注
             if self.is_image_annotated(self.file_path):
-                print(
-                    f"[DEBUG] 智能预测: 图片已标注，跳过预测: {os.path.basename(self.file_path)}")
+                logger.debug(f"智能预测: 图片已标注，跳过预测: {os.path.basename(self.file_path)}")
                 return
 
             # 检查模型是否已加载
             if not self.ai_assistant_panel.predictor or not self.ai_assistant_panel.predictor.is_model_loaded():
-                print(f"[DEBUG] 智能预测: 模型未加载，跳过预测")
+                logger.debug("智能预测: 模型未加载，跳过预测")
                 return
 
             # 检查是否正在预测中（包括智能预测）
             if hasattr(self.ai_assistant_panel, 'is_predicting') and self.ai_assistant_panel.is_predicting:
-                print(f"[DEBUG] 智能预测: 正在预测中，跳过")
+                logger.debug("智能预测: 正在预测中，跳过")
                 return
 
             if hasattr(self.ai_assistant_panel, 'is_smart_predicting') and self.ai_assistant_panel.is_smart_predicting:
-                print(f"[DEBUG] 智能预测: 智能预测正在进行中，跳过")
+                logger.debug("智能预测: 智能预测正在进行中，跳过")
                 return
 
-            print(
-                f"[DEBUG] 智能预测: 开始自动预测未标注图片: {os.path.basename(self.file_path)}")
+            logger.debug(f"智能预测: 开始自动预测未标注图片: {os.path.basename(self.file_path)}")
 
             # 显示智能预测状态
             self.statusBar().showMessage(
@@ -3385,7 +3589,7 @@ class MainWindow(QMainWindow, WindowMixin):
 
             # 使用正确的信号机制触发预测，确保结果能够自动显示
             confidence = self.ai_assistant_panel.get_current_confidence()
-            print(f"[DEBUG] 智能预测: 使用信号机制触发预测，置信度: {confidence}")
+            logger.debug(f"智能预测: 使用信号机制触发预测，置信度: {confidence}")
 
             # 发送预测请求信号，这样预测结果会自动应用到画布
             self.ai_assistant_panel.prediction_requested.emit(
@@ -3393,9 +3597,7 @@ class MainWindow(QMainWindow, WindowMixin):
 
         except Exception as e:
             error_msg = f"智能预测执行失败: {str(e)}"
-            print(f"[ERROR] {error_msg}")
-            import traceback
-            traceback.print_exc()
+            logger.exception(error_msg)
 
     def show_bounding_box_from_annotation_file(self, file_path):
         # 检查file_path是否为None，避免TypeError
@@ -3408,6 +3610,8 @@ class MainWindow(QMainWindow, WindowMixin):
             txt_path = os.path.join(self.default_save_dir, basename + TXT_EXT)
             json_path = os.path.join(
                 self.default_save_dir, basename + JSON_EXT)
+            # 后台可能仍在写入这张图片的标注
+            self.save_queue.wait_for([xml_path, txt_path, json_path])
 
             """Annotation file priority:
             PascalXML > YOLO
@@ -3423,6 +3627,7 @@ class MainWindow(QMainWindow, WindowMixin):
             xml_path = os.path.splitext(file_path)[0] + XML_EXT
             txt_path = os.path.splitext(file_path)[0] + TXT_EXT
             json_path = os.path.splitext(file_path)[0] + JSON_EXT
+            self.save_queue.wait_for([xml_path, txt_path, json_path])
 
             if os.path.isfile(xml_path):
                 self.load_pascal_xml_by_filename(xml_path)
@@ -3579,6 +3784,7 @@ class MainWindow(QMainWindow, WindowMixin):
         settings[SETTING_PAINT_LABEL] = self.display_label_option.isChecked()
         settings[SETTING_DRAW_SQUARE] = self.draw_squares_option.isChecked()
         settings[SETTING_LABEL_FILE_FORMAT] = self.label_file_format
+        settings[SETTING_ANNOTATION_DB] = self.annotation_db_option.isChecked()
 
         # 保存用户缩放偏好设置
         settings['user_preferred_zoom_enabled'] = self.user_preferred_zoom_enabled
@@ -3587,6 +3793,11 @@ class MainWindow(QMainWindow, WindowMixin):
 
         settings.save()
 
+        # Finish background annotation writes, then the CreateML write-behind buffer
+        self.save_queue.flush()
+        flush_create_ml_stores()
+        self.close_annotation_database()
+
     def load_recent(self, filename):
         if self.may_continue():
             self.load_file(filename)
@@ -3617,6 +3828,8 @@ class MainWindow(QMainWindow, WindowMixin):
 
         if dir_path is not None and len(dir_path) > 1:
             self.default_save_dir = dir_path
+            # 标注目录变了，重新同步数据库
+            self.open_annotation_database()
 
         # 只有当file_path不为None时才调用
         if self.file_path is not None:
@@ -3712,6 +3925,7 @@ class MainWindow(QMainWindow, WindowMixin):
         # 更新切换按钮状态和状态栏信息
         self.update_switch_button_state()
         self.update_status_bar_info()
+        self.open_annotation_database(list(self.m_img_list))
 
     def verify_image(self, _value=False):
         # Proceeding next image without dialog if having any label
@@ -3736,7 +3950,7 @@ class MainWindow(QMainWindow, WindowMixin):
         if self.auto_saving.isChecked():
             if self.default_save_dir is not None:
                 if self.dirty is True:
-                    self.save_file()
+                    self.save_file(asynchronous=True)
             else:
                 self.change_save_dir_dialog()
                 return
@@ -3761,7 +3975,7 @@ class MainWindow(QMainWindow, WindowMixin):
         if self.auto_saving.isChecked():
             if self.default_save_dir is not None:
                 if self.dirty is True:
-                    self.save_file()
+                    self.save_file(asynchronous=True)
             else:
                 self.change_save_dir_dialog()
                 return
@@ -3804,21 +4018,21 @@ class MainWindow(QMainWindow, WindowMixin):
             self.img_count = 1
             self.load_file(filename)
 
-    def save_file(self, _value=False):
+    def save_file(self, _value=False, asynchronous=False):
         if self.default_save_dir is not None and len(ustr(self.default_save_dir)):
             if self.file_path:
                 image_file_name = os.path.basename(self.file_path)
                 saved_file_name = os.path.splitext(image_file_name)[0]
                 saved_path = os.path.join(
                     ustr(self.default_save_dir), saved_file_name)
-                self._save_file(saved_path)
+                self._save_file(saved_path, asynchronous)
         else:
             image_file_dir = os.path.dirname(self.file_path)
             image_file_name = os.path.basename(self.file_path)
             saved_file_name = os.path.splitext(image_file_name)[0]
             saved_path = os.path.join(image_file_dir, saved_file_name)
             self._save_file(saved_path if self.label_file
-                            else self.save_file_dialog(remove_ext=False))
+                            else self.save_file_dialog(remove_ext=False), asynchronous)
 
     def save_file_as(self, _value=False):
         assert not self.image.isNull(), "cannot save empty image"
@@ -3843,9 +4057,13 @@ class MainWindow(QMainWindow, WindowMixin):
                 return full_file_path
         return ''
 
-    def _save_file(self, annotation_file_path):
-        if annotation_file_path and self.save_labels(annotation_file_path):
+    def _save_file(self, annotation_file_path, asynchronous=False):
+        if annotation_file_path and self.save_labels(annotation_file_path, asynchronous):
             self.set_clean()
+            if asynchronous:
+                # 完成后由on_annotation_saved更新状态栏
+                self.statusBar().showMessage('Saving to  %s' % annotation_file_path)
+                return
             self.statusBar().showMessage('Saved to  %s' % annotation_file_path)
             self.statusBar().show()
             # 保存后更新切换按钮状态和状态栏信息
@@ -4642,7 +4860,7 @@ class MainWindow(QMainWindow, WindowMixin):
             else:
                 QMessageBox.warning(self, "警告", "AI助手未初始化")
         except Exception as e:
-            print(f"[ERROR] AI预测当前图像失败: {str(e)}")
+            logger.error(f"AI预测当前图像失败: {str(e)}")
 
     def on_ai_batch_predict(self):
         """AI批量预测"""
@@ -4652,7 +4870,7 @@ class MainWindow(QMainWindow, WindowMixin):
             else:
                 QMessageBox.warning(self, "警告", "AI助手未初始化")
         except Exception as e:
-            print(f"[ERROR] AI批量预测失败: {str(e)}")
+            logger.error(f"AI批量预测失败: {str(e)}")
 
     def on_ai_toggle_panel(self):
         """切换AI面板显示"""
@@ -4662,72 +4880,69 @@ class MainWindow(QMainWindow, WindowMixin):
             else:
                 QMessageBox.warning(self, "警告", "AI助手面板未初始化")
         except Exception as e:
-            print(f"[ERROR] 切换AI面板失败: {str(e)}")
+            logger.error(f"切换AI面板失败: {str(e)}")
 
     def on_batch_copy(self):
         """批量复制标注"""
         try:
             # 显示批量操作对话框，默认选择复制操作
-            dialog = BatchOperationsDialog(self)
+            dialog = self.create_batch_operations_dialog()
             dialog.operation_combo.setCurrentText("批量复制标注")
             dialog.exec_()
         except Exception as e:
-            print(f"[ERROR] 批量复制失败: {str(e)}")
+            logger.error(f"批量复制失败: {str(e)}")
 
     def on_batch_delete(self):
         """批量删除标注"""
         try:
             # 显示批量操作对话框，默认选择删除操作
-            dialog = BatchOperationsDialog(self)
+            dialog = self.create_batch_operations_dialog()
             dialog.operation_combo.setCurrentText("批量删除标注")
             dialog.exec_()
         except Exception as e:
-            print(f"[ERROR] 批量删除失败: {str(e)}")
+            logger.error(f"批量删除失败: {str(e)}")
 
     # ==================== AI助手信号处理方法 ====================
 
     def on_ai_prediction_requested(self, image_path, confidence):
         """处理AI预测请求"""
         try:
-            print(
-                f"[DEBUG] 主窗口: 收到AI预测请求，image_path='{image_path}', confidence={confidence}")
+            logger.debug(f"收到AI预测请求，image_path='{image_path}', confidence={confidence}")
 
             # 如果image_path为空，使用当前图像
             if not image_path and self.file_path:
                 image_path = self.file_path
-                print(f"[DEBUG] 主窗口: 使用当前图像路径: {image_path}")
+                logger.debug(f"使用当前图像路径: {image_path}")
 
             if not image_path:
                 error_msg = "没有当前图像，请先打开一张图片"
-                print(f"[ERROR] 主窗口: {error_msg}")
+                logger.error(error_msg)
                 return
 
             if not os.path.exists(image_path):
                 error_msg = f"图像文件不存在: {image_path}"
-                print(f"[ERROR] 主窗口: {error_msg}")
+                logger.error(error_msg)
                 return
 
-            print(f"[DEBUG] 主窗口: 准备启动AI预测，图像路径: {image_path}")
+            logger.debug(f"准备启动AI预测，图像路径: {image_path}")
 
             # 启动AI预测
             if hasattr(self.ai_assistant_panel, 'start_prediction'):
-                print(f"[DEBUG] 主窗口: 调用AI助手面板的start_prediction方法")
+                logger.debug("调用AI助手面板的start_prediction方法")
                 self.ai_assistant_panel.start_prediction(image_path)
             else:
                 error_msg = "AI助手面板没有start_prediction方法"
-                print(f"[ERROR] 主窗口: {error_msg}")
+                logger.error(error_msg)
 
         except Exception as e:
             error_msg = f"AI预测请求处理失败: {str(e)}"
-            print(f"[ERROR] 主窗口: {error_msg}")
-            import traceback
-            traceback.print_exc()
+            logger.exception(error_msg)
 
     def on_ai_batch_prediction_requested(self, dir_path, confidence):
         """处理AI批量预测请求"""
         try:
             if not dir_path or not os.path.exists(dir_path):
-                print("[ERROR] 无效的目录路径")
+                logger.error("无效的目录路径")
                 return
 
             # 启动批量预测
@@ -4735,38 +4950,35 @@ class MainWindow(QMainWindow, WindowMixin):
                 self.ai_assistant_panel.start_batch_prediction(dir_path)
 
         except Exception as e:
-            print(f"[ERROR] AI批量预测请求处理失败: {str(e)}")
+            logger.error(f"AI批量预测请求处理失败: {str(e)}")
 
     def on_ai_predictions_applied(self, predictions):
         """处理AI预测结果应用"""
         try:
-            print(
-                f"[DEBUG] 应用预测结果: {predictions[0] if predictions else 'None'}")
+            logger.debug(f"应用预测结果: {predictions[0] if predictions else 'None'}")
 
             if not predictions:
-                print("[INFO] 没有预测结果需要应用")
+                logger.info("没有预测结果需要应用")
                 return
 
             # 判断传入的是PredictionResult对象列表还是Detection对象列表
             first_item = predictions[0]
             if hasattr(first_item, 'detections'):
                 # 这是PredictionResult对象，获取其中的detections
-                print("[DEBUG] 接收到PredictionResult对象")
+                logger.debug("接收到PredictionResult对象")
                 detections = first_item.detections
                 is_smart_prediction = getattr(
                     first_item, 'is_smart_prediction', False)
             else:
                 # 这是Detection对象列表
-                print("[DEBUG] 接收到Detection对象列表")
+                logger.debug("接收到Detection对象列表")
                 detections = predictions
                 is_smart_prediction = False
 
-            print(f"[DEBUG] 开始应用 {len(detections)} 个检测结果到画布")
+            logger.debug(f"开始应用 {len(detections)} 个检测结果到画布")
 
             # 将每个检测结果转换为Shape对象并添加到画布
             for i, detection in enumerate(detections):
-                print(f"[DEBUG] 应用预测结果: {detection}")
-
                 # 使用Detection的to_shape方法转换为Shape对象
                 shape = detection.to_shape()
 
@@ -4788,8 +5000,8 @@ class MainWindow(QMainWindow, WindowMixin):
                 # 添加到标签列表
                 self.add_label(shape)
 
-                print(
-                    f"[DEBUG] 成功添加检测结果 {i+1}: {detection.class_name} (置信度: {detection.confidence:.3f})")
+                logger.debug("成功添加检测结果 %d: %s (置信度: %.3f)", i + 1, detection.class_name,
+                             detection.confidence)
 
             # 更新画布显示
             self.canvas.repaint()
@@ -4805,19 +5017,17 @@ class MainWindow(QMainWindow, WindowMixin):
                 self.statusBar().showMessage(
                     f'✅ 预测结果已应用，共添加 {len(detections)} 个检测框')
 
-            print(f"[DEBUG] 成功应用所有预测结果到画布，共 {len(detections)} 个对象")
+            logger.debug(f"成功应用所有预测结果到画布，共 {len(detections)} 个对象")
 
         except Exception as e:
             error_msg = f"AI预测结果应用失败: {str(e)}"
-            print(f"[ERROR] {error_msg}")
+            logger.exception(error_msg)
             self.statusBar().showMessage(f'❌ 预测结果应用失败: {str(e)}')
-            import traceback
-            traceback.print_exc()
 
     def on_ai_predictions_cleared(self):
         """处理AI预测结果清除"""
         try:
-            print("[DEBUG] 主窗口: 收到清除AI预测结果信号")
+            logger.debug("收到清除AI预测结果信号")
 
             # 找到所有AI生成的标注框
             ai_shapes = []
@@ -4825,7 +5035,7 @@ class MainWindow(QMainWindow, WindowMixin):
                 if hasattr(shape, 'ai_generated') and shape.ai_generated:
                     ai_shapes.append(shape)
 
-            print(f"[DEBUG] 主窗口: 找到 {len(ai_shapes)} 个AI生成的标注框")
+            logger.debug(f"找到 {len(ai_shapes)} 个AI生成的标注框")
 
             # 从画布中移除AI生成的标注框
             for shape in ai_shapes:
@@ -4846,7 +5056,7 @@ class MainWindow(QMainWindow, WindowMixin):
                     if item in self.items_to_shapes:
                         del self.items_to_shapes[item]
 
-                print(f"[DEBUG] 主窗口: 移除AI标注框 - {shape.label}")
+                logger.debug("移除AI标注框 - %s", shape.label)
 
             # 更新画布显示
             self.canvas.repaint()
@@ -4865,28 +5075,26 @@ class MainWindow(QMainWindow, WindowMixin):
             # 设置为已修改状态
             self.set_dirty()
 
-            print(f"[DEBUG] 主窗口: 成功清除 {len(ai_shapes)} 个AI生成的标注框")
+            logger.debug(f"成功清除 {len(ai_shapes)} 个AI生成的标注框")
 
         except Exception as e:
             error_msg = f"清除AI预测结果失败: {str(e)}"
-            print(f"[ERROR] 主窗口: {error_msg}")
-            import traceback
-            traceback.print_exc()
+            logger.exception(error_msg)
 
     def on_ai_model_changed(self, model_path):
         """处理AI模型切换"""
         try:
-            print(f"[DEBUG] AI模型已切换到: {model_path}")
+            logger.debug(f"AI模型已切换到: {model_path}")
 
         except Exception as e:
-            print(f"[ERROR] AI模型切换处理失败: {str(e)}")
+            logger.error(f"AI模型切换处理失败: {str(e)}")
 
     # ==================== 批量操作信号处理方法 ====================
 
     def on_batch_operation_started(self, operation_name, total_count):
         """处理批量操作开始"""
         try:
-            print(f"[DEBUG] 批量操作开始: {operation_name}, 总数: {total_count}")
+            logger.debug(f"批量操作开始: {operation_name}, 总数: {total_count}")
             # 显示进度条
             if hasattr(self, 'progress_bar'):
                 self.progress_bar.setVisible(True)
@@ -4894,23 +5102,23 @@ class MainWindow(QMainWindow, WindowMixin):
                 self.progress_bar.setValue(0)
 
         except Exception as e:
-            print(f"[ERROR] 批量操作开始处理失败: {str(e)}")
+            logger.error(f"批量操作开始处理失败: {str(e)}")
 
     def on_batch_operation_progress(self, current, total, current_file):
         """处理批量操作进度"""
         try:
-            print(f"[DEBUG] 批量操作进度: {current}/{total}, 当前文件: {current_file}")
+            logger.debug("批量操作进度: %d/%d, 当前文件: %s", current, total, current_file)
             # 更新进度条
             if hasattr(self, 'progress_bar'):
                 self.progress_bar.setValue(current)
 
         except Exception as e:
-            print(f"[ERROR] 批量操作进度处理失败: {str(e)}")
+            logger.error(f"批量操作进度处理失败: {str(e)}")
 
     def on_batch_operation_completed(self, operation_name, result_stats):
         """处理批量操作完成"""
         try:
-            print(f"[DEBUG] 批量操作完成: {operation_name}, 结果: {result_stats}")
+            logger.debug(f"批量操作完成: {operation_name}, 结果: {result_stats}")
             # 隐藏进度条
             if hasattr(self, 'progress_bar'):
                 self.progress_bar.setVisible(False)
@@ -4920,12 +5128,12 @@ class MainWindow(QMainWindow, WindowMixin):
                                     f"{operation_name}已完成\n{result_stats}")
 
         except Exception as e:
-            print(f"[ERROR] 批量操作完成处理失败: {str(e)}")
+            logger.error(f"批量操作完成处理失败: {str(e)}")
 
     def on_batch_operation_error(self, error_message):
         """处理批量操作错误"""
         try:
-            print(f"[ERROR] 批量操作错误: {error_message}")
+            logger.error(f"批量操作错误: {error_message}")
             # 隐藏进度条
             if hasattr(self, 'progress_bar'):
                 self.progress_bar.setVisible(False)
@@ -4934,7 +5142,7 @@ class MainWindow(QMainWindow, WindowMixin):
             QMessageBox.critical(self, "操作错误", error_message)
 
         except Exception as e:
-            print(f"[ERROR] 批量操作错误处理失败: {str(e)}")
+            logger.error(f"批量操作错误处理失败: {str(e)}")
 
     # ==================== 快捷键信号处理方法 ====================
 
@@ -5012,10 +5220,36 @@ class MainWindow(QMainWindow, WindowMixin):
 
     # ==================== 对话框显示方法 ====================
 
+    def create_batch_operations_dialog(self):
+        """创建批量操作对话框，查询结果可回传到文件列表"""
+        dialog = BatchOperationsDialog(self)
+        annotation_dir = self.default_save_dir or self.dir_name
+        if annotation_dir:
+            dialog.filter_source_edit.setText(annotation_dir)
+        if self.annotation_db is not None:
+            dialog.set_annotation_database(self.annotation_db, (self.dir_name, self.default_save_dir))
+        dialog.images_selected.connect(self.show_image_subset)
+        return dialog
+
+    def show_image_subset(self, image_paths):
+        """文件列表只显示给定的图片（如数据集查询结果），重新打开目录可恢复全部图片"""
+        if not image_paths or not self.may_continue():
+            return
+        self.m_img_list = list(image_paths)
+        self.img_count = len(self.m_img_list)
+        self.file_path = None
+        self.file_list_widget.clear()
+        self.open_next_image()
+        for img_path in self.m_img_list:
+            self.file_list_widget.addItem(QListWidgetItem(img_path))
+        self.update_switch_button_state()
+        self.update_status_bar_info()
+        self.statusBar().showMessage(f'🔎 文件列表显示 {self.img_count} 张查询结果图片')
+
     def show_batch_operations_dialog(self):
         """显示批量操作对话框"""
         try:
-            dialog = BatchOperationsDialog(self)
+            dialog = self.create_batch_operations_dialog()
             dialog.exec_()
 
         except Exception as e:
@@ -5031,6 +5265,16 @@ class MainWindow(QMainWindow, WindowMixin):
         except Exception as e:
             print(f"[ERROR] 显示快捷键配置对话框失败: {str(e)}")
 
+    def show_diagnostics_dialog(self, _value=False):
+        """显示性能诊断对话框（非模态，可边操作边观察）"""
+        if self.diagnostics_dialog is None:
+            self.diagnostics_dialog = DiagnosticsDialog(self)
+        self.diagnostics_dialog.show()
+        self.diagnostics_dialog.raise_()
+        self.diagnostics_dialog.refresh_timer.start()
+        self.diagnostics_dialog.refresh()
+
+
 
 def inverted(color):
     return QColor(*[255 - v for v in color.getRgb()])
@@ -5100,4 +5344,6 @@ def main():
 
 
 if __name__ == '__main__':
+    # Worker processes of the bulk annotation readers need this in frozen builds
+    multiprocessing.freeze_support()
     sys.exit(main())
@@ -0,0 +1,285 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+CPU训练批次大小和数据加载线程自动调优
+
+训练开始前，对几组候选的批次大小和数据加载线程数各运行一次短时探测
+（几步真实的前向+反向传播），测量吞吐量（图片/秒）和峰值内存，
+在内存预算内选出吞吐量最高的组合。每次探测在独立的子进程中运行，
+峰值内存互不影响，内存耗尽也不会波及训练进程。
+"""
+
+import os
+import time
+import logging
+import threading
+import multiprocessing
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Sequence
+
+# 设置日志
+logger = logging.getLogger(__name__)
+
+# 候选批次大小（从小到大探测，超出内存预算或吞吐量不再提升时停止）
+CANDIDATE_BATCH_SIZES = (4, 8, 16, 32)
+# 数据加载线程数上限
+MAX_WORKERS = 8
+# 每次探测先预热的步数和计时的步数
+PROBE_WARMUP_STEPS = 2
+PROBE_STEPS = 6
+# 单次探测的超时（秒）
+PROBE_TIMEOUT = 300
+# 内存预算占当前可用内存的比例
+MEMORY_BUDGET_FRACTION = 0.7
+# 批次加倍后吞吐量提升不到该比例时停止增大批次
+MIN_THROUGHPUT_GAIN = 0.05
+# 峰值内存采样间隔（秒）
+RSS_SAMPLE_INTERVAL = 0.05
+
+
+@dataclass
+class ProbeResult:
+    """单次探测结果"""
+    batch_size: int
+    workers: int
+    images_per_second: float = 0.0
+    peak_rss_mb: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class AutoTuneResult:
+    """调优结果"""
+    batch_size: int
+    workers: int
+    images_per_second: float
+    peak_rss_mb: float
+    memory_budget_mb: Optional[float]
+    probes: List[ProbeResult] = field(default_factory=list)
+
+
+def candidate_workers(cpu_count: Optional[int] = None) -> List[int]:
+    """候选数据加载线程数：0、2、CPU核数的一半和全部（不超过MAX_WORKERS）"""
+    cpu_count = cpu_count or os.cpu_count() or 1
+    return sorted({0, min(2, cpu_count), min(MAX_WORKERS, max(1, cpu_count // 2)), min(MAX_WORKERS, cpu_count)})
+
+
+def available_memory_mb() -> Optional[float]:
+    """当前可用内存（MB），无法获取时返回None"""
+    try:
+        import psutil
+        return psutil.virtual_memory().available / (1024 * 1024)
+    except ImportError:
+        pass
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+class _RssSampler:
+    """采样当前进程及其子进程（数据加载线程）的内存总和，记录峰值"""
+
+    def __init__(self):
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        try:
+            import psutil
+            self._process = psutil.Process()
+        except ImportError:
+            self._process = None
+
+    def start(self):
+        if self._process is not None:
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(RSS_SAMPLE_INTERVAL):
+            try:
+                rss = self._process.memory_info().rss
+                for child in self._process.children(recursive=True):
+                    try:
+                        rss += child.memory_info().rss
+                    except Exception:
+                        pass
+                self.peak = max(self.peak, rss)
+            except Exception:
+                pass
+
+    def stop(self) -> float:
+        """停止采样，返回峰值内存（MB）"""
+        if self._process is not None:
+            self._stop.set()
+            self._thread.join()
+            return self.peak / (1024 * 1024)
+        try:
+            # 没有psutil时使用本进程的峰值（Linux上单位为KB）
+            import resource
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        except ImportError:
+            return 0.0
+
+
+def _probe_process_main(model_path: str, data_yaml: str, imgsz: int, batch_size: int, workers: int,
+                        steps: int, sender):
+    """探测子进程：用真实的数据加载和训练步骤测量吞吐量"""
+    try:
+        import torch
+        from ultralytics import YOLO
+        from ultralytics.cfg import get_cfg
+        from ultralytics.data import build_dataloader, build_yolo_dataset
+        from ultralytics.data.utils import check_det_dataset
+
+        sampler = _RssSampler()
+        sampler.start()
+
+        data = check_det_dataset(data_yaml)
+        cfg = get_cfg(overrides={'data': data_yaml, 'imgsz': imgsz, 'batch': batch_size, 'workers': workers})
+        model = YOLO(model_path).model
+        model.args = cfg
+        model.train()
+        for parameter in model.parameters():
+            parameter.requires_grad_(True)
+        stride = max(int(model.stride.max()), 32)
+
+        dataset = build_yolo_dataset(cfg, data['train'], batch_size, data, mode='train', stride=stride)
+        loader = build_dataloader(dataset, batch_size, workers, shuffle=True)
+        optimizer = torch.optim.SGD(model.parameters(), lr=1e-4, momentum=0.9)
+
+        iterator = iter(loader)
+        images = 0
+        start = time.perf_counter()
+        for step in range(PROBE_WARMUP_STEPS + steps):
+            if step == PROBE_WARMUP_STEPS:
+                images = 0
+                start = time.perf_counter()
+            batch = next(iterator)
+            batch['img'] = batch['img'].float() / 255
+            loss, _ = model.loss(batch)
+            optimizer.zero_grad()
+            loss.sum().backward()
+            optimizer.step()
+            images += batch['img'].shape[0]
+        elapsed = time.perf_counter() - start
+
+        sender.send({'images_per_second': images / elapsed, 'peak_rss_mb': sampler.stop()})
+    except Exception as e:
+        sender.send({'error': str(e)})
+    finally:
+        sender.close()
+
+
+def probe(model_path: str, data_yaml: str, batch_size: int, workers: int, imgsz: int = 640,
+          steps: int = PROBE_STEPS, timeout: float = PROBE_TIMEOUT) -> ProbeResult:
+    """在独立子进程中探测一组 (批次大小, 线程数)"""
+    context = multiprocessing.get_context('spawn')
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=_probe_process_main, name="BatchAutoTuneProbe",
+                              args=(model_path, data_yaml, imgsz, batch_size, workers, steps, sender))
+    process.start()
+    sender.close()
+    try:
+        if receiver.poll(timeout):
+            payload = receiver.recv()
+        else:
+            payload = {'error': f"探测超时 ({timeout}s)"}
+    except EOFError:
+        # 子进程没有发送结果就退出，通常是内存耗尽被系统终止
+        payload = {'error': "探测进程意外退出"}
+    finally:
+        receiver.close()
+        process.join(5)
+        if process.is_alive():
+            process.kill()
+            process.join()
+    return ProbeResult(batch_size, workers, **payload)
+
+
+def auto_tune(model_path: str, data_yaml: str, imgsz: int = 640,
+              batch_sizes: Sequence[int] = CANDIDATE_BATCH_SIZES,
+              workers_options: Optional[Sequence[int]] = None,
+              memory_budget_mb: Optional[float] = None,
+              log: Optional[Callable[[str], None]] = None,
+              should_stop: Optional[Callable[[], bool]] = None,
+              probe_func: Callable[..., ProbeResult] = probe) -> Optional[AutoTuneResult]:
+    """
+    选择吞吐量最高且峰值内存在预算内的批次大小和数据加载线程数
+
+    先固定中间的线程数，从小到大增大批次，直到超出内存预算或吞吐量不再明显提升；
+    再用选出的批次大小比较各个线程数。
+
+    Args:
+        model_path: 模型路径
+        data_yaml: 数据集配置
+        imgsz: 训练图像尺寸
+        batch_sizes: 候选批次大小
+        workers_options: 候选线程数，默认candidate_workers()
+        memory_budget_mb: 内存预算（MB），默认为可用内存的MEMORY_BUDGET_FRACTION
+        log: 日志回调
+        should_stop: 返回True时中止调优
+        probe_func: 探测函数（签名同probe）
+
+    Returns:
+        Optional[AutoTuneResult]: 没有任何候选在预算内成功运行时返回None
+    """
+    log = log or logger.info
+    should_stop = should_stop or (lambda: False)
+    workers_options = list(workers_options or candidate_workers())
+    if memory_budget_mb is None:
+        available = available_memory_mb()
+        memory_budget_mb = available * MEMORY_BUDGET_FRACTION if available else None
+
+    probes = []
+
+    def run(batch_size, workers):
+        result = probe_func(model_path, data_yaml, batch_size, workers, imgsz=imgsz)
+        probes.append(result)
+        if result.ok:
+            log(f"⚡ 探测 batch={batch_size}, workers={workers}: "
+                f"{result.images_per_second:.1f} 张/秒, 峰值内存 {result.peak_rss_mb:.0f} MB")
+        else:
+            log(f"⚠️ 探测 batch={batch_size}, workers={workers} 失败: {result.error}")
+        return result
+
+    def fits(result):
+        return result.ok and (memory_budget_mb is None or result.peak_rss_mb <= memory_budget_mb)
+
+    if memory_budget_mb is not None:
+        log(f"🧮 内存预算: {memory_budget_mb:.0f} MB")
+
+    best = None
+    base_workers = workers_options[len(workers_options) // 2]
+    for batch_size in sorted(batch_sizes):
+        if should_stop():
+            break
+        result = run(batch_size, base_workers)
+        # 更大的批次只会占用更多内存
+        if not fits(result):
+            break
+        improved = best is None or result.images_per_second >= best.images_per_second * (1 + MIN_THROUGHPUT_GAIN)
+        if best is None or result.images_per_second > best.images_per_second:
+            best = result
+        if not improved:
+            break
+
+    if best is None:
+        return None
+
+    for workers in workers_options:
+        if should_stop():
+            break
+        if workers == best.workers:
+            continue
+        result = run(best.batch_size, workers)
+        if fits(result) and result.images_per_second > best.images_per_second:
+            best = result
+
+    log(f"✅ 自动调优结果: batch={best.batch_size}, workers={best.workers}, "
+        f"{best.images_per_second:.1f} 张/秒")
+    return AutoTuneResult(best.batch_size, best.workers, best.images_per_second, best.peak_rss_mb,
+                          memory_budget_mb, probes)
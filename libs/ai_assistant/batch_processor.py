@@ -18,6 +18,7 @@ try:
 except ImportError:
     from PyQt4.QtCore import QObject, pyqtSignal, QThread, QTimer
 
+from libs import perf_trace
 from .yolo_predictor import YOLOPredictor, PredictionResult
 
 # 设置日志
@@ -140,37 +141,16 @@ class BatchProcessor(QObject):
             logger.error(error_msg)
             self.error_occurred.emit(error_msg)
     
+    @perf_trace.timed('batch.scan')
     def _scan_images(self, dir_path: str, recursive: bool = True) -> List[str]:
         """扫描目录中的图像文件"""
-        image_files = []
-        
         try:
-            dir_path = Path(dir_path)
-            
-            if not dir_path.exists() or not dir_path.is_dir():
-                return image_files
-            
-            # 扫描模式
-            pattern = "**/*" if recursive else "*"
-            
-            for format_ext in self.SUPPORTED_FORMATS:
-                # 扫描指定格式的文件
-                files = dir_path.glob(f"{pattern}{format_ext}")
-                image_files.extend([str(f) for f in files if f.is_file()])
-                
-                # 同时扫描大写格式
-                files = dir_path.glob(f"{pattern}{format_ext.upper()}")
-                image_files.extend([str(f) for f in files if f.is_file()])
-            
-            # 去重并排序
-            image_files = sorted(list(set(image_files)))
-            
+            image_files = scan_images(dir_path, recursive)
             logger.info(f"扫描到 {len(image_files)} 个图像文件")
-            
+            return image_files
         except Exception as e:
             logger.error(f"扫描图像文件失败: {str(e)}")
-        
-        return image_files
+            return []
     
     def _is_image_file(self, file_path: str) -> bool:
         """检查是否为支持的图像文件"""
@@ -233,9 +213,10 @@ class BatchProcessor(QObject):
                     self.progress_updated.emit(i + 1, self.total_files, os.path.basename(file_path))
                     
                     # 执行预测
-                    result = self.predictor.predict_single(
-                        file_path, conf_threshold, iou_threshold, max_det
-                    )
+                    with perf_trace.span('batch.image'):
+                        result = self.predictor.predict_single(
+                            file_path, conf_threshold, iou_threshold, max_det
+                        )
                     
                     if result is not None:
                         self.results[file_path] = result
@@ -262,6 +243,7 @@ class BatchProcessor(QObject):
             
             # 处理完成
             total_time = time.time() - self.start_time
+            perf_trace.record('batch.total', total_time)
             
             summary = {
                 'total_files': self.total_files,
@@ -286,6 +268,7 @@ class BatchProcessor(QObject):
         finally:
             self.is_processing = False
     
+    @perf_trace.timed('batch.save')
     def _save_result(self, result: PredictionResult):
         """保存预测结果到文件"""
         try:
@@ -331,3 +314,21 @@ class BatchProcessor(QObject):
         """清除结果缓存"""
         self.results.clear()
         self.errors.clear()
+
+
+def scan_images(dir_path: str, recursive: bool = True) -> List[str]:
+    """
+    列出目录中支持格式的图像文件（扩展名不区分大小写），按路径排序
+
+    只遍历一次目录树，不像按扩展名逐个glob那样每种格式各遍历两次。
+    """
+    if not os.path.isdir(dir_path):
+        return []
+    formats = set(BatchProcessor.SUPPORTED_FORMATS)
+    image_files = []
+    for root, dirs, files in os.walk(dir_path):
+        image_files.extend(os.path.join(root, name) for name in files
+                           if os.path.splitext(name)[1].lower() in formats)
+        if not recursive:
+            break
+    return sorted(image_files)
@@ -0,0 +1,369 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+导出模型基准测试
+
+导出完成后，对能在本机CPU上运行的格式（ONNX Runtime、TorchScript）：
+- 在若干批次大小和线程数下测量预热后的推理延迟分位数（p50/p90/p99）和吞吐量
+- 在项目图片样本上与源 .pt 模型的检测结果比较（框IoU、置信度偏差）
+结果保存为导出文件旁的 <文件名>.benchmark.json。
+"""
+
+import os
+import json
+import time
+import logging
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from libs.ai_assistant.model_evaluator import box_iou, greedy_match
+
+# 设置日志
+logger = logging.getLogger(__name__)
+
+# 可在本机CPU上测试的导出格式
+BENCHMARK_FORMATS = ('onnx', 'torchscript')
+# 测试的批次大小
+BENCHMARK_BATCH_SIZES = (1, 4, 8)
+# 每种配置的预热次数、最多计时次数和计时时间上限（秒）
+WARMUP_RUNS = 3
+MAX_RUNS = 50
+MIN_RUNS = 5
+MAX_SECONDS_PER_CONFIG = 3.0
+# 精度比较使用的图片数、置信度阈值和匹配IoU阈值
+ACCURACY_SAMPLE_SIZE = 20
+ACCURACY_CONF = 0.25
+MATCH_IOU = 0.5
+# letterbox填充颜色（与ultralytics相同）
+PAD_COLOR = (114, 114, 114)
+
+BENCHMARK_SUFFIX = '.benchmark.json'
+
+
+@dataclass
+class LatencyStats:
+    """一种 (批次大小, 线程数) 配置的延迟统计（毫秒，按批次计）"""
+    batch_size: int
+    threads: int
+    runs: int
+    mean_ms: float
+    p50_ms: float
+    p90_ms: float
+    p99_ms: float
+    images_per_second: float
+
+
+@dataclass
+class AccuracyComparison:
+    """导出模型与源模型检测结果的比较"""
+    images: int
+    reference_boxes: int
+    exported_boxes: int
+    matched_boxes: int
+    mean_iou: float
+    min_iou: float
+    mean_score_drift: float
+    max_score_drift: float
+
+    @property
+    def match_rate(self) -> float:
+        """源模型检测框中被导出模型复现的比例"""
+        return self.matched_boxes / max(self.reference_boxes, 1)
+
+
+@dataclass
+class BenchmarkReport:
+    """一次导出的基准测试结果"""
+    exported_path: str
+    source_path: str
+    export_format: str
+    image_size: int
+    latency: List[LatencyStats] = field(default_factory=list)
+    accuracy: Optional[AccuracyComparison] = None
+    notes: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict:
+        data = asdict(self)
+        if self.accuracy is not None:
+            data['accuracy']['match_rate'] = self.accuracy.match_rate
+        return data
+
+
+def benchmark_report_path(exported_path: str) -> str:
+    """基准测试结果文件: 导出文件旁的 <文件名>.benchmark.json"""
+    return exported_path + BENCHMARK_SUFFIX
+
+
+def candidate_threads(cpu_count: Optional[int] = None) -> List[int]:
+    """测试的线程数：1、一半核数、全部核数"""
+    cpu_count = cpu_count or os.cpu_count() or 1
+    return sorted({1, max(1, cpu_count // 2), cpu_count})
+
+
+def letterbox(image_path: str, size: int) -> np.ndarray:
+    """按ultralytics的方式等比缩放并居中填充到 size×size，返回 (3, size, size) float32 [0, 1]"""
+    from PIL import Image
+
+    with Image.open(image_path) as img:
+        img = img.convert('RGB')
+        ratio = min(size / img.width, size / img.height)
+        resized = img.resize((max(1, round(img.width * ratio)), max(1, round(img.height * ratio))), Image.BILINEAR)
+    canvas = Image.new('RGB', (size, size), PAD_COLOR)
+    canvas.paste(resized, ((size - resized.width) // 2, (size - resized.height) // 2))
+    return np.asarray(canvas, dtype=np.float32).transpose(2, 0, 1) / 255.0
+
+
+def make_batch(samples: Sequence[np.ndarray], batch_size: int, size: int) -> np.ndarray:
+    """用样本图片（不足时循环重复，没有时用随机噪声）组成一个批次"""
+    if not samples:
+        rng = np.random.default_rng(0)
+        return rng.random((batch_size, 3, size, size), dtype=np.float32)
+    return np.stack([samples[i % len(samples)] for i in range(batch_size)])
+
+
+def measure_latency(run: Callable[[], None], warmup: int = WARMUP_RUNS, max_runs: int = MAX_RUNS,
+                    min_runs: int = MIN_RUNS, max_seconds: float = MAX_SECONDS_PER_CONFIG) -> np.ndarray:
+    """
+    预热后重复调用run，返回每次的耗时（秒）
+
+    至少计时min_runs次；之后达到max_runs次或累计超过max_seconds时停止。
+    """
+    for _ in range(warmup):
+        run()
+    samples = []
+    start = time.perf_counter()
+    while len(samples) < max_runs:
+        t0 = time.perf_counter()
+        run()
+        samples.append(time.perf_counter() - t0)
+        if len(samples) >= min_runs and time.perf_counter() - start >= max_seconds:
+            break
+    return np.array(samples)
+
+
+def summarize_latency(samples: np.ndarray, batch_size: int, threads: int) -> LatencyStats:
+    p50, p90, p99 = np.percentile(samples, [50, 90, 99]) * 1000
+    mean = float(samples.mean())
+    return LatencyStats(batch_size, threads, len(samples), mean * 1000, float(p50), float(p90), float(p99),
+                        batch_size / mean if mean > 0 else 0.0)
+
+
+def _onnx_runner(model_path: str, threads: int) -> Tuple[Callable[[np.ndarray], None], Optional[int], Optional[int]]:
+    """ONNX Runtime CPU推理，返回 (运行函数, 固定批次大小或None, 固定输入尺寸或None)"""
+    import onnxruntime
+
+    options = onnxruntime.SessionOptions()
+    options.intra_op_num_threads = threads
+    options.inter_op_num_threads = 1
+    session = onnxruntime.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+    model_input = session.get_inputs()[0]
+    shape = model_input.shape
+    fixed_batch = shape[0] if isinstance(shape[0], int) else None
+    fixed_size = shape[2] if isinstance(shape[2], int) else None
+    return (lambda batch: session.run(None, {model_input.name: batch})), fixed_batch, fixed_size
+
+
+def _torchscript_runner(model_path: str, threads: int) -> Tuple[Callable[[np.ndarray], None], Optional[int], Optional[int]]:
+    """TorchScript CPU推理，返回 (运行函数, 固定批次大小或None, 固定输入尺寸或None)"""
+    import torch
+
+    torch.set_num_threads(threads)
+    model = torch.jit.load(model_path, map_location='cpu')
+    model.eval()
+
+    def run(batch):
+        with torch.inference_mode():
+            model(torch.from_numpy(batch))
+
+    return run, None, None
+
+
+_RUNNERS = {'onnx': _onnx_runner, 'torchscript': _torchscript_runner}
+
+
+@contextmanager
+def _restore_torch_threads(export_format: str):
+    """TorchScript测量修改的是整个进程的torch线程数，结束后恢复，避免影响GUI中的其他推理"""
+    if export_format != 'torchscript':
+        yield
+        return
+    import torch
+
+    previous = torch.get_num_threads()
+    try:
+        yield
+    finally:
+        torch.set_num_threads(previous)
+
+
+def benchmark_latency(model_path: str, export_format: str, image_size: int, samples: Sequence[np.ndarray],
+                      batch_sizes: Sequence[int] = BENCHMARK_BATCH_SIZES,
+                      thread_counts: Optional[Sequence[int]] = None,
+                      log: Optional[Callable[[str], None]] = None,
+                      notes: Optional[List[str]] = None) -> List[LatencyStats]:
+    """在各批次大小和线程数下测量导出模型的延迟"""
+    log = log or logger.info
+    notes = notes if notes is not None else []
+    results = []
+    with _restore_torch_threads(export_format):
+        for threads in thread_counts or candidate_threads():
+            run, fixed_batch, fixed_size = _RUNNERS[export_format](model_path, threads)
+            size = fixed_size or image_size
+            for batch_size in batch_sizes:
+                if fixed_batch is not None and batch_size != fixed_batch:
+                    note = (f"模型的批次大小固定为{fixed_batch}，跳过batch={batch_size}"
+                            f"（导出时启用动态batch可测试）")
+                    if note not in notes:
+                        notes.append(note)
+                    continue
+                batch = make_batch(samples, batch_size, size)
+                try:
+                    stats = summarize_latency(measure_latency(lambda: run(batch)), batch_size, threads)
+                except Exception as e:
+                    notes.append(f"batch={batch_size}, threads={threads} 运行失败: {e}")
+                    continue
+                results.append(stats)
+                log(f"⏱️ batch={batch_size}, threads={threads}: p50 {stats.p50_ms:.1f} ms, "
+                    f"p99 {stats.p99_ms:.1f} ms, {stats.images_per_second:.1f} 张/秒")
+    return results
+
+
+def compare_detections(reference: np.ndarray, exported: np.ndarray,
+                       iou_threshold: float = MATCH_IOU) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    匹配一张图片上两个模型的检测结果（同类别、IoU从高到低一对一）
+
+    Args:
+        reference, exported: (N, 6) 数组 [x1, y1, x2, y2, 置信度, 类别]
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: 匹配对的IoU、匹配对的置信度差（导出 - 源）
+    """
+    reference = np.asarray(reference, dtype=np.float64).reshape(-1, 6)
+    exported = np.asarray(exported, dtype=np.float64).reshape(-1, 6)
+    iou = box_iou(reference[:, :4], exported[:, :4])
+    iou[reference[:, None, 5] != exported[None, :, 5]] = 0
+    ref_index, exp_index = greedy_match(iou, iou_threshold)
+    return iou[ref_index, exp_index], exported[exp_index, 4] - reference[ref_index, 4]
+
+
+def summarize_accuracy(pairs: Sequence[Tuple[np.ndarray, np.ndarray]]) -> AccuracyComparison:
+    """
+    汇总多张图片的检测结果比较
+
+    Args:
+        pairs: 每张图片的 (源模型检测, 导出模型检测)
+    """
+    ious, drifts = [np.zeros(0)], [np.zeros(0)]
+    reference_boxes = exported_boxes = 0
+    for reference, exported in pairs:
+        iou, drift = compare_detections(reference, exported)
+        ious.append(iou)
+        drifts.append(np.abs(drift))
+        reference_boxes += len(np.asarray(reference).reshape(-1, 6))
+        exported_boxes += len(np.asarray(exported).reshape(-1, 6))
+    ious, drifts = np.concatenate(ious), np.concatenate(drifts)
+    return AccuracyComparison(
+        images=len(pairs), reference_boxes=reference_boxes, exported_boxes=exported_boxes,
+        matched_boxes=len(ious), mean_iou=float(ious.mean()) if len(ious) else 0.0,
+        min_iou=float(ious.min()) if len(ious) else 0.0,
+        mean_score_drift=float(drifts.mean()) if len(drifts) else 0.0,
+        max_score_drift=float(drifts.max()) if len(drifts) else 0.0)
+
+
+def detect_images(model, image_paths: Sequence[str], image_size: int,
+                  conf: float = ACCURACY_CONF) -> List[np.ndarray]:
+    """用ultralytics模型逐张检测，返回每张图片的 (N, 6) 数组 [x1, y1, x2, y2, 置信度, 类别]"""
+    detections = []
+    for image_path in image_paths:
+        boxes = model.predict(image_path, conf=conf, imgsz=image_size, device='cpu', verbose=False)[0].boxes
+        detections.append(np.hstack([boxes.xyxy.cpu().numpy(), boxes.conf.cpu().numpy()[:, None],
+                                     boxes.cls.cpu().numpy()[:, None]]))
+    return detections
+
+
+def benchmark_accuracy(source_path: str, exported_path: str, image_paths: Sequence[str],
+                       image_size: int) -> AccuracyComparison:
+    """在样本图片上比较导出模型与源模型的检测结果"""
+    from ultralytics import YOLO
+
+    reference = detect_images(YOLO(source_path), image_paths, image_size)
+    exported = detect_images(YOLO(exported_path, task='detect'), image_paths, image_size)
+    return summarize_accuracy(list(zip(reference, exported)))
+
+
+def run_export_benchmark(source_path: str, exported_path: str, export_format: str, image_size: int,
+                         image_paths: Sequence[str] = (), log: Optional[Callable[[str], None]] = None,
+                         should_stop: Optional[Callable[[], bool]] = None) -> BenchmarkReport:
+    """
+    对导出的模型运行延迟和精度测试，并把结果保存到导出文件旁
+
+    缺少onnxruntime/torch等运行库时相应部分记入notes，不抛出异常。
+    """
+    log = log or logger.info
+    should_stop = should_stop or (lambda: False)
+    report = BenchmarkReport(exported_path, source_path, export_format, image_size)
+    image_paths = list(image_paths)[:ACCURACY_SAMPLE_SIZE]
+
+    samples, sample_paths = [], []
+    for image_path in image_paths:
+        try:
+            samples.append(letterbox(image_path, image_size))
+            sample_paths.append(image_path)
+        except (OSError, ValueError) as e:
+            logger.debug(f"跳过无法读取的图片 {image_path}: {e}")
+    if not samples:
+        report.notes.append("没有可用的项目图片，延迟测试使用随机输入，跳过精度比较")
+
+    if not should_stop():
+        try:
+            report.latency = benchmark_latency(exported_path, export_format, image_size, samples,
+                                               log=log, notes=report.notes)
+        except ImportError as e:
+            report.notes.append(f"无法测试延迟，缺少运行库: {e}")
+        except Exception as e:
+            report.notes.append(f"延迟测试失败: {e}")
+
+    if samples and not should_stop():
+        try:
+            report.accuracy = benchmark_accuracy(source_path, exported_path, sample_paths, image_size)
+            log(f"🎯 与源模型比较: 复现 {report.accuracy.match_rate:.1%} 的检测框, "
+                f"平均IoU {report.accuracy.mean_iou:.3f}, 最大置信度偏差 {report.accuracy.max_score_drift:.3f}")
+        except ImportError as e:
+            report.notes.append(f"无法比较精度，缺少运行库: {e}")
+        except Exception as e:
+            report.notes.append(f"精度比较失败: {e}")
+
+    for note in report.notes:
+        log(f"⚠️ {note}")
+
+    try:
+        with open(benchmark_report_path(exported_path), 'w', encoding='utf-8') as f:
+            json.dump(report.to_dict(), f, ensure_ascii=False, indent=2)
+    except OSError as e:
+        logger.warning(f"保存基准测试结果失败: {e}")
+    return report
+
+
+def format_report(report: BenchmarkReport) -> str:
+    """生成显示在对话框中的文字摘要"""
+    lines = [f"基准测试 ({report.export_format.upper()}, CPU, {report.image_size}px):"]
+    if report.latency:
+        best = max(report.latency, key=lambda stats: stats.images_per_second)
+        single = min((stats for stats in report.latency if stats.batch_size == 1),
+                     key=lambda stats: stats.p50_ms, default=None)
+        if single:
+            lines.append(f"  单张延迟: p50 {single.p50_ms:.1f} ms, p99 {single.p99_ms:.1f} ms "
+                         f"({single.threads} 线程)")
+        lines.append(f"  最高吞吐量: {best.images_per_second:.1f} 张/秒 "
+                     f"(batch={best.batch_size}, {best.threads} 线程)")
+    if report.accuracy:
+        accuracy = report.accuracy
+        lines.append(f"  与源模型一致性: {accuracy.match_rate:.1%} 检测框复现, 平均IoU {accuracy.mean_iou:.3f}, "
+                     f"平均置信度偏差 {accuracy.mean_score_drift:.4f}")
+    lines.extend(f"  注意: {note}" for note in report.notes)
+    lines.append(f"  详细结果: {benchmark_report_path(report.exported_path)}")
+    return '\n'.join(lines)
@@ -0,0 +1,260 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+多格式导出队列
+
+同一个检查点的多个导出任务（格式 + 参数）在有界进程池中并行运行。
+每个工作进程启动时把检查点复制到自己的临时目录并只加载一次模型，
+之后在该进程中运行的任务共用这个模型（ultralytics导出时会深拷贝模型，不会相互影响）；
+导出文件先写入工作进程的临时目录，避免同名产物（如静态/动态两种ONNX）相互覆盖，
+完成后移动到输出目录。全部任务结束后写出清单文件，列出每个产物的大小和SHA-256。
+"""
+
+import os
+import json
+import time
+import queue
+import shutil
+import hashlib
+import logging
+import tempfile
+import multiprocessing
+import multiprocessing.util
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence
+
+# 设置日志
+logger = logging.getLogger(__name__)
+
+# 默认并行导出的进程数（导出本身会占用多核，进程过多反而变慢）
+DEFAULT_MAX_WORKERS = 2
+MANIFEST_NAME = 'export_manifest.json'
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# 导出格式 -> ultralytics的format参数
+ULTRALYTICS_FORMATS = {'onnx': 'onnx', 'tensorrt': 'engine', 'coreml': 'coreml',
+                       'tflite': 'tflite', 'torchscript': 'torchscript'}
+
+# 任务状态
+STATUS_QUEUED = 'queued'
+STATUS_RUNNING = 'running'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+STATUS_CANCELLED = 'cancelled'
+
+
+@dataclass
+class ExportJob:
+    """一个导出任务"""
+    job_id: str
+    export_format: str
+    output_name: str
+    kwargs: Dict = field(default_factory=dict)
+
+    @property
+    def label(self) -> str:
+        """任务的简短描述，如 onnx(dynamic=True, opset=12)"""
+        params = ', '.join(f"{key}={value}" for key, value in sorted(self.kwargs.items())
+                           if key not in ('imgsz', 'device'))
+        return f"{self.export_format}({params})" if params else self.export_format
+
+
+@dataclass
+class JobResult:
+    """导出任务结果"""
+    job_id: str
+    export_format: str
+    success: bool
+    path: str = ""
+    size_bytes: int = 0
+    sha256: str = ""
+    seconds: float = 0.0
+    kwargs: Dict = field(default_factory=dict)
+    error: str = ""
+
+
+def artifact_size(path: str) -> int:
+    """产物大小（目录形式的产物如.mlpackage按其中全部文件计算）"""
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(root, name))
+                   for root, _, names in os.walk(path) for name in names)
+    return os.path.getsize(path)
+
+
+def artifact_sha256(path: str) -> str:
+    """产物的SHA-256；目录按相对路径排序后依次计入文件名和内容"""
+    digest = hashlib.sha256()
+    if os.path.isdir(path):
+        files = sorted(os.path.relpath(os.path.join(root, name), path)
+                       for root, _, names in os.walk(path) for name in names)
+    else:
+        files = [None]
+    for relative in files:
+        file_path = path if relative is None else os.path.join(path, relative)
+        if relative is not None:
+            digest.update(relative.replace(os.sep, '/').encode('utf-8'))
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_manifest(output_dir: str, source_path: str, results: Sequence[JobResult],
+                   name: str = MANIFEST_NAME) -> str:
+    """写出导出清单，返回清单路径"""
+    manifest = {
+        'source': os.path.abspath(source_path),
+        'source_sha256': artifact_sha256(source_path) if os.path.exists(source_path) else "",
+        'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'artifacts': [asdict(result) for result in results],
+    }
+    manifest_path = os.path.join(output_dir, name)
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest_path
+
+
+class _QueueLogHandler(logging.Handler):
+    """把工作进程中ultralytics的日志发回GUI进程"""
+
+    def __init__(self, events):
+        super().__init__(logging.INFO)
+        self.events = events
+        self.job_id = None
+
+    def emit(self, record):
+        if self.job_id is None:
+            return
+        try:
+            self.events.put(('log', self.job_id, self.format(record)))
+        except Exception:
+            self.handleError(record)
+
+
+# 工作进程状态（由_worker_init设置）
+_worker = {}
+
+
+def _worker_init(model_path: str, events):
+    """工作进程初始化：复制检查点到私有临时目录并加载一次模型"""
+    handler = _QueueLogHandler(events)
+    _worker.update(events=events, handler=handler)
+    try:
+        from ultralytics import YOLO
+
+        work_dir = tempfile.mkdtemp(prefix='labelImg_export_')
+        # 工作进程正常退出时删除临时目录（进程池的工作进程不执行atexit）
+        multiprocessing.util.Finalize(None, shutil.rmtree, args=(work_dir,), kwargs={'ignore_errors': True},
+                                      exitpriority=10)
+        local_path = os.path.join(work_dir, os.path.basename(model_path))
+        shutil.copy2(model_path, local_path)
+        logging.getLogger('ultralytics').addHandler(handler)
+        _worker.update(model=YOLO(local_path), work_dir=work_dir)
+    except Exception as e:
+        # 初始化失败时进程池会整体失效，改为让每个任务返回该错误
+        _worker['error'] = f"加载模型失败: {e}"
+
+
+def _run_job(job: ExportJob, output_dir: str) -> JobResult:
+    """在工作进程中运行一个导出任务"""
+    events, handler = _worker['events'], _worker['handler']
+    if 'error' in _worker:
+        return JobResult(job.job_id, job.export_format, False, kwargs=job.kwargs, error=_worker['error'])
+    handler.job_id = job.job_id
+    events.put(('status', job.job_id, STATUS_RUNNING))
+    start = time.perf_counter()
+    try:
+        exported = str(_worker['model'].export(format=ULTRALYTICS_FORMATS[job.export_format], **job.kwargs))
+        suffix = '.mlpackage' if exported.endswith('.mlpackage') else os.path.splitext(exported)[1]
+        target = os.path.join(output_dir, job.output_name + suffix)
+        if os.path.isdir(target):
+            shutil.rmtree(target)
+        elif os.path.exists(target):
+            os.remove(target)
+        shutil.move(exported, target)
+        return JobResult(job.job_id, job.export_format, True, target, artifact_size(target),
+                         artifact_sha256(target), time.perf_counter() - start, job.kwargs)
+    except Exception as e:
+        return JobResult(job.job_id, job.export_format, False, seconds=time.perf_counter() - start,
+                         kwargs=job.kwargs, error=str(e))
+    finally:
+        handler.job_id = None
+
+
+class ExportQueue:
+    """
+    在有界进程池中运行一组导出任务
+
+    on_event在调用run()的线程中被调用，参数为事件元组:
+        ('status', job_id, 状态)、('log', job_id, 日志)、('result', job_id, JobResult)
+    """
+
+    def __init__(self, model_path: str, jobs: Sequence[ExportJob], output_dir: str,
+                 max_workers: int = DEFAULT_MAX_WORKERS,
+                 on_event: Optional[Callable[[tuple], None]] = None):
+        self.model_path = model_path
+        self.jobs = list(jobs)
+        self.output_dir = output_dir
+        self.max_workers = max(1, min(max_workers, len(self.jobs)))
+        self.on_event = on_event or (lambda event: None)
+        self._cancelled = False
+
+    def cancel(self):
+        """取消尚未开始的任务（正在导出的任务无法中断，会运行到结束）"""
+        self._cancelled = True
+
+    def run(self) -> List[JobResult]:
+        """运行全部任务并写出清单，返回按任务顺序排列的结果"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        context = multiprocessing.get_context('spawn')
+        manager = context.Manager()
+        events = manager.Queue()
+        results = {}
+        try:
+            with ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context,
+                                     initializer=_worker_init,
+                                     initargs=(self.model_path, events)) as executor:
+                futures = {executor.submit(_run_job, job, self.output_dir): job for job in self.jobs}
+                for job in self.jobs:
+                    self.on_event(('status', job.job_id, STATUS_QUEUED))
+                pending = dict(futures)
+                while pending:
+                    self._drain(events)
+                    if self._cancelled:
+                        for future in pending:
+                            future.cancel()
+                    for future, job in list(pending.items()):
+                        if not future.done():
+                            continue
+                        del pending[future]
+                        if future.cancelled():
+                            result = JobResult(job.job_id, job.export_format, False, kwargs=job.kwargs,
+                                               error="已取消")
+                        else:
+                            try:
+                                result = future.result()
+                            except BrokenProcessPool as e:
+                                result = JobResult(job.job_id, job.export_format, False, kwargs=job.kwargs,
+                                                   error=f"导出进程异常退出: {e}")
+                        results[job.job_id] = result
+                        self._drain(events)
+                        self.on_event(('result', job.job_id, result))
+                    time.sleep(0.1)
+                self._drain(events)
+        finally:
+            manager.shutdown()
+
+        ordered = [results[job.job_id] for job in self.jobs if job.job_id in results]
+        manifest_path = write_manifest(self.output_dir, self.model_path, ordered)
+        logger.info(f"📦 导出清单: {manifest_path}")
+        return ordered
+
+    def _drain(self, events):
+        while True:
+            try:
+                event = events.get_nowait()
+            except queue.Empty:
+                return
+            self.on_event(event)
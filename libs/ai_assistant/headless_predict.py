@@ -0,0 +1,470 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+命令行批量预标注（labelImg-predict）
+
+不创建任何窗口，复用YOLOPredictor的预测、ConfidenceFilter的过滤和labelImg的标注写入代码，
+适合在无显示器的服务器上整夜运行:
+
+    labelImg-predict yolov8n.pt /data/images --format yolo --workers 8 --device cpu
+
+图片按小块分发给N个工作进程，每个工作进程只加载一次自己的模型；进行中的小块数量有上限，
+百万张图片也不会一次性提交。标注文件原子写入，存在即完整，所以已有标注的图片直接跳过，
+中断后重新运行同一命令即可从断点继续；没有检测结果的图片也写出空标注，作为已处理的标记。
+运行中定期打印进度、吞吐量（总体和最近一分钟）和预计剩余时间。
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+import multiprocessing
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from libs.atomic_file import atomic_write_text
+from libs.constants import DEFAULT_ENCODING
+from libs.create_ml_io import JSON_EXT, CreateMLWriter
+from libs.labelFile import LabelFile
+from libs.pascal_voc_io import XML_EXT, PascalVocWriter
+from libs.yolo_io import CLASSES_FILE, TXT_EXT, YOLOWriter, invalidate_class_list_cache, load_class_list
+from .batch_processor import scan_images
+from .confidence_filter import ConfidenceFilter
+from .yolo_predictor import Detection
+
+# 设置日志
+logger = logging.getLogger(__name__)
+
+# 标注格式 -> 标注文件扩展名
+FORMAT_EXTENSIONS = {'voc': XML_EXT, 'yolo': TXT_EXT, 'createml': JSON_EXT}
+# 每个任务块的图片数（太小则进程间通信开销占比高，太大则进度粗糙、中断时丢失的工作多）
+DEFAULT_CHUNK_SIZE = 32
+# 每个工作进程同时排队的任务块数
+IN_FLIGHT_PER_WORKER = 2
+# 工作进程异常退出（内存耗尽、崩溃）后重建进程池的最多次数
+MAX_POOL_RESTARTS = 3
+# 打印进度的间隔（秒）
+PROGRESS_INTERVAL = 10.0
+# “最近”吞吐量的统计窗口（秒）
+RECENT_WINDOW = 60.0
+
+# 退出码
+EXIT_OK = 0
+EXIT_FAILURES = 1
+EXIT_MODEL_ERROR = 2
+EXIT_INTERRUPTED = 130
+
+
+def annotation_path(image_path: str, image_root: str, fmt: str, output_dir: Optional[str] = None) -> str:
+    """
+    图片对应的标注文件路径
+
+    默认与图片放在同一目录；指定output_dir时，按图片相对image_root的路径在output_dir下镜像目录结构。
+    """
+    stem = os.path.splitext(image_path)[0]
+    if output_dir:
+        stem = os.path.join(output_dir, os.path.relpath(stem, image_root))
+    return stem + FORMAT_EXTENSIONS[fmt]
+
+
+def plan_work(image_paths: Sequence[str], image_root: str, fmt: str, output_dir: Optional[str] = None,
+              overwrite: bool = False) -> Tuple[List[Tuple[str, str]], int]:
+    """
+    找出需要预测的图片
+
+    Returns:
+        ([(图片路径, 标注文件路径), ...], 因已有标注而跳过的图片数)
+    """
+    todo = []
+    skipped = 0
+    listings = {}
+    for image_path in image_paths:
+        target = annotation_path(image_path, image_root, fmt, output_dir)
+        if not overwrite:
+            # 每个目录只列一次，避免对百万个文件逐个stat
+            directory, name = os.path.split(target)
+            existing = listings.get(directory)
+            if existing is None:
+                try:
+                    existing = set(os.listdir(directory))
+                except OSError:
+                    existing = set()
+                listings[directory] = existing
+            if name in existing:
+                skipped += 1
+                continue
+        todo.append((image_path, target))
+    return todo, skipped
+
+
+def detection_shapes(detections: Sequence[Detection]) -> List[Dict]:
+    """把检测结果转换为标注写入器使用的形状字典（与MainWindow保存时的格式相同）"""
+    shapes = []
+    for detection in detections:
+        x1, y1, x2, y2 = detection.bbox
+        shapes.append({'label': detection.class_name,
+                       'points': [(x1, y1), (x2, y1), (x2, y2), (x1, y2)],
+                       'difficult': False})
+    return shapes
+
+
+def merge_class_list(existing: Sequence[str], class_names: Sequence[str]) -> List[str]:
+    """在已有类别列表后追加模型中新的类别（已有类别的编号保持不变）"""
+    merged = list(existing)
+    merged.extend(name for name in class_names if name not in merged)
+    return merged
+
+
+def write_annotation(fmt: str, target: str, image_path: str, image_shape: List[int], shapes: List[Dict],
+                     class_list: Optional[List[str]] = None):
+    """
+    写出一张图片的标注文件（三种格式都是原子写入）
+
+    YOLO格式的classes.txt由调用方维护，这里只写标注文件本身。
+    """
+    folder_name = os.path.basename(os.path.dirname(image_path))
+    file_name = os.path.basename(image_path)
+    if fmt == 'createml':
+        CreateMLWriter(folder_name, file_name, image_shape, shapes, target, local_img_path=image_path).write()
+        return
+
+    writer_class = PascalVocWriter if fmt == 'voc' else YOLOWriter
+    writer = writer_class(folder_name, file_name, image_shape, local_img_path=image_path)
+    for shape in shapes:
+        bnd_box = LabelFile.convert_points_to_bnd_box(shape['points'])
+        writer.add_bnd_box(bnd_box[0], bnd_box[1], bnd_box[2], bnd_box[3], shape['label'], int(shape['difficult']))
+    if fmt == 'voc':
+        writer.save(target_file=target)
+    else:
+        writer.save(class_list, target_file=target, write_classes=False)
+
+
+def ensure_class_list(directory: str, class_names: Sequence[str]) -> List[str]:
+    """返回目录的YOLO类别列表，必要时把模型的新类别追加到classes.txt"""
+    class_list_path = os.path.join(directory, CLASSES_FILE)
+    existing = load_class_list(class_list_path) if os.path.isfile(class_list_path) else []
+    merged = merge_class_list(existing, class_names)
+    if merged != existing:
+        atomic_write_text(class_list_path, ''.join(name + '\n' for name in merged), DEFAULT_ENCODING)
+        invalidate_class_list_cache(class_list_path)
+    return merged
+
+
+# 工作进程状态（由_worker_init设置）
+_worker = {}
+
+
+def _worker_init(model_path: str, options: Dict):
+    """工作进程初始化：只加载一次模型"""
+    logging.basicConfig(level=options['log_level'], format='%(asctime)s %(levelname)s %(message)s')
+    _worker.update(options=options, class_lists={})
+    try:
+        from .yolo_predictor import YOLO_AVAILABLE, YOLOPredictor
+        if not YOLO_AVAILABLE:
+            from .yolo_predictor import IMPORT_ERROR
+            raise RuntimeError(f"YOLO库不可用: {IMPORT_ERROR}")
+        if options['threads']:
+            import torch
+            torch.set_num_threads(options['threads'])
+
+        predictor = YOLOPredictor()
+        if options['device'] == 'cpu':
+            predictor.force_cpu_mode()
+        if not predictor.load_model(model_path):
+            raise RuntimeError(f"无法加载模型 {model_path}")
+
+        names = predictor.class_names
+        class_names = [names[key] for key in sorted(names)] if isinstance(names, dict) else list(names)
+        confidence_filter = ConfidenceFilter(options['conf'])
+        for class_name, threshold in options['class_conf'].items():
+            confidence_filter.set_class_threshold(class_name, threshold)
+        _worker.update(predictor=predictor, class_names=class_names, filter=confidence_filter)
+    except Exception as e:
+        # 初始化失败时进程池会整体失效，改为让每个任务块返回该错误
+        _worker['error'] = f"加载模型失败: {e}"
+
+
+def _predict_chunk(items: Sequence[Tuple[str, str]]) -> Tuple[List[Tuple[str, bool, int, str]], str]:
+    """
+    在工作进程中预测一块图片并写出标注
+
+    Returns:
+        ([(图片路径, 是否成功, 框数, 错误信息), ...], 模型加载错误)
+    """
+    if 'error' in _worker:
+        return [], _worker['error']
+    options = _worker['options']
+    predictor, confidence_filter = _worker['predictor'], _worker['filter']
+    results = []
+    for image_path, target in items:
+        try:
+            prediction = predictor.predict_single(image_path, options['conf'], options['iou'], options['max_det'])
+            if prediction is None:
+                raise RuntimeError("预测失败（详见日志）")
+            # 与AI助手面板应用预测结果时相同的过滤步骤
+            detections = confidence_filter.filter_detections(prediction.detections, options['conf'])
+            detections = confidence_filter.optimize_for_annotation(detections, options['min_box_size'],
+                                                                   options['max_overlap'])
+
+            directory = os.path.dirname(target)
+            os.makedirs(directory, exist_ok=True)
+            class_list = None
+            if options['format'] == 'yolo':
+                class_list = _worker['class_lists'].get(directory)
+                if class_list is None:
+                    class_list = ensure_class_list(directory, _worker['class_names'])
+                    _worker['class_lists'][directory] = class_list
+            write_annotation(options['format'], target, image_path, LabelFile.get_image_shape(image_path, None),
+                             detection_shapes(detections), class_list)
+            results.append((image_path, True, len(detections), ''))
+        except Exception as e:
+            results.append((image_path, False, 0, str(e)))
+    return results, ''
+
+
+class ThroughputMeter:
+    """统计完成数量、吞吐量和预计剩余时间"""
+
+    def __init__(self, total: int, window: float = RECENT_WINDOW):
+        self.total = total
+        self.window = window
+        self.done = 0
+        self.failed = 0
+        self.boxes = 0
+        self.start = time.perf_counter()
+        self._samples = deque([(self.start, 0)])
+
+    def add(self, done: int, failed: int, boxes: int):
+        self.done += done
+        self.failed += failed
+        self.boxes += boxes
+        now = time.perf_counter()
+        self._samples.append((now, self.done))
+        while len(self._samples) > 2 and now - self._samples[1][0] > self.window:
+            self._samples.popleft()
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def overall_rate(self) -> float:
+        elapsed = self.elapsed
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    def recent_rate(self) -> float:
+        (first_time, first_done), (last_time, last_done) = self._samples[0], self._samples[-1]
+        span = last_time - first_time
+        return (last_done - first_done) / span if span > 0 else self.overall_rate()
+
+    def eta(self) -> Optional[float]:
+        rate = self.recent_rate()
+        return (self.total - self.done) / rate if rate > 0 else None
+
+    def format_line(self) -> str:
+        percent = 100.0 * self.done / self.total if self.total else 100.0
+        eta = self.eta()
+        return (f"{self.done}/{self.total} ({percent:.1f}%)  "
+                f"{self.overall_rate():.2f} 张/秒（最近 {self.recent_rate():.2f}）  "
+                f"ETA {format_duration(eta) if eta is not None else '-'}  "
+                f"框 {self.boxes}  失败 {self.failed}")
+
+
+def format_duration(seconds: float) -> str:
+    """把秒数格式化为 h:mm:ss"""
+    seconds = int(round(seconds))
+    return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+def run(model_path: str, items: Sequence[Tuple[str, str]], options: Dict, workers: int,
+        chunk_size: int = DEFAULT_CHUNK_SIZE, progress_interval: float = PROGRESS_INTERVAL,
+        out=sys.stdout) -> Tuple[ThroughputMeter, List[Tuple[str, str]], str]:
+    """
+    在进程池中预测全部图片
+
+    Returns:
+        (统计, [(失败的图片, 错误信息), ...], 模型加载错误)
+    """
+    meter = ThroughputMeter(len(items))
+    failures = []
+    chunks = deque(items[i:i + chunk_size] for i in range(0, len(items), chunk_size))
+    if not chunks:
+        return meter, failures, ''
+
+    def record(results):
+        chunk_failures = [(image_path, error) for image_path, ok, _, error in results if not ok]
+        failures.extend(chunk_failures)
+        meter.add(len(results), len(chunk_failures), sum(boxes for _, _, boxes, _ in results))
+
+    def fail_chunks(failed_chunks, error):
+        for chunk in failed_chunks:
+            record([(image_path, False, 0, error) for image_path, _ in chunk])
+
+    context = multiprocessing.get_context('spawn')
+
+    def create_executor():
+        return ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_worker_init,
+                                   initargs=(model_path, options))
+
+    executor = create_executor()
+    pending = {}
+    model_error = ''
+    restarts = 0
+    last_report = time.perf_counter()
+    try:
+        while chunks or pending:
+            broken = ''
+            try:
+                while chunks and len(pending) < workers * IN_FLIGHT_PER_WORKER:
+                    future = executor.submit(_predict_chunk, chunks[0])
+                    pending[future] = chunks.popleft()
+            except BrokenProcessPool as e:
+                broken = str(e)
+            if not broken:
+                finished, _ = wait(pending, timeout=progress_interval, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    chunk = pending.pop(future)
+                    try:
+                        results, model_error = future.result()
+                    except BrokenProcessPool as e:
+                        broken = str(e)
+                        fail_chunks([chunk], f"工作进程异常退出: {e}")
+                        continue
+                    if model_error:
+                        break
+                    record(results)
+            if model_error:
+                break
+            if broken:
+                # 进程池失效后排队中的任务块都无法完成，记为失败（未写出标注，下次运行时重新预测）
+                fail_chunks(pending.values(), f"工作进程异常退出: {broken}")
+                pending.clear()
+                executor.shutdown(wait=True, cancel_futures=True)
+                restarts += 1
+                if restarts > MAX_POOL_RESTARTS:
+                    print(f"❌ 工作进程反复异常退出，放弃剩余 {sum(map(len, chunks))} 张图片", file=out, flush=True)
+                    fail_chunks(chunks, "工作进程反复异常退出，未处理")
+                    chunks.clear()
+                    break
+                print(f"⚠️ 工作进程异常退出，重建进程池（第 {restarts} 次）: {broken}", file=out, flush=True)
+                executor = create_executor()
+            if time.perf_counter() - last_report >= progress_interval:
+                print(meter.format_line(), file=out, flush=True)
+                last_report = time.perf_counter()
+    finally:
+        # 中断或出错时丢弃尚未开始的任务块；正在运行的块会写完当前图片所在的块
+        executor.shutdown(wait=True, cancel_futures=True)
+    return meter, failures, model_error
+
+
+def parse_class_thresholds(values: Optional[Sequence[str]]) -> Dict[str, float]:
+    """解析 类别=阈值 形式的参数"""
+    thresholds = {}
+    for value in values or ():
+        name, separator, threshold = value.rpartition('=')
+        if not separator or not name:
+            raise ValueError(f"类别阈值格式应为 类别=阈值: {value}")
+        thresholds[name] = float(threshold)
+    return thresholds
+
+
+def build_parser() -> argparse.ArgumentParser:
+    cpu_count = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(prog='labelImg-predict',
+                                     description='无界面批量预标注：用YOLO模型预测目录中的图片并写出标注文件')
+    parser.add_argument('model', help='YOLO模型文件（.pt）')
+    parser.add_argument('images', help='图片目录')
+    parser.add_argument('--format', choices=sorted(FORMAT_EXTENSIONS), default='voc', help='标注格式')
+    parser.add_argument('--output-dir', help='标注输出目录（按图片目录结构镜像），默认与图片放在一起')
+    parser.add_argument('--no-recursive', action='store_true', help='不扫描子目录')
+    parser.add_argument('--overwrite', action='store_true', help='重新预测已有标注的图片并覆盖标注')
+    parser.add_argument('--conf', type=float, default=0.25, help='置信度阈值')
+    parser.add_argument('--iou', type=float, default=0.45, help='NMS的IoU阈值')
+    parser.add_argument('--max-det', type=int, default=100, help='每张图片的最大检测数')
+    parser.add_argument('--class-conf', action='append', metavar='类别=阈值',
+                        help='单独提高某个类别的置信度阈值，可重复指定')
+    parser.add_argument('--min-box-size', type=int, default=10, help='丢弃宽或高小于该像素数的框')
+    parser.add_argument('--max-overlap', type=float, default=0.8, help='去除重叠比例超过该值的重复框')
+    parser.add_argument('--workers', type=int, default=max(1, cpu_count // 4),
+                        help='工作进程数（每个进程加载一个模型）')
+    parser.add_argument('--threads', type=int, help='每个工作进程的推理线程数，默认 CPU核数/工作进程数')
+    parser.add_argument('--device', choices=('auto', 'cpu'), default='auto', help='推理设备')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='每次分发给工作进程的图片数')
+    parser.add_argument('--progress-interval', type=float, default=PROGRESS_INTERVAL, help='打印进度的间隔（秒）')
+    parser.add_argument('--report', help='把统计和失败列表写入该JSON文件')
+    parser.add_argument('--verbose', action='store_true', help='输出预测器的详细日志')
+    return parser
+
+
+def main(argv=None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        class_conf = parse_class_thresholds(args.class_conf)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.workers < 1 or args.chunk_size < 1:
+        parser.error('--workers 和 --chunk-size 必须大于0')
+
+    log_level = logging.INFO if args.verbose else logging.WARNING
+    logging.basicConfig(level=log_level, format='%(asctime)s %(levelname)s %(message)s')
+
+    from .yolo_predictor import YOLO_AVAILABLE
+    if not YOLO_AVAILABLE:
+        from .yolo_predictor import IMPORT_ERROR
+        print(f"❌ YOLO库不可用: {IMPORT_ERROR}", file=sys.stderr)
+        return EXIT_MODEL_ERROR
+    if not os.path.isdir(args.images):
+        print(f"❌ 图片目录不存在: {args.images}", file=sys.stderr)
+        return EXIT_FAILURES
+
+    image_root = os.path.abspath(args.images)
+    output_dir = os.path.abspath(args.output_dir) if args.output_dir else None
+    images = scan_images(image_root, recursive=not args.no_recursive)
+    items, skipped = plan_work(images, image_root, args.format, output_dir, args.overwrite)
+    print(f"🔍 找到 {len(images)} 张图片，已有标注跳过 {skipped} 张，待预测 {len(items)} 张", flush=True)
+    if not items:
+        return EXIT_OK
+
+    workers = min(args.workers, max(1, -(-len(items) // args.chunk_size)))
+    threads = args.threads or max(1, (os.cpu_count() or 1) // workers)
+    # 工作进程导入torch时读取该变量，避免N个进程各自占满全部核心
+    os.environ['OMP_NUM_THREADS'] = str(threads)
+    options = {'format': args.format, 'conf': args.conf, 'iou': args.iou, 'max_det': args.max_det,
+               'class_conf': class_conf, 'min_box_size': args.min_box_size, 'max_overlap': args.max_overlap,
+               'device': args.device, 'threads': threads, 'log_level': log_level}
+    print(f"🚀 {workers} 个工作进程 × {threads} 线程，格式 {args.format}", flush=True)
+
+    try:
+        meter, failures, model_error = run(args.model, items, options, workers, args.chunk_size,
+                                           args.progress_interval)
+    except KeyboardInterrupt:
+        print("⏹️ 已中断，已写出的标注会在下次运行时跳过", file=sys.stderr)
+        return EXIT_INTERRUPTED
+
+    if model_error:
+        print(f"❌ {model_error}", file=sys.stderr)
+        return EXIT_MODEL_ERROR
+
+    print(f"✅ 完成 {meter.done} 张（失败 {meter.failed}），用时 {format_duration(meter.elapsed)}，"
+          f"{meter.overall_rate():.2f} 张/秒，共 {meter.boxes} 个框", flush=True)
+    for image_path, error in failures[:10]:
+        print(f"  ⚠️ {image_path}: {error}", file=sys.stderr)
+    if len(failures) > 10:
+        print(f"  ... 另有 {len(failures) - 10} 张失败", file=sys.stderr)
+
+    if args.report:
+        report = {'model': args.model, 'images': image_root, 'format': args.format, 'skipped': skipped,
+                  'processed': meter.done, 'failed': meter.failed, 'boxes': meter.boxes,
+                  'seconds': round(meter.elapsed, 3), 'images_per_second': round(meter.overall_rate(), 3),
+                  'workers': workers, 'threads': threads,
+                  'failures': [{'image': image_path, 'error': error} for image_path, error in failures]}
+        atomic_write_text(args.report, json.dumps(report, ensure_ascii=False, indent=2), 'utf-8')
+    return EXIT_FAILURES if failures else EXIT_OK
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,468 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+离线模型评估
+
+在当前标注目录上运行模型预测，与Pascal VOC / YOLO / CreateML真值匹配，
+计算每个类别的AP50、AP50-95、精确度、召回率以及混淆矩阵。
+IoU按图片一次性计算为矩阵，匹配和累计全部向量化。
+
+预测结果以低置信度阈值缓存在 <目录>/.labelImg/predictions.db 中，
+按模型文件（路径、大小、修改时间）和图片（大小、修改时间）区分，
+重复评估或调整阈值时只预测新增或修改过的图片。
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from libs.annotation_database import DATABASE_DIR
+from libs.dataset_query import BoxTable
+
+# 设置日志
+logger = logging.getLogger(__name__)
+
+PREDICTIONS_DB_NAME = 'predictions.db'
+# 缓存预测时使用的置信度阈值（与ultralytics验证时相同），评估时再按需过滤
+PREDICTION_CONF = 0.001
+# 预测时的NMS IoU阈值（与ultralytics验证时相同）
+PREDICTION_IOU = 0.7
+# 每张图片最多保留的预测框
+MAX_DETECTIONS = 300
+# 每次送入模型的图片数
+PREDICT_BATCH_SIZE = 8
+# mAP50-95的IoU阈值
+IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)
+# 混淆矩阵的置信度和IoU阈值（与ultralytics的ConfusionMatrix相同）
+CONFUSION_CONF = 0.25
+CONFUSION_IOU = 0.45
+# 混淆矩阵中背景（漏检/误检）所用的名称
+BACKGROUND = 'background'
+
+_EPS = 1e-16
+_trapezoid = getattr(np, 'trapezoid', None) or np.trapz
+
+
+@dataclass
+class ClassMetrics:
+    """单个类别的评估指标"""
+    name: str
+    instances: int
+    predictions: int
+    precision: float
+    recall: float
+    ap50: float
+    ap50_95: float
+
+
+@dataclass
+class EvaluationResult:
+    """一个模型在一个目录上的评估结果"""
+    model_path: str
+    image_count: int
+    instance_count: int
+    precision: float
+    recall: float
+    map50: float
+    map50_95: float
+    per_class: List[ClassMetrics] = field(default_factory=list)
+    # 混淆矩阵[真实类别, 预测类别]，最后一行/列为背景
+    confusion_matrix: Optional[np.ndarray] = None
+    class_names: List[str] = field(default_factory=list)
+    cached_images: int = 0
+    predict_seconds: float = 0.0
+    # 找不到图片文件、未参与评估的标注文件
+    missing_images: List[str] = field(default_factory=list)
+
+
+def box_iou(boxes1: np.ndarray, boxes2: np.ndarray) -> np.ndarray:
+    """两组 (x1, y1, x2, y2) 框的IoU矩阵，形状 (len(boxes1), len(boxes2))"""
+    boxes1 = np.asarray(boxes1, dtype=np.float64).reshape(-1, 4)
+    boxes2 = np.asarray(boxes2, dtype=np.float64).reshape(-1, 4)
+    top_left = np.maximum(boxes1[:, None, :2], boxes2[None, :, :2])
+    bottom_right = np.minimum(boxes1[:, None, 2:], boxes2[None, :, 2:])
+    inter = np.clip(bottom_right - top_left, 0, None).prod(axis=2)
+    area1 = (boxes1[:, 2:] - boxes1[:, :2]).clip(0).prod(axis=1)
+    area2 = (boxes2[:, 2:] - boxes2[:, :2]).clip(0).prod(axis=1)
+    return inter / (area1[:, None] + area2[None, :] - inter + _EPS)
+
+
+def greedy_match(iou: np.ndarray, threshold: float) -> Tuple[np.ndarray, np.ndarray]:
+    """IoU从高到低一对一匹配，返回 (真值下标, 预测下标)"""
+    gt_index, pred_index = np.nonzero(iou >= threshold)
+    if not len(gt_index):
+        return gt_index, pred_index
+    order = np.argsort(-iou[gt_index, pred_index], kind='stable')
+    gt_index, pred_index = gt_index[order], pred_index[order]
+    _, first = np.unique(pred_index, return_index=True)
+    keep = np.sort(first)
+    gt_index, pred_index = gt_index[keep], pred_index[keep]
+    _, first = np.unique(gt_index, return_index=True)
+    keep = np.sort(first)
+    return gt_index[keep], pred_index[keep]
+
+
+def match_predictions(gt_classes: np.ndarray, gt_boxes: np.ndarray, pred_classes: np.ndarray,
+                      pred_boxes: np.ndarray, iou_thresholds: Sequence[float] = IOU_THRESHOLDS) -> np.ndarray:
+    """
+    标记每个预测框在各IoU阈值下是否为真正例
+
+    只有类别相同的框可以匹配，每个真值框最多匹配一个预测框。
+
+    Returns:
+        np.ndarray: 布尔矩阵，形状 (预测框数, 阈值数)
+    """
+    correct = np.zeros((len(pred_classes), len(iou_thresholds)), dtype=bool)
+    if not len(gt_classes) or not len(pred_classes):
+        return correct
+    iou = box_iou(gt_boxes, pred_boxes)
+    iou[np.asarray(gt_classes)[:, None] != np.asarray(pred_classes)[None, :]] = 0
+    for i, threshold in enumerate(iou_thresholds):
+        _, pred_index = greedy_match(iou, threshold)
+        correct[pred_index, i] = True
+    return correct
+
+
+def average_precision(recall: np.ndarray, precision: np.ndarray) -> float:
+    """PR曲线下的面积（COCO 101点插值）"""
+    recall = np.concatenate(([0.0], recall, [1.0]))
+    precision = np.concatenate(([1.0], precision, [0.0]))
+    # 精确度包络线：从右向左取累计最大值
+    precision = np.flip(np.maximum.accumulate(np.flip(precision)))
+    x = np.linspace(0, 1, 101)
+    return float(_trapezoid(np.interp(x, recall, precision), x))
+
+
+def ap_per_class(correct: np.ndarray, confidence: np.ndarray, pred_classes: np.ndarray,
+                 gt_classes: np.ndarray, class_count: int) -> Dict[str, np.ndarray]:
+    """
+    按类别计算AP和最佳F1置信度下的精确度/召回率
+
+    Args:
+        correct: match_predictions的结果，形状 (预测框数, 阈值数)
+        confidence: 预测置信度
+        pred_classes: 预测类别
+        gt_classes: 真值类别
+        class_count: 类别数
+
+    Returns:
+        dict: ap (class_count, 阈值数)、precision、recall、instances、predictions（均按类别）
+              以及选用的置信度confidence
+    """
+    order = np.argsort(-confidence, kind='stable')
+    correct, confidence, pred_classes = correct[order], confidence[order], pred_classes[order]
+    instances = np.bincount(gt_classes, minlength=class_count)[:class_count]
+    predictions = np.bincount(pred_classes, minlength=class_count)[:class_count]
+
+    grid = np.linspace(0, 1, 1000)
+    ap = np.zeros((class_count, correct.shape[1]))
+    precision_curve = np.zeros((class_count, len(grid)))
+    recall_curve = np.zeros((class_count, len(grid)))
+    for c in range(class_count):
+        mask = pred_classes == c
+        if not instances[c] or not mask.any():
+            continue
+        tp = np.cumsum(correct[mask], axis=0)
+        fp = np.cumsum(~correct[mask], axis=0)
+        recall = tp / (instances[c] + _EPS)
+        precision = tp / (tp + fp)
+        # 置信度从高到低，np.interp需要递增的横坐标，因此取负
+        recall_curve[c] = np.interp(-grid, -confidence[mask], recall[:, 0], left=0)
+        precision_curve[c] = np.interp(-grid, -confidence[mask], precision[:, 0], left=1)
+        for t in range(correct.shape[1]):
+            ap[c, t] = average_precision(recall[:, t], precision[:, t])
+
+    f1 = 2 * precision_curve * recall_curve / (precision_curve + recall_curve + _EPS)
+    present = instances > 0
+    best = int(f1[present].mean(axis=0).argmax()) if present.any() else 0
+    return {'ap': ap, 'precision': precision_curve[:, best], 'recall': recall_curve[:, best],
+            'instances': instances, 'predictions': predictions, 'confidence': float(grid[best])}
+
+
+def confusion_matrix(gt_classes: np.ndarray, gt_boxes: np.ndarray, pred_classes: np.ndarray,
+                     pred_boxes: np.ndarray, class_count: int, matrix: Optional[np.ndarray] = None,
+                     iou_threshold: float = CONFUSION_IOU) -> np.ndarray:
+    """
+    把一张图片的匹配结果累加到混淆矩阵[真实类别, 预测类别]
+
+    不区分类别按IoU匹配；未匹配的真值计入背景列（漏检），未匹配的预测计入背景行（误检）。
+    预测应已按CONFUSION_CONF过滤。
+    """
+    if matrix is None:
+        matrix = np.zeros((class_count + 1, class_count + 1), dtype=np.int64)
+    background = class_count
+    gt_index, pred_index = greedy_match(box_iou(gt_boxes, pred_boxes), iou_threshold)
+    np.add.at(matrix, (gt_classes[gt_index], pred_classes[pred_index]), 1)
+    missed = np.ones(len(gt_classes), dtype=bool)
+    missed[gt_index] = False
+    np.add.at(matrix, (gt_classes[missed], background), 1)
+    extra = np.ones(len(pred_classes), dtype=bool)
+    extra[pred_index] = False
+    np.add.at(matrix, (background, pred_classes[extra]), 1)
+    return matrix
+
+
+def evaluate_predictions(table: BoxTable, predictions: Sequence[np.ndarray],
+                         model_names: Sequence[str], model_path: str = '') -> EvaluationResult:
+    """
+    计算一个模型的评估指标
+
+    Args:
+        table: 真值标注表
+        predictions: 与table.image_paths一一对应的预测，每个为 (N, 6) 数组
+                     [x1, y1, x2, y2, 置信度, 模型类别编号]
+        model_names: 模型的类别名称（按类别编号）
+        model_path: 模型路径（只用于记录）
+
+    模型类别按名称对应到标注类别；标注中没有的模型类别追加在后面，这些预测都计为误检。
+    难例（difficult）框与其他框同样计入。
+    """
+    class_names = list(table.class_names)
+    class_index = {name: i for i, name in enumerate(class_names)}
+    for name in model_names:
+        if name not in class_index:
+            class_index[name] = len(class_names)
+            class_names.append(name)
+    class_map = np.array([class_index[name] for name in model_names], dtype=np.int64)
+    class_count = len(class_names)
+
+    gt_order = np.argsort(table.image_ids, kind='stable')
+    gt_offsets = np.searchsorted(table.image_ids[gt_order], np.arange(table.image_count + 1))
+    gt_classes_all = table.class_ids[gt_order].astype(np.int64)
+    gt_boxes_all = table.boxes[gt_order]
+
+    correct_blocks, confidence_blocks, class_blocks = [], [], []
+    matrix = np.zeros((class_count + 1, class_count + 1), dtype=np.int64)
+    for i in range(table.image_count):
+        start, end = gt_offsets[i], gt_offsets[i + 1]
+        gt_classes, gt_boxes = gt_classes_all[start:end], gt_boxes_all[start:end]
+        pred = np.asarray(predictions[i], dtype=np.float64).reshape(-1, 6)
+        pred_classes = class_map[pred[:, 5].astype(np.int64)] if len(pred) else np.zeros(0, dtype=np.int64)
+
+        correct_blocks.append(match_predictions(gt_classes, gt_boxes, pred_classes, pred[:, :4]))
+        confidence_blocks.append(pred[:, 4])
+        class_blocks.append(pred_classes)
+
+        confident = pred[:, 4] >= CONFUSION_CONF
+        confusion_matrix(gt_classes, gt_boxes, pred_classes[confident], pred[confident, :4],
+                         class_count, matrix)
+
+    stats = ap_per_class(np.concatenate(correct_blocks) if correct_blocks else np.zeros((0, len(IOU_THRESHOLDS)), bool),
+                         np.concatenate(confidence_blocks) if confidence_blocks else np.zeros(0),
+                         np.concatenate(class_blocks) if class_blocks else np.zeros(0, dtype=np.int64),
+                         table.class_ids.astype(np.int64), class_count)
+
+    per_class = []
+    for c, name in enumerate(class_names):
+        if not stats['instances'][c] and not stats['predictions'][c]:
+            continue
+        per_class.append(ClassMetrics(name, int(stats['instances'][c]), int(stats['predictions'][c]),
+                                      float(stats['precision'][c]), float(stats['recall'][c]),
+                                      float(stats['ap'][c, 0]), float(stats['ap'][c].mean())))
+
+    # 与ultralytics相同，总体指标为有真值的类别的平均
+    present = stats['instances'] > 0
+    mean = (lambda values: float(values[present].mean())) if present.any() else (lambda values: 0.0)
+    return EvaluationResult(model_path=model_path, image_count=table.image_count,
+                            instance_count=len(table), precision=mean(stats['precision']),
+                            recall=mean(stats['recall']), map50=mean(stats['ap'][:, 0]),
+                            map50_95=mean(stats['ap'].mean(axis=1)), per_class=per_class,
+                            confusion_matrix=matrix, class_names=class_names)
+
+
+def predictions_db_path(folder: str) -> str:
+    """预测缓存的默认位置: <目录>/.labelImg/predictions.db"""
+    return os.path.join(folder, DATABASE_DIR, PREDICTIONS_DB_NAME)
+
+
+class PredictionCache:
+    """
+    模型预测结果缓存（SQLite）
+
+    每个 (模型, 图片) 一行，预测框存为float32 (N, 6) 数组；
+    图片大小或修改时间变化后缓存失效。
+    """
+
+    def __init__(self, db_path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS models (
+                id INTEGER PRIMARY KEY,
+                key TEXT UNIQUE NOT NULL,
+                names TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS predictions (
+                model_id INTEGER NOT NULL,
+                image_path TEXT NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                file_size INTEGER NOT NULL,
+                data BLOB NOT NULL,
+                PRIMARY KEY (model_id, image_path)
+            );
+        """)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @staticmethod
+    def model_key(model_path: str, imgsz: int) -> str:
+        """模型文件被重新训练覆盖后key随之改变"""
+        stat = os.stat(model_path)
+        return f"{os.path.abspath(model_path)}|{stat.st_size}|{stat.st_mtime_ns}|{imgsz}|{PREDICTION_CONF}"
+
+    def model_id(self, key: str, names: Optional[Sequence[str]] = None) -> Optional[int]:
+        """查找模型；给出names时不存在则创建"""
+        row = self.conn.execute("SELECT id FROM models WHERE key = ?", (key,)).fetchone()
+        if row:
+            return row[0]
+        if names is None:
+            return None
+        cursor = self.conn.execute("INSERT INTO models (key, names) VALUES (?, ?)",
+                                   (key, json.dumps(list(names), ensure_ascii=False)))
+        self.conn.commit()
+        return cursor.lastrowid
+
+    def model_names(self, model_id: int) -> List[str]:
+        row = self.conn.execute("SELECT names FROM models WHERE id = ?", (model_id,)).fetchone()
+        return json.loads(row[0]) if row else []
+
+    def lookup(self, model_id: int, image_paths: Sequence[str]) -> Dict[str, np.ndarray]:
+        """读取仍然有效的缓存预测"""
+        rows = {image_path: (mtime_ns, file_size, data) for image_path, mtime_ns, file_size, data in
+                self.conn.execute("SELECT image_path, mtime_ns, file_size, data FROM predictions "
+                                  "WHERE model_id = ?", (model_id,))}
+        cached = {}
+        for image_path in image_paths:
+            row = rows.get(os.path.abspath(image_path))
+            if row is None:
+                continue
+            try:
+                stat = os.stat(image_path)
+            except OSError:
+                continue
+            if (stat.st_mtime_ns, stat.st_size) == row[:2]:
+                cached[image_path] = np.frombuffer(row[2], dtype=np.float32).reshape(-1, 6)
+        return cached
+
+    def store(self, model_id: int, predictions: Dict[str, np.ndarray]):
+        """保存一批预测（一次事务）"""
+        rows = []
+        for image_path, pred in predictions.items():
+            stat = os.stat(image_path)
+            rows.append((model_id, os.path.abspath(image_path), stat.st_mtime_ns, stat.st_size,
+                         np.ascontiguousarray(pred, dtype=np.float32).tobytes()))
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?, ?)", rows)
+
+
+class ModelEvaluator:
+    """
+    在一个标注目录上评估一个或多个模型
+
+    真值只读取一次；每个模型先查缓存，只对缺失的图片运行预测。
+    """
+
+    def __init__(self, folder: str, imgsz: int = 640, device: str = 'cpu',
+                 cache_path: Optional[str] = None):
+        self.folder = folder
+        self.imgsz = imgsz
+        self.device = device
+        self.cache_path = cache_path or predictions_db_path(folder)
+        self._table = None
+        self.missing_images = []
+
+    @property
+    def ground_truth(self) -> BoxTable:
+        """目录中的标注真值；找不到图片文件的标注被剔除并记入missing_images"""
+        if self._table is None:
+            table = BoxTable.from_annotation_dir(self.folder)
+            for path, error in table.errors.items():
+                logger.warning(f"⚠️ 跳过无法读取的标注 {path}: {error}")
+            exists = [os.path.isfile(path) for path in table.image_paths]
+            if not all(exists):
+                # VOC标注中的图片不存在时image_paths是推测的路径，送入预测会使整个评估失败
+                self.missing_images = [table.annotation_files[i] for i, ok in enumerate(exists) if not ok]
+                for path in self.missing_images:
+                    logger.warning(f"⚠️ 跳过找不到图片的标注 {path}")
+                table = table.subset([i for i, ok in enumerate(exists) if ok])
+            self._table = table
+        return self._table
+
+    def predict(self, model_path: str, image_paths: Sequence[str],
+                progress_callback: Optional[Callable[[int, int], None]] = None,
+                should_stop: Optional[Callable[[], bool]] = None) -> Tuple[Dict[str, np.ndarray], List[str], int]:
+        """
+        获取模型在这些图片上的预测（优先使用缓存）
+
+        Returns:
+            Tuple: (图片路径 -> (N, 6) 预测, 模型类别名称, 命中缓存的图片数)
+        """
+        should_stop = should_stop or (lambda: False)
+        with PredictionCache(self.cache_path) as cache:
+            key = PredictionCache.model_key(model_path, self.imgsz)
+            model_id = cache.model_id(key)
+            results = cache.lookup(model_id, image_paths) if model_id is not None else {}
+            cached_count = len(results)
+            names = cache.model_names(model_id) if model_id is not None else []
+            missing = [path for path in image_paths if path not in results]
+            if progress_callback:
+                progress_callback(cached_count, len(image_paths))
+            if not missing:
+                return results, names, cached_count
+
+            from ultralytics import YOLO
+            model = YOLO(model_path)
+            names = [model.names[i] for i in sorted(model.names)]
+            model_id = cache.model_id(key, names)
+            for start in range(0, len(missing), PREDICT_BATCH_SIZE):
+                if should_stop():
+                    break
+                batch = missing[start:start + PREDICT_BATCH_SIZE]
+                outputs = model.predict(batch, conf=PREDICTION_CONF, iou=PREDICTION_IOU, imgsz=self.imgsz,
+                                        device=self.device, max_det=MAX_DETECTIONS, verbose=False)
+                predicted = {}
+                for image_path, output in zip(batch, outputs):
+                    boxes = output.boxes
+                    predicted[image_path] = np.hstack([
+                        boxes.xyxy.cpu().numpy(), boxes.conf.cpu().numpy()[:, None],
+                        boxes.cls.cpu().numpy()[:, None]]).astype(np.float32)
+                cache.store(model_id, predicted)
+                results.update(predicted)
+                if progress_callback:
+                    progress_callback(len(results), len(image_paths))
+        return results, names, cached_count
+
+    def evaluate(self, model_path: str,
+                 progress_callback: Optional[Callable[[int, int], None]] = None,
+                 should_stop: Optional[Callable[[], bool]] = None) -> Optional[EvaluationResult]:
+        """评估一个模型，中途停止时返回None"""
+        table = self.ground_truth
+        start = time.perf_counter()
+        predictions, names, cached_count = self.predict(model_path, table.image_paths,
+                                                        progress_callback, should_stop)
+        predict_seconds = time.perf_counter() - start
+        if len(predictions) < table.image_count:
+            return None
+        result = evaluate_predictions(table, [predictions[path] for path in table.image_paths],
+                                      names, model_path)
+        result.cached_images = cached_count
+        result.predict_seconds = predict_seconds
+        result.missing_images = list(self.missing_images)
+        logger.info(f"📊 {os.path.basename(model_path)}: mAP50={result.map50:.3f}, "
+                    f"mAP50-95={result.map50_95:.3f} ({table.image_count} 张图片, {cached_count} 张来自缓存)")
+        return result
@@ -0,0 +1,243 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+ONNX静态INT8量化
+
+用当前标注目录中抽样的图片做校准，生成权重按通道量化的静态INT8模型（QDQ格式），
+再在另一组已标注图片上用标注真值分别计算FP32和INT8模型的mAP50-95，
+下降超过设定上限时丢弃量化模型。
+
+检测头的解码部分（DFL、Sigmoid、坐标换算等）对量化误差敏感，保持FP32。
+"""
+
+import os
+import json
+import random
+import logging
+from dataclasses import asdict, dataclass
+from typing import Callable, List, Optional, Sequence
+
+from libs.annotation_database import find_annotation_file
+from libs.dataset_query import BoxTable
+from libs.ai_assistant.export_benchmark import ACCURACY_CONF, detect_images, letterbox, summarize_accuracy
+from libs.ai_assistant.model_evaluator import PREDICTION_CONF, evaluate_predictions
+
+# 导入ONNX Runtime量化工具
+try:
+    from onnxruntime.quantization import (CalibrationDataReader, CalibrationMethod, QuantFormat,
+                                          QuantType, quantize_static)
+    QUANTIZATION_AVAILABLE = True
+except ImportError:
+    CalibrationDataReader = object
+    QUANTIZATION_AVAILABLE = False
+
+# 设置日志
+logger = logging.getLogger(__name__)
+
+# 校准和验证使用的图片数
+DEFAULT_CALIBRATION_SIZE = 100
+DEFAULT_VALIDATION_SIZE = 50
+# 允许的mAP50-95下降上限（绝对值）
+DEFAULT_MAX_MAP_DROP = 0.02
+# 校准方法
+CALIBRATION_METHODS = ('minmax', 'entropy', 'percentile')
+
+INT8_SUFFIX = '_int8'
+QUANTIZATION_REPORT_SUFFIX = '.quantization.json'
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.tif', '.webp')
+
+
+@dataclass
+class QuantizationResult:
+    """量化结果"""
+    fp32_path: str
+    int8_path: Optional[str]
+    kept: bool
+    fp32_size_mb: float = 0.0
+    int8_size_mb: float = 0.0
+    calibration_images: int = 0
+    validation_images: int = 0
+    fp32_map50_95: float = 0.0
+    int8_map50_95: float = 0.0
+    max_map_drop: float = DEFAULT_MAX_MAP_DROP
+    match_rate: float = 0.0
+    mean_iou: float = 0.0
+    message: str = ""
+
+    @property
+    def map_drop(self) -> float:
+        return self.fp32_map50_95 - self.int8_map50_95
+
+
+def int8_model_path(fp32_path: str) -> str:
+    """量化模型路径: <名称>_int8.onnx"""
+    stem, ext = os.path.splitext(fp32_path)
+    return stem + INT8_SUFFIX + ext
+
+
+def sample_images(folder: str, count: int, exclude: Sequence[str] = (), seed: int = 0) -> List[str]:
+    """
+    从目录中随机抽取图片，优先抽取已标注的图片
+
+    Args:
+        folder: 图片目录
+        count: 抽取数量
+        exclude: 不参与抽样的图片（如已用于校准的图片）
+        seed: 随机种子
+    """
+    excluded = set(exclude)
+    images = sorted(os.path.join(folder, name) for name in os.listdir(folder)
+                    if name.lower().endswith(IMAGE_EXTENSIONS))
+    images = [image for image in images if image not in excluded]
+    annotated = [image for image in images if find_annotation_file(image)]
+    rng = random.Random(seed)
+    pool = annotated if len(annotated) >= count else images
+    return rng.sample(pool, min(count, len(pool)))
+
+
+class ImageCalibrationReader(CalibrationDataReader):
+    """把样本图片按推理时的预处理（letterbox）逐张送入校准"""
+
+    def __init__(self, image_paths: Sequence[str], input_name: str, image_size: int):
+        self.image_paths = list(image_paths)
+        self.input_name = input_name
+        self.image_size = image_size
+        self._index = 0
+
+    def get_next(self):
+        while self._index < len(self.image_paths):
+            image_path = self.image_paths[self._index]
+            self._index += 1
+            try:
+                return {self.input_name: letterbox(image_path, self.image_size)[None]}
+            except (OSError, ValueError) as e:
+                logger.debug(f"跳过无法读取的校准图片 {image_path}: {e}")
+        return None
+
+    def rewind(self):
+        self._index = 0
+
+
+def detection_head_nodes(model_path: str) -> List[str]:
+    """
+    检测头中需要保持FP32的解码节点
+
+    ultralytics导出的检测头以含'/dfl/'的节点标识；同一模块下除cv2/cv3卷积分支外的节点
+    （DFL、Sigmoid、坐标换算、拼接）都不量化。
+    """
+    try:
+        import onnx
+    except ImportError:
+        return []
+    nodes = onnx.load(model_path, load_external_data=False).graph.node
+    prefixes = {node.name.split('/dfl/')[0] + '/' for node in nodes if '/dfl/' in node.name}
+    return [node.name for node in nodes
+            if any(node.name.startswith(prefix) for prefix in prefixes)
+            and '/cv2.' not in node.name and '/cv3.' not in node.name]
+
+
+def quantize_onnx(fp32_path: str, int8_path: str, calibration_paths: Sequence[str], image_size: int,
+                  method: str = 'minmax', per_channel: bool = True):
+    """生成静态INT8模型：激活UInt8、权重Int8，QDQ格式"""
+    if not QUANTIZATION_AVAILABLE:
+        raise ImportError("onnxruntime未安装，无法进行INT8量化")
+    import onnxruntime
+
+    session = onnxruntime.InferenceSession(fp32_path, providers=['CPUExecutionProvider'])
+    input_name = session.get_inputs()[0].name
+    del session
+
+    methods = {'minmax': CalibrationMethod.MinMax, 'entropy': CalibrationMethod.Entropy,
+               'percentile': CalibrationMethod.Percentile}
+    quantize_static(fp32_path, int8_path, ImageCalibrationReader(calibration_paths, input_name, image_size),
+                    quant_format=QuantFormat.QDQ, activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8,
+                    per_channel=per_channel, calibrate_method=methods[method],
+                    nodes_to_exclude=detection_head_nodes(fp32_path))
+
+
+def sample_validation(table: BoxTable, count: int, exclude: Sequence[str] = (), seed: int = 1) -> BoxTable:
+    """
+    从标注表中随机抽取用于验证精度的已标注图片
+
+    图片文件不存在的标注被跳过；验证图片尽量不与校准图片（exclude）重复。
+    """
+    excluded = {os.path.abspath(path) for path in exclude}
+    existing = [i for i, path in enumerate(table.image_paths) if os.path.isfile(path)]
+    candidates = [i for i in existing if os.path.abspath(table.image_paths[i]) not in excluded] or existing
+    rng = random.Random(seed)
+    return table.subset(sorted(rng.sample(candidates, min(count, len(candidates)))))
+
+
+def quantize_and_validate(fp32_path: str, folder: str, image_size: int = 640,
+                          max_map_drop: float = DEFAULT_MAX_MAP_DROP,
+                          calibration_size: int = DEFAULT_CALIBRATION_SIZE,
+                          validation_size: int = DEFAULT_VALIDATION_SIZE,
+                          method: str = 'minmax',
+                          log: Optional[Callable[[str], None]] = None,
+                          should_stop: Optional[Callable[[], bool]] = None) -> QuantizationResult:
+    """
+    量化ONNX模型并用标注真值验证精度，mAP下降超过max_map_drop时删除量化模型
+
+    结果保存为FP32模型旁的 <文件名>.quantization.json。量化或验证出错时删除量化模型并抛出异常。
+    """
+    log = log or logger.info
+    should_stop = should_stop or (lambda: False)
+    int8_path = int8_model_path(fp32_path)
+    result = QuantizationResult(fp32_path, None, False, max_map_drop=max_map_drop,
+                                fp32_size_mb=os.path.getsize(fp32_path) / (1024 * 1024))
+
+    calibration = sample_images(folder, calibration_size)
+    ground_truth = BoxTable.from_annotation_dir(folder)
+    validation = sample_validation(ground_truth, validation_size, exclude=calibration)
+    result.calibration_images, result.validation_images = len(calibration), validation.image_count
+    if not calibration or not validation.image_count:
+        result.message = "目录中没有可用于校准的图片" if not calibration else "目录中没有可用于验证精度的已标注图片"
+        log(f"⚠️ {result.message}")
+        return result
+
+    try:
+        log(f"🔧 INT8量化: {len(calibration)} 张校准图片, {method} 校准")
+        quantize_onnx(fp32_path, int8_path, calibration, image_size, method)
+        result.int8_size_mb = os.path.getsize(int8_path) / (1024 * 1024)
+        if should_stop():
+            os.remove(int8_path)
+            result.message = "已取消"
+            return result
+
+        from ultralytics import YOLO
+
+        log(f"🧪 验证量化精度: {validation.image_count} 张已标注图片")
+        fp32_model = YOLO(fp32_path, task='detect')
+        int8_model = YOLO(int8_path, task='detect')
+        fp32_detections = detect_images(fp32_model, validation.image_paths, image_size, conf=PREDICTION_CONF)
+        int8_detections = detect_images(int8_model, validation.image_paths, image_size, conf=PREDICTION_CONF)
+        names = [fp32_model.names[i] for i in sorted(fp32_model.names)]
+        # 两个模型都以标注为真值计分，按差值判断是否保留
+        result.fp32_map50_95 = evaluate_predictions(validation, fp32_detections, names).map50_95
+        result.int8_map50_95 = evaluate_predictions(validation, int8_detections, names).map50_95
+        comparison = summarize_accuracy([(ref[ref[:, 4] >= ACCURACY_CONF], cand[cand[:, 4] >= ACCURACY_CONF])
+                                         for ref, cand in zip(fp32_detections, int8_detections)])
+        result.match_rate, result.mean_iou = comparison.match_rate, comparison.mean_iou
+    except Exception:
+        # 未经验证的量化模型不能留在导出目录中
+        if os.path.exists(int8_path):
+            os.remove(int8_path)
+        raise
+
+    if result.map_drop <= max_map_drop:
+        result.kept = True
+        result.int8_path = int8_path
+        result.message = (f"保留INT8模型: mAP50-95下降 {result.map_drop:.4f} (上限 {max_map_drop:.4f}), "
+                          f"大小 {result.fp32_size_mb:.1f} MB → {result.int8_size_mb:.1f} MB")
+    else:
+        os.remove(int8_path)
+        result.message = f"丢弃INT8模型: mAP50-95下降 {result.map_drop:.4f} 超过上限 {max_map_drop:.4f}"
+    log(("✅ " if result.kept else "⚠️ ") + result.message)
+
+    try:
+        with open(fp32_path + QUANTIZATION_REPORT_SUFFIX, 'w', encoding='utf-8') as f:
+            json.dump(dict(asdict(result), map_drop=result.map_drop), f, ensure_ascii=False, indent=2)
+    except OSError as e:
+        logger.warning(f"保存量化结果失败: {e}")
+    return result
@@ -31,7 +31,9 @@ except ImportError as e:
     IMPORT_ERROR = str(e)
 
 # 导入labelImg相关模块
+from libs import perf_trace
 from libs.shape import Shape
+from libs.image_geometry import probe_image_geometry
 
 # 设置日志
 logger = logging.getLogger(__name__)
@@ -235,7 +237,6 @@ class YOLOPredictor(QObject):
         Returns:
             bool: 加载是否成功
         """
-        print(f"[DEBUG] YOLO预测器: 开始加载模型: {model_path}")
         try:
             logger.info(f"正在加载模型: {model_path}")
 
@@ -303,77 +304,65 @@ class YOLOPredictor(QObject):
         Returns:
             PredictionResult: 预测结果，失败时返回None
         """
-        print(f"[DEBUG] YOLO预测器: predict_single被调用")
-        print(f"[DEBUG] YOLO预测器: 图像路径: {image_path}")
-        print(
-            f"[DEBUG] YOLO预测器: 参数 - conf: {conf_threshold}, iou: {iou_threshold}, max_det: {max_det}")
+        logger.debug(f"predict_single: {image_path} (conf={conf_threshold}, iou={iou_threshold}, "
+                     f"max_det={max_det})")
 
         if not self.is_loaded:
             error_msg = "模型未加载"
-            print(f"[ERROR] YOLO预测器: {error_msg}")
             logger.error(error_msg)
             self.error_occurred.emit(error_msg)
             return None
 
         if not os.path.exists(image_path):
             error_msg = f"图像文件不存在: {image_path}"
-            print(f"[ERROR] YOLO预测器: {error_msg}")
             logger.error(error_msg)
             self.error_occurred.emit(error_msg)
             return None
 
         try:
-            print(f"[DEBUG] YOLO预测器: 开始预测图像: {image_path}")
-            logger.debug(f"预测图像: {image_path}")
-
-            # 检查模型状态
-            print(
-                f"[DEBUG] YOLO预测器: 模型状态 - 已加载: {self.is_loaded}, 模型名: {self.model_name}")
+            logger.debug(f"预测图像: {image_path} (模型: {self.model_name})")
 
             # 执行预测（带CUDA回退机制）
-            print(f"[DEBUG] YOLO预测器: 调用模型进行预测...")
             start_time = time.time()
 
             try:
-                results = self.model(
-                    image_path,
-                    conf=conf_threshold,
-                    iou=iou_threshold,
-                    max_det=max_det,
-                    verbose=False
-                )
+                with perf_trace.span('predict.model'):
+                    results = self.model(
+                        image_path,
+                        conf=conf_threshold,
+                        iou=iou_threshold,
+                        max_det=max_det,
+                        verbose=False
+                    )
                 inference_time = time.time() - start_time
-                print(f"[DEBUG] YOLO预测器: 模型预测完成，耗时: {inference_time:.3f}秒")
 
             except RuntimeError as e:
                 if "torchvision::nms" in str(e) and "CUDA" in str(e):
                     # CUDA NMS错误，尝试回退到CPU
-                    print(f"[WARNING] YOLO预测器: CUDA NMS错误，回退到CPU模式: {e}")
                     logger.warning(f"CUDA NMS错误，回退到CPU模式: {e}")
 
                     # 强制切换到CPU模式
                     self.force_cpu_mode()
 
                     # 重新尝试预测
-                    print(f"[DEBUG] YOLO预测器: 使用CPU模式重新预测...")
                     start_time = time.time()
-                    results = self.model(
-                        image_path,
-                        conf=conf_threshold,
-                        iou=iou_threshold,
-                        max_det=max_det,
-                        verbose=False
-                    )
+                    with perf_trace.span('predict.model'):
+                        results = self.model(
+                            image_path,
+                            conf=conf_threshold,
+                            iou=iou_threshold,
+                            max_det=max_det,
+                            verbose=False
+                        )
                     inference_time = time.time() - start_time
-                    print(f"[DEBUG] YOLO预测器: CPU模式预测完成，耗时: {inference_time:.3f}秒")
                 else:
                     # 其他RuntimeError，直接抛出
                     raise
+            self._record_speed(results)
 
             # 处理结果
-            print(f"[DEBUG] YOLO预测器: 处理预测结果...")
-            detections = self._process_results(results, image_path)
-            print(f"[DEBUG] YOLO预测器: 结果处理完成，检测数量: {len(detections)}")
+            with perf_trace.span('predict.results'):
+                detections = self._process_results(results, image_path)
 
             # 创建预测结果
             result = PredictionResult(
@@ -385,26 +374,32 @@ class YOLOPredictor(QObject):
                 confidence_threshold=conf_threshold
             )
 
-            print(
-                f"[DEBUG] YOLO预测器: 预测完成，检测到 {len(detections)} 个目标，耗时: {inference_time:.3f}秒")
             logger.debug(
                 f"预测完成，检测到 {len(detections)} 个目标，耗时: {inference_time:.3f}秒")
 
             # 发送预测完成信号
-            print(f"[DEBUG] YOLO预测器: 发送预测完成信号")
             self.prediction_completed.emit(result)
 
             return result
 
         except Exception as e:
             error_msg = f"预测失败: {str(e)}"
-            print(f"[ERROR] YOLO预测器: {error_msg}")
-            logger.error(error_msg)
-            import traceback
-            traceback.print_exc()
+            logger.exception(error_msg)
             self.error_occurred.emit(error_msg)
             return None
 
+    @staticmethod
+    def _record_speed(results):
+        """把ultralytics统计的预处理/推理/后处理耗时记入性能计时"""
+        if not perf_trace.is_enabled():
+            return
+        for result in results or []:
+            speed = getattr(result, 'speed', None) or {}
+            for key, name in (('preprocess', 'predict.pre'), ('inference', 'predict.infer'),
+                              ('postprocess', 'predict.post')):
+                if speed.get(key) is not None:
+                    perf_trace.record(name, speed[key] / 1000.0)
+
     def predict_batch(self, image_paths: List[str], conf_threshold: float = 0.25,
                       iou_threshold: float = 0.45, max_det: int = 100) -> Dict[str, PredictionResult]:
         """
@@ -477,9 +472,12 @@ class YOLOPredictor(QObject):
                     # 其他RuntimeError，直接抛出
                     raise
 
+            self._record_speed(batch_results)
+
             # 处理每个结果
             for i, (image_path, result) in enumerate(zip(valid_paths, batch_results)):
-                detections = self._process_results([result], image_path)
+                with perf_trace.span('predict.results'):
+                    detections = self._process_results([result], image_path)
 
                 prediction_result = PredictionResult(
                     image_path=image_path,
@@ -517,13 +515,17 @@ class YOLOPredictor(QObject):
         detections = []
 
         try:
-            # 获取图像尺寸
-            image = cv2.imread(image_path)
-            if image is None:
-                logger.error(f"无法读取图像: {image_path}")
-                return detections
+            # 获取图像尺寸（只读取文件头，按EXIF方向与cv2.imread保持一致）
+            geometry = probe_image_geometry(image_path)
+            if geometry is not None:
+                img_width, img_height = geometry.oriented_size
+            else:
+                image = cv2.imread(image_path)
+                if image is None:
+                    logger.error(f"无法读取图像: {image_path}")
+                    return detections
 
-            img_height, img_width = image.shape[:2]
+                img_height, img_width = image.shape[:2]
 
             # 处理每个结果
             for result in results:
@@ -3,16 +3,24 @@
 """
 YOLO训练器模块
 
-提供YOLO模型训练功能，包括数据加载、模型训练、进度监控等
+提供YOLO模型训练功能，包括数据加载、模型训练、进度监控等。
+训练在独立子进程中运行，日志和每轮指标通过管道流式回传GUI。
 """
 
 import os
 import time
+import shutil
+import atexit
 import logging
 import threading
+import multiprocessing
 from pathlib import Path
 from typing import Dict, Optional, Callable, Any
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict
+
+from libs import perf_trace
+from libs.training_metrics_store import TrainingMetricsStore, metrics_db_path
+from libs.ai_assistant.batch_autotune import auto_tune
 
 try:
     from PyQt5.QtCore import QObject, pyqtSignal, QThread
@@ -32,6 +40,60 @@ except ImportError as e:
 # 设置日志
 logger = logging.getLogger(__name__)
 
+# ultralytics在output_dir下创建的运行目录名（重名时追加数字）
+TRAINING_RUN_NAME = 'yolo_training'
+# 训练被停止或异常退出时写入运行目录的标记文件，表示可从last.pt继续
+INTERRUPTED_MARKER = 'interrupted'
+# 停止训练时另存的可继续检查点：ultralytics结束训练时会剥离last.pt中的优化器状态，
+# 剥离后的last.pt无法用于resume
+RESUME_CHECKPOINT = 'resume.pt'
+
+# 正在运行的训练子进程，GUI退出时结束它们
+_active_processes = set()
+
+
+@atexit.register
+def _terminate_training_processes():
+    """GUI退出时结束训练子进程（last.pt保留，可继续训练）"""
+    for process in list(_active_processes):
+        process.terminate()
+        process.join(5)
+
+
+def find_resumable_checkpoint(output_dir: str) -> Optional[str]:
+    """
+    查找output_dir下最近一次被中断的训练的检查点
+
+    主动停止的训练使用停止前另存的resume.pt，异常退出的训练使用last.pt。
+
+    Returns:
+        Optional[str]: 检查点路径，没有可继续的训练时返回None
+    """
+    candidates = []
+    for marker in Path(output_dir).glob(f"{TRAINING_RUN_NAME}*/{INTERRUPTED_MARKER}"):
+        for name in (RESUME_CHECKPOINT, 'last.pt'):
+            checkpoint = marker.parent / 'weights' / name
+            if checkpoint.exists():
+                candidates.append((marker.stat().st_mtime, str(checkpoint)))
+                break
+    return max(candidates)[1] if candidates else None
+
+
+def save_resumable_checkpoint(trainer) -> Path:
+    """停止训练前把last.pt另存为resume.pt（保留优化器状态和轮次）"""
+    checkpoint = Path(trainer.wdir) / RESUME_CHECKPOINT
+    shutil.copy2(trainer.last, checkpoint)
+    return checkpoint
+
+
+def discard_resumable_checkpoint(trainer):
+    """继续训练开始后删除已恢复的resume.pt，之后中断时改用新的last.pt"""
+    checkpoint = Path(trainer.wdir) / RESUME_CHECKPOINT
+    try:
+        checkpoint.unlink()
+    except FileNotFoundError:
+        pass
+
 
 @dataclass
 class TrainingConfig:
@@ -47,6 +109,9 @@ class TrainingConfig:
     output_dir: str             # 输出目录
     resume: bool = False        # 是否恢复训练
     save_period: int = 10       # 保存周期
+    log_iterations: bool = False  # 是否记录每次迭代的损失到指标数据库
+    workers: int = 8            # 数据加载线程数
+    auto_tune: bool = False     # 训练前探测最佳批次大小和线程数（CPU训练）
 
 
 @dataclass
@@ -74,6 +139,7 @@ class YOLOTrainer(QObject):
     training_error = pyqtSignal(str)                   # 训练错误
     training_stopped = pyqtSignal()                    # 训练停止
     log_message = pyqtSignal(str)                      # 日志消息
+    autotune_completed = pyqtSignal(dict)              # 自动调优完成 (AutoTuneResult字典)
 
     def __init__(self):
         """初始化YOLO训练器"""
@@ -91,6 +157,9 @@ class YOLOTrainer(QObject):
         self.is_training = False
         self.should_stop = False
         self.training_thread = None
+        self.training_process = None
+        self.stop_event = None
+        self.run_dir = None
         self.start_time = None
 
         # 训练回调函数
@@ -278,6 +347,10 @@ class YOLOTrainer(QObject):
         """
         开始训练
 
+        训练在独立的子进程中运行，不与GUI争用GIL，崩溃或内存耗尽也不会影响标注会话。
+        config.resume为True时从检查点继续：model_path为last.pt或resume.pt时直接使用，
+        否则使用output_dir下最近一次中断的训练。
+
         Args:
             config: 训练配置
         """
@@ -285,6 +358,14 @@ class YOLOTrainer(QObject):
             self.training_error.emit("训练已在进行中")
             return
 
+        if config.resume and os.path.basename(config.model_path) not in ('last.pt', RESUME_CHECKPOINT):
+            checkpoint = find_resumable_checkpoint(config.output_dir)
+            if checkpoint is None:
+                self.training_error.emit("没有找到可继续的训练 (last.pt)")
+                return
+            config.model_path = checkpoint
+            config.model_type = 'custom'
+
         # 验证配置
         if not self.validate_config(config):
             return
@@ -292,171 +373,288 @@ class YOLOTrainer(QObject):
         self.config = config
         self.is_training = True
         self.should_stop = False
-
-        # 在新线程中执行训练
-        self.training_thread = threading.Thread(target=self._train_worker)
-        self.training_thread.daemon = True
+        self.run_dir = None
+
+        # spawn: 不继承GUI进程的Qt状态和线程
+        context = multiprocessing.get_context('spawn')
+        receiver, sender = context.Pipe(duplex=False)
+        self.stop_event = context.Event()
+        # 不能设为daemon：训练进程还要创建数据加载子进程
+        self.training_process = context.Process(
+            target=_training_process_main, args=(asdict(config), sender, self.stop_event),
+            name="YOLOTraining")
+        self.training_process.start()
+        sender.close()
+        _active_processes.add(self.training_process)
+
+        # 监听线程只阻塞在管道上，把子进程消息转成信号
+        self.training_thread = threading.Thread(
+            target=self._monitor_training, args=(receiver, self.training_process),
+            name="YOLOTrainingMonitor", daemon=True)
         self.training_thread.start()
 
-    def stop_training(self):
-        """停止训练"""
-        if self.is_training:
+    def stop_training(self, force: bool = False):
+        """
+        停止训练
+
+        第一次请求让子进程在当前轮次结束、另存可继续的检查点后退出；
+        再次请求（或force=True）立即结束子进程，已保存的last.pt仍可用于继续训练。
+        """
+        if not self.is_training:
+            return
+        if self.should_stop or force:
+            self.log_message.emit("⛔ 强制结束训练进程")
+            self.should_stop = True
+            self.training_process.terminate()
+        else:
             self.should_stop = True
-            self.log_message.emit("🛑 正在停止训练...")
+            self.stop_event.set()
+            self.log_message.emit("🛑 正在停止训练（当前轮次结束并保存检查点后退出）...")
 
-    def _train_worker(self):
-        """训练工作线程"""
+    def _monitor_training(self, receiver, process):
+        """监听线程：转发训练子进程的日志、指标和结果"""
+        outcome = None
+        epoch_elapsed = 0.0
         try:
             self.training_started.emit()
-            self.start_time = time.time()
+            while True:
+                try:
+                    kind, payload = receiver.recv()
+                except (EOFError, OSError):
+                    break
+                if kind == 'log':
+                    self.log_message.emit(payload)
+                elif kind == 'metrics':
+                    training_metrics = TrainingMetrics(**payload)
+                    # 每轮耗时取相邻两轮累计时间之差（第一轮包含数据集加载）
+                    perf_trace.record('train.epoch', training_metrics.time_elapsed - epoch_elapsed)
+                    epoch_elapsed = training_metrics.time_elapsed
+                    self._emit_metrics(training_metrics)
+                elif kind == 'run_dir':
+                    self.run_dir = payload
+                elif kind == 'autotune':
+                    self.config.batch_size = payload['batch_size']
+                    self.config.workers = payload['workers']
+                    self.autotune_completed.emit(payload)
+                else:
+                    outcome = (kind, payload)
+        finally:
+            receiver.close()
+            process.join()
+            _active_processes.discard(process)
+            self.is_training = False
 
-            self.log_message.emit("🚀 开始YOLO模型训练...")
-            self.log_message.emit(f"📁 数据集配置: {self.config.dataset_config}")
-            self.log_message.emit(
-                f"⚙️ 训练参数: {self.config.epochs}轮, 批次{self.config.batch_size}, 学习率{self.config.learning_rate}")
-            self.log_message.emit(f"🖥️ 训练设备: {self.config.device.upper()}")
-            self.log_message.emit(f"📂 输出目录: {self.config.output_dir}")
+        kind, payload = outcome or (None, None)
+        completed = kind == 'completed'
+        if self.run_dir:
+            self._set_interrupted_marker(not completed)
+
+        if completed:
+            self.log_message.emit(f"✅ 训练完成！模型已保存到: {payload}")
+            self.training_completed.emit(payload)
+        elif kind == 'stopped' or (kind is None and self.should_stop):
+            self.log_message.emit("🛑 训练已停止，可从 resume.pt 继续训练")
+            self.training_stopped.emit()
+        elif kind == 'error':
+            logger.error(payload)
+            self.training_error.emit(payload)
+        else:
+            error_msg = f"训练进程意外退出 (退出码 {process.exitcode})，可从 last.pt 继续训练"
+            logger.error(error_msg)
+            self.training_error.emit(error_msg)
 
-            # 再次验证数据集配置（训练前最后检查）
-            self.log_message.emit("🔍 训练前最后验证数据集配置...")
+    def _set_interrupted_marker(self, interrupted: bool):
+        """标记运行目录是否可继续训练"""
+        marker = os.path.join(self.run_dir, INTERRUPTED_MARKER)
+        try:
+            if interrupted:
+                with open(marker, 'w', encoding='utf-8') as f:
+                    f.write(time.strftime('%Y-%m-%d %H:%M:%S'))
+            elif os.path.exists(marker):
+                os.remove(marker)
+        except OSError as e:
+            logger.warning(f"更新训练中断标记失败: {e}")
 
-            # 读取并显示数据集配置
-            with open(self.config.dataset_config, 'r', encoding='utf-8') as f:
-                dataset_info = yaml.safe_load(f)
+    def _emit_metrics(self, training_metrics: TrainingMetrics):
+        """发送训练进度信号和日志"""
+        self.training_progress.emit(training_metrics)
 
-            self.log_message.emit(f"📋 最终使用的数据集配置:")
-            for key, value in dataset_info.items():
-                self.log_message.emit(f"   {key}: {value}")
-
-            # 初始化模型
-            self.log_message.emit(f"🤖 模型配置信息:")
-            self.log_message.emit(f"   模型类型: {self.config.model_type}")
-            self.log_message.emit(f"   模型名称: {self.config.model_name}")
-            self.log_message.emit(f"   模型路径: {self.config.model_path}")
-
-            # 根据模型类型加载模型
-            if self.config.model_type == 'pretrained':
-                # 预训练模型，直接使用模型名称
-                model_path = self.config.model_path
-                self.log_message.emit(f"📦 加载预训练模型: {model_path}")
-            elif self.config.model_type in ['custom', 'manual']:
-                # 自定义或手动指定模型，使用完整路径
-                model_path = self.config.model_path
-                if not os.path.exists(model_path):
-                    error_msg = f"模型文件不存在: {model_path}"
-                    self.log_message.emit(f"❌ {error_msg}")
-                    self.training_error.emit(error_msg)
-                    return
-                self.log_message.emit(f"📄 加载自定义模型: {model_path}")
-            else:
-                error_msg = f"未知的模型类型: {self.config.model_type}"
-                self.log_message.emit(f"❌ {error_msg}")
-                self.training_error.emit(error_msg)
-                return
+        progress_percent = (training_metrics.epoch / training_metrics.total_epochs) * 100
+        self.log_message.emit(
+            f"📊 Epoch {training_metrics.epoch}/{training_metrics.total_epochs} ({progress_percent:.1f}%) - "
+            f"Loss: {training_metrics.train_loss:.4f}, mAP50: {training_metrics.map50:.4f}"
+        )
 
-            # 验证模型文件
-            try:
-                if self.config.model_type != 'pretrained' and not os.path.exists(model_path):
-                    raise FileNotFoundError(f"模型文件不存在: {model_path}")
 
-                # 获取模型文件大小
-                if os.path.exists(model_path):
-                    file_size = os.path.getsize(
-                        model_path) / (1024 * 1024)  # MB
-                    self.log_message.emit(f"📊 模型文件大小: {file_size:.2f} MB")
+class _PipeLogHandler(logging.Handler):
+    """把训练子进程中ultralytics的日志发回GUI进程"""
 
-                self.model = YOLO(model_path)
-                self.log_message.emit(f"✅ 模型加载成功")
+    def __init__(self, send):
+        super().__init__(logging.INFO)
+        self.send = send
 
-            except Exception as e:
-                error_msg = f"模型加载失败: {str(e)}"
-                self.log_message.emit(f"❌ {error_msg}")
-                self.training_error.emit(error_msg)
-                return
+    def emit(self, record):
+        try:
+            self.send('log', self.format(record))
+        except Exception:
+            self.handleError(record)
 
-            # 设置训练回调
-            self.model.add_callback('on_train_epoch_end', self._on_epoch_end)
-
-            # 开始训练
-            results = self.model.train(
-                data=self.config.dataset_config,
-                epochs=self.config.epochs,
-                batch=self.config.batch_size,
-                lr0=self.config.learning_rate,
-                device=self.config.device,
-                project=self.config.output_dir,
-                name='yolo_training',
-                save_period=self.config.save_period,
-                resume=self.config.resume,
-                verbose=True
-            )
 
-            if not self.should_stop:
-                # 训练完成
-                model_path = str(results.save_dir / 'weights' / 'best.pt')
-                self.log_message.emit(f"✅ 训练完成！模型已保存到: {model_path}")
-                self.training_completed.emit(model_path)
-            else:
-                self.log_message.emit("🛑 训练已停止")
-                self.training_stopped.emit()
+def _training_process_main(config_dict: Dict, sender, stop_event):
+    """
+    训练子进程入口
 
+    通过管道发送 (类型, 数据) 消息: log / run_dir / metrics，最后是
+    completed(best.pt路径) / stopped(resume.pt路径) / error(错误信息) 之一。
+    stop_event被设置后，当前轮次保存模型时另存resume.pt并停止训练。
+    """
+    def send(kind, payload):
+        try:
+            sender.send((kind, payload))
+        except (OSError, EOFError):
+            # GUI进程已不在，继续训练并保存结果
+            pass
+
+    logging.getLogger('ultralytics').addHandler(_PipeLogHandler(send))
+    config = TrainingConfig(**config_dict)
+    start_time = time.time()
+
+    # 指标数据库在运行目录确定后打开，由本进程写入、GUI只读
+    store = None
+    iteration = 0
+
+    def request_stop(trainer):
+        if stop_event.is_set():
+            trainer.stop = True
+
+    def current_lr(trainer):
+        return float(trainer.optimizer.param_groups[0].get('lr', 0.0))
+
+    def on_pretrain_routine_start(trainer):
+        nonlocal store
+        store = TrainingMetricsStore(metrics_db_path(str(trainer.save_dir)))
+        send('run_dir', str(trainer.save_dir))
+
+    def on_train_start(trainer):
+        # 断点续训复用运行目录和指标数据库，迭代编号从恢复的轮次接着计数，
+        # 否则会覆盖中断前记录的逐迭代曲线
+        nonlocal iteration
+        iteration = trainer.start_epoch * len(trainer.train_loader)
+        if config.resume:
+            discard_resumable_checkpoint(trainer)
+
+    def on_train_batch_end(trainer):
+        nonlocal iteration
+        request_stop(trainer)
+        iteration += 1
+        if store is not None and config.log_iterations and trainer.tloss is not None:
+            values = trainer.label_loss_items(trainer.tloss, prefix='train')
+            values['lr'] = current_lr(trainer)
+            store.log_iteration(iteration, values)
+
+    def on_model_save(trainer):
+        # 停止后ultralytics在final_eval中剥离last.pt的优化器状态，先另存一份用于继续训练。
+        # 保存之后才到达的停止请求留到下一轮处理，保证停止时一定有resume.pt
+        request_stop(trainer)
+        if stop_event.is_set():
+            save_resumable_checkpoint(trainer)
+
+    def on_fit_epoch_end(trainer):
+        try:
+            metrics = trainer.metrics or {}
+            losses = trainer.label_loss_items(trainer.tloss, prefix='train') if trainer.tloss is not None else {}
+            if store is not None:
+                store.log_epoch(trainer.epoch + 1, {**losses, **metrics, 'lr': current_lr(trainer)})
+            send('metrics', dict(
+                epoch=trainer.epoch + 1,
+                total_epochs=trainer.epochs,
+                train_loss=float(losses.get('train/box_loss', 0.0)),
+                val_loss=float(metrics.get('val/box_loss', 0.0)),
+                precision=float(metrics.get('metrics/precision(B)', 0.0)),
+                recall=float(metrics.get('metrics/recall(B)', 0.0)),
+                map50=float(metrics.get('metrics/mAP50(B)', 0.0)),
+                map50_95=float(metrics.get('metrics/mAP50-95(B)', 0.0)),
+                lr=current_lr(trainer),
+                time_elapsed=time.time() - start_time))
         except Exception as e:
-            error_msg = f"训练失败: {str(e)}"
-            logger.error(error_msg)
-            self.training_error.emit(error_msg)
-        finally:
-            self.is_training = False
+            logger.error(f"回调函数错误: {str(e)}")
 
-    def _on_epoch_end(self, trainer):
-        """训练轮次结束回调"""
-        try:
-            if self.should_stop:
-                trainer.stop = True
-                return
+    try:
+        if not YOLO_AVAILABLE:
+            send('error', f"YOLO库不可用: {IMPORT_ERROR}")
+            return
 
-            # 获取训练指标
-            epoch = trainer.epoch + 1
-            total_epochs = trainer.epochs
-
-            # 从训练器获取指标
-            metrics = trainer.metrics
-            if metrics:
-                train_loss = getattr(metrics, 'box_loss', 0.0)
-                val_loss = getattr(metrics, 'val_box_loss', 0.0)
-                precision = getattr(metrics, 'precision', 0.0)
-                recall = getattr(metrics, 'recall', 0.0)
-                map50 = getattr(metrics, 'map50', 0.0)
-                map50_95 = getattr(metrics, 'map50_95', 0.0)
-                lr = getattr(trainer.optimizer, 'param_groups', [{}])[
-                    0].get('lr', 0.0)
-            else:
-                train_loss = val_loss = precision = recall = map50 = map50_95 = lr = 0.0
-
-            time_elapsed = time.time() - self.start_time
-
-            # 创建训练指标对象
-            training_metrics = TrainingMetrics(
-                epoch=epoch,
-                total_epochs=total_epochs,
-                train_loss=train_loss,
-                val_loss=val_loss,
-                precision=precision,
-                recall=recall,
-                map50=map50,
-                map50_95=map50_95,
-                lr=lr,
-                time_elapsed=time_elapsed
-            )
+        send('log', "🚀 开始YOLO模型训练（独立进程 PID %d）..." % os.getpid())
+        send('log', f"📁 数据集配置: {config.dataset_config}")
+        send('log', f"⚙️ 训练参数: {config.epochs}轮, 批次{config.batch_size}, 学习率{config.learning_rate}")
+        send('log', f"🖥️ 训练设备: {config.device.upper()}")
+        send('log', f"📂 输出目录: {config.output_dir}")
 
-            # 发送进度信号
-            self.training_progress.emit(training_metrics)
+        if config.model_type not in ('pretrained', 'custom', 'manual'):
+            send('error', f"未知的模型类型: {config.model_type}")
+            return
+        if config.model_type != 'pretrained' and not os.path.exists(config.model_path):
+            send('error', f"模型文件不存在: {config.model_path}")
+            return
+        if os.path.exists(config.model_path):
+            file_size = os.path.getsize(config.model_path) / (1024 * 1024)  # MB
+            send('log', f"📊 模型文件大小: {file_size:.2f} MB")
+
+        if config.auto_tune and not config.resume:
+            send('log', "⚡ 正在探测最佳批次大小和数据加载线程数...")
+            result = auto_tune(config.model_path, config.dataset_config,
+                               log=lambda message: send('log', message), should_stop=stop_event.is_set)
+            if stop_event.is_set():
+                send('stopped', '')
+                return
+            if result is None:
+                send('log', f"⚠️ 自动调优没有可用结果，使用 batch={config.batch_size}, workers={config.workers}")
+            else:
+                config.batch_size, config.workers = result.batch_size, result.workers
+                send('autotune', asdict(result))
 
-            # 发送日志消息
-            progress_percent = (epoch / total_epochs) * 100
-            self.log_message.emit(
-                f"📊 Epoch {epoch}/{total_epochs} ({progress_percent:.1f}%) - "
-                f"Loss: {train_loss:.4f}, mAP50: {map50:.4f}"
+        try:
+            model = YOLO(config.model_path)
+        except Exception as e:
+            send('error', f"模型加载失败: {str(e)}")
+            return
+        send('log', f"✅ 模型加载成功: {config.model_path}")
+
+        model.add_callback('on_pretrain_routine_start', on_pretrain_routine_start)
+        model.add_callback('on_train_start', on_train_start)
+        model.add_callback('on_train_batch_end', on_train_batch_end)
+        model.add_callback('on_train_epoch_end', request_stop)
+        model.add_callback('on_model_save', on_model_save)
+        model.add_callback('on_fit_epoch_end', on_fit_epoch_end)
+
+        if config.resume:
+            # 训练参数从检查点恢复
+            send('log', f"🔄 从 {config.model_path} 继续训练")
+            results = model.train(resume=True)
+        else:
+            results = model.train(
+                data=config.dataset_config,
+                epochs=config.epochs,
+                batch=config.batch_size,
+                workers=config.workers,
+                lr0=config.learning_rate,
+                device=config.device,
+                project=config.output_dir,
+                name=TRAINING_RUN_NAME,
+                save_period=config.save_period,
+                verbose=True
             )
 
-        except Exception as e:
-            logger.error(f"回调函数错误: {str(e)}")
+        save_dir = Path(results.save_dir) if results is not None and hasattr(results, 'save_dir') \
+            else Path(model.trainer.save_dir)
+        if stop_event.is_set():
+            send('stopped', str(save_dir / 'weights' / RESUME_CHECKPOINT))
+        else:
+            send('completed', str(save_dir / 'weights' / 'best.pt'))
+
+    except Exception as e:
+        send('error', f"训练失败: {str(e)}")
+    finally:
+        if store is not None:
+            store.close()
+        sender.close()
@@ -21,8 +21,12 @@ except ImportError:
     from PyQt4.QtGui import *
 
 from .ai_assistant import YOLOPredictor, ModelManager, BatchProcessor, ConfidenceFilter
-from .ai_assistant.yolo_trainer import YOLOTrainer, TrainingConfig
+from .ai_assistant.yolo_trainer import YOLOTrainer, TrainingConfig, find_resumable_checkpoint
 from .training_history_manager import TrainingHistoryManager
+from .incremental_training import dataset_images, plan_incremental_training, write_incremental_dataset
+from .training_metrics_store import KIND_EPOCH, KIND_ITERATION, list_runs, metrics_db_path
+from .metrics_chart import MetricsChart
+from .log_view import LogView, LogSearchEdit, default_spill_path
 from .smart_epochs_calculator import SmartEpochsCalculator
 from .training_config_manager import TrainingConfigManager
 
@@ -95,13 +99,13 @@ class CollapsibleGroupBox(QGroupBox):
 
     def _apply_collapsed_state(self):
         """应用折叠状态"""
-        print(f"[DEBUG] _apply_collapsed_state: 开始应用")
+        logger.debug("_apply_collapsed_state: 开始应用")
         if self.content_widget:
             self.content_widget.hide()
-            print(f"[DEBUG] _apply_collapsed_state: 隐藏内容")
+            logger.debug("_apply_collapsed_state: 隐藏内容")
         self.setMaximumHeight(30)
         self.setMinimumHeight(30)
-        print(f"[DEBUG] _apply_collapsed_state: 设置高度限制30px")
+        logger.debug("_apply_collapsed_state: 设置高度限制30px")
 
     def _apply_expanded_state(self):
         """应用展开状态"""
@@ -242,7 +246,7 @@ class CollapsibleClassesInfoGroup(CollapsibleGroupBox):
             # 检查是否有保存的状态
             saved_state = settings.get(
                 'ai_assistant/classes_info_collapsed', None)
-            print(f"[DEBUG] load_collapsed_state: saved_state={saved_state}")
+            logger.debug(f"load_collapsed_state: saved_state={saved_state}")
 
             # 如果没有保存的状态，使用默认折叠状态
             # 这确保了新用户的默认体验是折叠的（节省空间）
@@ -250,12 +254,11 @@ class CollapsibleClassesInfoGroup(CollapsibleGroupBox):
                 # 第一次使用，保存默认折叠状态
                 settings['ai_assistant/classes_info_collapsed'] = True
                 settings.save()
-                print(f"[DEBUG] load_collapsed_state: 保存并返回默认True")
+                logger.debug("load_collapsed_state: 保存并返回默认True")
                 return True
             else:
                 # 强制返回True来确保默认折叠
-                print(
-                    f"[DEBUG] load_collapsed_state: 强制返回True（忽略保存的{saved_state}）")
+                logger.debug(f"load_collapsed_state: 强制返回True（忽略保存的{saved_state}）")
                 return True
 
         except Exception as e:
@@ -797,13 +800,10 @@ class AIAssistantPanel(QWidget):
         group.user_classes_count = self.user_classes_count
 
         # 确保正确应用折叠状态和标题
-        print(
-            f"[DEBUG] create_classes_info_group 最终: collapsed={group.collapsed}")
-        print(f"[DEBUG] create_classes_info_group 最终: height={group.height()}")
-        print(
-            f"[DEBUG] create_classes_info_group 最终: maxHeight={group.maximumHeight()}")
-        print(
-            f"[DEBUG] create_classes_info_group 最终: minHeight={group.minimumHeight()}")
+        logger.debug(f"create_classes_info_group 最终: collapsed={group.collapsed}")
+        logger.debug(f"create_classes_info_group 最终: height={group.height()}")
+        logger.debug(f"create_classes_info_group 最终: maxHeight={group.maximumHeight()}")
+        logger.debug(f"create_classes_info_group 最终: minHeight={group.minimumHeight()}")
 
         if group.collapsed:
             group.update_title_for_collapsed_state()
@@ -1418,6 +1418,7 @@ class AIAssistantPanel(QWidget):
             self.trainer.training_error.connect(self.on_training_error)
             self.trainer.training_stopped.connect(self.on_training_stopped)
             self.trainer.log_message.connect(self.on_training_log)
+            self.trainer.autotune_completed.connect(self.on_autotune_completed)
 
             # 初始化模型列表
             self.refresh_models()
@@ -1852,7 +1853,7 @@ class AIAssistantPanel(QWidget):
                 except:
                     self.hardware_info['nvidia_driver'] = 'Not Found'
 
-            print(f"[DEBUG] 硬件信息检测完成: {self.hardware_info}")
+            logger.debug(f"硬件信息检测完成: {self.hardware_info}")
 
         except Exception as e:
             logger.error(f"硬件信息检测失败: {str(e)}")
@@ -2318,6 +2319,23 @@ class AIAssistantPanel(QWidget):
             self.lr_spin.setDecimals(4)
             params_layout.addRow("学习率:", self.lr_spin)
 
+            # 增量微调
+            self.incremental_checkbox = QCheckBox("🔁 增量微调（新图片 + 旧图片回放）")
+            self.incremental_checkbox.setToolTip(
+                "从最近训练好的模型继续，只训练尚未训练过的新图片，\n"
+                "并按类别分层抽取部分旧图片回放，防止遗忘。\n"
+                "训练轮数和学习率自动选择，通常几分钟即可完成。")
+            params_layout.addRow("训练模式:", self.incremental_checkbox)
+
+            # CPU训练自动调优
+            self.auto_tune_checkbox = QCheckBox("⚡ 自动调优批次大小和数据加载线程（CPU训练）")
+            self.auto_tune_checkbox.setChecked(True)
+            self.auto_tune_checkbox.setToolTip(
+                "CPU训练开始前，对几组批次大小和线程数做短时探测，\n"
+                "在内存预算内选择吞吐量最高的组合。\n"
+                "结果按数据集和模型记录，下次训练直接使用。")
+            params_layout.addRow("", self.auto_tune_checkbox)
+
             # 模型选择组
             model_group = QGroupBox("🤖 基础模型选择")
             model_layout = QVBoxLayout(model_group)
@@ -3355,13 +3373,40 @@ class AIAssistantPanel(QWidget):
             progress_layout.addLayout(metrics_layout)
             layout.addWidget(progress_group)
 
+            # 训练曲线组（从运行目录下的指标数据库绘制）
+            chart_group = QGroupBox("📉 训练曲线")
+            chart_layout = QVBoxLayout(chart_group)
+
+            chart_options_layout = QHBoxLayout()
+            chart_options_layout.addWidget(QLabel("指标:"))
+            self.metric_chart_combo = QComboBox()
+            for text, name, kind in self.TRAINING_CHART_METRICS:
+                self.metric_chart_combo.addItem(text, (name, kind))
+            self.metric_chart_combo.currentIndexChanged.connect(self._on_chart_metric_changed)
+            chart_options_layout.addWidget(self.metric_chart_combo)
+
+            chart_options_layout.addWidget(QLabel("对比:"))
+            self.compare_run_combo = QComboBox()
+            self.compare_run_combo.currentIndexChanged.connect(self._update_chart_runs)
+            chart_options_layout.addWidget(self.compare_run_combo)
+            chart_options_layout.addStretch()
+            chart_layout.addLayout(chart_options_layout)
+
+            self.metrics_chart = MetricsChart()
+            self.metrics_chart.set_metric(*self.TRAINING_CHART_METRICS[0][1:])
+            chart_layout.addWidget(self.metrics_chart)
+            layout.addWidget(chart_group)
+            self._chart_run_dir = None
+            self._populate_compare_runs()
+
             # 训练日志组
             log_group = QGroupBox("📋 训练日志")
             log_layout = QVBoxLayout(log_group)
 
-            self.monitor_log_text = QTextEdit()
+            self.monitor_log_text = LogView(spill_path=default_spill_path('training'))
             self.monitor_log_text.setPlainText("点击'开始训练'启动训练过程...")
             self.monitor_log_text.setMaximumHeight(600)
+            log_layout.addWidget(LogSearchEdit(self.monitor_log_text))
             log_layout.addWidget(self.monitor_log_text)
 
             # 训练控制按钮
@@ -4031,6 +4076,10 @@ class AIAssistantPanel(QWidget):
                 'device': self.device_combo.currentText()
             }
 
+            if getattr(self, 'incremental_checkbox', None) is not None and self.incremental_checkbox.isChecked():
+                if not self._prepare_incremental_training(config):
+                    return
+
             self._safe_append_log("📊 训练配置参数:")
             for key, value in config.items():
                 self._safe_append_log(f"   {key}: {value}")
@@ -4081,6 +4130,32 @@ class AIAssistantPanel(QWidget):
                     output_dir=os.path.join(os.getcwd(), 'runs', 'train')
                 )
 
+                # CPU训练：使用记录的调优结果，没有记录时在训练前探测
+                if device == 'cpu' and getattr(self, 'auto_tune_checkbox', None) is not None \
+                        and self.auto_tune_checkbox.isChecked():
+                    tuned = self.training_config_manager.get_autotune_result(
+                        training_config.dataset_config, training_config.model_path)
+                    if tuned:
+                        training_config.batch_size = tuned['batch_size']
+                        training_config.workers = tuned['workers']
+                        self._safe_append_log(
+                            f"⚡ 使用已记录的调优结果: batch={tuned['batch_size']}, workers={tuned['workers']}")
+                    else:
+                        training_config.auto_tune = True
+
+                # 上次训练被停止或中断时，可从检查点继续
+                checkpoint = find_resumable_checkpoint(training_config.output_dir)
+                if checkpoint:
+                    resume_reply = QMessageBox.question(
+                        dialog, "继续训练",
+                        f"发现未完成的训练:\n{checkpoint}\n\n是否从该检查点继续训练？\n"
+                        f"选择“否”将使用当前配置重新开始训练。",
+                        QMessageBox.Yes | QMessageBox.No, QMessageBox.Yes)
+                    if resume_reply == QMessageBox.Yes:
+                        training_config.model_type = 'custom'
+                        training_config.model_path = checkpoint
+                        training_config.resume = True
+
                 # 保存对话框引用，以便训练完成后关闭
                 self.training_dialog = dialog
 
@@ -4090,6 +4165,44 @@ class AIAssistantPanel(QWidget):
         except Exception as e:
             logger.error(f"开始完整训练失败: {str(e)}")
 
+    def _prepare_incremental_training(self, config):
+        """
+        把训练配置改为增量微调：最近的训练模型 + 新图片和回放样本 + 自动轮数
+
+        Returns:
+            bool: 是否可以开始训练
+        """
+        from PyQt5.QtWidgets import QMessageBox
+
+        if not self.training_history_manager:
+            QMessageBox.warning(self, "增量微调", "训练历史管理器未初始化，无法区分新旧图片")
+            return False
+
+        base_model = self.training_history_manager.get_latest_model()
+        if not base_model:
+            QMessageBox.warning(self, "增量微调", "还没有训练完成的模型，请先进行一次完整训练")
+            return False
+
+        self._safe_append_log("🔁 正在制定增量微调计划...")
+        plan = plan_incremental_training(config['dataset_config'], self.training_history_manager,
+                                         config['batch_size'], config['learning_rate'])
+        if plan is None:
+            QMessageBox.information(self, "增量微调", "数据集中没有新的图片，无需增量微调")
+            return False
+
+        config['dataset_config'] = write_incremental_dataset(plan, config['dataset_config'])
+        config['model_type'] = 'custom'
+        config['model_path'] = base_model
+        config['model_name'] = os.path.basename(base_model)
+        config['epochs'] = plan.epochs
+        config['learning_rate'] = plan.learning_rate
+
+        self._safe_append_log(f"🤖 基础模型: {base_model}")
+        self._safe_append_log(f"🆕 新图片: {len(plan.new_images)} 张")
+        self._safe_append_log(f"♻️ 回放图片: {len(plan.replay_images)} 张 (覆盖 {len(plan.replay_class_counts)} 个类别)")
+        self._safe_append_log(f"⏱️ 自动选择: {plan.epochs} 轮, 学习率 {plan.learning_rate:.5f}")
+        return True
+
     def _switch_to_training_monitor(self):
         """切换到训练监控标签页"""
         try:
@@ -4218,6 +4331,16 @@ class AIAssistantPanel(QWidget):
             data_options_layout.addRow(
                 "备份现有数据:", self.backup_existing_checkbox)
 
+            # 训练图像缓存
+            self.image_cache_checkbox = QCheckBox()
+            self.image_cache_checkbox.setChecked(False)
+            self.image_cache_checkbox.setToolTip(
+                "把训练图片预先缩小到训练尺寸（640px）并让data.yaml指向缓存，\n"
+                "训练时不再每轮解码和缩放原始大图。\n"
+                "缓存按修改时间增量更新，高分辨率照片建议勾选。"
+            )
+            data_options_layout.addRow("生成图像缓存:", self.image_cache_checkbox)
+
             # 不包含已训练的图片选项
             self.exclude_trained_checkbox = QCheckBox()
             self.exclude_trained_checkbox.setChecked(True)  # 默认排除已训练图片
@@ -4269,7 +4392,7 @@ class AIAssistantPanel(QWidget):
             self.auto_progress_bar.setVisible(False)
             layout.addWidget(self.auto_progress_bar)
 
-            self.auto_log_text = QTextEdit()
+            self.auto_log_text = LogView(spill_path=default_spill_path('auto_config'))
             self.auto_log_text.setMaximumHeight(150)
             self.auto_log_text.setVisible(False)
             layout.addWidget(self.auto_log_text)
@@ -4808,7 +4931,9 @@ class AIAssistantPanel(QWidget):
                     dataset_name=dataset_name,
                     train_ratio=train_ratio,
                     use_class_config=True,      # 启用固定类别配置
-                    class_config_dir="configs"  # 配置文件目录
+                    class_config_dir="configs",  # 配置文件目录
+                    image_cache_size=640 if getattr(self, 'image_cache_checkbox', None) is not None
+                    and self.image_cache_checkbox.isChecked() else None
                 )
 
                 # 进度回调函数
@@ -6006,7 +6131,7 @@ class AIAssistantPanel(QWidget):
             progress_bar = QProgressBar()
             progress_layout.addWidget(progress_bar)
 
-            log_text = QTextEdit()
+            log_text = LogView(spill_path=default_spill_path('install'))
             log_text.setMaximumHeight(100)
             log_text.setPlainText("点击'开始安装'或手动执行上述命令...")
             progress_layout.addWidget(log_text)
@@ -6834,48 +6959,47 @@ pip install torch torchvision torchaudio
     def on_predict_current(self):
         """预测当前图像"""
         try:
-            print("[DEBUG] AI助手: 开始预测当前图像")
+            logger.debug("开始预测当前图像")
 
             # 检查模型是否加载
             if not self.predictor or not self.predictor.is_model_loaded():
                 error_msg = "模型未加载，请先选择并加载模型"
-                print(f"[ERROR] AI助手: {error_msg}")
+                logger.error(error_msg)
                 self.update_status(error_msg, is_error=True)
                 return
 
             # 这里需要从父窗口获取当前图像路径
             # 暂时发送信号，由父窗口处理
             confidence = self.get_current_confidence()
-            print(f"[DEBUG] AI助手: 置信度设置为 {confidence}")
-            print(f"[DEBUG] AI助手: 发送预测请求信号")
+            logger.debug(f"置信度设置为 {confidence}")
+            logger.debug("发送预测请求信号")
             self.prediction_requested.emit("", confidence)
 
         except Exception as e:
             error_msg = f"预测请求失败: {str(e)}"
-            print(f"[ERROR] AI助手: {error_msg}")
             logger.error(error_msg)
             self.update_status(error_msg, is_error=True)
 
     def start_prediction(self, image_path):
         """开始预测指定图像"""
         try:
-            print(f"[DEBUG] AI助手: start_prediction被调用，图像路径: {image_path}")
+            logger.debug(f"start_prediction被调用，图像路径: {image_path}")
 
             # 检查模型是否加载
             if not self.predictor or not self.predictor.is_model_loaded():
                 error_msg = "模型未加载，请先选择并加载模型"
-                print(f"[ERROR] AI助手: {error_msg}")
+                logger.error(error_msg)
                 self.update_status(error_msg, is_error=True)
                 return
 
             # 检查图像文件
             if not os.path.exists(image_path):
                 error_msg = f"图像文件不存在: {image_path}"
-                print(f"[ERROR] AI助手: {error_msg}")
+                logger.error(error_msg)
                 self.update_status(error_msg, is_error=True)
                 return
 
-            print(f"[DEBUG] AI助手: 开始执行预测...")
+            logger.debug("开始执行预测...")
             self.update_status("正在预测...")
 
             # 获取当前参数
@@ -6883,11 +7007,10 @@ pip install torch torchvision torchaudio
             iou_threshold = self.get_current_nms()
             max_detections = self.get_current_max_det()
 
-            print(
-                f"[DEBUG] AI助手: 预测参数 - confidence: {confidence}, iou: {iou_threshold}, max_det: {max_detections}")
+            logger.debug(f"预测参数 - confidence: {confidence}, iou: {iou_threshold}, max_det: {max_detections}")
 
             # 执行预测（异步，结果将通过prediction_completed信号处理）
-            print(f"[DEBUG] AI助手: 启动预测，等待prediction_completed信号...")
+            logger.debug("启动预测，等待prediction_completed信号...")
             result = self.predictor.predict_single(
                 image_path=image_path,
                 conf_threshold=confidence,
@@ -6900,7 +7023,6 @@ pip install torch torchvision torchaudio
 
         except Exception as e:
             error_msg = f"预测执行失败: {str(e)}"
-            print(f"[ERROR] AI助手: {error_msg}")
             logger.error(error_msg)
             self.update_status(error_msg, is_error=True)
             import traceback
@@ -6934,11 +7056,10 @@ pip install torch torchvision torchaudio
             # 清除当前预测结果
             self.clear_prediction_results()
 
-            print("[DEBUG] AI助手: 预测已取消，结果已清除")
+            logger.debug("预测已取消，结果已清除")
 
         except Exception as e:
             error_msg = f"取消预测失败: {str(e)}"
-            print(f"[ERROR] AI助手: {error_msg}")
             logger.error(error_msg)
 
     def on_apply_results(self):
@@ -6969,11 +7090,10 @@ pip install torch torchvision torchaudio
         """清除预测结果"""
         try:
             self.clear_prediction_results()
-            print("[DEBUG] AI助手: 预测结果已清除")
+            logger.debug("预测结果已清除")
 
         except Exception as e:
             error_msg = f"清除预测结果失败: {str(e)}"
-            print(f"[ERROR] AI助手: {error_msg}")
             logger.error(error_msg)
 
     def clear_prediction_results(self):
@@ -6993,7 +7113,6 @@ pip install torch torchvision torchaudio
 
         except Exception as e:
             error_msg = f"清除预测结果失败: {str(e)}"
-            print(f"[ERROR] AI助手: {error_msg}")
             logger.error(error_msg)
 
     def on_result_item_double_clicked(self, item):
@@ -7075,13 +7194,12 @@ pip install torch torchvision torchaudio
             # 根据预测类型显示不同的状态信息
             if self.is_smart_predicting:
                 if result.detections:
-                    print(
-                        f"[DEBUG] 智能预测完成，自动应用 {len(result.detections)} 个检测结果")
+                    logger.debug(f"智能预测完成，自动应用 {len(result.detections)} 个检测结果")
                     self.predictions_applied.emit([result])
                     self.update_status(
                         f"🤖 智能预测完成，已自动应用 {len(result.detections)} 个检测结果")
                 else:
-                    print(f"[DEBUG] 智能预测完成，未检测到对象")
+                    logger.debug("智能预测完成，未检测到对象")
                     self.update_status("🤖 智能预测完成，未检测到对象")
 
                 # 重置智能预测状态
@@ -7090,10 +7208,10 @@ pip install torch torchvision torchaudio
                 # 手动预测：显示结果但不自动应用
                 self.update_status(f"预测完成，检测到 {len(result.detections)} 个目标")
                 if result.detections:
-                    print(f"[DEBUG] 手动预测完成，发送应用信号")
+                    logger.debug("手动预测完成，发送应用信号")
                     self.predictions_applied.emit([result])
                 else:
-                    print(f"[DEBUG] 手动预测完成，未检测到对象")
+                    logger.debug("手动预测完成，未检测到对象")
 
         except Exception as e:
             error_msg = f"预测完成处理失败: {str(e)}"
@@ -7367,6 +7485,7 @@ pip install torch torchvision torchaudio
             # 启用停止按钮，禁用开始按钮
             if hasattr(self, 'stop_training_btn') and self.stop_training_btn is not None:
                 try:
+                    self.stop_training_btn.setText("🛑 停止训练")
                     self.stop_training_btn.setEnabled(True)
                 except RuntimeError:
                     pass
@@ -7394,9 +7513,86 @@ pip install torch torchvision torchaudio
         except Exception as e:
             logger.error(f"训练开始回调失败: {str(e)}")
 
+    # 训练曲线可选的指标: (显示名称, 指标名称, 粒度)
+    TRAINING_CHART_METRICS = (
+        ("训练损失 (box)", 'train/box_loss', KIND_EPOCH),
+        ("验证损失 (box)", 'val/box_loss', KIND_EPOCH),
+        ("mAP50", 'metrics/mAP50(B)', KIND_EPOCH),
+        ("mAP50-95", 'metrics/mAP50-95(B)', KIND_EPOCH),
+        ("精确率", 'metrics/precision(B)', KIND_EPOCH),
+        ("召回率", 'metrics/recall(B)', KIND_EPOCH),
+        ("学习率", 'lr', KIND_EPOCH),
+        ("训练损失 (每次迭代)", 'train/box_loss', KIND_ITERATION),
+    )
+
+    def _training_runs_dir(self):
+        return os.path.join(os.getcwd(), 'runs', 'train')
+
+    def _populate_compare_runs(self):
+        """列出可对比的历史训练"""
+        try:
+            self.compare_run_combo.blockSignals(True)
+            self.compare_run_combo.clear()
+            self.compare_run_combo.addItem("无", None)
+            for run_dir in list_runs(self._training_runs_dir()):
+                if run_dir != self._chart_run_dir:
+                    self.compare_run_combo.addItem(os.path.basename(run_dir), run_dir)
+        except RuntimeError:
+            pass
+        finally:
+            self.compare_run_combo.blockSignals(False)
+
+    def _on_chart_metric_changed(self, index):
+        try:
+            name, kind = self.metric_chart_combo.itemData(index)
+            self.metrics_chart.set_metric(name, kind)
+        except RuntimeError:
+            pass
+
+    def _update_chart_runs(self, *args):
+        """当前训练和选中的对比训练"""
+        try:
+            runs = []
+            if self._chart_run_dir:
+                runs.append((os.path.basename(self._chart_run_dir), metrics_db_path(self._chart_run_dir)))
+            compare_dir = self.compare_run_combo.currentData()
+            if compare_dir:
+                runs.append((os.path.basename(compare_dir), metrics_db_path(compare_dir)))
+            self.metrics_chart.set_runs(runs)
+        except RuntimeError:
+            pass
+
+    def _refresh_training_chart(self):
+        """训练进度更新时增量刷新曲线"""
+        if getattr(self, 'metrics_chart', None) is None:
+            return
+        run_dir = getattr(self.trainer, 'run_dir', None) if self.trainer else None
+        if run_dir and run_dir != self._chart_run_dir:
+            self._chart_run_dir = run_dir
+            self._populate_compare_runs()
+            self._update_chart_runs()
+        else:
+            try:
+                self.metrics_chart.refresh()
+            except RuntimeError:
+                pass
+
+    def on_autotune_completed(self, result):
+        """自动调优完成回调：记录结果，同一数据集和模型下次跳过探测"""
+        try:
+            config = self.trainer.config
+            self.training_config_manager.save_autotune_result(config.dataset_config, config.model_path, result)
+            self._safe_append_log(
+                f"📝 已记录调优结果: batch={result['batch_size']}, workers={result['workers']} "
+                f"({result['images_per_second']:.1f} 张/秒, 峰值内存 {result['peak_rss_mb']:.0f} MB)")
+        except Exception as e:
+            logger.error(f"保存自动调优结果失败: {str(e)}")
+
     def on_training_progress(self, metrics):
         """训练进度回调"""
         try:
+            self._refresh_training_chart()
+
             # 更新进度条
             if hasattr(self, 'training_progress_bar') and self.training_progress_bar is not None:
                 try:
@@ -7446,9 +7642,6 @@ pip install torch torchvision torchaudio
                                f"Precision: {metrics.precision:.4f}, "
                                f"Recall: {metrics.recall:.4f}")
                     self.monitor_log_text.append(log_msg)
-                    # 自动滚动到底部
-                    self.monitor_log_text.moveCursor(
-                        self.monitor_log_text.textCursor().End)
                 except RuntimeError:
                     pass
 
@@ -7459,6 +7652,7 @@ pip install torch torchvision torchaudio
         """训练完成回调"""
         try:
             self._safe_append_log(f"✅ 训练完成！模型已保存到: {model_path}")
+            self._refresh_training_chart()
 
             # 复制模型到 models 文件夹
             copied_model_path = self._copy_model_to_models_folder(model_path)
@@ -7604,30 +7798,8 @@ pip install torch torchvision torchaudio
             List[str]: 图片文件路径列表
         """
         try:
-            import yaml
-            from pathlib import Path
-
-            with open(dataset_config_path, 'r', encoding='utf-8') as f:
-                config = yaml.safe_load(f)
-
-            image_files = []
-            dataset_base = Path(dataset_config_path).parent
-
-            # 获取训练和验证图片目录
-            train_path = dataset_base / config.get('train', 'images/train')
-            val_path = dataset_base / config.get('val', 'images/val')
-
-            # 扫描图片文件
-            image_extensions = ['.jpg', '.jpeg',
-                                '.png', '.bmp', '.tiff', '.tif']
-
-            for img_dir in [train_path, val_path]:
-                if img_dir.exists():
-                    for ext in image_extensions:
-                        for img_file in img_dir.glob(f"*{ext}"):
-                            image_files.append(str(img_file))
-
-            return image_files
+            # 训练集和验证集可以是图片目录或图片列表文件（增量微调）
+            return dataset_images(dataset_config_path, 'train') + dataset_images(dataset_config_path, 'val')
 
         except Exception as e:
             logger.error(f"从数据集配置提取图片列表失败: {str(e)}")
@@ -7717,6 +7889,8 @@ pip install torch torchvision torchaudio
         """训练停止回调"""
         try:
             self._safe_append_log("🛑 训练已停止")
+            self._refresh_training_chart()
+            self._safe_append_log("💡 再次开始训练时可选择从检查点继续")
 
             # 更新训练状态
             if hasattr(self, 'training_status_label') and self.training_status_label is not None:
@@ -7836,13 +8010,18 @@ pip install torch torchvision torchaudio
         """停止训练"""
         try:
             if self.trainer and self.trainer.is_training:
-                self.trainer.stop_training()
-                self._safe_append_log("🛑 正在停止训练...")
+                # 第一次点击在当前轮次结束后停止，再次点击立即结束训练进程
+                force = self.trainer.should_stop
+                self.trainer.stop_training(force=force)
+                self._safe_append_log("🛑 正在停止训练..." if not force else "⛔ 正在强制停止训练...")
 
-                # 禁用停止按钮
+                # 等待当前轮次结束期间，停止按钮用于强制停止
                 if hasattr(self, 'stop_training_btn') and self.stop_training_btn is not None:
                     try:
-                        self.stop_training_btn.setEnabled(False)
+                        if force:
+                            self.stop_training_btn.setEnabled(False)
+                        else:
+                            self.stop_training_btn.setText("强制停止")
                     except RuntimeError:
                         pass
             else:
@@ -7858,9 +8037,8 @@ pip install torch torchvision torchaudio
         try:
             if hasattr(self, 'log_text') and self.log_text is not None:
                 try:
+                    # LogView批量刷新并自动滚动到底部
                     self.log_text.append(message)
-                    # 自动滚动到底部
-                    self.log_text.moveCursor(self.log_text.textCursor().End)
                 except RuntimeError:
                     # UI对象已被删除，使用logger记录
                     logger.info(f"训练日志: {message}")
@@ -7891,10 +8069,8 @@ pip install torch torchvision torchaudio
         try:
             if hasattr(self, 'auto_log_text') and self.auto_log_text is not None:
                 try:
+                    # LogView批量刷新并自动滚动到底部
                     self.auto_log_text.append(message)
-                    # 自动滚动到底部
-                    self.auto_log_text.moveCursor(
-                        self.auto_log_text.textCursor().End)
                 except RuntimeError:
                     # UI对象已被删除，使用logger记录
                     logger.info(f"自动配置日志: {message}")
@@ -0,0 +1,461 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+项目标注数据库模块
+
+用SQLite（WAL模式）镜像项目中所有标注框，支持整个数据集范围的快速查询。
+XML/TXT/JSON标注文件仍然是唯一的数据来源，数据库只是可随时重建的索引：
+保存标注时增量写入，打开目录时按文件mtime/大小同步变化的文件。
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from libs.create_ml_io import JSON_EXT, get_create_ml_store
+from libs.image_geometry import probe_image_geometry
+from libs.pascal_voc_io import XML_EXT, parse_voc_annotation
+from libs.yolo_io import CLASSES_FILE, TXT_EXT, load_class_list, parse_yolo_labels
+
+# 设置日志
+logger = logging.getLogger(__name__)
+
+DATABASE_DIR = '.labelImg'
+DATABASE_NAME = 'annotations.db'
+SCHEMA_VERSION = 1
+
+SOURCE_MANUAL = 'manual'
+SOURCE_AI = 'ai'
+
+# 同步时每个事务写入的图片数
+SYNC_BATCH_SIZE = 500
+
+# 默认框尺寸分箱边界（sqrt(面积)，像素），与COCO小/中/大目标划分对齐
+DEFAULT_SIZE_BINS = (0, 16, 32, 64, 96, 128, 256, 512)
+
+# 与GUI加载标注时相同的优先级: PascalXML > YOLO > CreateML
+ANNOTATION_EXTENSIONS = (XML_EXT, TXT_EXT, JSON_EXT)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    annotation_path TEXT,
+    annotation_mtime_ns INTEGER,
+    annotation_size INTEGER,
+    width INTEGER,
+    height INTEGER,
+    verified INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS classes (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS boxes (
+    id INTEGER PRIMARY KEY,
+    image_id INTEGER NOT NULL REFERENCES images(id) ON DELETE CASCADE,
+    class_id INTEGER NOT NULL REFERENCES classes(id),
+    x1 REAL NOT NULL,
+    y1 REAL NOT NULL,
+    x2 REAL NOT NULL,
+    y2 REAL NOT NULL,
+    area REAL NOT NULL,
+    relative_area REAL,
+    difficult INTEGER NOT NULL DEFAULT 0,
+    source TEXT NOT NULL DEFAULT 'manual',
+    confidence REAL
+);
+CREATE INDEX IF NOT EXISTS boxes_class_image ON boxes(class_id, image_id);
+CREATE INDEX IF NOT EXISTS boxes_image ON boxes(image_id);
+CREATE INDEX IF NOT EXISTS boxes_area ON boxes(area);
+CREATE INDEX IF NOT EXISTS boxes_class_area ON boxes(class_id, area);
+"""
+
+
+class AnnotationBox(namedtuple('AnnotationBox', 'label x1 y1 x2 y2 difficult source confidence')):
+    """一个标注框，坐标为像素值"""
+    __slots__ = ()
+
+    def __new__(cls, label, x1, y1, x2, y2, difficult=False, source=SOURCE_MANUAL, confidence=None):
+        return super().__new__(cls, label, x1, y1, x2, y2, difficult, source, confidence)
+
+
+def default_database_path(project_dir: str) -> str:
+    """项目数据库的默认位置: <项目目录>/.labelImg/annotations.db"""
+    return os.path.join(project_dir, DATABASE_DIR, DATABASE_NAME)
+
+
+def find_annotation_file(image_path: str, save_dir: Optional[str] = None) -> Optional[str]:
+    """
+    按GUI的优先级查找图片对应的标注文件
+
+    Args:
+        image_path: 图片路径
+        save_dir: 标注保存目录，为None时在图片所在目录查找
+
+    Returns:
+        标注文件路径，不存在时返回None
+    """
+    stem = os.path.splitext(image_path)[0]
+    if save_dir is not None:
+        stem = os.path.join(save_dir, os.path.basename(stem))
+    for ext in ANNOTATION_EXTENSIONS:
+        if os.path.isfile(stem + ext):
+            return stem + ext
+    return None
+
+
+def _file_stamp(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None, None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def read_annotation_boxes(image_path: str, annotation_path: str):
+    """
+    读取一个标注文件中属于image_path的标注框
+
+    Returns:
+        tuple: (boxes, (width, height), verified)，boxes为AnnotationBox列表
+
+    Raises:
+        解析失败时抛出原始异常（OSError、XML语法错误、ValueError等）
+    """
+    ext = os.path.splitext(annotation_path)[1].lower()
+    geometry = probe_image_geometry(image_path)
+    size = (geometry.width, geometry.height) if geometry is not None else (None, None)
+
+    if ext == XML_EXT:
+        annotation = parse_voc_annotation(annotation_path, dtype=np.float64)
+        height, width = annotation.img_size[:2]
+        if width and height:
+            size = (width, height)
+        boxes = [AnnotationBox(label, *coords, difficult=difficult)
+                 for label, coords, difficult in zip(annotation.labels, annotation.boxes.tolist(),
+                                                     annotation.difficult.tolist())]
+        return boxes, size, annotation.verified
+
+    if ext == TXT_EXT:
+        width, height = size
+        if width is None:
+            raise ValueError("无法读取图片尺寸: %s" % image_path)
+        classes = load_class_list(os.path.join(os.path.dirname(os.path.realpath(annotation_path)), CLASSES_FILE))
+        labels = parse_yolo_labels(annotation_path, dtype=np.float64)
+        # 与YoloReader相同：先裁剪到[0, 1]再取整到像素
+        half = labels[:, 3:5] / 2
+        corners = np.hstack([np.clip(labels[:, 1:3] - half, 0, 1), np.clip(labels[:, 1:3] + half, 0, 1)])
+        corners = np.round(corners * np.array([width, height, width, height]))
+        boxes = [AnnotationBox(classes[int(class_index)], *coords)
+                 for class_index, coords in zip(labels[:, 0].tolist(), corners.tolist())]
+        return boxes, size, False
+
+    if ext == JSON_EXT:
+        entry = get_create_ml_store(annotation_path).get(os.path.basename(image_path))
+        boxes = []
+        if entry is None:
+            return boxes, size, False
+        for shape in entry["annotations"]:
+            coords = shape["coordinates"]
+            half_w = coords["width"] / 2
+            half_h = coords["height"] / 2
+            boxes.append(AnnotationBox(shape["label"], coords["x"] - half_w, coords["y"] - half_h,
+                                       coords["x"] + half_w, coords["y"] + half_h))
+        return boxes, size, entry.get("verified", False)
+
+    raise ValueError("不支持的标注格式: %s" % annotation_path)
+
+
+class AnnotationDatabase:
+    """
+    项目标注数据库
+
+    images表记录每张图片、对应标注文件及其(mtime, size)；boxes表镜像每个标注框。
+    框表上的(class_id, image_id)索引覆盖了类别计数、每类图片数和包含/排除查询，
+    百万级标注框也只需扫描索引。连接可跨线程使用，所有访问由同一把锁串行化。
+    """
+
+    def __init__(self, db_path: str):
+        """
+        打开或创建数据库
+
+        Args:
+            db_path: 数据库文件路径，所在目录不存在时自动创建
+        """
+        self.db_path = db_path
+        db_dir = os.path.dirname(os.path.abspath(db_path))
+        if not os.path.isdir(db_dir):
+            os.makedirs(db_dir)
+
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if version not in (0, SCHEMA_VERSION):
+            # 数据库只是索引，结构不兼容时直接重建
+            logger.info(f"🔄 标注数据库结构版本 {version} 已过期，重建中")
+            self._conn.executescript("DROP TABLE IF EXISTS boxes; DROP TABLE IF EXISTS classes; "
+                                     "DROP TABLE IF EXISTS images;")
+        self._conn.executescript(_SCHEMA)
+        self._conn.execute("PRAGMA user_version=%d" % SCHEMA_VERSION)
+        self._class_ids = dict(self._conn.execute("SELECT name, id FROM classes"))
+
+    def close(self):
+        """关闭数据库连接，之后的操作会抛出sqlite3.ProgrammingError"""
+        with self._lock:
+            self._conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            try:
+                with self._conn:
+                    yield
+            except sqlite3.Error:
+                # 回滚后新插入的类别已不存在，重新加载缓存
+                self._class_ids = dict(self._conn.execute("SELECT name, id FROM classes"))
+                raise
+
+    def _class_id(self, name):
+        class_id = self._class_ids.get(name)
+        if class_id is None:
+            self._conn.execute("INSERT OR IGNORE INTO classes(name) VALUES (?)", (name,))
+            class_id = self._conn.execute("SELECT id FROM classes WHERE name = ?", (name,)).fetchone()[0]
+            self._class_ids[name] = class_id
+        return class_id
+
+    def _write_image(self, image_path, annotation_path, stamp, size, verified, boxes):
+        """在当前事务中替换一张图片的记录和全部标注框"""
+        image_id = self._image_id(image_path)
+        if image_id is None:
+            image_id = self._conn.execute(
+                "INSERT INTO images(path) VALUES (?)", (image_path,)).lastrowid
+        else:
+            self._conn.execute("DELETE FROM boxes WHERE image_id = ?", (image_id,))
+        self._conn.execute(
+            "UPDATE images SET annotation_path = ?, annotation_mtime_ns = ?, annotation_size = ?, "
+            "width = ?, height = ?, verified = ? WHERE id = ?",
+            (annotation_path, stamp[0], stamp[1], size[0], size[1], int(bool(verified)), image_id))
+        image_area = size[0] * size[1] if size[0] and size[1] else None
+        rows = []
+        for box in boxes:
+            x1, x2 = sorted((box.x1, box.x2))
+            y1, y2 = sorted((box.y1, box.y2))
+            area = (x2 - x1) * (y2 - y1)
+            rows.append((image_id, self._class_id(box.label), x1, y1, x2, y2, area,
+                         area / image_area if image_area else None,
+                         int(bool(box.difficult)), box.source, box.confidence))
+        self._conn.executemany(
+            "INSERT INTO boxes(image_id, class_id, x1, y1, x2, y2, area, relative_area, difficult, source, "
+            "confidence) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def _image_id(self, image_path):
+        row = self._conn.execute("SELECT id FROM images WHERE path = ?", (image_path,)).fetchone()
+        return None if row is None else row[0]
+
+    def record_annotation(self, image_path: str, annotation_path: str, boxes: Iterable,
+                          image_shape: Optional[Sequence[int]] = None, verified: bool = False):
+        """
+        记录刚保存的标注，在标注文件写入之后调用
+
+        同时记录标注文件当前的mtime/大小，下次同步时不会重复解析该文件。
+
+        Args:
+            image_path: 图片路径
+            annotation_path: 已写入的标注文件路径
+            boxes: AnnotationBox（或同顺序的元组）序列
+            image_shape: [高, 宽, 深度]，未知时为None
+            verified: 是否已验证
+        """
+        boxes = [box if isinstance(box, AnnotationBox) else AnnotationBox(*box) for box in boxes]
+        size = (image_shape[1], image_shape[0]) if image_shape else (None, None)
+        stamp = _file_stamp(annotation_path)
+        with self._transaction():
+            self._write_image(os.path.abspath(image_path), os.path.abspath(annotation_path),
+                              stamp, size, verified, boxes)
+
+    def remove_images(self, image_paths: Iterable[str]):
+        """删除图片及其标注框的记录"""
+        with self._transaction():
+            self._conn.executemany("DELETE FROM images WHERE path = ?",
+                                   [(os.path.abspath(path),) for path in image_paths])
+
+    def sync(self, image_paths: Iterable[str], save_dir: Optional[str] = None,
+             progress_callback: Optional[Callable[[int, int], None]] = None) -> Dict[str, int]:
+        """
+        将数据库与磁盘上的标注文件同步
+
+        只解析标注文件路径、mtime或大小发生变化的图片；不在image_paths中的图片会被删除。
+
+        Args:
+            image_paths: 项目中的全部图片
+            save_dir: 标注保存目录，为None时标注与图片在同一目录
+            progress_callback: 进度回调 (已处理数, 总数)
+
+        Returns:
+            dict: 统计信息 (total, updated, unchanged, removed, errors)
+        """
+        image_paths = [os.path.abspath(path) for path in image_paths]
+        stats = {'total': len(image_paths), 'updated': 0, 'unchanged': 0, 'removed': 0, 'errors': 0}
+
+        with self._lock:
+            known = {row[0]: row[1:] for row in self._conn.execute(
+                "SELECT path, annotation_path, annotation_mtime_ns, annotation_size FROM images")}
+
+        pending = []
+        for index, image_path in enumerate(image_paths):
+            annotation_path = find_annotation_file(image_path, save_dir)
+            stamp = _file_stamp(annotation_path) if annotation_path else (None, None)
+            if annotation_path is not None:
+                annotation_path = os.path.abspath(annotation_path)
+            if known.get(image_path) == (annotation_path,) + stamp:
+                stats['unchanged'] += 1
+            else:
+                boxes, size, verified = [], (None, None), False
+                if annotation_path is not None:
+                    try:
+                        boxes, size, verified = read_annotation_boxes(image_path, annotation_path)
+                    except Exception as e:
+                        logger.warning(f"⚠️ 无法解析标注文件 {annotation_path}: {e}")
+                        stats['errors'] += 1
+                pending.append((image_path, annotation_path, stamp, size, verified, boxes))
+                stats['updated'] += 1
+
+            if len(pending) >= SYNC_BATCH_SIZE:
+                self._write_pending(pending)
+            if progress_callback is not None:
+                progress_callback(index + 1, stats['total'])
+        self._write_pending(pending)
+
+        removed = set(known).difference(image_paths)
+        if removed:
+            self.remove_images(removed)
+            stats['removed'] = len(removed)
+        logger.info(f"✅ 标注数据库同步完成: {stats}")
+        return stats
+
+    def _write_pending(self, pending):
+        if not pending:
+            return
+        with self._transaction():
+            for item in pending:
+                self._write_image(*item)
+        pending.clear()
+
+    # ------------------------------------------------------------------
+    # 查询
+
+    def box_columns(self):
+        """
+        以NumPy列导出全部图片和标注框，供BoxTable在内存中查询
+
+        Returns:
+            tuple: (图片路径列表, 标注文件路径列表, 类别名称列表,
+                    图片编号, 类别编号, (N, 4)坐标, 难度)，编号均为列表下标
+        """
+        with self._lock:
+            images = self._conn.execute("SELECT id, path, annotation_path FROM images ORDER BY id").fetchall()
+            classes = self._conn.execute("SELECT id, name FROM classes ORDER BY id").fetchall()
+            rows = np.array(self._conn.execute(
+                "SELECT image_id, class_id, x1, y1, x2, y2, difficult FROM boxes").fetchall(),
+                dtype=np.float64).reshape(-1, 7)
+
+        image_keys = np.array([row[0] for row in images], dtype=np.int64)
+        class_keys = np.array([row[0] for row in classes], dtype=np.int64)
+        return ([row[1] for row in images], [row[2] for row in images], [row[1] for row in classes],
+                np.searchsorted(image_keys, rows[:, 0].astype(np.int64)).astype(np.int32),
+                np.searchsorted(class_keys, rows[:, 1].astype(np.int64)).astype(np.int32),
+                rows[:, 2:6].astype(np.float32), rows[:, 6].astype(bool))
+
+    def image_count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM images").fetchone()[0]
+
+    def box_count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM boxes").fetchone()[0]
+
+    def class_counts(self) -> Dict[str, int]:
+        """每个类别的标注框数量"""
+        with self._lock:
+            return dict(self._conn.execute(
+                "SELECT c.name, t.n FROM (SELECT class_id, COUNT(*) AS n FROM boxes GROUP BY class_id) t "
+                "JOIN classes c ON c.id = t.class_id ORDER BY t.n DESC"))
+
+    def images_per_class(self) -> Dict[str, int]:
+        """包含每个类别的图片数量"""
+        with self._lock:
+            return dict(self._conn.execute(
+                "SELECT c.name, t.n FROM (SELECT class_id, COUNT(DISTINCT image_id) AS n FROM boxes "
+                "GROUP BY class_id) t JOIN classes c ON c.id = t.class_id ORDER BY t.n DESC"))
+
+    def images_containing(self, include: Iterable[str] = (), exclude: Iterable[str] = ()) -> List[str]:
+        """
+        查找包含include中所有类别、且不包含exclude中任何类别的图片
+
+        include为空时从全部图片开始筛选。
+
+        Returns:
+            list: 排序后的图片路径
+        """
+        include = list(include)
+        exclude = list(exclude)
+        with self._lock:
+            if any(name not in self._class_ids for name in include):
+                return []
+            parts = ["SELECT image_id FROM boxes WHERE class_id = ?"] * len(include) or ["SELECT id FROM images"]
+            params = [self._class_ids[name] for name in include]
+            # 复合查询从左到右求值：先求交集，再依次去掉排除的类别
+            query = " INTERSECT ".join(parts)
+            for name in exclude:
+                if name in self._class_ids:
+                    query += " EXCEPT SELECT image_id FROM boxes WHERE class_id = ?"
+                    params.append(self._class_ids[name])
+            return [row[0] for row in self._conn.execute(
+                "SELECT path FROM images WHERE id IN (%s) ORDER BY path" % query, params)]
+
+    def box_size_histogram(self, bins: Sequence[float] = DEFAULT_SIZE_BINS, class_name: Optional[str] = None,
+                           normalized: bool = False) -> List[tuple]:
+        """
+        按sqrt(面积)统计标注框尺寸分布
+
+        Args:
+            bins: 递增的分箱边界；最后一个箱子没有上界
+            class_name: 只统计该类别，为None时统计全部
+            normalized: 为True时尺寸为sqrt(框面积/图片面积)，边界应在[0, 1]之间
+
+        Returns:
+            list: [(下界, 上界或None, 数量), ...]，小于第一个边界的框不计入
+        """
+        bins = list(bins)
+        class_filter = ""
+        class_params = []
+        if class_name is not None:
+            class_filter = " AND class_id = (SELECT id FROM classes WHERE name = ?)"
+            class_params = [class_name]
+
+        with self._lock:
+            if normalized:
+                # 比较结果为0/1，相加即得到所在箱子编号，一次扫描完成分箱
+                bin_expr = " + ".join("(relative_area >= ?)" for _ in bins)
+                counts = dict(self._conn.execute(
+                    "SELECT %s AS bin, COUNT(*) FROM boxes WHERE relative_area IS NOT NULL%s GROUP BY bin"
+                    % (bin_expr, class_filter), [edge * edge for edge in bins] + class_params))
+                return [(low, high, counts.get(index + 1, 0))
+                        for index, (low, high) in enumerate(zip(bins, bins[1:] + [None]))]
+
+            # 像素面积有索引：每个边界一次范围计数，相邻两者之差即为箱内数量
+            at_least = [self._conn.execute(
+                "SELECT COUNT(*) FROM boxes WHERE area >= ?%s" % class_filter,
+                [edge * edge] + class_params).fetchone()[0] for edge in bins]
+        return [(low, high, count - next_count)
+                for low, high, count, next_count in zip(bins, bins[1:] + [None], at_least, at_least[1:] + [0])]
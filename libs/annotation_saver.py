@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+标注异步保存模块
+
+在后台线程中写入标注文件，避免自动保存时阻塞GUI线程
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Iterable, Optional
+
+try:
+    from PyQt5.QtCore import QObject, pyqtSignal
+except ImportError:
+    from PyQt4.QtCore import QObject, pyqtSignal
+
+# 设置日志
+logger = logging.getLogger(__name__)
+
+
+class AnnotationSaveQueue(QObject):
+    """
+    标注写入队列
+
+    保存任务按标注文件路径排队，同一路径尚未写入的旧任务会被新任务替换（合并重复保存）。
+    任务由单个后台线程按提交顺序执行，结果通过信号回到GUI线程。
+    """
+
+    # 信号定义
+    save_finished = pyqtSignal(str)         # 保存完成 (标注文件路径)
+    save_failed = pyqtSignal(str, str)      # 保存失败 (标注文件路径, 错误信息)
+
+    def __init__(self, parent=None):
+        """初始化保存队列"""
+        super().__init__(parent)
+
+        self._pending = OrderedDict()   # 路径 -> 保存函数
+        self._active = None             # 正在写入的路径
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._worker = threading.Thread(target=self._run, name="AnnotationSaveQueue", daemon=True)
+        self._worker.start()
+
+    def enqueue(self, annotation_path: str, save_func: Callable[[], None]):
+        """
+        提交保存任务
+
+        Args:
+            annotation_path: 标注文件路径，用于合并同一文件的重复保存
+            save_func: 执行写入的函数，只能使用提交时的数据快照
+        """
+        with self._condition:
+            if self._stopped:
+                raise RuntimeError("保存队列已停止")
+            # 重新插入以保证按最后一次提交的顺序写入
+            self._pending.pop(annotation_path, None)
+            self._pending[annotation_path] = save_func
+            self._condition.notify_all()
+
+    def is_pending(self, annotation_path: str) -> bool:
+        """检查路径是否还有未完成的写入"""
+        with self._condition:
+            return annotation_path in self._pending or annotation_path == self._active
+
+    def pending_count(self) -> int:
+        """未完成的任务数"""
+        with self._condition:
+            return len(self._pending) + (1 if self._active else 0)
+
+    def wait_for(self, annotation_paths: Iterable[str], timeout: Optional[float] = None) -> bool:
+        """
+        等待指定路径的写入完成
+
+        Returns:
+            bool: 在超时前全部完成返回True
+        """
+        paths = set(annotation_paths)
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: self._active not in paths and not paths.intersection(self._pending),
+                timeout)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待所有已提交的写入完成
+
+        Returns:
+            bool: 在超时前全部完成返回True
+        """
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: not self._pending and self._active is None, timeout)
+
+    def stop(self, timeout: Optional[float] = None) -> bool:
+        """写完剩余任务后停止后台线程"""
+        finished = self.flush(timeout)
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        self._worker.join(timeout)
+        return finished
+
+    def _run(self):
+        """后台线程主循环"""
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending or self._stopped)
+                if not self._pending:
+                    return
+                annotation_path, save_func = self._pending.popitem(last=False)
+                self._active = annotation_path
+
+            try:
+                save_func()
+            except Exception as e:
+                logger.error(f"❌ 保存标注失败 {annotation_path}: {e}")
+                self.save_failed.emit(annotation_path, str(e))
+            else:
+                self.save_finished.emit(annotation_path)
+            finally:
+                with self._condition:
+                    self._active = None
+                    self._condition.notify_all()
@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+import os
+import tempfile
+
+from libs.constants import DEFAULT_ENCODING
+
+# mkstemp creates 0600 files; new annotation files should get the usual umask mode
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def atomic_write_bytes(path, data):
+    """
+    Write data to path through a temporary file in the same directory and
+    os.replace, so readers never observe a half-written file.
+    """
+    dir_name = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '.', suffix='.tmp', dir=dir_name)
+    try:
+        with os.fdopen(fd, 'wb') as tmp_file:
+            tmp_file.write(data)
+            tmp_file.flush()
+            os.fsync(tmp_file.fileno())
+        try:
+            mode = os.stat(path).st_mode & 0o777
+        except OSError:
+            mode = 0o666 & ~_UMASK
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def atomic_write_text(path, text, encoding=DEFAULT_ENCODING):
+    atomic_write_bytes(path, text.encode(encoding))
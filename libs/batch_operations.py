@@ -21,10 +21,15 @@ except ImportError:
     from PyQt4.QtCore import *
     from PyQt4.QtGui import *
 
+import numpy as np
+
 from .shape import Shape
 from .labelFile import LabelFile, LabelFileFormat
-from .pascal_voc_io import PascalVocWriter
-from .yolo_io import YOLOWriter
+from .image_geometry import probe_image_geometry
+from .pascal_voc_io import PascalVocWriter, XML_EXT, parse_voc_annotation
+from .yolo_io import YOLOWriter, YoloReader, TXT_EXT
+from .create_ml_io import JSON_EXT
+from .dataset_query import BoxTable, box_filter_mask
 
 # 设置日志
 logger = logging.getLogger(__name__)
@@ -235,14 +240,15 @@ class BatchOperations(QObject):
                         continue
 
                     # 读取标注文件
-                    label_file = LabelFile()
-                    shapes, image_path, image_data = label_file.load(
-                        annotation_file)
+                    shapes, image_path, image_shape, class_list = \
+                        self._load_annotation_shapes(annotation_file)
 
-                    # 调整标注框大小
+                    # 调整标注框大小（限制在图像范围内）
+                    image_size = (image_shape[1], image_shape[0])
                     resized_shapes = []
                     for shape in shapes:
-                        resized_shape = self._resize_shape(shape, scale_factor)
+                        resized_shape = self._resize_shape(
+                            shape, scale_factor, image_size)
                         resized_shapes.append(resized_shape)
 
                     # 保存调整后的标注
@@ -251,8 +257,8 @@ class BatchOperations(QObject):
                         output_file = os.path.join(
                             target_dir, os.path.basename(annotation_file))
 
-                    label_file.save(output_file, resized_shapes,
-                                    image_path, image_data)
+                    self._save_annotation_shapes(
+                        output_file, resized_shapes, image_path, image_shape, class_list)
 
                     self.successful_files += 1
 
@@ -308,8 +314,72 @@ class BatchOperations(QObject):
             logger.error(f"查找对应图像文件失败: {str(e)}")
             return None
 
-    def _resize_shape(self, shape: Shape, scale_factor: float) -> Shape:
-        """调整单个标注框大小"""
+    def _load_annotation_shapes(self, annotation_file: str) -> Tuple[List[Shape], str, List[int], List[str]]:
+        """
+        读取Pascal VOC或YOLO标注文件
+
+        图像尺寸取自XML的<size>或图像文件头，不解码图像。
+
+        Returns:
+            Tuple: (形状列表, 图像路径, 图像尺寸[高, 宽, 通道], YOLO类别列表)
+        """
+        image_path = self._find_corresponding_image(annotation_file)
+        geometry = probe_image_geometry(image_path) if image_path else None
+        class_list = []
+
+        if annotation_file.lower().endswith(XML_EXT):
+            annotation = parse_voc_annotation(annotation_file, dtype=np.float64)
+            if image_path is None:
+                image_path = os.path.join(os.path.dirname(annotation_file),
+                                          annotation.filename or '')
+            if annotation.img_size[0] and annotation.img_size[1]:
+                image_shape = list(annotation.img_size)
+            elif geometry is not None:
+                image_shape = geometry.to_image_shape()
+            else:
+                raise ValueError("无法获取图像尺寸")
+            raw_shapes = [(label, [(x_min, y_min), (x_max, y_min), (x_max, y_max), (x_min, y_max)], difficult)
+                          for label, (x_min, y_min, x_max, y_max), difficult
+                          in zip(annotation.labels, annotation.boxes.tolist(), annotation.difficult.tolist())]
+        elif annotation_file.lower().endswith(TXT_EXT):
+            if geometry is None:
+                raise ValueError("找不到对应图像或无法获取图像尺寸")
+            image_shape = geometry.to_image_shape()
+            reader = YoloReader(annotation_file, None, img_size=image_shape)
+            class_list = list(reader.classes)
+            raw_shapes = [(label, points, difficult)
+                          for label, points, _, _, difficult in reader.get_shapes()]
+        else:
+            raise ValueError("不支持的标注格式")
+
+        shapes = []
+        for label, points, difficult in raw_shapes:
+            shape = Shape(label=label)
+            for x, y in points:
+                shape.add_point(QPointF(x, y))
+            shape.close()
+            shape.difficult = difficult
+            shapes.append(shape)
+        return shapes, image_path, image_shape, class_list
+
+    def _save_annotation_shapes(self, output_file: str, shapes: List[Shape], image_path: str,
+                                image_shape: List[int], class_list: List[str]):
+        """按输出文件格式保存形状"""
+        shape_dicts = [dict(label=shape.label,
+                            points=[(p.x(), p.y()) for p in shape.points],
+                            difficult=shape.difficult)
+                       for shape in shapes]
+        label_file = LabelFile()
+        if output_file.lower().endswith(XML_EXT):
+            label_file.save_pascal_voc_format(output_file, shape_dicts, image_path, None,
+                                              image_shape=image_shape)
+        else:
+            label_file.save_yolo_format(output_file, shape_dicts, image_path, None, class_list,
+                                        image_shape=image_shape)
+
+    def _resize_shape(self, shape: Shape, scale_factor: float,
+                      image_size: Optional[Tuple[int, int]] = None) -> Shape:
+        """调整单个标注框大小，image_size为(宽, 高)时将结果限制在图像范围内"""
         try:
             from PyQt5.QtCore import QPointF
 
@@ -331,6 +401,9 @@ class BatchOperations(QObject):
                     # 新的点位置
                     new_x = center_x + offset_x
                     new_y = center_y + offset_y
+                    if image_size is not None:
+                        new_x = min(max(new_x, 0), image_size[0])
+                        new_y = min(max(new_y, 0), image_size[1])
 
                     new_shape.add_point(QPointF(new_x, new_y))
 
@@ -343,46 +416,18 @@ class BatchOperations(QObject):
             return shape
 
     def _apply_filter_criteria(self, shapes: List[Shape], criteria: Dict) -> List[Shape]:
-        """应用过滤条件"""
+        """应用过滤条件（与数据集查询共用向量化实现）"""
         try:
-            filtered_shapes = []
-
-            for shape in shapes:
-                should_include = True
-
-                # 按类别过滤
-                if 'classes' in criteria:
-                    allowed_classes = criteria['classes']
-                    if shape.label not in allowed_classes:
-                        should_include = False
-
-                # 按大小过滤
-                if 'min_size' in criteria and should_include:
-                    min_size = criteria['min_size']
-                    if len(shape.points) >= 2:
-                        width = abs(shape.points[2].x() - shape.points[0].x())
-                        height = abs(shape.points[2].y() - shape.points[0].y())
-                        if width < min_size or height < min_size:
-                            should_include = False
-
-                # 按最大大小过滤
-                if 'max_size' in criteria and should_include:
-                    max_size = criteria['max_size']
-                    if len(shape.points) >= 2:
-                        width = abs(shape.points[2].x() - shape.points[0].x())
-                        height = abs(shape.points[2].y() - shape.points[0].y())
-                        if width > max_size or height > max_size:
-                            should_include = False
-
-                # 按难度过滤
-                if 'exclude_difficult' in criteria and should_include:
-                    if criteria['exclude_difficult'] and shape.difficult:
-                        should_include = False
-
-                if should_include:
-                    filtered_shapes.append(shape)
-
-            return filtered_shapes
+            class_names = list(dict.fromkeys(shape.label for shape in shapes))
+            class_index = {name: i for i, name in enumerate(class_names)}
+            class_ids = np.array([class_index[shape.label] for shape in shapes], dtype=np.int32)
+            boxes = np.array([[shape.points[0].x(), shape.points[0].y(), shape.points[2].x(), shape.points[2].y()]
+                              if len(shape.points) > 2 else [np.nan] * 4 for shape in shapes],
+                             dtype=np.float64).reshape(-1, 4)
+            difficult = np.array([bool(shape.difficult) for shape in shapes], dtype=bool)
+
+            mask = box_filter_mask(class_ids, boxes, difficult, criteria, class_names)
+            return [shape for shape, keep in zip(shapes, mask.tolist()) if keep]
 
         except Exception as e:
             logger.error(f"应用过滤条件失败: {str(e)}")
@@ -404,12 +449,43 @@ class BatchOperations(QObject):
         return bool(self.current_operation and self.processed_files < self.total_files)
 
 
+class BoxTableThread(QThread):
+    """后台读取数据集标注并构建BoxTable（项目标注数据库可用时直接从数据库载入）"""
+
+    table_ready = pyqtSignal(object)   # BoxTable
+    failed = pyqtSignal(str)           # 错误信息
+
+    def __init__(self, source_dir: str, database=None, parent=None):
+        super().__init__(parent)
+        self.source_dir = source_dir
+        self.database = database
+
+    def run(self):
+        try:
+            if self.database is not None:
+                table = BoxTable.from_database(self.database)
+            else:
+                table = BoxTable.from_annotation_dir(self.source_dir)
+            self.table_ready.emit(table)
+        except Exception as e:
+            # 读取过程中主窗口切换目录会关闭数据库
+            self.failed.emit(str(e))
+
+
 class BatchOperationsDialog(QDialog):
     """批量操作对话框"""
 
+    # 数据集查询结果中的图片，交给主窗口文件列表显示
+    images_selected = pyqtSignal(list)
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.batch_ops = BatchOperations(self)
+        # 项目标注数据库及其覆盖的目录（由主窗口设置）
+        self.annotation_database = None
+        self.database_dirs = set()
+        self.query_thread = None
+        self.pending_criteria = {}
         self.setup_ui()
         self.setup_connections()
 
@@ -602,6 +678,38 @@ class BatchOperationsDialog(QDialog):
         self.filter_min_size_spin.setValue(10)
         layout.addRow("最小尺寸:", self.filter_min_size_spin)
 
+        self.filter_max_size_spin = QSpinBox()
+        self.filter_max_size_spin.setRange(0, 100000)
+        self.filter_max_size_spin.setSpecialValueText("不限")
+        layout.addRow("最大尺寸:", self.filter_max_size_spin)
+
+        self.filter_exclude_difficult_check = QCheckBox("忽略困难样本")
+        layout.addRow("", self.filter_exclude_difficult_check)
+
+        # 按图片统计匹配的标注框数量
+        self.filter_min_boxes_spin = QSpinBox()
+        self.filter_min_boxes_spin.setRange(0, 100000)
+        self.filter_min_boxes_spin.setValue(1)
+        layout.addRow("每张图片至少匹配:", self.filter_min_boxes_spin)
+
+        self.filter_max_boxes_spin = QSpinBox()
+        self.filter_max_boxes_spin.setRange(0, 100000)
+        self.filter_max_boxes_spin.setSpecialValueText("不限")
+        layout.addRow("每张图片至多匹配:", self.filter_max_boxes_spin)
+
+        self.filter_exclude_classes_edit = QLineEdit()
+        self.filter_exclude_classes_edit.setPlaceholderText("含有这些类别的图片将被排除")
+        layout.addRow("排除的类别:", self.filter_exclude_classes_edit)
+
+        self.filter_action_combo = QComboBox()
+        self.filter_action_combo.addItems([
+            "在文件列表中显示",
+            "复制到目标目录",
+            "删除标注",
+            "调整大小（使用缩放因子）"
+        ])
+        layout.addRow("对结果:", self.filter_action_combo)
+
         self.filter_target_edit = QLineEdit()
         self.filter_target_btn = QPushButton("浏览...")
         target_layout = QHBoxLayout()
@@ -667,9 +775,113 @@ class BatchOperationsDialog(QDialog):
         """开始格式转换操作"""
         QMessageBox.information(self, "提示", "格式转换操作暂未实现")
 
+    def filter_criteria(self) -> Dict:
+        """从界面收集数据集查询条件"""
+        criteria = {
+            'min_size': self.filter_min_size_spin.value(),
+            'min_boxes': self.filter_min_boxes_spin.value(),
+            'exclude_difficult': self.filter_exclude_difficult_check.isChecked()
+        }
+        classes = [name.strip() for name in self.filter_classes_edit.text().split(',') if name.strip()]
+        if classes:
+            criteria['classes'] = classes
+        exclude_classes = [name.strip() for name in self.filter_exclude_classes_edit.text().split(',')
+                           if name.strip()]
+        if exclude_classes:
+            criteria['exclude_classes'] = exclude_classes
+        if self.filter_max_size_spin.value() > 0:
+            criteria['max_size'] = self.filter_max_size_spin.value()
+        if self.filter_max_boxes_spin.value() > 0:
+            criteria['max_boxes'] = self.filter_max_boxes_spin.value()
+        return criteria
+
     def start_filter_operation(self):
-        """开始过滤操作"""
-        QMessageBox.information(self, "提示", "过滤操作暂未实现")
+        """在后台线程中读取整个数据集，查询完成后对匹配的图片执行所选操作"""
+        source_dir = self.filter_source_edit.text().strip()
+        if not source_dir or not os.path.isdir(source_dir):
+            QMessageBox.warning(self, "警告", "请选择源目录")
+            return
+
+        if self.query_thread is not None:
+            return
+        database = self.annotation_database
+        if database is not None and os.path.abspath(source_dir) not in self.database_dirs:
+            database = None
+        self.status_label.setText("正在从项目标注数据库读取..." if database is not None else "正在读取标注...")
+        self.start_btn.setEnabled(False)
+        self.pending_criteria = self.filter_criteria()
+        # 挂在QApplication上：对话框先关闭时线程照常结束并自行释放
+        self.query_thread = BoxTableThread(source_dir, database, QApplication.instance())
+        self.query_thread.table_ready.connect(self.on_filter_table_ready)
+        self.query_thread.failed.connect(self.on_filter_table_failed)
+        self.query_thread.finished.connect(self.query_thread.deleteLater)
+        self.query_thread.start()
+
+    def set_annotation_database(self, database, directories):
+        """过滤的源目录是directories之一时，直接从项目标注数据库查询"""
+        self.annotation_database = database
+        self.database_dirs = {os.path.abspath(directory) for directory in directories if directory}
+
+    def on_filter_table_failed(self, error: str):
+        self.query_thread = None
+        self.start_btn.setEnabled(True)
+        self.status_label.setText(f"读取标注失败: {error}")
+        QMessageBox.critical(self, "错误", f"读取标注失败: {error}")
+
+    def on_filter_table_ready(self, table: BoxTable):
+        """查询结果就绪后，对匹配的图片执行所选操作"""
+        self.query_thread = None
+        self.start_btn.setEnabled(True)
+        image_ids = table.select_images(self.pending_criteria)
+        self.status_label.setText(
+            f"查询完成: {len(image_ids)}/{table.image_count} 张图片匹配（共{len(table)}个标注框）")
+        if len(image_ids) == 0:
+            QMessageBox.information(self, "查询结果", "没有匹配的图片")
+            return
+
+        action = self.filter_action_combo.currentIndex()
+        if action == 0:
+            image_paths = [path for path in table.image_paths_for(image_ids) if os.path.exists(path)]
+            self.images_selected.emit(image_paths)
+            self.accept()
+            return
+
+        annotation_files = table.annotation_files_for(image_ids)
+        if not annotation_files:
+            QMessageBox.information(self, "查询结果", "匹配的图片都没有标注文件")
+            return
+        shared_files = [path for path in annotation_files if path.lower().endswith(JSON_EXT)]
+        if shared_files:
+            # 一个CreateML文件包含多张图片的标注，按文件复制、删除或缩放会波及未匹配的图片
+            QMessageBox.warning(
+                self, "不支持的操作",
+                f"匹配结果包含 {len(shared_files)} 个CreateML标注文件，其中也保存着未匹配图片的标注，"
+                "无法按文件复制、删除或调整大小。\n请改用“在文件列表中显示”。")
+            return
+
+        target_dir = self.filter_target_edit.text().strip()
+        if action == 1:
+            if not target_dir:
+                QMessageBox.warning(self, "警告", "请选择目标目录")
+                return
+            self.batch_ops.batch_copy_annotations(annotation_files, target_dir, copy_images=True)
+        elif action == 2:
+            reply = QMessageBox.question(
+                self, "确认删除", f"确定要删除 {len(annotation_files)} 个标注文件吗？此操作不可撤销。",
+                QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+            if reply == QMessageBox.Yes:
+                self.batch_ops.batch_delete_annotations(annotation_files)
+        else:
+            self.batch_ops.batch_resize_annotations(
+                annotation_files, self.resize_scale_spin.value(), target_dir or None)
+
+    def done(self, result):
+        if self.query_thread is not None:
+            # 线程读完后自行释放，结果不再交给已关闭的对话框
+            self.query_thread.table_ready.disconnect(self.on_filter_table_ready)
+            self.query_thread.failed.disconnect(self.on_filter_table_failed)
+            self.query_thread = None
+        super().done(result)
 
     def on_operation_started(self, operation: str, total: int):
         """操作开始处理"""
@@ -9,6 +9,7 @@ except ImportError:
 
 # from PyQt4.QtOpenGL import *
 
+from libs import perf_trace
 from libs.shape import Shape
 from libs.utils import distance
 
@@ -18,6 +19,25 @@ CURSOR_DRAW = Qt.CrossCursor
 CURSOR_MOVE = Qt.ClosedHandCursor
 CURSOR_GRAB = Qt.OpenHandCursor
 
+# The static layer covers the visible part of the canvas; paint directly beyond this size.
+MAX_STATIC_LAYER_PIXELS = 4096 * 4096
+
+
+class StaticLayer(object):
+    """
+    Offscreen rendering of the image and every shape that is not selected.
+    Painting composites it under the selected / highlighted shape and the
+    shape being drawn, so hovering and dragging do not redraw all shapes.
+    """
+
+    def __init__(self, key, rect, pixmap):
+        self.key = key
+        self.rect = rect
+        self.pixmap = pixmap
+        # Set by shapes rendered into this layer when they change.
+        self.dirty = False
+
+
 # class Canvas(QGLWidget):
 
 
@@ -57,6 +77,7 @@ class Canvas(QWidget):
         self.h_shape = None
         self.h_vertex = None
         self._painter = QPainter()
+        self._static_layer = None
         self._cursor = CURSOR_DEFAULT
         # Menus:
         self.menus = (QMenu(), QMenu())
@@ -121,7 +142,9 @@ class Canvas(QWidget):
         # Polygon drawing.
         if self.drawing():
             self.override_cursor(CURSOR_DRAW)
+            self.update_crosshair()
             if self.current:
+                dirty = self.drawing_rect()
                 # Display annotation width and height while drawing
                 current_width = abs(self.current[0].x() - pos.x())
                 current_height = abs(self.current[0].y() - pos.y())
@@ -159,28 +182,31 @@ class Canvas(QWidget):
                 self.line.line_color = color
                 self.prev_point = QPointF()
                 self.current.highlight_clear()
+                self.update(dirty.united(self.drawing_rect()))
             else:
                 self.prev_point = pos
-            self.repaint()
+                self.update_crosshair()
             return
 
         # Polygon copy moving.
         if Qt.RightButton & ev.buttons():
             if self.selected_shape_copy and self.prev_point:
                 self.override_cursor(CURSOR_MOVE)
+                dirty = self.shape_rect(self.selected_shape_copy)
                 self.bounded_move_shape(self.selected_shape_copy, pos)
-                self.repaint()
+                self.update(dirty.united(self.shape_rect(self.selected_shape_copy)))
             elif self.selected_shape:
                 self.selected_shape_copy = self.selected_shape.copy()
-                self.repaint()
+                self.update(self.shape_rect(self.selected_shape_copy))
             return
 
         # Polygon/Vertex moving.
         if Qt.LeftButton & ev.buttons():
             if self.selected_vertex():
+                dirty = self.shape_rect(self.h_shape)
                 self.bounded_move_vertex(pos)
                 self.shapeMoved.emit()
-                self.repaint()
+                self.update(dirty.united(self.shape_rect(self.h_shape)))
 
                 # Display annotation width and height while moving vertex
                 point1 = self.h_shape[1]
@@ -191,9 +217,10 @@ class Canvas(QWidget):
                         '📏 宽度: %d, 高度: %d | 📍 坐标: (%d, %d)' % (current_width, current_height, pos.x(), pos.y()))
             elif self.selected_shape and self.prev_point:
                 self.override_cursor(CURSOR_MOVE)
+                dirty = self.shape_rect(self.selected_shape)
                 self.bounded_move_shape(self.selected_shape, pos)
                 self.shapeMoved.emit()
-                self.repaint()
+                self.update(dirty.united(self.shape_rect(self.selected_shape)))
 
                 # Display annotation width and height while moving shape
                 point1 = self.selected_shape[1]
@@ -215,6 +242,8 @@ class Canvas(QWidget):
         # - Highlight vertex
         # Update shape/vertex fill and tooltip value accordingly.
         self.setToolTip("Image")
+        # Repaint only the previously and newly highlighted shapes
+        dirty = self.shape_rect(self.h_shape) if self.h_shape else QRect()
         priority_list = self.shapes + ([self.selected_shape] if self.selected_shape else [])
         for shape in reversed([s for s in priority_list if self.isVisible(s)]):
             # Look for a nearby vertex to highlight. If that fails,
@@ -228,7 +257,7 @@ class Canvas(QWidget):
                 self.override_cursor(CURSOR_POINT)
                 self.setToolTip("Click & drag to move point")
                 self.setStatusTip(self.toolTip())
-                self.update()
+                self.update(dirty.united(self.shape_rect(shape)))
                 break
             elif shape.contains_point(pos):
                 if self.selected_vertex():
@@ -238,7 +267,7 @@ class Canvas(QWidget):
                     "Click & drag to move shape '%s'" % shape.label)
                 self.setStatusTip(self.toolTip())
                 self.override_cursor(CURSOR_GRAB)
-                self.update()
+                self.update(dirty.united(self.shape_rect(shape)))
 
                 # Display annotation width and height while hovering inside
                 point1 = self.h_shape[1]
@@ -251,7 +280,7 @@ class Canvas(QWidget):
         else:  # Nothing found, clear highlights, reset state.
             if self.h_shape:
                 self.h_shape.highlight_clear()
-                self.update()
+                self.update(dirty)
             self.h_vertex, self.h_shape = None, None
             self.override_cursor(CURSOR_DEFAULT)
 
@@ -492,33 +521,159 @@ class Canvas(QWidget):
         if not self.bounded_move_shape(shape, point - offset):
             self.bounded_move_shape(shape, point + offset)
 
+    def to_widget_rect(self, rect, margin=2):
+        """Image-coordinate rect to the widget rect covering it, rounded outwards."""
+        if rect.isNull():
+            return QRect()
+        offset = self.offset_to_center()
+        s = self.scale
+        widget_rect = QRectF((rect.x() + offset.x()) * s, (rect.y() + offset.y()) * s,
+                             rect.width() * s, rect.height() * s).toAlignedRect()
+        return widget_rect.adjusted(-margin, -margin, margin, margin)
+
+    def to_image_rect(self, rect):
+        """Widget rect to image coordinates."""
+        offset = self.offset_to_center()
+        s = self.scale
+        return QRectF(rect.x() / s - offset.x(), rect.y() / s - offset.y(), rect.width() / s, rect.height() / s)
+
+    def shape_rect(self, shape):
+        """Widget rect covering everything painted for the shape."""
+        return self.to_widget_rect(shape.paint_rect())
+
+    def drawing_rect(self):
+        """Widget rect covering the shape being drawn, the line to the cursor and the rubber band."""
+        rect = QRectF()
+        for shape in (self.current, self.line):
+            if shape:
+                rect = rect.united(shape.paint_rect())
+        return self.to_widget_rect(rect)
+
+    def update_crosshair(self):
+        """Schedule a repaint of the crosshair lines through prev_point."""
+        if not self.pixmap or self.prev_point.isNull():
+            return
+        x, y = self.prev_point.x(), self.prev_point.y()
+        self.update(self.to_widget_rect(QRectF(x, 0, 0, self.pixmap.height())))
+        self.update(self.to_widget_rect(QRectF(0, y, self.pixmap.width(), 0)))
+
+    def invalidate_static_layer(self):
+        self._static_layer = None
+
+    def static_shapes(self):
+        """Shapes painted into the static layer."""
+        if self._hide_background:
+            return []
+        return [shape for shape in self.shapes if not shape.selected and self.isVisible(shape)]
+
+    def _static_layer_key(self, rect):
+        offset = self.offset_to_center()
+        overlay = self.overlay_color.rgba() if self.overlay_color else None
+        return (rect.x(), rect.y(), rect.width(), rect.height(), self.devicePixelRatioF(),
+                self.scale, offset.x(), offset.y(), self.pixmap.cacheKey(), overlay,
+                self._hide_background, self.label_font_size, id(self.shapes), len(self.shapes),
+                id(self.selected_shape), Shape.line_color.rgba(), Shape.vertex_fill_color.rgba(),
+                Shape.point_size, Shape.point_type)
+
+    def _begin_scene(self, painter):
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setRenderHint(QPainter.HighQualityAntialiasing)
+        painter.setRenderHint(QPainter.SmoothPixmapTransform)
+
+        painter.scale(self.scale, self.scale)
+        painter.translate(self.offset_to_center())
+
+    def _paint_static(self, painter, exposed):
+        """Paint the image and the static shapes intersecting the exposed widget rect."""
+        area = self.to_image_rect(exposed)
+        # A small margin keeps smooth scaling seamless across partial repaints
+        source = area.toAlignedRect().adjusted(-2, -2, 2, 2).intersected(self.pixmap.rect())
+        if not source.isEmpty():
+            if self.overlay_color:
+                temp = self.pixmap.copy(source)
+                overlay_painter = QPainter(temp)
+                overlay_painter.setCompositionMode(overlay_painter.CompositionMode_Overlay)
+                overlay_painter.fillRect(temp.rect(), self.overlay_color)
+                overlay_painter.end()
+                painter.drawPixmap(source.topLeft(), temp)
+            else:
+                painter.drawPixmap(source.topLeft(), self.pixmap, source)
+
+        shapes = self.static_shapes()
+        if not area.contains(QRectF(self.pixmap.rect())):
+            # Outline plus vertex radius; labels can reach further, so use their full rect
+            margin = Shape.point_size / self.scale + Shape.pen_width()
+            shapes = [shape for shape in shapes
+                      if (shape.paint_rect() if shape.paint_label else
+                          shape.polygon().boundingRect().adjusted(-margin, -margin, margin, margin)).intersects(area)]
+        Shape.paint_batch(painter, shapes, painter.device().devicePixelRatioF())
+        return shapes
+
+    def update_static_layer(self):
+        """Return the static layer for the visible area, re-rendering it if stale."""
+        rect = self.visibleRegion().boundingRect()
+        if rect.isEmpty():
+            rect = self.rect()
+        if rect.isEmpty() or rect.width() * rect.height() > MAX_STATIC_LAYER_PIXELS:
+            self._static_layer = None
+            return None
+
+        key = self._static_layer_key(rect)
+        layer = self._static_layer
+        if layer is not None and not layer.dirty and layer.key == key:
+            return layer
+
+        with perf_trace.span('canvas.static_layer'):
+            ratio = self.devicePixelRatioF()
+            pixmap = QPixmap(int(rect.width() * ratio), int(rect.height() * ratio))
+            pixmap.setDevicePixelRatio(ratio)
+            pixmap.fill(Qt.transparent)
+            painter = QPainter(pixmap)
+            painter.translate(-rect.x(), -rect.y())
+            self._begin_scene(painter)
+            shapes = self._paint_static(painter, rect)
+            painter.end()
+
+        layer = self._static_layer = StaticLayer(key, rect, pixmap)
+        for shape in shapes:
+            shape.static_layer = layer
+        return layer
+
+    @perf_trace.timed('canvas.paint')
     def paintEvent(self, event):
         if not self.pixmap:
             return super(Canvas, self).paintEvent(event)
 
-        p = self._painter
-        p.begin(self)
-        p.setRenderHint(QPainter.Antialiasing)
-        p.setRenderHint(QPainter.HighQualityAntialiasing)
-        p.setRenderHint(QPainter.SmoothPixmapTransform)
-
-        p.scale(self.scale, self.scale)
-        p.translate(self.offset_to_center())
-
-        temp = self.pixmap
-        if self.overlay_color:
-            temp = QPixmap(self.pixmap)
-            painter = QPainter(temp)
-            painter.setCompositionMode(painter.CompositionMode_Overlay)
-            painter.fillRect(temp.rect(), self.overlay_color)
-            painter.end()
-
-        p.drawPixmap(0, 0, temp)
         Shape.scale = self.scale
         Shape.label_font_size = self.label_font_size
-        for shape in self.shapes:
-            if (shape.selected or not self._hide_background) and self.isVisible(shape):
-                shape.fill = shape.selected or shape == self.h_shape
+        layer = self.update_static_layer()
+
+        # Only the invalidated region is repainted (e.g. the two crosshair strips)
+        region = event.region()
+        exposed = region.boundingRect()
+        p = self._painter
+        p.begin(self)
+        p.setClipRegion(region)
+        if layer is not None:
+            ratio = layer.pixmap.devicePixelRatio()
+            for rect in region.rects():
+                target = rect.intersected(layer.rect)
+                source = target.translated(-layer.rect.topLeft())
+                p.drawPixmap(QRectF(target), layer.pixmap,
+                             QRectF(source.x() * ratio, source.y() * ratio,
+                                    source.width() * ratio, source.height() * ratio))
+        self._begin_scene(p)
+        if layer is None:
+            self._paint_static(p, exposed)
+
+        # Highlighted and selected shapes are filled and go on top of the static layer.
+        overlay = [self.h_shape]
+        if self.selected_shape is not self.h_shape:
+            overlay.append(self.selected_shape)
+        for shape in overlay:
+            if shape is not None and (shape.selected or not self._hide_background) \
+                    and self.isVisible(shape) and shape in self.shapes:
+                shape.fill = True
                 shape.paint(p)
         if self.current:
             self.current.paint(p)
@@ -648,28 +803,16 @@ class Canvas(QWidget):
         # print(self.selectedShape.points)
         if direction == 'Left' and not self.move_out_of_bound(QPointF(-1.0, 0)):
             # print("move Left one pixel")
-            self.selected_shape.points[0] += QPointF(-1.0, 0)
-            self.selected_shape.points[1] += QPointF(-1.0, 0)
-            self.selected_shape.points[2] += QPointF(-1.0, 0)
-            self.selected_shape.points[3] += QPointF(-1.0, 0)
+            self.selected_shape.move_by(QPointF(-1.0, 0))
         elif direction == 'Right' and not self.move_out_of_bound(QPointF(1.0, 0)):
             # print("move Right one pixel")
-            self.selected_shape.points[0] += QPointF(1.0, 0)
-            self.selected_shape.points[1] += QPointF(1.0, 0)
-            self.selected_shape.points[2] += QPointF(1.0, 0)
-            self.selected_shape.points[3] += QPointF(1.0, 0)
+            self.selected_shape.move_by(QPointF(1.0, 0))
         elif direction == 'Up' and not self.move_out_of_bound(QPointF(0, -1.0)):
             # print("move Up one pixel")
-            self.selected_shape.points[0] += QPointF(0, -1.0)
-            self.selected_shape.points[1] += QPointF(0, -1.0)
-            self.selected_shape.points[2] += QPointF(0, -1.0)
-            self.selected_shape.points[3] += QPointF(0, -1.0)
+            self.selected_shape.move_by(QPointF(0, -1.0))
         elif direction == 'Down' and not self.move_out_of_bound(QPointF(0, 1.0)):
             # print("move Down one pixel")
-            self.selected_shape.points[0] += QPointF(0, 1.0)
-            self.selected_shape.points[1] += QPointF(0, 1.0)
-            self.selected_shape.points[2] += QPointF(0, 1.0)
-            self.selected_shape.points[3] += QPointF(0, 1.0)
+            self.selected_shape.move_by(QPointF(0, 1.0))
         self.shapeMoved.emit()
         self.repaint()
 
@@ -707,16 +850,19 @@ class Canvas(QWidget):
 
     def load_pixmap(self, pixmap):
         self.pixmap = pixmap
+        self.invalidate_static_layer()
         self.shapes = []
         self.repaint()
 
     def load_shapes(self, shapes):
         self.shapes = list(shapes)
+        self.invalidate_static_layer()
         self.current = None
         self.repaint()
 
     def set_shape_visible(self, shape, value):
         self.visible[shape] = value
+        self.invalidate_static_layer()
         self.repaint()
 
     def current_cursor(self):
@@ -742,6 +888,7 @@ class Canvas(QWidget):
 
         self.restore_cursor()
         self.pixmap = None
+        self.invalidate_static_layer()
         self.update()
 
     def set_drawing_shape_to_square(self, status):
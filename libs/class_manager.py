@@ -16,6 +16,8 @@ from typing import List, Dict, Optional, Tuple, Set
 from datetime import datetime
 import logging
 
+from libs.yolo_io import read_yolo_label_dir
+
 # 设置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -364,23 +366,13 @@ class ClassConfigManager:
 
             for labels_dir in labels_dirs:
                 if os.path.exists(labels_dir):
-                    for label_file in os.listdir(labels_dir):
-                        if label_file.endswith('.txt'):
-                            label_path = os.path.join(labels_dir, label_file)
-                            try:
-                                with open(label_path, 'r', encoding=DEFAULT_ENCODING) as f:
-                                    for line in f:
-                                        parts = line.strip().split()
-                                        if parts:
-                                            class_id = int(parts[0])
-                                            analysis['label_files_classes'].add(
-                                                class_id)
-                                            analysis['class_usage_count'][class_id] = \
-                                                analysis['class_usage_count'].get(
-                                                    class_id, 0) + 1
-                            except Exception as e:
-                                logger.warning(
-                                    f"⚠️ 读取标签文件失败 {label_path}: {e}")
+                    label_set = read_yolo_label_dir(labels_dir)
+                    for label_path, error in label_set.errors.items():
+                        logger.warning(f"⚠️ 读取标签文件失败 {label_path}: {error}")
+                    for class_id, count in label_set.class_counts().items():
+                        analysis['label_files_classes'].add(class_id)
+                        analysis['class_usage_count'][class_id] = \
+                            analysis['class_usage_count'].get(class_id, 0) + count
 
             # 转换为列表便于JSON序列化
             analysis['label_files_classes'] = sorted(
@@ -20,4 +20,5 @@ SETTING_LABEL_FILE_FORMAT= 'labelFileFormat'
 SETTING_LAST_OPENED_DIR = 'lastOpenedDir'
 SETTING_YOLO_EXPORT_DIR = 'yoloExportDir'
 SETTING_MODEL_EXPORT_DIR = 'modelExportDir'
+SETTING_ANNOTATION_DB = 'annotationDatabase'
 DEFAULT_ENCODING = 'utf-8'
@@ -1,14 +1,189 @@
 #!/usr/bin/env python
 # -*- coding: utf8 -*-
+import atexit
 import json
-from pathlib import Path
+import threading
 
+from libs.atomic_file import atomic_write_text
 from libs.constants import DEFAULT_ENCODING
 import os
 
 JSON_EXT = '.json'
+JSONL_EXT = '.jsonl'
 ENCODE_METHOD = DEFAULT_ENCODING
 
+# Seconds dirty entries may wait in memory before a write-behind flush
+DEFAULT_FLUSH_DELAY = 2.0
+
+
+class CreateMLStore:
+    """
+    In-memory, indexed view of one CreateML annotation file.
+
+    The file is parsed once and kept as a list of image entries plus an
+    image -> index map, so looking up or replacing one image is O(1).
+    Changed entries are buffered and written back by flush(), either
+    explicitly or from a timer flush_delay seconds after the first change.
+
+    A path ending in .json holds standard CreateML JSON and is rewritten
+    atomically on flush. A path ending in .jsonl holds one entry per line;
+    flush only appends the changed entries (the last line for an image
+    wins) and compacts the file once it is mostly superseded lines.
+    export_json() writes standard CreateML JSON from either variant.
+    """
+
+    def __init__(self, path, flush_delay=DEFAULT_FLUSH_DELAY):
+        self.path = path
+        self.flush_delay = flush_delay
+        self.json_lines = path.lower().endswith(JSONL_EXT)
+        self._lock = threading.RLock()
+        self._timer = None
+        self._entries = []
+        self._index = {}
+        self._dirty = {}
+        self._disk_lines = 0
+        self._stamp = None
+        self._load()
+
+    def _disk_stamp(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load(self):
+        entries = []
+        self._disk_lines = 0
+        if os.path.isfile(self.path):
+            with open(self.path, 'r', encoding=ENCODE_METHOD) as file:
+                if self.json_lines:
+                    for line in file:
+                        if line.strip():
+                            entries.append(json.loads(line))
+                            self._disk_lines += 1
+                else:
+                    input_data = file.read()
+                    entries = json.loads(input_data) if input_data.strip() else []
+
+        self._entries = []
+        self._index = {}
+        for entry in entries:
+            self._set(entry)
+        self._stamp = self._disk_stamp()
+
+    def _set(self, entry):
+        index = self._index.get(entry["image"])
+        if index is None:
+            self._index[entry["image"]] = len(self._entries)
+            self._entries.append(entry)
+        else:
+            self._entries[index] = entry
+
+    def _refresh(self):
+        """Reload if another writer changed the file, keeping unsaved entries."""
+        if self._disk_stamp() != self._stamp:
+            self._load()
+            for entry in self._dirty.values():
+                self._set(entry)
+
+    def get(self, image):
+        with self._lock:
+            self._refresh()
+            index = self._index.get(image)
+            return None if index is None else self._entries[index]
+
+    def images(self):
+        with self._lock:
+            self._refresh()
+            return list(self._index)
+
+    def entries(self):
+        with self._lock:
+            self._refresh()
+            return list(self._entries)
+
+    def put(self, entry, flush=False):
+        """
+        Add or replace the entry for entry["image"]. The write is deferred
+        unless flush is True or the file does not exist yet.
+        """
+        with self._lock:
+            self._refresh()
+            self._set(entry)
+            self._dirty[entry["image"]] = entry
+            if flush or self._stamp is None:
+                self.flush()
+            elif self._timer is None and self.flush_delay is not None:
+                self._timer = threading.Timer(self.flush_delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def is_dirty(self):
+        with self._lock:
+            return bool(self._dirty)
+
+    def flush(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._dirty:
+                return
+            self._refresh()
+
+            if self.json_lines and self._stamp is not None and \
+                    self._disk_lines + len(self._dirty) <= 2 * len(self._entries):
+                with open(self.path, 'a', encoding=ENCODE_METHOD) as file:
+                    for entry in self._dirty.values():
+                        file.write(json.dumps(entry) + '\n')
+                self._disk_lines += len(self._dirty)
+            elif self.json_lines:
+                atomic_write_text(self.path, ''.join(json.dumps(entry) + '\n' for entry in self._entries),
+                                  ENCODE_METHOD)
+                self._disk_lines = len(self._entries)
+            else:
+                atomic_write_text(self.path, json.dumps(self._entries), ENCODE_METHOD)
+
+            self._dirty.clear()
+            self._stamp = self._disk_stamp()
+
+    def export_json(self, target_path):
+        """Write every entry as a standard CreateML JSON list to target_path."""
+        atomic_write_text(target_path, json.dumps(self.entries()), ENCODE_METHOD)
+
+
+# Clean stores beyond this many are dropped so per-image .json files do not pile up
+MAX_CACHED_STORES = 256
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_create_ml_store(path):
+    """Return the shared CreateMLStore for path, creating it on first use."""
+    key = os.path.abspath(path)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            if len(_stores) >= MAX_CACHED_STORES:
+                for cached_key in [k for k, v in _stores.items() if not v.is_dirty()]:
+                    del _stores[cached_key]
+            store = CreateMLStore(key)
+            _stores[key] = store
+        return store
+
+
+def flush_create_ml_stores():
+    """Write out every buffered CreateML change."""
+    with _stores_lock:
+        stores = list(_stores.values())
+    for store in stores:
+        store.flush()
+
+
+atexit.register(flush_create_ml_stores)
+
 
 class CreateMLWriter:
     def __init__(self, folder_name, filename, img_size, shapes, output_file, database_src='Unknown', local_img_path=None):
@@ -21,15 +196,10 @@ class CreateMLWriter:
         self.verified = False
         self.shapes = shapes
         self.output_file = output_file
+        # When True the entry stays in the store's write-behind buffer
+        self.write_behind = False
 
     def write(self):
-        if os.path.isfile(self.output_file):
-            with open(self.output_file, "r") as file:
-                input_data = file.read()
-                output_dict = json.loads(input_data)
-        else:
-            output_dict = []
-
         output_image_dict = {
             "image": self.filename,
             "verified": self.verified,
@@ -57,18 +227,7 @@ class CreateMLWriter:
             }
             output_image_dict["annotations"].append(shape_dict)
 
-        # check if image already in output
-        exists = False
-        for i in range(0, len(output_dict)):
-            if output_dict[i]["image"] == output_image_dict["image"]:
-                exists = True
-                output_dict[i] = output_image_dict
-                break
-
-        if not exists:
-            output_dict.append(output_image_dict)
-
-        Path(self.output_file).write_text(json.dumps(output_dict), ENCODE_METHOD)
+        get_create_ml_store(self.output_file).put(output_image_dict, flush=not self.write_behind)
 
     def calculate_coordinates(self, x1, x2, y1, y2):
         if x1 < x2:
@@ -105,21 +264,16 @@ class CreateMLReader:
             print("JSON decoding failed")
 
     def parse_json(self):
-        with open(self.json_path, "r") as file:
-            input_data = file.read()
-
-        # Returns a list
-        output_list = json.loads(input_data)
-
-        if output_list:
-            self.verified = output_list[0].get("verified", False)
+        image = get_create_ml_store(self.json_path).get(self.filename)
 
         if len(self.shapes) > 0:
             self.shapes = []
-        for image in output_list:
-            if image["image"] == self.filename:
-                for shape in image["annotations"]:
-                    self.add_shape(shape["label"], shape["coordinates"])
+        if image is None:
+            return
+
+        self.verified = image.get("verified", False)
+        for shape in image["annotations"]:
+            self.add_shape(shape["label"], shape["coordinates"])
 
     def add_shape(self, label, bnd_box):
         x_min = bnd_box["x"] - (bnd_box["width"] / 2)
@@ -0,0 +1,274 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+数据集查询模块
+
+把整个数据集的标注框装入列式NumPy表（图片编号、类别编号、x1、y1、x2、y2、难度），
+过滤条件全部以向量化方式计算，百万级标注框的查询在毫秒级完成。
+查询结果（匹配的图片/标注文件）可以交给文件列表或批量复制/删除/调整大小。
+"""
+
+import logging
+import os
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from libs.create_ml_io import JSON_EXT, get_create_ml_store
+from libs.image_geometry import probe_image_geometry
+from libs.pascal_voc_io import read_voc_dir
+from libs.yolo_io import read_yolo_label_dir
+
+# 设置日志
+logger = logging.getLogger(__name__)
+
+# 与BatchOperations._find_corresponding_image相同的图像格式
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.tif', '.webp')
+
+
+def find_image_for_annotation(annotation_file: str) -> Optional[str]:
+    """查找与标注文件同名的图像文件"""
+    base_name = os.path.splitext(annotation_file)[0]
+    for ext in IMAGE_EXTENSIONS:
+        for candidate in (base_name + ext, base_name + ext.upper()):
+            if os.path.exists(candidate):
+                return candidate
+    return None
+
+
+def box_filter_mask(class_ids: np.ndarray, boxes: np.ndarray, difficult: np.ndarray,
+                    criteria: Dict, class_names: Sequence[str]) -> np.ndarray:
+    """
+    计算每个标注框是否满足过滤条件
+
+    Args:
+        class_ids: (N,) 类别编号，索引class_names
+        boxes: (N, 4) [x1, y1, x2, y2] 像素坐标
+        difficult: (N,) 难度标记
+        criteria: 过滤条件，支持 classes / min_size / max_size / exclude_difficult，
+            含义与BatchOperations._apply_filter_criteria一致（宽和高都需满足尺寸限制）
+        class_names: 类别名称列表
+
+    Returns:
+        np.ndarray: (N,) bool掩码
+    """
+    mask = np.ones(len(class_ids), dtype=bool)
+
+    if 'classes' in criteria:
+        mask &= np.isin(class_ids, _class_indices(criteria['classes'], class_names))
+
+    if 'min_size' in criteria or 'max_size' in criteria:
+        width = np.abs(boxes[:, 2] - boxes[:, 0])
+        height = np.abs(boxes[:, 3] - boxes[:, 1])
+        # 写成排除条件，坐标为NaN（点数不足的形状）时不受尺寸限制
+        if 'min_size' in criteria:
+            mask &= ~((width < criteria['min_size']) | (height < criteria['min_size']))
+        if 'max_size' in criteria:
+            mask &= ~((width > criteria['max_size']) | (height > criteria['max_size']))
+
+    if criteria.get('exclude_difficult'):
+        mask &= ~difficult
+
+    return mask
+
+
+def _class_indices(names: Iterable[str], class_names: Sequence[str]) -> np.ndarray:
+    """类别名称转编号，不存在的类别被忽略"""
+    index = {name: i for i, name in enumerate(class_names)}
+    return np.array([index[name] for name in names if name in index], dtype=np.int32)
+
+
+class BoxTable:
+    """
+    列式标注框表
+
+    每张图片一行记录在image_paths/annotation_files中；每个标注框一行记录在
+    image_ids、class_ids、boxes、difficult中，image_ids索引图片，class_ids索引class_names。
+    """
+
+    def __init__(self, image_paths: List[str], annotation_files: List[str], class_names: List[str],
+                 image_ids: np.ndarray, class_ids: np.ndarray, boxes: np.ndarray, difficult: np.ndarray,
+                 errors: Optional[Dict[str, str]] = None):
+        self.image_paths = image_paths
+        self.annotation_files = annotation_files
+        self.class_names = class_names
+        self.image_ids = image_ids
+        self.class_ids = class_ids
+        self.boxes = boxes
+        self.difficult = difficult
+        self.errors = errors or {}
+
+    def __len__(self):
+        return len(self.class_ids)
+
+    @property
+    def image_count(self) -> int:
+        return len(self.image_paths)
+
+    @classmethod
+    def from_annotation_dir(cls, dir_path: str, workers: Optional[int] = None) -> 'BoxTable':
+        """
+        读取目录下全部Pascal VOC、YOLO和CreateML标注
+
+        同一图片有多种标注时按GUI的优先级（XML > TXT > JSON）只取一种。
+        YOLO坐标按图像文件头中的尺寸换算为像素，找不到图像的文件记入errors。
+        """
+        builder = _TableBuilder()
+
+        voc_set = read_voc_dir(dir_path, workers=workers)
+        builder.errors.update(voc_set.errors)
+        voc_class_ids = builder.class_ids_for(voc_set.class_names)
+        for i, annotation_file in enumerate(voc_set.files):
+            image_path = find_image_for_annotation(annotation_file)
+            if image_path is None:
+                image_path = os.path.join(dir_path, voc_set.filenames[i] or '')
+            start, end = voc_set.offsets[i], voc_set.offsets[i + 1]
+            builder.add(image_path, annotation_file, voc_class_ids[voc_set.class_ids[start:end]],
+                        voc_set.boxes[start:end], voc_set.difficult[start:end])
+
+        yolo_set = read_yolo_label_dir(dir_path)
+        builder.errors.update(yolo_set.errors)
+        yolo_class_ids = builder.class_ids_for(yolo_set.classes)
+        for i, annotation_file in enumerate(yolo_set.files):
+            image_path = find_image_for_annotation(annotation_file)
+            geometry = probe_image_geometry(image_path) if image_path else None
+            if geometry is None:
+                builder.errors[annotation_file] = "找不到对应图像或无法获取图像尺寸"
+                continue
+            labels = yolo_set.labels_for(i)
+            class_index = labels[:, 0].astype(np.int64)
+            if len(class_index) and (class_index.min() < 0 or class_index.max() >= len(yolo_class_ids)):
+                builder.errors[annotation_file] = "类别编号超出classes.txt范围"
+                continue
+            # 与YoloReader相同：裁剪到[0, 1]后取整到像素
+            half = labels[:, 3:5] / 2
+            corners = np.hstack([np.clip(labels[:, 1:3] - half, 0, 1), np.clip(labels[:, 1:3] + half, 0, 1)])
+            size = np.array([geometry.width, geometry.height] * 2, dtype=np.float64)
+            builder.add(image_path, annotation_file, yolo_class_ids[class_index],
+                        np.round(corners * size), np.zeros(len(labels), dtype=bool))
+
+        for name in sorted(os.listdir(dir_path)):
+            if not name.lower().endswith(JSON_EXT):
+                continue
+            annotation_file = os.path.join(dir_path, name)
+            try:
+                entries = get_create_ml_store(annotation_file).entries()
+            except (OSError, ValueError) as e:
+                builder.errors[annotation_file] = str(e)
+                continue
+            for entry in entries:
+                labels, coords = [], []
+                for shape in entry.get("annotations", []):
+                    c = shape["coordinates"]
+                    labels.append(shape["label"])
+                    coords.append([c["x"] - c["width"] / 2, c["y"] - c["height"] / 2,
+                                   c["x"] + c["width"] / 2, c["y"] + c["height"] / 2])
+                builder.add(os.path.join(dir_path, entry["image"]), annotation_file,
+                            builder.class_ids_for(labels), np.array(coords, dtype=np.float64).reshape(-1, 4),
+                            np.zeros(len(labels), dtype=bool))
+
+        return builder.build()
+
+    @classmethod
+    def from_database(cls, database) -> 'BoxTable':
+        """从项目标注数据库（AnnotationDatabase）载入"""
+        image_paths, annotation_files, class_names, image_ids, class_ids, boxes, difficult = \
+            database.box_columns()
+        return cls(image_paths, annotation_files, class_names, image_ids, class_ids, boxes, difficult)
+
+    def box_mask(self, criteria: Dict) -> np.ndarray:
+        """满足过滤条件的标注框掩码，见box_filter_mask"""
+        return box_filter_mask(self.class_ids, self.boxes, self.difficult, criteria, self.class_names)
+
+    def select_images(self, criteria: Dict) -> np.ndarray:
+        """
+        查询满足条件的图片
+
+        标注框级条件（classes / min_size / max_size / exclude_difficult）先选出匹配的框，
+        再按图片统计：
+            min_boxes: 每张图片至少有多少个匹配框（默认1；为0时包含没有匹配框的图片）
+            max_boxes: 每张图片至多有多少个匹配框
+            exclude_classes: 含有这些类别任意标注框的图片被排除
+
+        例如“person类小于16像素的框超过50个的图片”:
+            {'classes': ['person'], 'max_size': 16, 'min_boxes': 51}
+
+        Returns:
+            np.ndarray: 升序的图片编号
+        """
+        counts = np.bincount(self.image_ids[self.box_mask(criteria)], minlength=self.image_count)
+        selected = counts >= criteria.get('min_boxes', 1)
+        if criteria.get('max_boxes') is not None:
+            selected &= counts <= criteria['max_boxes']
+        if criteria.get('exclude_classes'):
+            excluded = np.isin(self.class_ids, _class_indices(criteria['exclude_classes'], self.class_names))
+            selected &= np.bincount(self.image_ids[excluded], minlength=self.image_count) == 0
+        return np.flatnonzero(selected)
+
+    def subset(self, image_ids: Sequence[int]) -> 'BoxTable':
+        """只含给定图片（按给定顺序重新编号）及其标注框的新表，类别列表不变"""
+        image_ids = np.asarray(image_ids, dtype=np.int64)
+        remap = np.full(self.image_count, -1, dtype=np.int64)
+        remap[image_ids] = np.arange(len(image_ids))
+        new_ids = remap[self.image_ids]
+        mask = new_ids >= 0
+        return BoxTable([self.image_paths[i] for i in image_ids], [self.annotation_files[i] for i in image_ids],
+                        list(self.class_names), new_ids[mask].astype(self.image_ids.dtype),
+                        self.class_ids[mask], self.boxes[mask], self.difficult[mask], dict(self.errors))
+
+    def image_paths_for(self, image_ids: Iterable[int]) -> List[str]:
+        return [self.image_paths[i] for i in image_ids]
+
+    def annotation_files_for(self, image_ids: Iterable[int]) -> List[str]:
+        """图片对应的标注文件（去重，同一CreateML文件只出现一次；数据库中没有标注文件的图片被跳过）"""
+        return list(dict.fromkeys(path for path in (self.annotation_files[i] for i in image_ids) if path))
+
+    def class_counts(self, criteria: Optional[Dict] = None) -> Dict[str, int]:
+        """每个类别（满足条件）的标注框数量"""
+        class_ids = self.class_ids if criteria is None else self.class_ids[self.box_mask(criteria)]
+        counts = np.bincount(class_ids, minlength=len(self.class_names))
+        return {name: int(count) for name, count in zip(self.class_names, counts) if count}
+
+
+class _TableBuilder:
+    """逐个文件收集标注，最后一次性拼接成BoxTable"""
+
+    def __init__(self):
+        self.image_paths = []
+        self.annotation_files = []
+        self.class_index = {}
+        self.seen_images = set()
+        self.class_blocks = []
+        self.box_blocks = []
+        self.difficult_blocks = []
+        self.errors = {}
+
+    def class_ids_for(self, names: Iterable[str]) -> np.ndarray:
+        """名称转为全局类别编号"""
+        return np.array([self.class_index.setdefault(name, len(self.class_index)) for name in names],
+                        dtype=np.int32)
+
+    def add(self, image_path, annotation_file, class_ids, boxes, difficult):
+        key = os.path.normcase(os.path.abspath(image_path))
+        if key in self.seen_images:
+            return
+        self.seen_images.add(key)
+        self.image_paths.append(image_path)
+        self.annotation_files.append(annotation_file)
+        self.class_blocks.append(np.asarray(class_ids, dtype=np.int32))
+        self.box_blocks.append(np.asarray(boxes, dtype=np.float32).reshape(-1, 4))
+        self.difficult_blocks.append(np.asarray(difficult, dtype=bool))
+
+    def build(self) -> BoxTable:
+        counts = [len(block) for block in self.class_blocks]
+        image_ids = np.repeat(np.arange(len(counts), dtype=np.int32), counts)
+        if counts:
+            class_ids = np.concatenate(self.class_blocks)
+            boxes = np.concatenate(self.box_blocks)
+            difficult = np.concatenate(self.difficult_blocks)
+        else:
+            class_ids = np.zeros(0, dtype=np.int32)
+            boxes = np.zeros((0, 4), dtype=np.float32)
+            difficult = np.zeros(0, dtype=bool)
+        return BoxTable(self.image_paths, self.annotation_files, list(self.class_index),
+                        image_ids, class_ids, boxes, difficult, self.errors)
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+性能诊断对话框
+
+显示perf_trace按名称汇总的耗时分位数，可开启/关闭记录、清空，
+以及导出JSON汇总或Chrome trace。
+"""
+
+import os
+import time
+import logging
+
+try:
+    from PyQt5.QtCore import Qt, QTimer
+    from PyQt5.QtWidgets import (QCheckBox, QDialog, QFileDialog, QHBoxLayout, QHeaderView, QLabel, QMessageBox,
+                                 QPushButton, QTableWidget, QTableWidgetItem, QVBoxLayout)
+except ImportError:
+    from PyQt4.QtCore import Qt, QTimer
+    from PyQt4.QtGui import (QCheckBox, QDialog, QFileDialog, QHBoxLayout, QHeaderView, QLabel, QMessageBox,
+                             QPushButton, QTableWidget, QTableWidgetItem, QVBoxLayout)
+
+from libs import perf_trace
+
+logger = logging.getLogger(__name__)
+
+# 对话框打开时自动刷新的间隔
+REFRESH_INTERVAL_MS = 1000
+
+COLUMNS = (('name', '名称'), ('count', '次数'), ('total_ms', '总计 ms'), ('mean_ms', '平均 ms'),
+           ('p50_ms', 'p50 ms'), ('p95_ms', 'p95 ms'), ('p99_ms', 'p99 ms'), ('max_ms', '最大 ms'))
+
+
+class DiagnosticsDialog(QDialog):
+    """性能诊断对话框"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle('⏱️ 性能诊断')
+        self.resize(760, 480)
+
+        layout = QVBoxLayout(self)
+
+        self.enabled_check = QCheckBox('记录性能计时')
+        self.enabled_check.setChecked(perf_trace.is_enabled())
+        self.enabled_check.setToolTip('记录图片加载、绘制、保存、预测、批处理、转换和训练各阶段的耗时\n'
+                                      '也可以用环境变量 LABELIMG_TRACE=1 在启动时开启')
+        self.enabled_check.toggled.connect(self.on_enabled_toggled)
+        layout.addWidget(self.enabled_check)
+
+        self.table = QTableWidget(0, len(COLUMNS))
+        self.table.setHorizontalHeaderLabels([title for _, title in COLUMNS])
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.table.verticalHeader().setVisible(False)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        layout.addWidget(self.table)
+
+        self.summary_label = QLabel()
+        layout.addWidget(self.summary_label)
+
+        buttons = QHBoxLayout()
+        refresh_btn = QPushButton('🔄 刷新')
+        refresh_btn.clicked.connect(self.refresh)
+        reset_btn = QPushButton('🗑️ 清空')
+        reset_btn.clicked.connect(self.on_reset)
+        json_btn = QPushButton('💾 导出JSON')
+        json_btn.clicked.connect(self.export_json)
+        trace_btn = QPushButton('📈 导出Chrome trace')
+        trace_btn.setToolTip('可在 chrome://tracing 或 ui.perfetto.dev 中打开')
+        trace_btn.clicked.connect(self.export_chrome_trace)
+        close_btn = QPushButton('关闭')
+        close_btn.clicked.connect(self.accept)
+        for button in (refresh_btn, reset_btn, json_btn, trace_btn):
+            buttons.addWidget(button)
+        buttons.addStretch()
+        buttons.addWidget(close_btn)
+        layout.addLayout(buttons)
+
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(REFRESH_INTERVAL_MS)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.refresh_timer.start()
+        self.refresh()
+
+    def refresh(self):
+        """重新读取汇总统计"""
+        rows = perf_trace.summary()
+        self.table.setUpdatesEnabled(False)
+        self.table.setRowCount(len(rows))
+        for row, stats in enumerate(rows):
+            for column, (key, _) in enumerate(COLUMNS):
+                value = stats[key]
+                text = value if key == 'name' else (str(value) if key == 'count' else f"{value:.2f}")
+                item = self.table.item(row, column)
+                if item is None:
+                    item = QTableWidgetItem()
+                    if key != 'name':
+                        item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                    self.table.setItem(row, column, item)
+                item.setText(text)
+        self.table.setUpdatesEnabled(True)
+        state = '记录中' if perf_trace.is_enabled() else '未开启'
+        self.summary_label.setText(f"{state}，{len(rows)} 个计时项")
+
+    def on_enabled_toggled(self, checked):
+        perf_trace.set_enabled(checked)
+        self.refresh()
+
+    def on_reset(self):
+        perf_trace.reset()
+        self.refresh()
+
+    def _save_path(self, title, suffix, file_filter):
+        default_name = f"labelImg_{suffix}_{time.strftime('%Y%m%d_%H%M%S')}.json"
+        path, _ = QFileDialog.getSaveFileName(self, title, os.path.join(os.path.expanduser('~'), default_name),
+                                              file_filter)
+        return path
+
+    def export_json(self):
+        path = self._save_path('导出性能统计', 'perf', 'JSON (*.json)')
+        if path:
+            self._export(perf_trace.dump_json, path)
+
+    def export_chrome_trace(self):
+        path = self._save_path('导出Chrome trace', 'trace', 'Chrome trace (*.json)')
+        if path:
+            self._export(perf_trace.dump_chrome_trace, path)
+
+    def _export(self, dump, path):
+        try:
+            dump(path)
+        except OSError as e:
+            QMessageBox.warning(self, '导出失败', f'写入 {path} 失败: {e}')
+            return
+        logger.info(f"💾 已导出: {path}")
+        self.summary_label.setText(f"已导出: {path}")
+
+    def done(self, result):
+        self.refresh_timer.stop()
+        super().done(result)
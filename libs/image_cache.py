@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+训练图像缓存
+
+把训练图片预先缩小到训练尺寸（长边 = imgsz，与ultralytics的load_image一致，不放大），
+训练时每轮只需解码小图，不再反复解码和缩放原始的高分辨率照片。
+YOLO标签是归一化坐标，等比缩放后无需修改。
+
+缓存按修改时间增量更新：缓存文件的mtime设为源文件的mtime，未变化的图片直接跳过。
+"""
+
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# 每个工作进程一次处理的图片数
+CACHE_CHUNK_SIZE = 16
+# 重新编码JPEG的质量
+JPEG_QUALITY = 95
+
+_PIL_FORMATS = {'.jpg': 'JPEG', '.jpeg': 'JPEG', '.png': 'PNG', '.bmp': 'BMP',
+                '.tif': 'TIFF', '.tiff': 'TIFF', '.webp': 'WEBP'}
+
+
+def is_cache_current(source_path, cache_path):
+    """缓存文件存在且与源文件的修改时间一致"""
+    try:
+        return os.stat(cache_path).st_mtime_ns == os.stat(source_path).st_mtime_ns
+    except OSError:
+        return False
+
+
+def cache_image(source_path, cache_path, max_size):
+    """
+    生成一张缓存图片
+
+    长边不超过max_size的图片直接复制。像素按原样保存（不按EXIF旋转），
+    与labelImg中标注时看到的图像一致。
+
+    Returns:
+        bool: True表示缩小了图片，False表示原样复制
+    """
+    from PIL import Image
+
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp_path = cache_path + '.tmp'
+    resized = False
+    with Image.open(source_path) as img:
+        width, height = img.size
+        if max(width, height) > max_size:
+            ratio = max_size / max(width, height)
+            size = (max(1, min(max_size, round(width * ratio))), max(1, min(max_size, round(height * ratio))))
+            # JPEG按DCT缩放解码（draft），只解码接近目标尺寸的数据
+            img.draft('RGB' if img.mode not in ('L', 'RGB') else img.mode, size)
+            small = img.resize(size, Image.BILINEAR, reducing_gap=2.0)
+            if small.mode not in ('L', 'RGB', 'RGBA'):
+                small = small.convert('RGB')
+            image_format = _PIL_FORMATS.get(os.path.splitext(cache_path)[1].lower(), 'PNG')
+            if image_format == 'JPEG':
+                if small.mode == 'RGBA':
+                    small = small.convert('RGB')
+                small.save(tmp_path, image_format, quality=JPEG_QUALITY)
+            else:
+                small.save(tmp_path, image_format)
+            resized = True
+    if not resized:
+        shutil.copyfile(source_path, tmp_path)
+    os.replace(tmp_path, cache_path)
+
+    stat = os.stat(source_path)
+    os.utime(cache_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    return resized
+
+
+def cache_images_chunk(tasks, max_size):
+    """
+    处理一批缓存任务（可在工作进程中运行）
+
+    Returns:
+        tuple: (缩小的图片数, 复制的图片数, [(源文件, 错误信息), ...])
+    """
+    resized = copied = 0
+    errors = []
+    for source_path, cache_path in tasks:
+        try:
+            if cache_image(source_path, cache_path, max_size):
+                resized += 1
+            else:
+                copied += 1
+        except Exception as e:
+            errors.append((source_path, str(e)))
+    return resized, copied, errors
+
+
+def build_image_cache(pairs, max_size, workers=None, progress_callback=None):
+    """
+    并行生成缓存图片，跳过未变化的图片
+
+    Args:
+        pairs: [(源图片路径, 缓存图片路径), ...]
+        max_size: 缓存图片的最大边长（训练的imgsz）
+        workers: 工作进程数，默认CPU核数，1表示在当前进程中处理
+        progress_callback: 进度回调，接收 (已完成数, 总数)
+
+    Returns:
+        dict: 统计信息 {total, skipped, resized, copied, errors}
+    """
+    tasks = [(source, cache) for source, cache in pairs if not is_cache_current(source, cache)]
+    stats = {'total': len(pairs), 'skipped': len(pairs) - len(tasks), 'resized': 0, 'copied': 0, 'errors': []}
+    chunks = [tasks[i:i + CACHE_CHUNK_SIZE] for i in range(0, len(tasks), CACHE_CHUNK_SIZE)]
+    done = stats['skipped']
+
+    def collect(result, count):
+        nonlocal done
+        resized, copied, errors = result
+        stats['resized'] += resized
+        stats['copied'] += copied
+        stats['errors'].extend(errors)
+        done += count
+        if progress_callback:
+            progress_callback(done, stats['total'])
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    remaining = chunks
+    if workers > 1 and len(chunks) > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+                futures = [executor.submit(cache_images_chunk, chunk, max_size) for chunk in chunks]
+                for i, (chunk, future) in enumerate(zip(chunks, futures)):
+                    collect(future.result(), len(chunk))
+                    remaining = chunks[i + 1:]
+        except (OSError, BrokenProcessPool) as e:
+            # 进程池不可用时在当前进程中完成剩余的图片
+            print(f"Image cache process pool failed ({e}), continuing in a single process")
+        else:
+            remaining = []
+    for chunk in remaining:
+        collect(cache_images_chunk(chunk, max_size), len(chunk))
+
+    return stats
+
+
+def remove_stale_cache(cache_dir, keep_paths):
+    """删除缓存目录中不再属于数据集的文件"""
+    keep = {os.path.normcase(os.path.abspath(path)) for path in keep_paths}
+    removed = 0
+    if not os.path.isdir(cache_dir):
+        return removed
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if os.path.isfile(path) and os.path.normcase(os.path.abspath(path)) not in keep:
+            os.remove(path)
+            removed += 1
+    return removed
@@ -0,0 +1,275 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+"""
+Read image size, channel count and EXIF orientation from file headers.
+
+Only the first few hundred bytes of JPEG, PNG, BMP, TIFF and WebP files are
+read; pixels are never decoded. Results are cached by path, mtime and size.
+"""
+import os
+import struct
+import threading
+from collections import OrderedDict, namedtuple
+
+# EXIF orientations that rotate the image by 90 or 270 degrees
+_TRANSPOSED_ORIENTATIONS = (5, 6, 7, 8)
+_EXIF_ORIENTATION_TAG = 0x0112
+_PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+_PNG_CHANNELS = {0: 1, 2: 3, 3: 3, 4: 2, 6: 4}
+# JPEG start-of-frame markers; C4, C8 and CC share the range but are not frames
+_JPEG_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+MAX_CACHED_GEOMETRIES = 65536
+
+
+class ImageGeometry(namedtuple('ImageGeometry', 'width height channels orientation')):
+    """
+    Stored width/height as found in the header; orientation is the EXIF
+    value (1 when absent). oriented_size is the size after applying it, as
+    returned by decoders that honour EXIF (cv2.imread, PIL.ImageOps).
+    """
+    __slots__ = ()
+
+    @property
+    def oriented_size(self):
+        if self.orientation in _TRANSPOSED_ORIENTATIONS:
+            return self.height, self.width
+        return self.width, self.height
+
+    def to_image_shape(self):
+        """Return [height, width, depth] as used by the annotation writers."""
+        return [self.height, self.width, 1 if self.channels == 1 else 3]
+
+
+def _is_gray_palette(palette, entry_size):
+    for i in range(0, len(palette) - entry_size + 1, entry_size):
+        if not palette[i] == palette[i + 1] == palette[i + 2]:
+            return False
+    return True
+
+
+def _read_tiff_tags(data, wanted):
+    """Return {tag: first value} for the wanted tags of the first IFD in data."""
+    if data[:2] == b'II':
+        endian = '<'
+    elif data[:2] == b'MM':
+        endian = '>'
+    else:
+        return {}
+    ifd_offset = struct.unpack(endian + 'I', data[4:8])[0]
+    if ifd_offset + 2 > len(data):
+        return {}
+    entry_count = struct.unpack(endian + 'H', data[ifd_offset:ifd_offset + 2])[0]
+    tags = {}
+    for i in range(entry_count):
+        start = ifd_offset + 2 + i * 12
+        entry = data[start:start + 12]
+        if len(entry) < 12:
+            break
+        tag, value_type = struct.unpack(endian + 'HH', entry[:4])
+        if tag not in wanted:
+            continue
+        if value_type == 3:
+            tags[tag] = struct.unpack(endian + 'H', entry[8:10])[0]
+        elif value_type == 4:
+            tags[tag] = struct.unpack(endian + 'I', entry[8:12])[0]
+    return tags
+
+
+def _exif_orientation(exif):
+    """Orientation from an EXIF payload (TIFF structure, optional Exif\\0\\0 prefix)."""
+    if exif.startswith(b'Exif\x00\x00'):
+        exif = exif[6:]
+    return _read_tiff_tags(exif, (_EXIF_ORIENTATION_TAG,)).get(_EXIF_ORIENTATION_TAG, 1)
+
+
+def _probe_jpeg(f):
+    f.seek(2)
+    orientation = 1
+    while True:
+        byte = f.read(1)
+        while byte and byte != b'\xff':
+            byte = f.read(1)
+        while byte == b'\xff':
+            byte = f.read(1)
+        if not byte:
+            return None
+        marker = byte[0]
+        if marker == 0x01 or 0xD0 <= marker <= 0xD9:
+            continue
+        length_bytes = f.read(2)
+        if len(length_bytes) < 2:
+            return None
+        length = struct.unpack('>H', length_bytes)[0]
+        if marker in _JPEG_SOF_MARKERS:
+            frame = f.read(6)
+            if len(frame) < 6:
+                return None
+            height, width, components = struct.unpack('>HHB', frame[1:6])
+            return ImageGeometry(width, height, components, orientation)
+        if marker == 0xE1:
+            segment = f.read(length - 2)
+            if segment.startswith(b'Exif\x00\x00'):
+                orientation = _exif_orientation(segment)
+        else:
+            f.seek(length - 2, os.SEEK_CUR)
+
+
+def _probe_png(f):
+    header = f.read(33)
+    if len(header) < 33 or header[12:16] != b'IHDR':
+        return None
+    width, height, _, color_type = struct.unpack('>IIBB', header[16:26])
+    channels = _PNG_CHANNELS.get(color_type, 3)
+    if color_type == 3:
+        # Palette images with only gray entries load as grayscale
+        while True:
+            chunk_header = f.read(8)
+            if len(chunk_header) < 8:
+                break
+            chunk_length, chunk_type = struct.unpack('>I4s', chunk_header)
+            if chunk_type == b'PLTE':
+                if _is_gray_palette(f.read(chunk_length), 3):
+                    channels = 1
+                break
+            if chunk_type == b'IDAT':
+                break
+            f.seek(chunk_length + 4, os.SEEK_CUR)
+    return ImageGeometry(width, height, channels, 1)
+
+
+def _probe_bmp(f):
+    header = f.read(54)
+    if len(header) < 26:
+        return None
+    dib_size = struct.unpack('<I', header[14:18])[0]
+    if dib_size == 12:
+        width, height, _, bits = struct.unpack('<hhHH', header[18:26])
+        entry_size = 3
+        colors_used = 0
+    else:
+        if len(header) < 50:
+            return None
+        width, height, _, bits = struct.unpack('<iiHH', header[18:30])
+        entry_size = 4
+        colors_used = struct.unpack('<I', header[46:50])[0]
+    channels = 4 if bits == 32 else 3
+    if bits <= 8:
+        f.seek(14 + dib_size)
+        palette = f.read((colors_used or (1 << bits)) * entry_size)
+        channels = 1 if _is_gray_palette(palette, entry_size) else 3
+    return ImageGeometry(abs(width), abs(height), channels, 1)
+
+
+def _probe_tiff(f):
+    f.seek(0)
+    data = f.read(65536)
+    tags = _read_tiff_tags(data, (256, 257, 277, _EXIF_ORIENTATION_TAG))
+    if 256 not in tags or 257 not in tags:
+        return None
+    return ImageGeometry(tags[256], tags[257], tags.get(277, 1), tags.get(_EXIF_ORIENTATION_TAG, 1))
+
+
+def _probe_webp(f):
+    f.seek(12)
+    geometry = None
+    has_exif = False
+    while True:
+        chunk_header = f.read(8)
+        if len(chunk_header) < 8:
+            break
+        chunk_type, chunk_length = struct.unpack('<4sI', chunk_header)
+        padded_length = chunk_length + (chunk_length & 1)
+        if chunk_type == b'VP8X':
+            data = f.read(10)
+            if len(data) < 10:
+                return None
+            width = int.from_bytes(data[4:7], 'little') + 1
+            height = int.from_bytes(data[7:10], 'little') + 1
+            geometry = ImageGeometry(width, height, 4 if data[0] & 0x10 else 3, 1)
+            has_exif = bool(data[0] & 0x08)
+            f.seek(padded_length - 10, os.SEEK_CUR)
+            if not has_exif:
+                return geometry
+            continue
+        if chunk_type == b'EXIF' and geometry is not None:
+            return geometry._replace(orientation=_exif_orientation(f.read(chunk_length)))
+        if geometry is not None:
+            f.seek(padded_length, os.SEEK_CUR)
+            continue
+        if chunk_type == b'VP8 ':
+            data = f.read(10)
+            if len(data) < 10 or data[3:6] != b'\x9d\x01\x2a':
+                return None
+            width, height = struct.unpack('<HH', data[6:10])
+            return ImageGeometry(width & 0x3FFF, height & 0x3FFF, 3, 1)
+        if chunk_type == b'VP8L':
+            data = f.read(5)
+            if len(data) < 5 or data[0] != 0x2F:
+                return None
+            bits = struct.unpack('<I', data[1:5])[0]
+            width = (bits & 0x3FFF) + 1
+            height = ((bits >> 14) & 0x3FFF) + 1
+            return ImageGeometry(width, height, 4 if (bits >> 28) & 1 else 3, 1)
+        return None
+    return geometry
+
+
+def read_image_geometry(image_path):
+    """
+    Return the ImageGeometry of image_path from its header, or None when the
+    format is not recognised or the header is truncated. Not cached.
+    """
+    with open(image_path, 'rb') as f:
+        head = f.read(12)
+        f.seek(0)
+        if head[:2] == b'\xff\xd8':
+            return _probe_jpeg(f)
+        if head[:8] == _PNG_SIGNATURE:
+            return _probe_png(f)
+        if head[:2] == b'BM':
+            return _probe_bmp(f)
+        if head[:4] in (b'II*\x00', b'MM\x00*'):
+            return _probe_tiff(f)
+        if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+            return _probe_webp(f)
+    return None
+
+
+_geometry_cache = OrderedDict()
+_geometry_lock = threading.Lock()
+
+
+def probe_image_geometry(image_path):
+    """
+    Cached read_image_geometry. Entries are keyed by absolute path and
+    invalidated when the file's mtime or size changes. Returns None for
+    missing files and unsupported or corrupt headers.
+    """
+    key = os.path.abspath(image_path)
+    try:
+        stat = os.stat(key)
+    except OSError:
+        return None
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    with _geometry_lock:
+        cached = _geometry_cache.get(key)
+        if cached is not None and cached[0] == stamp:
+            _geometry_cache.move_to_end(key)
+            return cached[1]
+
+    try:
+        geometry = read_image_geometry(key)
+    except (OSError, struct.error):
+        geometry = None
+
+    with _geometry_lock:
+        _geometry_cache[key] = (stamp, geometry)
+        if len(_geometry_cache) > MAX_CACHED_GEOMETRIES:
+            _geometry_cache.popitem(last=False)
+    return geometry
+
+
+def clear_image_geometry_cache():
+    with _geometry_lock:
+        _geometry_cache.clear()
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+增量微调
+从最近训练好的模型出发，只用尚未训练过的新图片加上按类别分层抽取的
+旧图片回放样本做短周期训练，避免全量重训的耗时，也避免只学新数据导致的遗忘
+"""
+
+import os
+import math
+import random
+import logging
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import yaml
+
+from libs.constants import DEFAULT_ENCODING
+from libs.yolo_io import parse_yolo_labels
+
+logger = logging.getLogger(__name__)
+
+# 回放样本数 = 新图片数 × REPLAY_RATIO，并限制在 [MIN_REPLAY, MAX_REPLAY] 内
+DEFAULT_REPLAY_RATIO = 1.0
+MIN_REPLAY = 50
+MAX_REPLAY = 2000
+
+# 增量微调的目标总迭代次数，据此换算轮数，并限制在 [MIN_EPOCHS, MAX_EPOCHS] 内
+TARGET_ITERATIONS = 600
+MIN_EPOCHS = 5
+MAX_EPOCHS = 30
+
+# 微调学习率相对于完整训练学习率的比例
+LEARNING_RATE_SCALE = 0.1
+
+# 增量数据集配置写在原数据集目录下的这个子目录中
+INCREMENTAL_DIR = 'incremental'
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.tif', '.webp')
+
+
+@dataclass
+class IncrementalPlan:
+    """增量微调计划"""
+    new_images: List[str]
+    replay_images: List[str]
+    epochs: int
+    learning_rate: float
+    # 回放样本中每个类别的图片数（类别编号 -> 图片数）
+    replay_class_counts: Dict[int, int] = field(default_factory=dict)
+
+    @property
+    def train_images(self) -> List[str]:
+        return self.new_images + self.replay_images
+
+
+def load_dataset_config(data_yaml: str) -> Dict:
+    with open(data_yaml, 'r', encoding=DEFAULT_ENCODING) as f:
+        return yaml.safe_load(f) or {}
+
+
+def dataset_images(data_yaml: str, split: str = 'train') -> List[str]:
+    """
+    列出data.yaml中某个划分的全部图片
+
+    与ultralytics的解析方式一致：相对路径基于'path'字段（缺省为data.yaml所在目录），
+    条目可以是图片目录、图片列表文件或它们组成的列表。
+    """
+    config = load_dataset_config(data_yaml)
+    base = Path(config.get('path') or Path(data_yaml).parent)
+    if not base.is_absolute():
+        base = Path(data_yaml).parent / base
+    entries = config.get(split) or []
+    if isinstance(entries, str):
+        entries = [entries]
+
+    images = []
+    for entry in entries:
+        entry_path = Path(entry) if Path(entry).is_absolute() else base / entry
+        if entry_path.is_dir():
+            images.extend(sorted(str(path) for path in entry_path.rglob('*')
+                                 if path.suffix.lower() in IMAGE_EXTENSIONS))
+        elif entry_path.is_file():
+            with open(entry_path, 'r', encoding=DEFAULT_ENCODING) as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        image = Path(line) if Path(line).is_absolute() else entry_path.parent / line
+                        images.append(str(image))
+    return images
+
+
+def label_path_for(image_path: str) -> str:
+    """YOLO标签路径：把路径中最后一个images目录换成labels（与ultralytics相同）"""
+    head, sep, tail = image_path.rpartition(os.sep + 'images' + os.sep)
+    if not sep:
+        return os.path.splitext(image_path)[0] + '.txt'
+    return head + os.sep + 'labels' + os.sep + os.path.splitext(tail)[0] + '.txt'
+
+
+def image_classes(image_path: str) -> Sequence[int]:
+    """图片标签中出现的类别编号（无标签的背景图片返回空）"""
+    try:
+        labels = parse_yolo_labels(label_path_for(image_path))
+    except (OSError, ValueError):
+        return ()
+    return sorted(set(labels[:, 0].astype(int).tolist()))
+
+
+def sample_replay(old_images: List[str], budget: int, seed: int = 0) -> Tuple[List[str], Dict[int, int]]:
+    """
+    按类别分层抽取回放样本
+
+    每个类别分到相同的名额，从最稀有的类别开始抽取含该类别的图片，
+    使少见类别也能出现在回放中；名额未用完时从剩余图片中随机补足。
+
+    Returns:
+        Tuple[List[str], Dict[int, int]]: (回放图片列表, 回放样本中每个类别的图片数)
+    """
+    rng = random.Random(seed)
+    budget = min(budget, len(old_images))
+    if budget <= 0:
+        return [], {}
+
+    images_by_class = {}
+    classes_of = {}
+    for image in old_images:
+        classes_of[image] = image_classes(image)
+        for class_id in classes_of[image]:
+            images_by_class.setdefault(class_id, []).append(image)
+
+    selected = []
+    selected_set = set()
+    class_counts = {}
+
+    def take(image):
+        selected.append(image)
+        selected_set.add(image)
+        for class_id in classes_of[image]:
+            class_counts[class_id] = class_counts.get(class_id, 0) + 1
+
+    if images_by_class:
+        quota = max(1, budget // len(images_by_class))
+        for class_id in sorted(images_by_class, key=lambda c: len(images_by_class[c])):
+            candidates = [image for image in images_by_class[class_id] if image not in selected_set]
+            rng.shuffle(candidates)
+            for image in candidates:
+                if class_counts.get(class_id, 0) >= quota or len(selected) >= budget:
+                    break
+                take(image)
+
+    remaining = [image for image in old_images if image not in selected_set]
+    rng.shuffle(remaining)
+    for image in remaining[:budget - len(selected)]:
+        take(image)
+
+    return selected, class_counts
+
+
+def choose_epochs(image_count: int, batch_size: int) -> int:
+    """按目标迭代次数换算增量微调的轮数"""
+    iterations_per_epoch = max(1, math.ceil(image_count / max(1, batch_size)))
+    epochs = math.ceil(TARGET_ITERATIONS / iterations_per_epoch)
+    return max(MIN_EPOCHS, min(MAX_EPOCHS, epochs))
+
+
+def plan_incremental_training(data_yaml: str, history_manager, batch_size: int, learning_rate: float,
+                              replay_ratio: float = DEFAULT_REPLAY_RATIO,
+                              max_replay: int = MAX_REPLAY, seed: int = 0) -> Optional[IncrementalPlan]:
+    """
+    制定增量微调计划
+
+    Args:
+        data_yaml: 完整数据集的data.yaml
+        history_manager: TrainingHistoryManager，用于区分新旧图片
+        batch_size: 批次大小
+        learning_rate: 完整训练的学习率
+        replay_ratio: 每张新图片对应的回放图片数
+        max_replay: 回放样本上限
+
+    Returns:
+        Optional[IncrementalPlan]: 没有新图片时返回None
+    """
+    new_images, old_images = history_manager.partition_images(dataset_images(data_yaml, 'train'))
+    if not new_images:
+        return None
+
+    budget = min(max_replay, max(MIN_REPLAY, round(len(new_images) * replay_ratio)))
+    replay_images, class_counts = sample_replay(old_images, budget, seed)
+    epochs = choose_epochs(len(new_images) + len(replay_images), batch_size)
+    logger.info(f"增量微调计划: {len(new_images)} 张新图片, {len(replay_images)} 张回放图片, {epochs} 轮")
+    return IncrementalPlan(new_images, replay_images, epochs, learning_rate * LEARNING_RATE_SCALE, class_counts)
+
+
+def write_incremental_dataset(plan: IncrementalPlan, data_yaml: str) -> str:
+    """
+    写出增量微调用的数据集配置
+
+    不复制图片：训练集写成图片列表文件，验证集和类别沿用原配置。
+
+    Returns:
+        str: 增量数据集的data.yaml路径
+    """
+    config = load_dataset_config(data_yaml)
+    output_dir = os.path.join(os.path.dirname(os.path.abspath(data_yaml)), INCREMENTAL_DIR)
+    os.makedirs(output_dir, exist_ok=True)
+
+    train_list = os.path.join(output_dir, 'train.txt')
+    with open(train_list, 'w', encoding=DEFAULT_ENCODING) as f:
+        f.writelines(os.path.abspath(image) + '\n' for image in plan.train_images)
+
+    base = config.get('path') or os.path.dirname(os.path.abspath(data_yaml))
+    if not os.path.isabs(base):
+        base = os.path.join(os.path.dirname(os.path.abspath(data_yaml)), base)
+    config['path'] = base
+    config['train'] = train_list
+
+    incremental_yaml = os.path.join(output_dir, 'data.yaml')
+    with open(incremental_yaml, 'w', encoding=DEFAULT_ENCODING) as f:
+        yaml.dump(config, f, default_flow_style=False, allow_unicode=True)
+    return incremental_yaml
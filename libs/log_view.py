@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+日志显示控件
+训练、导出、安装等过程的日志先缓冲，每隔约100ms一次性插入控件；
+控件只保留最近的若干行，更早的行写入日志文件；支持按关键字过滤
+"""
+
+import os
+import logging
+import tempfile
+from collections import deque
+from itertools import islice
+from typing import List, Optional
+
+try:
+    from PyQt5.QtCore import QTimer
+    from PyQt5.QtWidgets import QLineEdit, QPlainTextEdit
+except ImportError:
+    from PyQt4.QtCore import QTimer
+    from PyQt4.QtGui import QLineEdit, QPlainTextEdit
+
+logger = logging.getLogger(__name__)
+
+# 控件中保留的行数
+DEFAULT_MAX_LINES = 5000
+# 两次刷新控件之间的最短间隔
+FLUSH_INTERVAL_MS = 100
+# 溢出日志文件所在目录
+SPILL_DIR = os.path.join(tempfile.gettempdir(), 'labelImg_logs')
+
+
+def default_spill_path(name: str) -> str:
+    """名为name的日志视图的溢出文件"""
+    return os.path.join(SPILL_DIR, f"{name}_{os.getpid()}.log")
+
+
+class LogView(QPlainTextEdit):
+    """
+    有界、批量刷新的只读日志视图
+
+    append()与QTextEdit.append用法相同，但只把行放入缓冲区，
+    由单次定时器合并为一次插入。超出max_lines的旧行从控件移除并追加到spill_path。
+    """
+
+    def __init__(self, parent=None, max_lines: int = DEFAULT_MAX_LINES, spill_path: Optional[str] = None):
+        super(LogView, self).__init__(parent)
+        self.setReadOnly(True)
+        self.setMaximumBlockCount(max_lines)
+        self.max_lines = max_lines
+        self.spill_path = spill_path
+        # 保留的行（过滤时从这里重建显示内容）
+        self._lines = deque(maxlen=max_lines)
+        self._pending = []
+        self._filter = ''
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(FLUSH_INTERVAL_MS)
+        self._flush_timer.timeout.connect(self.flush)
+        if spill_path:
+            self.setToolTip(f"更早的日志保存在: {spill_path}")
+
+    def append(self, text):
+        """添加一行或多行日志（在下一次刷新时显示）"""
+        self._pending.extend(str(text).splitlines() or [''])
+        if not self._flush_timer.isActive():
+            self._flush_timer.start()
+
+    def flush(self):
+        """把缓冲的行一次性插入控件"""
+        self._flush_timer.stop()
+        if not self._pending:
+            return
+        new_lines, self._pending = self._pending, []
+
+        overflow = len(self._lines) + len(new_lines) - self.max_lines
+        if overflow > 0:
+            evicted = list(islice(self._lines, 0, min(overflow, len(self._lines))))
+            evicted.extend(new_lines[:max(0, overflow - len(self._lines))])
+            self._spill(evicted)
+        self._lines.extend(new_lines)
+
+        visible = new_lines[-self.max_lines:]
+        if self._filter:
+            visible = [line for line in visible if self._filter in line.lower()]
+        if not visible:
+            return
+        scrollbar = self.verticalScrollBar()
+        at_bottom = scrollbar.value() >= scrollbar.maximum() - 2
+        self.appendPlainText('\n'.join(visible))
+        if at_bottom:
+            scrollbar.setValue(scrollbar.maximum())
+
+    def _spill(self, lines: List[str]):
+        if not self.spill_path or not lines:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.spill_path), exist_ok=True)
+            with open(self.spill_path, 'a', encoding='utf-8') as f:
+                f.write('\n'.join(lines) + '\n')
+        except OSError as e:
+            logger.warning(f"写入日志文件失败 {self.spill_path}: {e}")
+            self.spill_path = None
+
+    def setPlainText(self, text):
+        """替换全部内容（原内容不写入溢出文件）"""
+        self._pending = []
+        self._lines.clear()
+        self._lines.extend(str(text).splitlines())
+        self._render()
+
+    def clear(self):
+        self._pending = []
+        self._lines.clear()
+        super(LogView, self).clear()
+
+    def lines(self) -> List[str]:
+        """保留的全部行（含尚未显示的）"""
+        return list(self._lines) + self._pending
+
+    def set_filter(self, text: str):
+        """只显示包含text的行（不区分大小写），空字符串显示全部"""
+        self.flush()
+        self._filter = text.strip().lower()
+        self._render()
+
+    def _render(self):
+        lines = self._lines
+        if self._filter:
+            lines = [line for line in lines if self._filter in line.lower()]
+        super(LogView, self).setPlainText('\n'.join(lines))
+        scrollbar = self.verticalScrollBar()
+        scrollbar.setValue(scrollbar.maximum())
+
+
+class LogSearchEdit(QLineEdit):
+    """日志视图的过滤输入框"""
+
+    def __init__(self, log_view: LogView, parent=None):
+        super(LogSearchEdit, self).__init__(parent)
+        self.setPlaceholderText("🔍 过滤日志...")
+        self.setClearButtonEnabled(True)
+        self.textChanged.connect(log_view.set_filter)
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+训练指标曲线控件
+从训练指标数据库读取序列，按绘图宽度做最小/最大值降采样后用QPainter绘制，
+上万个点的序列绘制也只需几毫秒
+"""
+
+import logging
+import sqlite3
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from PyQt5.QtGui import QPainter, QPen, QColor, QPolygonF, QFontMetrics
+    from PyQt5.QtCore import Qt, QPointF, QRectF
+    from PyQt5.QtWidgets import QWidget
+except ImportError:
+    from PyQt4.QtGui import QPainter, QPen, QColor, QPolygonF, QFontMetrics, QWidget
+    from PyQt4.QtCore import Qt, QPointF, QRectF
+
+from libs.training_metrics_store import KIND_EPOCH, TrainingMetricsStore, minmax_downsample
+
+logger = logging.getLogger(__name__)
+
+# 依次用于各条曲线的颜色
+SERIES_COLORS = ('#e74c3c', '#3498db', '#27ae60', '#f39c12', '#8e44ad', '#16a085')
+
+
+class MetricsChart(QWidget):
+    """
+    指标折线图
+
+    每条曲线来自一个指标数据库（一次训练）。refresh()只读取新增的点，
+    降采样结果按控件宽度缓存，重绘时直接使用。
+    """
+
+    MARGIN = 36
+
+    def __init__(self, parent=None):
+        super(MetricsChart, self).__init__(parent)
+        self.setMinimumHeight(160)
+        self.metric_name = None
+        self.kind = KIND_EPOCH
+        # 每条曲线: [标签, 数据库路径, steps, values]
+        self._series = []
+        # 降采样缓存: (宽度, [(steps, values), ...])
+        self._plot_cache = None
+
+    def set_metric(self, name: str, kind: str = KIND_EPOCH):
+        """切换显示的指标，已加载的曲线重新读取"""
+        self.metric_name = name
+        self.kind = kind
+        for series in self._series:
+            series[2], series[3] = np.zeros(0), np.zeros(0)
+        self.refresh()
+
+    def set_runs(self, runs: List[Tuple[str, str]]):
+        """
+        设置要显示的训练
+
+        Args:
+            runs: [(曲线标签, 指标数据库路径), ...]，第一条为当前训练
+        """
+        self._series = [[label, path, np.zeros(0), np.zeros(0)] for label, path in runs]
+        self.refresh()
+
+    def refresh(self):
+        """从数据库读取新增的点并重绘"""
+        if self.metric_name:
+            for series in self._series:
+                steps, values = series[2], series[3]
+                since = int(steps[-1]) if len(steps) else None
+                try:
+                    with TrainingMetricsStore(series[1], readonly=True) as store:
+                        new_steps, new_values = store.series(self.metric_name, self.kind, since)
+                except sqlite3.Error:
+                    # 训练刚开始，数据库还未创建
+                    continue
+                if len(new_steps):
+                    series[2] = np.concatenate([steps, new_steps])
+                    series[3] = np.concatenate([values, new_values])
+        self._plot_cache = None
+        self.update()
+
+    def _plot_data(self, width: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+        if self._plot_cache is None or self._plot_cache[0] != width:
+            self._plot_cache = (width, [minmax_downsample(steps, values, width)
+                                        for _, _, steps, values in self._series])
+        return self._plot_cache[1]
+
+    def _bounds(self) -> Optional[Tuple[float, float, float, float]]:
+        filled = [(steps, values) for _, _, steps, values in self._series if len(steps)]
+        if not filled:
+            return None
+        x_min = min(steps[0] for steps, _ in filled)
+        x_max = max(steps[-1] for steps, _ in filled)
+        y_min = min(values.min() for _, values in filled)
+        y_max = max(values.max() for _, values in filled)
+        if x_max == x_min:
+            x_max = x_min + 1
+        if y_max == y_min:
+            y_min, y_max = y_min - 0.5, y_max + 0.5
+        return x_min, x_max, y_min, y_max
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor('#ffffff'))
+        plot = QRectF(self.MARGIN, 8, self.width() - self.MARGIN - 8, self.height() - self.MARGIN)
+        painter.setPen(QPen(QColor('#bdc3c7')))
+        painter.drawRect(plot)
+
+        bounds = self._bounds()
+        if bounds is None or plot.width() <= 1:
+            painter.drawText(plot, Qt.AlignCenter, "暂无数据")
+            return
+        x_min, x_max, y_min, y_max = bounds
+
+        # 坐标轴刻度
+        painter.setPen(QPen(QColor('#7f8c8d')))
+        fm = QFontMetrics(self.font())
+        painter.drawText(QRectF(0, plot.top(), self.MARGIN - 2, fm.height()),
+                         Qt.AlignRight, f"{y_max:.3g}")
+        painter.drawText(QRectF(0, plot.bottom() - fm.height(), self.MARGIN - 2, fm.height()),
+                         Qt.AlignRight, f"{y_min:.3g}")
+        painter.drawText(QRectF(plot.left(), plot.bottom() + 2, plot.width(), fm.height()),
+                         Qt.AlignLeft, f"{x_min:g}")
+        painter.drawText(QRectF(plot.left(), plot.bottom() + 2, plot.width(), fm.height()),
+                         Qt.AlignRight, f"{x_max:g}")
+
+        x_scale = plot.width() / (x_max - x_min)
+        y_scale = plot.height() / (y_max - y_min)
+        painter.setRenderHint(QPainter.Antialiasing)
+        legend_y = plot.top() + fm.height()
+        for i, (steps, values) in enumerate(self._plot_data(int(plot.width()))):
+            if not len(steps):
+                continue
+            color = QColor(SERIES_COLORS[i % len(SERIES_COLORS)])
+            painter.setPen(QPen(color, 1.5))
+            xs = plot.left() + (steps - x_min) * x_scale
+            ys = plot.bottom() - (values - y_min) * y_scale
+            painter.drawPolyline(QPolygonF([QPointF(x, y) for x, y in zip(xs.tolist(), ys.tolist())]))
+
+            label = self._series[i][0]
+            painter.drawText(QRectF(plot.left() + 4, legend_y - fm.height(), plot.width() - 8, fm.height()),
+                             Qt.AlignRight, label)
+            legend_y += fm.height()
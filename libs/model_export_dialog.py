@@ -28,6 +28,7 @@ from libs.stringBundle import StringBundle
 from libs.settings import Settings
 from libs.constants import *
 from libs.ai_assistant.model_manager import ModelManager
+from libs.log_view import LogView, LogSearchEdit, default_spill_path
 
 # 导入YOLO相关库
 try:
@@ -53,6 +54,12 @@ class ExportConfig:
         self.onnx_opset = 12
         self.onnx_dynamic = False
         self.onnx_simplify = True
+        # ONNX静态INT8量化（用标注目录中的图片校准）
+        self.onnx_quantize = False
+        self.quantize_calibration_size = 100
+        self.quantize_method = "minmax"
+        self.quantize_max_map_drop = 0.02
+        self.quantize_folder = ""
         
         # TensorRT参数
         self.tensorrt_precision = "fp16"
@@ -63,6 +70,32 @@ class ExportConfig:
         self.batch_size = 1
         self.device = "cpu"
 
+        # 导出后基准测试（ONNX/TorchScript在CPU上的延迟和与源模型的一致性）
+        self.benchmark = True
+        self.benchmark_images = []
+
+
+def prepare_export_kwargs(config: ExportConfig) -> Dict:
+    """导出配置对应的ultralytics export参数"""
+    kwargs = {
+        "imgsz": config.image_size,
+        "device": config.device,
+    }
+
+    if config.export_format == "onnx":
+        kwargs.update({
+            "opset": config.onnx_opset,
+            "dynamic": config.onnx_dynamic,
+            "simplify": config.onnx_simplify,
+        })
+    elif config.export_format == "tensorrt":
+        kwargs.update({
+            "half": config.tensorrt_precision == "fp16",
+            "workspace": config.tensorrt_workspace,
+        })
+
+    return kwargs
+
 
 class ModelExportThread(QThread):
     """模型导出线程"""
@@ -122,6 +155,8 @@ class ModelExportThread(QThread):
                 result = model.export(format="coreml", **export_kwargs)
             elif self.config.export_format == "tflite":
                 result = model.export(format="tflite", **export_kwargs)
+            elif self.config.export_format == "torchscript":
+                result = model.export(format="torchscript", **export_kwargs)
             else:
                 raise Exception(f"不支持的导出格式: {self.config.export_format}")
             
@@ -134,7 +169,6 @@ class ModelExportThread(QThread):
             if self.config.output_dir and self.config.output_name:
                 self._move_exported_file(result)
             
-            self.progress_updated.emit(100, "导出完成")
             self.log_message.emit(f"模型导出成功: {result}")
 
             # 准备成功消息，包含文件路径信息
@@ -145,6 +179,17 @@ class ModelExportThread(QThread):
                 final_path = os.path.join(self.config.output_dir, f"{self.config.output_name}{file_ext}")
 
             success_msg = f"模型导出成功!\n\n导出文件: {final_path}"
+
+            quantized_path = self._run_quantization(final_path)
+            if quantized_path:
+                success_msg += f"\nINT8模型: {quantized_path}"
+
+            for path in filter(None, [final_path, quantized_path]):
+                benchmark_summary = self._run_benchmark(path)
+                if benchmark_summary:
+                    success_msg += f"\n\n{benchmark_summary}"
+
+            self.progress_updated.emit(100, "导出完成")
             self.export_completed.emit(True, success_msg)
             
         except Exception as e:
@@ -154,25 +199,53 @@ class ModelExportThread(QThread):
     
     def _prepare_export_kwargs(self) -> Dict:
         """准备导出参数"""
-        kwargs = {
-            "imgsz": self.config.image_size,
-            "device": self.config.device,
-        }
-        
-        if self.config.export_format == "onnx":
-            kwargs.update({
-                "opset": self.config.onnx_opset,
-                "dynamic": self.config.onnx_dynamic,
-                "simplify": self.config.onnx_simplify,
-            })
-        elif self.config.export_format == "tensorrt":
-            kwargs.update({
-                "half": self.config.tensorrt_precision == "fp16",
-                "workspace": self.config.tensorrt_workspace,
-            })
-        
-        return kwargs
+        return prepare_export_kwargs(self.config)
     
+    def _run_quantization(self, exported_path: str) -> Optional[str]:
+        """ONNX导出后生成INT8模型，精度下降在上限内时返回其路径"""
+        if self.config.export_format != "onnx" or not self.config.onnx_quantize or self.is_cancelled:
+            return None
+        if not self.config.quantize_folder or not os.path.isdir(self.config.quantize_folder):
+            self.log_message.emit("⚠️ 没有打开的图片目录，跳过INT8量化")
+            return None
+
+        from libs.ai_assistant.onnx_quantizer import quantize_and_validate
+
+        self.progress_updated.emit(91, "正在进行INT8量化...")
+        try:
+            result = quantize_and_validate(
+                exported_path, self.config.quantize_folder, self.config.image_size,
+                max_map_drop=self.config.quantize_max_map_drop,
+                calibration_size=self.config.quantize_calibration_size,
+                method=self.config.quantize_method,
+                log=self.log_message.emit, should_stop=lambda: self.is_cancelled)
+        except Exception as e:
+            self.log_message.emit(f"INT8量化失败: {str(e)}")
+            return None
+        return result.int8_path if result.kept else None
+
+    def _run_benchmark(self, exported_path: str) -> str:
+        """导出后在CPU上测试延迟并与源模型比较检测结果，返回摘要"""
+        from libs.ai_assistant.export_benchmark import BENCHMARK_FORMATS, format_report, run_export_benchmark
+
+        if not self.config.benchmark or self.config.export_format not in BENCHMARK_FORMATS:
+            return ""
+        if self.is_cancelled or not os.path.exists(exported_path):
+            return ""
+
+        self.progress_updated.emit(92, "正在测试导出模型的CPU性能...")
+        self.log_message.emit("开始导出后基准测试...")
+        try:
+            report = run_export_benchmark(self.config.model_path, exported_path, self.config.export_format,
+                                          self.config.image_size, self.config.benchmark_images,
+                                          log=self.log_message.emit, should_stop=lambda: self.is_cancelled)
+        except Exception as e:
+            self.log_message.emit(f"基准测试失败: {str(e)}")
+            return ""
+        summary = format_report(report)
+        self.log_message.emit(summary)
+        return summary
+
     def _move_exported_file(self, exported_path: str):
         """移动导出的文件到指定目录"""
         try:
@@ -195,6 +268,84 @@ class ModelExportThread(QThread):
             self.log_message.emit(f"移动文件失败: {str(e)}")
 
 
+class ModelExportQueueThread(QThread):
+    """在进程池中并行运行导出队列"""
+
+    # 信号定义
+    job_status = pyqtSignal(str, str)       # (任务ID, 状态)
+    job_log = pyqtSignal(str, str)          # (任务ID, 日志)
+    job_finished = pyqtSignal(object)       # JobResult
+    queue_completed = pyqtSignal(object)    # 全部JobResult
+
+    def __init__(self, model_path: str, jobs: List, output_dir: str, max_workers: int):
+        super().__init__()
+        from libs.ai_assistant.export_queue import ExportQueue
+
+        self.queue = ExportQueue(model_path, jobs, output_dir, max_workers, on_event=self._on_event)
+
+    def cancel(self):
+        """取消尚未开始的任务"""
+        self.queue.cancel()
+
+    def _on_event(self, event):
+        kind, job_id, payload = event
+        if kind == 'status':
+            self.job_status.emit(job_id, payload)
+        elif kind == 'log':
+            self.job_log.emit(job_id, payload)
+        elif kind == 'result':
+            self.job_finished.emit(payload)
+
+    def run(self):
+        try:
+            results = self.queue.run()
+        except Exception as e:
+            logger.error(f"导出队列失败: {str(e)}")
+            self.job_log.emit("", f"导出队列失败: {str(e)}")
+            results = []
+        self.queue_completed.emit(results)
+
+
+class ModelEvaluationThread(QThread):
+    """在标注目录上依次评估多个模型"""
+
+    # 信号定义
+    progress_updated = pyqtSignal(int, int, str)    # (已处理图片, 总图片, 当前模型)
+    model_evaluated = pyqtSignal(object)            # EvaluationResult
+    evaluation_failed = pyqtSignal(str, str)        # (模型路径, 错误信息)
+
+    def __init__(self, folder: str, model_paths: List[str], image_size: int = 640):
+        super().__init__()
+        self.folder = folder
+        self.model_paths = model_paths
+        self.image_size = image_size
+        self.is_cancelled = False
+
+    def cancel(self):
+        """取消评估（当前批次预测完成后停止）"""
+        self.is_cancelled = True
+
+    def run(self):
+        from libs.ai_assistant.model_evaluator import ModelEvaluator
+
+        evaluator = ModelEvaluator(self.folder, imgsz=self.image_size)
+        for model_path in self.model_paths:
+            if self.is_cancelled:
+                return
+            name = os.path.basename(model_path)
+            try:
+                result = evaluator.evaluate(
+                    model_path,
+                    progress_callback=lambda done, total: self.progress_updated.emit(done, total, name),
+                    should_stop=lambda: self.is_cancelled)
+            except Exception as e:
+                logger.error(f"评估模型失败 {model_path}: {str(e)}")
+                self.evaluation_failed.emit(model_path, str(e))
+                continue
+            if result is not None:
+                self.model_evaluated.emit(result)
+
+
 class ModelExportDialog(QDialog):
     """模型导出对话框"""
     
@@ -210,6 +361,14 @@ class ModelExportDialog(QDialog):
         # 导出线程
         self.export_thread = None
 
+        # 导出队列（ExportJob列表）及其线程
+        self.export_jobs = []
+        # 任务编号只增不减，移除任务后新任务也不会与已有任务（及其结果、日志）重号
+        self.next_job_id = 1
+        self.queue_thread = None
+        self.queue_model_path = None
+        self.queue_output_dir = ""
+
         # 初始化模型管理器
         self.model_manager = ModelManager()
         self.model_manager.models_updated.connect(self.update_model_list)
@@ -266,6 +425,10 @@ class ModelExportDialog(QDialog):
         output_group = self.create_output_group()
         main_layout.addWidget(output_group)
         
+        # 导出队列区域（加入任务后显示）
+        queue_group = self.create_queue_group()
+        main_layout.addWidget(queue_group)
+
         # 进度区域（初始隐藏）
         progress_group = self.create_progress_group()
         main_layout.addWidget(progress_group)
@@ -276,6 +439,7 @@ class ModelExportDialog(QDialog):
         
         # 初始隐藏进度区域
         self.progress_group.setVisible(False)
+        self.queue_group.setVisible(False)
 
     def create_model_selection_group(self):
         """创建模型选择区域"""
@@ -641,7 +805,8 @@ class ModelExportDialog(QDialog):
             "ONNX (.onnx)",
             "TensorRT (.engine)",
             "CoreML (.mlmodel)",
-            "TensorFlow Lite (.tflite)"
+            "TensorFlow Lite (.tflite)",
+            "TorchScript (.torchscript)"
         ])
         self.format_combo.currentTextChanged.connect(self.on_format_changed)
 
@@ -681,6 +846,10 @@ class ModelExportDialog(QDialog):
         tflite_widget = self.create_tflite_params_widget()
         self.params_stack.addWidget(tflite_widget)
 
+        # TorchScript参数页面
+        torchscript_widget = self.create_torchscript_params_widget()
+        self.params_stack.addWidget(torchscript_widget)
+
         layout.addWidget(self.params_stack)
 
         # 通用参数
@@ -700,6 +869,13 @@ class ModelExportDialog(QDialog):
         self.device_combo.addItems(["cpu", "cuda:0"])
         common_layout.addWidget(self.device_combo)
 
+        # 导出后基准测试
+        self.benchmark_check = QCheckBox("导出后测试CPU速度和精度")
+        self.benchmark_check.setChecked(True)
+        self.benchmark_check.setToolTip("ONNX/TorchScript导出后，测量不同批次和线程数下的推理延迟，"
+                                        "并在项目图片上与源模型比较检测结果")
+        common_layout.addWidget(self.benchmark_check)
+
         common_layout.addStretch()
         layout.addLayout(common_layout)
 
@@ -725,6 +901,33 @@ class ModelExportDialog(QDialog):
         self.onnx_simplify_check.setChecked(True)
         layout.addRow("", self.onnx_simplify_check)
 
+        # INT8量化
+        self.onnx_quantize_check = QCheckBox("INT8量化（用当前目录的图片校准）")
+        self.onnx_quantize_check.setToolTip("生成权重按通道量化的静态INT8模型，"
+                                            "用标注分别评估FP32和INT8模型，mAP下降超过上限时不保留")
+        layout.addRow("", self.onnx_quantize_check)
+
+        self.quantize_calibration_spin = QSpinBox()
+        self.quantize_calibration_spin.setRange(10, 1000)
+        self.quantize_calibration_spin.setValue(100)
+        self.quantize_calibration_spin.setSuffix(" 张")
+        layout.addRow("校准图片数:", self.quantize_calibration_spin)
+
+        self.quantize_method_combo = QComboBox()
+        self.quantize_method_combo.addItems(["minmax", "entropy", "percentile"])
+        layout.addRow("校准方法:", self.quantize_method_combo)
+
+        self.quantize_max_drop_spin = QDoubleSpinBox()
+        self.quantize_max_drop_spin.setRange(0.0, 20.0)
+        self.quantize_max_drop_spin.setSingleStep(0.5)
+        self.quantize_max_drop_spin.setValue(2.0)
+        self.quantize_max_drop_spin.setSuffix(" %")
+        layout.addRow("mAP下降上限:", self.quantize_max_drop_spin)
+
+        for control in (self.quantize_calibration_spin, self.quantize_method_combo, self.quantize_max_drop_spin):
+            control.setEnabled(False)
+            self.onnx_quantize_check.toggled.connect(control.setEnabled)
+
         return widget
 
     def create_tensorrt_params_widget(self):
@@ -770,6 +973,17 @@ class ModelExportDialog(QDialog):
 
         return widget
 
+    def create_torchscript_params_widget(self):
+        """创建TorchScript参数配置窗口"""
+        widget = QWidget()
+        layout = QFormLayout(widget)
+
+        info_label = QLabel("使用默认设置导出TorchScript，可直接用PyTorch在CPU上推理")
+        info_label.setWordWrap(True)
+        layout.addRow(info_label)
+
+        return widget
+
     def create_output_group(self):
         """创建输出设置区域"""
         group = QGroupBox(self.get_str('outputSettings'))
@@ -880,13 +1094,47 @@ class ModelExportDialog(QDialog):
         layout.addWidget(self.status_label)
 
         # 日志文本框
-        self.log_text = QTextEdit()
+        self.log_text = LogView(spill_path=default_spill_path('export'))
         self.log_text.setMaximumHeight(150)
-        self.log_text.setReadOnly(True)
+        layout.addWidget(LogSearchEdit(self.log_text))
         layout.addWidget(self.log_text)
 
         return self.progress_group
 
+    def create_queue_group(self):
+        """创建导出队列区域"""
+        from libs.ai_assistant.export_queue import DEFAULT_MAX_WORKERS
+
+        self.queue_group = QGroupBox("📦 导出队列")
+        layout = QVBoxLayout(self.queue_group)
+
+        self.queue_table = QTableWidget(0, 5)
+        self.queue_table.setHorizontalHeaderLabels(["任务", "输出文件", "状态", "耗时", "大小"])
+        self.queue_table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.queue_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.queue_table.horizontalHeader().setStretchLastSection(True)
+        self.queue_table.setMaximumHeight(150)
+        self.queue_table.setToolTip("选中任务可只查看该任务的日志")
+        self.queue_table.itemSelectionChanged.connect(self.on_queue_selection_changed)
+        layout.addWidget(self.queue_table)
+
+        controls = QHBoxLayout()
+        controls.addWidget(QLabel("并行进程数:"))
+        self.queue_workers_spin = QSpinBox()
+        self.queue_workers_spin.setRange(1, max(1, os.cpu_count() or 1))
+        self.queue_workers_spin.setValue(DEFAULT_MAX_WORKERS)
+        controls.addWidget(self.queue_workers_spin)
+        controls.addStretch()
+        self.remove_job_btn = QPushButton("移除选中")
+        self.remove_job_btn.clicked.connect(self.remove_export_jobs)
+        controls.addWidget(self.remove_job_btn)
+        self.run_queue_btn = QPushButton("🚀 开始批量导出")
+        self.run_queue_btn.clicked.connect(self.start_export_queue)
+        controls.addWidget(self.run_queue_btn)
+        layout.addLayout(controls)
+
+        return self.queue_group
+
     def create_button_layout(self):
         """创建按钮布局"""
         layout = QHBoxLayout()
@@ -898,6 +1146,12 @@ class ModelExportDialog(QDialog):
         self.export_btn.clicked.connect(self.start_export)
         layout.addWidget(self.export_btn)
 
+        # 导出队列按钮
+        self.add_to_queue_btn = QPushButton("➕ 加入队列")
+        self.add_to_queue_btn.setToolTip("把当前格式和参数加入导出队列，可加入多个后一起并行导出")
+        self.add_to_queue_btn.clicked.connect(self.add_export_job)
+        layout.addWidget(self.add_to_queue_btn)
+
         # 取消按钮
         self.cancel_btn = QPushButton(self.get_str('cancel'))
         self.cancel_btn.clicked.connect(self.cancel_export)
@@ -1707,6 +1961,12 @@ class ModelExportDialog(QDialog):
 
                 layout.addWidget(table)
 
+            # 在标注目录上实测评估
+            model_paths = [info.get('path') for info in training_models] or \
+                [self.model_combo.itemData(i) for i in range(self.model_combo.count())
+                 if self.model_combo.itemData(i)]
+            layout.addWidget(self._create_evaluation_group(dialog, model_paths), 1)
+
             # 关闭按钮
             button_layout = QHBoxLayout()
             button_layout.addStretch()
@@ -1716,10 +1976,180 @@ class ModelExportDialog(QDialog):
             layout.addLayout(button_layout)
 
             dialog.exec_()
+            if getattr(dialog, 'evaluation_thread', None) and dialog.evaluation_thread.isRunning():
+                dialog.evaluation_thread.cancel()
+                dialog.evaluation_thread.wait()
 
         except Exception as e:
             logger.error(f"显示模型对比失败: {str(e)}")
 
+    def _default_evaluation_folder(self) -> str:
+        """默认评估主窗口当前打开的标注目录"""
+        parent = self.parent()
+        for attr in ('dir_name', 'last_open_dir', 'default_save_dir'):
+            folder = getattr(parent, attr, None)
+            if folder and os.path.isdir(folder):
+                return folder
+        return ""
+
+    def _create_evaluation_group(self, dialog: QDialog, model_paths: List[str]) -> QGroupBox:
+        """模型对比对话框中的实测评估区域：在标注目录上后台评估各模型"""
+        from libs.ai_assistant.model_evaluator import BACKGROUND
+
+        group = QGroupBox("🎯 在标注目录上实测评估")
+        layout = QVBoxLayout(group)
+        dialog.evaluation_thread = None
+        results = []
+
+        folder_layout = QHBoxLayout()
+        folder_layout.addWidget(QLabel("标注目录:"))
+        folder_edit = QLineEdit(self._default_evaluation_folder())
+        folder_layout.addWidget(folder_edit)
+        browse_button = QPushButton("浏览...")
+        folder_layout.addWidget(browse_button)
+        evaluate_button = QPushButton("📊 开始评估")
+        evaluate_button.setEnabled(bool(model_paths))
+        folder_layout.addWidget(evaluate_button)
+        stop_button = QPushButton("停止")
+        stop_button.setEnabled(False)
+        folder_layout.addWidget(stop_button)
+        layout.addLayout(folder_layout)
+
+        progress_bar = QProgressBar()
+        progress_bar.setVisible(False)
+        layout.addWidget(progress_bar)
+        status_label = QLabel(f"将评估 {len(model_paths)} 个模型，预测结果缓存在标注目录的 .labelImg 中")
+        status_label.setStyleSheet("color: #7f8c8d;")
+        layout.addWidget(status_label)
+
+        results_table = QTableWidget(0, 8)
+        results_table.setHorizontalHeaderLabels([
+            "模型", "mAP50", "mAP50-95", "精确度", "召回率", "图片数", "缓存命中", "预测耗时(s)"
+        ])
+        results_table.setSelectionBehavior(QTableWidget.SelectRows)
+        results_table.setSelectionMode(QTableWidget.SingleSelection)
+        results_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(results_table)
+
+        detail_layout = QHBoxLayout()
+        class_table = QTableWidget(0, 7)
+        class_table.setHorizontalHeaderLabels(["类别", "实例", "预测", "精确度", "召回率", "AP50", "AP50-95"])
+        class_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        detail_layout.addWidget(class_table)
+        confusion_table = QTableWidget()
+        confusion_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        confusion_table.setToolTip("混淆矩阵：行为真实类别，列为预测类别")
+        detail_layout.addWidget(confusion_table)
+        layout.addLayout(detail_layout)
+
+        def browse():
+            folder = QFileDialog.getExistingDirectory(dialog, "选择标注目录", folder_edit.text())
+            if folder:
+                folder_edit.setText(folder)
+
+        def show_details():
+            rows = results_table.selectionModel().selectedRows()
+            if not rows:
+                return
+            result = results[rows[0].row()]
+            class_table.setRowCount(len(result.per_class))
+            for row, metrics in enumerate(result.per_class):
+                values = [metrics.name, str(metrics.instances), str(metrics.predictions),
+                          f"{metrics.precision:.1%}", f"{metrics.recall:.1%}",
+                          f"{metrics.ap50:.1%}", f"{metrics.ap50_95:.1%}"]
+                for column, value in enumerate(values):
+                    class_table.setItem(row, column, QTableWidgetItem(value))
+            class_table.resizeColumnsToContents()
+
+            # 只显示出现过的类别
+            matrix = result.confusion_matrix
+            used = [i for i in range(len(matrix)) if matrix[i].any() or matrix[:, i].any()]
+            labels = [(result.class_names + [BACKGROUND])[i] for i in used]
+            confusion_table.setRowCount(len(used))
+            confusion_table.setColumnCount(len(used))
+            confusion_table.setVerticalHeaderLabels(labels)
+            confusion_table.setHorizontalHeaderLabels(labels)
+            for row, i in enumerate(used):
+                for column, j in enumerate(used):
+                    item = QTableWidgetItem(str(matrix[i, j]))
+                    if i == j:
+                        item.setBackground(QColor('#d5f5e3'))
+                    elif matrix[i, j]:
+                        item.setBackground(QColor('#fadbd8'))
+                    confusion_table.setItem(row, column, item)
+            confusion_table.resizeColumnsToContents()
+
+        def on_progress(done, total, name):
+            progress_bar.setMaximum(max(total, 1))
+            progress_bar.setValue(done)
+            status_label.setText(f"正在评估 {name}: {done}/{total} 张图片")
+
+        def on_evaluated(result):
+            results.append(result)
+            row = results_table.rowCount()
+            results_table.insertRow(row)
+            path = Path(result.model_path)
+            # 训练输出的权重显示为 "训练目录/文件名"
+            name = f"{path.parent.parent.name}/{path.name}" if path.parent.name == 'weights' else path.name
+            values = [name, f"{result.map50:.1%}", f"{result.map50_95:.1%}", f"{result.precision:.1%}",
+                      f"{result.recall:.1%}", str(result.image_count),
+                      f"{result.cached_images}/{result.image_count}", f"{result.predict_seconds:.1f}"]
+            for column, value in enumerate(values):
+                results_table.setItem(row, column, QTableWidgetItem(value))
+            results_table.resizeColumnsToContents()
+            if row == 0:
+                results_table.selectRow(0)
+
+        def on_failed(model_path, error):
+            status_label.setText(f"❌ {os.path.basename(model_path)} 评估失败: {error}")
+
+        def on_finished():
+            progress_bar.setVisible(False)
+            evaluate_button.setEnabled(True)
+            stop_button.setEnabled(False)
+            if results and not status_label.text().startswith("❌"):
+                best = max(results, key=lambda r: r.map50_95)
+                missing = f"，{len(best.missing_images)} 个标注找不到图片已跳过" if best.missing_images else ""
+                status_label.setText(f"✅ 评估完成，mAP50-95最高: {os.path.basename(best.model_path)} "
+                                     f"({best.map50_95:.1%}){missing}")
+
+        def start():
+            folder = folder_edit.text().strip()
+            if not os.path.isdir(folder):
+                QMessageBox.warning(dialog, "提示", "请选择有效的标注目录")
+                return
+            if not YOLO_AVAILABLE:
+                QMessageBox.warning(dialog, "提示", "ultralytics库未安装，无法运行模型预测")
+                return
+            results.clear()
+            results_table.setRowCount(0)
+            class_table.setRowCount(0)
+            confusion_table.setRowCount(0)
+            confusion_table.setColumnCount(0)
+            thread = ModelEvaluationThread(folder, model_paths, self.image_size_spin.value())
+            thread.progress_updated.connect(on_progress)
+            thread.model_evaluated.connect(on_evaluated)
+            thread.evaluation_failed.connect(on_failed)
+            thread.finished.connect(on_finished)
+            dialog.evaluation_thread = thread
+            progress_bar.setValue(0)
+            progress_bar.setVisible(True)
+            evaluate_button.setEnabled(False)
+            stop_button.setEnabled(True)
+            status_label.setText("正在读取标注...")
+            thread.start()
+
+        def stop():
+            if dialog.evaluation_thread:
+                dialog.evaluation_thread.cancel()
+                status_label.setText("正在停止...")
+
+        browse_button.clicked.connect(browse)
+        evaluate_button.clicked.connect(start)
+        stop_button.clicked.connect(stop)
+        results_table.itemSelectionChanged.connect(show_details)
+        return group
+
     def generate_smart_filename(self, model_info: dict, export_format: str = "onnx") -> str:
         """智能生成导出文件名"""
         try:
@@ -1885,7 +2315,8 @@ class ModelExportDialog(QDialog):
                 'onnx': 'onnx',
                 'tensorrt': 'trt',
                 'coreml': 'coreml',
-                'tflite': 'tflite'
+                'tflite': 'tflite',
+                'torchscript': 'torchscript'
             }
             return format_map.get(export_format.lower(), export_format.lower())
         except Exception:
@@ -2067,6 +2498,8 @@ class ModelExportDialog(QDialog):
                 return "coreml"
             elif "TensorFlow Lite" in format_text:
                 return "tflite"
+            elif "TorchScript" in format_text:
+                return "torchscript"
             return "onnx"  # 默认
         except Exception:
             return "onnx"
@@ -2402,6 +2835,8 @@ class ModelExportDialog(QDialog):
             return ".mlmodel"
         elif "TensorFlow Lite" in format_text:
             return ".tflite"
+        elif "TorchScript" in format_text:
+            return ".torchscript"
         return ""
 
     def on_format_changed(self, format_text):
@@ -2410,7 +2845,8 @@ class ModelExportDialog(QDialog):
             "ONNX (.onnx)": (0, self.get_str('onnxDescription')),
             "TensorRT (.engine)": (1, self.get_str('tensorrtDescription')),
             "CoreML (.mlmodel)": (2, self.get_str('coremlDescription')),
-            "TensorFlow Lite (.tflite)": (3, self.get_str('tfliteDescription'))
+            "TensorFlow Lite (.tflite)": (3, self.get_str('tfliteDescription')),
+            "TorchScript (.torchscript)": (4, "TorchScript格式，用于PyTorch / LibTorch推理")
         }
 
         if format_text in format_map:
@@ -2481,22 +2917,183 @@ class ModelExportDialog(QDialog):
             config.export_format = "coreml"
         elif "TensorFlow Lite" in format_text:
             config.export_format = "tflite"
+        elif "TorchScript" in format_text:
+            config.export_format = "torchscript"
 
         # 通用参数
         config.image_size = self.image_size_spin.value()
         config.device = self.device_combo.currentText()
+        config.benchmark = self.benchmark_check.isChecked()
+        if config.benchmark:
+            config.benchmark_images = self._benchmark_sample_images()
 
         # 格式特定参数
         if config.export_format == "onnx":
             config.onnx_opset = self.onnx_opset_spin.value()
             config.onnx_dynamic = self.onnx_dynamic_check.isChecked()
             config.onnx_simplify = self.onnx_simplify_check.isChecked()
+            config.onnx_quantize = self.onnx_quantize_check.isChecked()
+            config.quantize_calibration_size = self.quantize_calibration_spin.value()
+            config.quantize_method = self.quantize_method_combo.currentText()
+            config.quantize_max_map_drop = self.quantize_max_drop_spin.value() / 100
+            config.quantize_folder = self._default_evaluation_folder()
         elif config.export_format == "tensorrt":
             config.tensorrt_precision = self.tensorrt_precision_combo.currentText()
             config.tensorrt_workspace = self.tensorrt_workspace_spin.value()
 
         return config
 
+    def _benchmark_sample_images(self) -> List[str]:
+        """基准测试的精度比较使用主窗口当前目录中的图片（均匀抽样）"""
+        from libs.ai_assistant.export_benchmark import ACCURACY_SAMPLE_SIZE
+
+        folder = self._default_evaluation_folder()
+        if not folder:
+            return []
+        extensions = ('.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.tif', '.webp')
+        images = sorted(os.path.join(folder, name) for name in os.listdir(folder)
+                        if name.lower().endswith(extensions))
+        step = max(1, len(images) // ACCURACY_SAMPLE_SIZE)
+        return images[::step][:ACCURACY_SAMPLE_SIZE]
+
+    def add_export_job(self):
+        """把当前格式和参数加入导出队列"""
+        from libs.ai_assistant.export_queue import STATUS_QUEUED, ExportJob
+
+        if self.queue_thread and self.queue_thread.isRunning():
+            return
+        if not self.validate_inputs():
+            return
+        config = self.get_export_config()
+        if self.export_jobs and config.model_path != self.queue_model_path:
+            QMessageBox.warning(self, self.get_str('warning'), "队列中的任务必须来自同一个模型，请先清空队列")
+            return
+        self.queue_model_path = config.model_path
+        self.queue_output_dir = config.output_dir or os.path.dirname(config.model_path)
+
+        job = ExportJob(str(self.next_job_id), config.export_format,
+                        self._unique_job_name(config), prepare_export_kwargs(config))
+        if any(existing.label == job.label for existing in self.export_jobs):
+            QMessageBox.information(self, self.get_str('warning'), f"队列中已有相同的任务: {job.label}")
+            return
+        self.next_job_id += 1
+        self.export_jobs.append(job)
+
+        row = self.queue_table.rowCount()
+        self.queue_table.insertRow(row)
+        extension = self._get_format_extension()
+        for column, value in enumerate([job.label, job.output_name + extension, STATUS_QUEUED, "", ""]):
+            self.queue_table.setItem(row, column, QTableWidgetItem(value))
+        self.queue_table.resizeColumnsToContents()
+        self.queue_group.setVisible(True)
+
+    def _unique_job_name(self, config) -> str:
+        """同一格式的多个任务（如静态/动态ONNX）使用不同的文件名"""
+        names = {job.output_name for job in self.export_jobs if job.export_format == config.export_format}
+        name, index = config.output_name, 2
+        while name in names:
+            name = f"{config.output_name}_{index}"
+            index += 1
+        return name
+
+    def remove_export_jobs(self):
+        """移除选中的任务（未选中时清空队列）"""
+        if self.queue_thread and self.queue_thread.isRunning():
+            return
+        rows = sorted({index.row() for index in self.queue_table.selectionModel().selectedRows()}, reverse=True)
+        if not rows:
+            rows = list(range(len(self.export_jobs) - 1, -1, -1))
+        for row in rows:
+            self.queue_table.removeRow(row)
+            del self.export_jobs[row]
+        self.queue_group.setVisible(bool(self.export_jobs))
+
+    def _queue_row(self, job_id: str) -> int:
+        for row, job in enumerate(self.export_jobs):
+            if job.job_id == job_id:
+                return row
+        return -1
+
+    def _job_log_prefix(self, job_id: str) -> str:
+        row = self._queue_row(job_id)
+        return f"[#{job_id} {self.export_jobs[row].label}]" if row >= 0 else ""
+
+    def on_queue_selection_changed(self):
+        """选中任务时只显示该任务的日志"""
+        rows = self.queue_table.selectionModel().selectedRows()
+        self.log_text.set_filter(f"[#{self.export_jobs[rows[0].row()].job_id} " if len(rows) == 1 else "")
+
+    def start_export_queue(self):
+        """并行运行导出队列"""
+        from libs.ai_assistant.export_queue import STATUS_QUEUED
+
+        if not self.export_jobs or (self.queue_thread and self.queue_thread.isRunning()):
+            return
+        if not YOLO_AVAILABLE:
+            QMessageBox.critical(self, self.get_str('error'), "ultralytics库未安装，无法进行模型导出")
+            return
+
+        for row in range(self.queue_table.rowCount()):
+            for column, value in ((2, STATUS_QUEUED), (3, ""), (4, "")):
+                self.queue_table.setItem(row, column, QTableWidgetItem(value))
+        self._set_queue_controls_enabled(False)
+        self.progress_group.setVisible(True)
+        self.progress_bar.setRange(0, len(self.export_jobs))
+        self.progress_bar.setValue(0)
+        self.log_text.clear()
+        self.status_label.setText(f"正在并行导出 {len(self.export_jobs)} 个任务...")
+
+        self.queue_thread = ModelExportQueueThread(self.queue_model_path, list(self.export_jobs),
+                                                   self.queue_output_dir, self.queue_workers_spin.value())
+        self.queue_thread.job_status.connect(self.on_job_status)
+        self.queue_thread.job_log.connect(
+            lambda job_id, message: self.on_log_message(f"{self._job_log_prefix(job_id)} {message}".strip()))
+        self.queue_thread.job_finished.connect(self.on_job_finished)
+        self.queue_thread.queue_completed.connect(self.on_queue_completed)
+        self.queue_thread.start()
+
+    def _set_queue_controls_enabled(self, enabled: bool):
+        for widget in (self.export_btn, self.add_to_queue_btn, self.run_queue_btn, self.remove_job_btn,
+                       self.queue_workers_spin, self.model_combo, self.format_combo):
+            widget.setEnabled(enabled)
+
+    def on_job_status(self, job_id: str, status: str):
+        row = self._queue_row(job_id)
+        if row >= 0:
+            self.queue_table.setItem(row, 2, QTableWidgetItem(status))
+
+    def on_job_finished(self, result):
+        """单个任务完成"""
+        from libs.ai_assistant.export_queue import STATUS_DONE, STATUS_FAILED
+
+        row = self._queue_row(result.job_id)
+        if row < 0:
+            return
+        status = STATUS_DONE if result.success else STATUS_FAILED
+        self.queue_table.setItem(row, 2, QTableWidgetItem(status if result.success else f"{status}: {result.error}"))
+        self.queue_table.setItem(row, 3, QTableWidgetItem(f"{result.seconds:.1f}s"))
+        if result.success:
+            self.queue_table.setItem(row, 1, QTableWidgetItem(os.path.basename(result.path)))
+            self.queue_table.setItem(row, 4, QTableWidgetItem(f"{result.size_bytes / (1024 * 1024):.1f} MB"))
+            self.on_log_message(f"{self._job_log_prefix(result.job_id)} 导出完成: {result.path}")
+        else:
+            self.on_log_message(f"{self._job_log_prefix(result.job_id)} 导出失败: {result.error}")
+        self.progress_bar.setValue(self.progress_bar.value() + 1)
+
+    def on_queue_completed(self, results):
+        """导出队列全部完成"""
+        from libs.ai_assistant.export_queue import MANIFEST_NAME
+
+        self._set_queue_controls_enabled(True)
+        succeeded = sum(1 for result in results if result.success)
+        manifest_path = os.path.join(self.queue_output_dir, MANIFEST_NAME)
+        self.status_label.setText(f"批量导出完成: {succeeded}/{len(self.export_jobs)} 个任务成功")
+        if results:
+            self.on_log_message(f"导出清单: {manifest_path}")
+        if self.queue_thread:
+            self.queue_thread.deleteLater()
+            self.queue_thread = None
+
     def start_export(self):
         """开始导出"""
         if not self.validate_inputs():
@@ -2550,12 +3147,9 @@ class ModelExportDialog(QDialog):
     def on_log_message(self, message):
         """日志消息"""
         timestamp = time.strftime("%H:%M:%S")
+        # LogView批量刷新并自动滚动到底部
         self.log_text.append(f"[{timestamp}] {message}")
 
-        # 自动滚动到底部
-        scrollbar = self.log_text.verticalScrollBar()
-        scrollbar.setValue(scrollbar.maximum())
-
     def on_export_completed(self, success, message):
         """导出完成"""
         # 恢复控件状态
@@ -2619,6 +3213,21 @@ class ModelExportDialog(QDialog):
 
     def closeEvent(self, event):
         """关闭事件"""
+        if self.queue_thread and self.queue_thread.isRunning():
+            reply = QMessageBox.question(
+                self,
+                self.get_str('confirmClose'),
+                self.get_str('exportInProgress'),
+                QMessageBox.Yes | QMessageBox.No,
+                QMessageBox.No
+            )
+            if reply != QMessageBox.Yes:
+                event.ignore()
+                return
+            # 正在运行的导出无法中断，等待其结束
+            self.queue_thread.cancel()
+            self.queue_thread.wait()
+
         if self.export_thread and self.export_thread.isRunning():
             reply = QMessageBox.question(
                 self,
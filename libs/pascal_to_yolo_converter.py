@@ -5,8 +5,12 @@ import shutil
 import random
 import yaml
 import json
-from xml.etree import ElementTree
+from libs import perf_trace
 from libs.constants import DEFAULT_ENCODING
+from libs.create_ml_io import get_create_ml_store
+from libs.image_cache import build_image_cache, remove_stale_cache
+from libs.image_geometry import probe_image_geometry
+from libs.pascal_voc_io import parse_voc_annotation, read_voc_files
 from libs.class_manager import ClassConfigManager
 
 
@@ -14,7 +18,8 @@ class PascalToYOLOConverter:
     """Pascal VOC到YOLO格式的转换器 - 支持固定类别顺序"""
 
     def __init__(self, source_dir, target_dir, dataset_name="dataset", train_ratio=0.8,
-                 use_class_config=True, class_config_dir="configs"):
+                 use_class_config=True, class_config_dir="configs", image_cache_size=None,
+                 cache_workers=None):
         """
         初始化转换器
 
@@ -25,6 +30,9 @@ class PascalToYOLOConverter:
             train_ratio: 训练集比例，默认0.8
             use_class_config: 是否使用类别配置管理器，默认True
             class_config_dir: 类别配置文件目录，默认"configs"
+            image_cache_size: 训练图像尺寸（imgsz）；设置后生成缩小到该尺寸的图像缓存，
+                data.yaml指向缓存，默认None不生成
+            cache_workers: 生成缓存的进程数，默认CPU核数
         """
         self.source_dir = source_dir
         self.target_dir = target_dir
@@ -42,6 +50,13 @@ class PascalToYOLOConverter:
         self.train_labels_dir = os.path.join(self.labels_dir, "train")
         self.val_labels_dir = os.path.join(self.labels_dir, "val")
 
+        # 训练图像缓存: cache_<imgsz>/images 和 cache_<imgsz>/labels（训练/验证集共用，
+        # 划分由 train.txt / val.txt 列表决定，重新划分时缓存仍可复用）
+        self.image_cache_size = image_cache_size
+        self.cache_workers = cache_workers
+        self.cache_dir = os.path.join(self.dataset_path, f"cache_{image_cache_size}") if image_cache_size else None
+        self.cache_stats = None
+
         # 类别管理
         if self.use_class_config:
             self.class_manager = ClassConfigManager(class_config_dir)
@@ -177,6 +192,7 @@ class PascalToYOLOConverter:
             print(f"⚠️ 获取现有文件信息失败: {e}")
             return {'dataset_exists': False, 'total_files': 0}
 
+    @perf_trace.timed('convert.verify')
     def verify_conversion_integrity(self, source_files):
         """验证转换后的数据完整性"""
         try:
@@ -231,6 +247,7 @@ class PascalToYOLOConverter:
             print(f"❌ 数据完整性验证失败: {e}")
             return {'integrity_passed': False, 'error': str(e)}
 
+    @perf_trace.timed('convert.scan')
     def scan_annotations(self):
         """扫描源目录中的标注文件（支持XML和JSON格式）"""
         annotation_files = []
@@ -289,22 +306,16 @@ class PascalToYOLOConverter:
     def parse_xml_annotation(self, xml_path):
         """解析Pascal VOC XML标注文件"""
         try:
-            tree = ElementTree.parse(xml_path)
-            root = tree.getroot()
+            annotation = parse_voc_annotation(xml_path)
 
             # 获取图片尺寸
-            size = root.find('size')
-            if size is None:
+            height, width = annotation.img_size[:2]
+            if not width or not height:
                 return None, None, None
 
-            width = int(size.find('width').text)
-            height = int(size.find('height').text)
-
             # 解析所有对象
             objects = []
-            for obj in root.findall('object'):
-                name = obj.find('name').text
-
+            for name, bbox in zip(annotation.labels, annotation.boxes.tolist()):
                 # 处理类别映射
                 if self.use_class_config:
                     # 使用固定类别配置
@@ -327,15 +338,7 @@ class PascalToYOLOConverter:
                         self.class_to_id[name] = len(self.classes) - 1
                     class_id = self.class_to_id[name]
 
-                # 获取边界框
-                bbox = obj.find('bndbox')
-                if bbox is None:
-                    continue
-
-                xmin = float(bbox.find('xmin').text)
-                ymin = float(bbox.find('ymin').text)
-                xmax = float(bbox.find('xmax').text)
-                ymax = float(bbox.find('ymax').text)
+                xmin, ymin, xmax, ymax = bbox
 
                 # 转换为YOLO格式 (中心点坐标和相对尺寸)
                 x_center = (xmin + xmax) / 2.0 / width
@@ -355,15 +358,8 @@ class PascalToYOLOConverter:
     def parse_json_annotation(self, json_path, image_filename):
         """解析CreateML JSON标注文件"""
         try:
-            with open(json_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-
-            # 找到对应图片的标注数据
-            image_data = None
-            for item in data:
-                if item.get('image') == image_filename:
-                    image_data = item
-                    break
+            # 找到对应图片的标注数据（通过索引存储，避免每张图片重新解析整个JSON）
+            image_data = get_create_ml_store(json_path).get(image_filename)
 
             if not image_data:
                 print(f"Warning: No annotation found for image {image_filename} in {json_path}")
@@ -372,22 +368,27 @@ class PascalToYOLOConverter:
             # 获取图片尺寸（需要从实际图片文件获取）
             image_path = os.path.join(self.source_dir, image_filename)
             try:
-                # 尝试使用PIL
-                try:
-                    from PIL import Image
-                    with Image.open(image_path) as img:
-                        width, height = img.size
-                except ImportError:
-                    # 如果PIL不可用，尝试使用OpenCV
+                # 优先只读取文件头，无法识别的格式再解码图片
+                geometry = probe_image_geometry(image_path)
+                if geometry is not None:
+                    width, height = geometry.width, geometry.height
+                else:
+                    # 尝试使用PIL
                     try:
-                        import cv2
-                        img = cv2.imread(image_path)
-                        height, width = img.shape[:2]
+                        from PIL import Image
+                        with Image.open(image_path) as img:
+                            width, height = img.size
                     except ImportError:
-                        # 如果都不可用，尝试使用PyQt5
-                        from PyQt5.QtGui import QImage
-                        img = QImage(image_path)
-                        width, height = img.width(), img.height()
+                        # 如果PIL不可用，尝试使用OpenCV
+                        try:
+                            import cv2
+                            img = cv2.imread(image_path)
+                            height, width = img.shape[:2]
+                        except ImportError:
+                            # 如果都不可用，尝试使用PyQt5
+                            from PyQt5.QtGui import QImage
+                            img = QImage(image_path)
+                            width, height = img.width(), img.height()
             except Exception as e:
                 print(f"Error getting image size for {image_path}: {e}")
                 return None, None, None
@@ -481,6 +482,12 @@ class PascalToYOLOConverter:
             'names': {i: name for i, name in enumerate(self.classes)}
         }
 
+        # 有图像缓存时训练和验证都读取缓存
+        if self.cache_dir and self.cache_stats is not None:
+            cache_name = os.path.basename(self.cache_dir)
+            config['train'] = f"{cache_name}/train.txt"
+            config['val'] = f"{cache_name}/val.txt"
+
         try:
             with open(yaml_file, 'w', encoding=DEFAULT_ENCODING) as f:
                 yaml.dump(config, f, default_flow_style=False,
@@ -490,6 +497,7 @@ class PascalToYOLOConverter:
             print(f"Error generating YAML config: {e}")
             return False
 
+    @perf_trace.timed('convert')
     def convert(self, progress_callback=None, clean_existing=False, backup_existing=False):
         """
         执行转换过程
@@ -547,10 +555,25 @@ class PascalToYOLOConverter:
                 self._process_file(xml_file, image_file, is_train=False)
                 self.val_count += 1
                 if progress_callback:
-                    progress = 50 + (i + 1) / len(val_files) * 40
+                    progress = 50 + (i + 1) / len(val_files) * (30 if self.cache_dir else 40)
                     progress_callback(int(progress), 100,
                                       f"处理验证集: {i+1}/{len(val_files)}")
 
+            # 生成训练图像缓存
+            if self.cache_dir:
+                if progress_callback:
+                    progress_callback(80, 100, f"生成训练图像缓存 ({self.image_cache_size}px)...")
+
+                def cache_progress(done, total):
+                    if progress_callback:
+                        progress_callback(80 + int(done / max(total, 1) * 10), 100,
+                                          f"生成训练图像缓存: {done}/{total}")
+
+                self.build_training_cache(
+                    [image_file for _, image_file in train_files],
+                    [image_file for _, image_file in val_files],
+                    progress_callback=cache_progress)
+
             # 生成配置文件
             if progress_callback:
                 progress_callback(90, 100, "生成配置文件...")
@@ -586,6 +609,7 @@ class PascalToYOLOConverter:
         except Exception as e:
             return False, str(e)
 
+    @perf_trace.timed('convert.file')
     def _process_file(self, annotation_file, image_file, is_train=True):
         """处理单个文件"""
         annotation_path = os.path.join(self.source_dir, annotation_file)
@@ -625,6 +649,61 @@ class PascalToYOLOConverter:
         self.processed_files += 1
         return True
 
+    @perf_trace.timed('convert.cache')
+    def build_training_cache(self, train_images, val_images, progress_callback=None):
+        """
+        生成缩小到训练尺寸的图像缓存，以及指向缓存的 train.txt / val.txt
+
+        Args:
+            train_images: 训练集图片文件名（已复制到images/train）
+            val_images: 验证集图片文件名（已复制到images/val）
+            progress_callback: 进度回调，接收 (已完成数, 总数)
+
+        Returns:
+            dict: build_image_cache的统计信息
+        """
+        cache_images_dir = os.path.join(self.cache_dir, "images")
+        cache_labels_dir = os.path.join(self.cache_dir, "labels")
+        os.makedirs(cache_images_dir, exist_ok=True)
+        os.makedirs(cache_labels_dir, exist_ok=True)
+
+        pairs = []
+        lists = {'train': [], 'val': []}
+        for split, images_dir, labels_dir, image_files in (
+                ('train', self.train_images_dir, self.train_labels_dir, train_images),
+                ('val', self.val_images_dir, self.val_labels_dir, val_images)):
+            for image_file in image_files:
+                source_image = os.path.join(images_dir, image_file)
+                label_name = os.path.splitext(image_file)[0] + ".txt"
+                source_label = os.path.join(labels_dir, label_name)
+                if not os.path.exists(source_image) or not os.path.exists(source_label):
+                    continue
+                cache_image_path = os.path.abspath(os.path.join(cache_images_dir, image_file))
+                pairs.append((source_image, cache_image_path))
+                # 标签很小，每次都重新复制
+                shutil.copyfile(source_label, os.path.join(cache_labels_dir, label_name))
+                lists[split].append(cache_image_path)
+
+        self.cache_stats = build_image_cache(pairs, self.image_cache_size, workers=self.cache_workers,
+                                             progress_callback=progress_callback)
+        keep_images = [cache for _, cache in pairs]
+        self.cache_stats['removed'] = remove_stale_cache(cache_images_dir, keep_images)
+        remove_stale_cache(cache_labels_dir, [os.path.join(cache_labels_dir, os.path.splitext(
+            os.path.basename(cache))[0] + ".txt") for cache in keep_images])
+
+        # 缓存失败的图片在列表中使用原图（其标签在labels/train或labels/val中）
+        fallback = {}
+        for source, error in self.cache_stats['errors']:
+            print(f"Error caching image {source}: {error}")
+            fallback[os.path.abspath(os.path.join(cache_images_dir, os.path.basename(source)))] = \
+                os.path.abspath(source)
+
+        for split, paths in lists.items():
+            with open(os.path.join(self.cache_dir, f"{split}.txt"), 'w', encoding=DEFAULT_ENCODING) as f:
+                f.writelines(fallback.get(path, path) + "\n" for path in paths)
+
+        return self.cache_stats
+
     def _scan_and_setup_classes(self):
         """扫描数据集中的所有类别并设置类别配置"""
         try:
@@ -633,19 +712,21 @@ class PascalToYOLOConverter:
 
             # 扫描所有标注文件获取类别
             annotation_files = self.scan_annotations()
+
+            # XML文件通过进程池批量解析
+            xml_paths = [os.path.join(self.source_dir, annotation_file)
+                         for annotation_file, _ in annotation_files
+                         if annotation_file.lower().endswith('.xml')]
+            if xml_paths:
+                label_set = read_voc_files(xml_paths)
+                found_classes.update(name for name in label_set.class_names if name)
+                for xml_path, error in label_set.errors.items():
+                    print(f"⚠️ 解析标注文件失败 {os.path.basename(xml_path)}: {error}")
+
             for annotation_file, image_file in annotation_files:
                 annotation_path = os.path.join(self.source_dir, annotation_file)
                 try:
-                    if annotation_file.lower().endswith('.xml'):
-                        tree = ElementTree.parse(annotation_path)
-                        root = tree.getroot()
-
-                        for obj in root.findall('object'):
-                            name = obj.find('name').text
-                            if name:
-                                found_classes.add(name)
-
-                    elif annotation_file.lower().endswith('.json'):
+                    if annotation_file.lower().endswith('.json'):
                         with open(annotation_path, 'r', encoding='utf-8') as f:
                             data = json.load(f)
 
@@ -744,6 +825,15 @@ class PascalToYOLOConverter:
                 f"  - 类别列表: {self.classes}"
             ]
 
+            if self.cache_stats is not None:
+                report_lines.extend([
+                    f"🗜️ 训练图像缓存 ({self.image_cache_size}px):",
+                    f"  - 缩小: {self.cache_stats['resized']} 张, 复制: {self.cache_stats['copied']} 张, "
+                    f"未变化: {self.cache_stats['skipped']} 张",
+                ])
+                if self.cache_stats['errors']:
+                    report_lines.append(f"  - 失败: {len(self.cache_stats['errors'])} 张（使用原图）")
+
             if self.use_class_config:
                 report_lines.append(f"📋 使用固定类别配置: ✅")
                 if self.unknown_classes:
@@ -1,10 +1,14 @@
 #!/usr/bin/env python
 # -*- coding: utf8 -*-
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from xml.etree import ElementTree
 from xml.etree.ElementTree import Element, SubElement
 from lxml import etree
-import codecs
+import numpy as np
+from libs.atomic_file import atomic_write_text
 from libs.constants import DEFAULT_ENCODING
 from libs.ustr import ustr
 
@@ -12,6 +16,180 @@ from libs.ustr import ustr
 XML_EXT = '.xml'
 ENCODE_METHOD = DEFAULT_ENCODING
 
+# Below this many files the process pool costs more than it saves
+PARALLEL_MIN_FILES = 64
+_BND_BOX_KEYS = ('xmin', 'ymin', 'xmax', 'ymax')
+_PARSE_ERRORS = (OSError, etree.XMLSyntaxError, ValueError, TypeError)
+
+
+class VocAnnotation:
+    """
+    The parts of a Pascal VOC file needed for training and statistics.
+
+    boxes is an (N, 4) array of [xmin, ymin, xmax, ymax], difficult an (N,)
+    bool array and labels the N object names, all in file order.
+    """
+
+    def __init__(self, file_path, filename, img_size, verified, labels, boxes, difficult):
+        self.file_path = file_path
+        self.filename = filename
+        self.img_size = img_size  # (height, width, depth), zeros when <size> is missing
+        self.verified = verified
+        self.labels = labels
+        self.boxes = boxes
+        self.difficult = difficult
+
+    def __len__(self):
+        return len(self.labels)
+
+
+def parse_voc_annotation(file_path, dtype=np.float32):
+    """
+    Stream a Pascal VOC file with lxml iterparse and return a VocAnnotation.
+
+    Only <filename>, <size> and the name/bndbox/difficult of each <object>
+    are extracted; each object is cleared once read so memory stays flat.
+    Errors (I/O, malformed XML, bad coordinates) are raised to the caller.
+    """
+    filename = None
+    height = width = depth = 0
+    verified = False
+    labels = []
+    coords = []
+    difficult = []
+
+    context = etree.iterparse(file_path, events=('end',), encoding=ENCODE_METHOD,
+                              tag=('annotation', 'filename', 'size', 'object'))
+    for _, elem in context:
+        tag = elem.tag
+        if tag == 'object':
+            bnd_box = elem.find('bndbox')
+            if bnd_box is not None:
+                labels.append(elem.findtext('name'))
+                coords.append([float(bnd_box.findtext(key)) for key in _BND_BOX_KEYS])
+                difficult_text = elem.findtext('difficult')
+                difficult.append(bool(int(difficult_text)) if difficult_text else False)
+            elem.clear()
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+        elif tag == 'size':
+            width = int(float(elem.findtext('width') or 0))
+            height = int(float(elem.findtext('height') or 0))
+            depth = int(float(elem.findtext('depth') or 0))
+        elif tag == 'filename':
+            if filename is None:
+                filename = elem.text
+        else:
+            verified = elem.get('verified') == 'yes'
+
+    boxes = np.array(coords, dtype=dtype).reshape(-1, 4)
+    return VocAnnotation(file_path, filename, (height, width, depth), verified,
+                         labels, boxes, np.array(difficult, dtype=bool))
+
+
+def _parse_voc_chunk(file_paths):
+    results = []
+    for file_path in file_paths:
+        try:
+            results.append((file_path, parse_voc_annotation(file_path), None))
+        except _PARSE_ERRORS as e:
+            results.append((file_path, None, '%s: %s' % (type(e).__name__, e)))
+    return results
+
+
+class VocLabelSet:
+    """
+    Many parsed VOC files packed into flat arrays.
+
+    Rows of files[i] are boxes[offsets[i]:offsets[i + 1]]; class_ids index
+    into class_names. errors maps every file that failed to parse to its
+    error message instead of dropping it silently.
+    """
+
+    def __init__(self, files, annotations, errors):
+        self.files = files
+        self.errors = errors
+        self.filenames = [annotation.filename for annotation in annotations]
+        self.img_sizes = np.array([annotation.img_size for annotation in annotations],
+                                  dtype=np.int32).reshape(-1, 3)
+        self.verified = np.array([annotation.verified for annotation in annotations], dtype=bool)
+
+        self.offsets = np.zeros(len(annotations) + 1, dtype=np.int64)
+        np.cumsum([len(annotation) for annotation in annotations], out=self.offsets[1:])
+
+        class_index = {}
+        class_ids = []
+        for annotation in annotations:
+            for label in annotation.labels:
+                class_ids.append(class_index.setdefault(label, len(class_index)))
+        self.class_names = list(class_index)
+        self.class_ids = np.array(class_ids, dtype=np.int32)
+
+        if annotations:
+            self.boxes = np.concatenate([annotation.boxes for annotation in annotations])
+            self.difficult = np.concatenate([annotation.difficult for annotation in annotations])
+        else:
+            self.boxes = np.zeros((0, 4), dtype=np.float32)
+            self.difficult = np.zeros(0, dtype=bool)
+
+    def __len__(self):
+        return len(self.files)
+
+    def labels_for(self, index):
+        start, end = self.offsets[index], self.offsets[index + 1]
+        return [self.class_names[i] for i in self.class_ids[start:end]]
+
+    def boxes_for(self, index):
+        return self.boxes[self.offsets[index]:self.offsets[index + 1]]
+
+    def class_counts(self):
+        """Return {class name: box count} over the whole set."""
+        counts = np.bincount(self.class_ids, minlength=len(self.class_names))
+        return dict(zip(self.class_names, counts.tolist()))
+
+
+def read_voc_files(file_paths, workers=None, chunk_size=256):
+    """
+    Parse many VOC files, spread across a process pool, into a VocLabelSet.
+
+    workers defaults to the CPU count; small inputs or workers=1 are parsed
+    in-process. If the pool cannot be started the files are parsed serially.
+    """
+    file_paths = list(file_paths)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    chunks = [file_paths[i:i + chunk_size] for i in range(0, len(file_paths), chunk_size)]
+
+    results = []
+    if workers > 1 and len(file_paths) >= PARALLEL_MIN_FILES:
+        try:
+            with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+                for chunk_result in executor.map(_parse_voc_chunk, chunks):
+                    results.extend(chunk_result)
+        except (OSError, BrokenProcessPool):
+            results = []
+    if not results:
+        for chunk in chunks:
+            results.extend(_parse_voc_chunk(chunk))
+
+    files = []
+    annotations = []
+    errors = {}
+    for file_path, annotation, error in results:
+        if annotation is None:
+            errors[file_path] = error
+        else:
+            files.append(file_path)
+            annotations.append(annotation)
+    return VocLabelSet(files, annotations, errors)
+
+
+def read_voc_dir(dir_path, workers=None):
+    """Parse every .xml file directly inside dir_path, see read_voc_files."""
+    file_paths = [os.path.join(dir_path, name) for name in sorted(os.listdir(dir_path))
+                  if name.lower().endswith(XML_EXT)]
+    return read_voc_files(file_paths, workers=workers)
+
 class PascalVocWriter:
 
     def __init__(self, folder_name, filename, img_size, database_src='Unknown', local_img_path=None):
@@ -112,20 +290,14 @@ class PascalVocWriter:
     def save(self, target_file=None):
         root = self.gen_xml()
         self.append_objects(root)
-        out_file = None
         if target_file is None:
-            out_file = codecs.open(
-                self.filename + XML_EXT, 'w', encoding=ENCODE_METHOD)
-        else:
-            out_file = codecs.open(target_file, 'w', encoding=ENCODE_METHOD)
+            target_file = self.filename + XML_EXT
 
         prettify_result = self.prettify(root)
         # Fix Unicode encoding error: prettify_result is already bytes, decode it properly
         if isinstance(prettify_result, bytes):
-            out_file.write(prettify_result.decode(ENCODE_METHOD))
-        else:
-            out_file.write(prettify_result)
-        out_file.close()
+            prettify_result = prettify_result.decode(ENCODE_METHOD)
+        atomic_write_text(target_file, prettify_result, ENCODE_METHOD)
 
 
 class PascalVocReader:
@@ -136,40 +308,28 @@ class PascalVocReader:
         self.shapes = []
         self.file_path = file_path
         self.verified = False
+        self.error = None
         try:
             self.parse_xml()
-        except:
-            pass
+        except (AssertionError,) + _PARSE_ERRORS as e:
+            self.error = str(e)
+            print("Failed to parse %s: %s" % (file_path, e))
 
     def get_shapes(self):
         return self.shapes
 
     def add_shape(self, label, bnd_box, difficult):
-        x_min = int(float(bnd_box.find('xmin').text))
-        y_min = int(float(bnd_box.find('ymin').text))
-        x_max = int(float(bnd_box.find('xmax').text))
-        y_max = int(float(bnd_box.find('ymax').text))
+        x_min, y_min, x_max, y_max = [int(value) for value in bnd_box]
         points = [(x_min, y_min), (x_max, y_min), (x_max, y_max), (x_min, y_max)]
         self.shapes.append((label, points, None, None, difficult))
 
     def parse_xml(self):
         assert self.file_path.endswith(XML_EXT), "Unsupported file format"
-        parser = etree.XMLParser(encoding=ENCODE_METHOD)
-        xml_tree = ElementTree.parse(self.file_path, parser=parser).getroot()
-        filename = xml_tree.find('filename').text
-        try:
-            verified = xml_tree.attrib['verified']
-            if verified == 'yes':
-                self.verified = True
-        except KeyError:
-            self.verified = False
-
-        for object_iter in xml_tree.findall('object'):
-            bnd_box = object_iter.find("bndbox")
-            label = object_iter.find('name').text
-            # Add chris
-            difficult = False
-            if object_iter.find('difficult') is not None:
-                difficult = bool(int(object_iter.find('difficult').text))
+        # float64 keeps int(float(text)) semantics for the pixel coordinates
+        annotation = parse_voc_annotation(self.file_path, dtype=np.float64)
+        self.verified = annotation.verified
+
+        for label, bnd_box, difficult in zip(annotation.labels, annotation.boxes.tolist(),
+                                             annotation.difficult.tolist()):
             self.add_shape(label, bnd_box, difficult)
         return True
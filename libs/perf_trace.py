@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+热点路径计时
+
+在加载图片、绘制、保存、预测、批处理、转换、训练等路径上埋点（命名的span），
+按名称汇总耗时分布，可在诊断对话框中查看，或导出为JSON / Chrome trace
+（chrome://tracing、Perfetto可直接打开）。
+
+关闭时（默认）span()只检查一个全局标志并返回共享的空上下文，几乎没有开销；
+设置环境变量 LABELIMG_TRACE=1 或在诊断对话框中勾选后开始记录。
+
+    with perf_trace.span('load_file.decode'):
+        ...
+
+    @perf_trace.timed('save')
+    def save(...):
+        ...
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from collections import deque
+from functools import wraps
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# 设置日志
+logger = logging.getLogger(__name__)
+
+# 每个名称保留的最近耗时样本数（用于计算分位数）
+MAX_SAMPLES_PER_NAME = 10000
+# Chrome trace保留的最近事件数
+MAX_TRACE_EVENTS = 200000
+
+_enabled = os.environ.get('LABELIMG_TRACE', '').lower() in ('1', 'true', 'yes', 'on')
+_lock = threading.Lock()
+_samples: Dict[str, deque] = {}
+_counts: Dict[str, int] = {}
+_totals: Dict[str, float] = {}
+_events = deque(maxlen=MAX_TRACE_EVENTS)
+# trace中的时间戳以此为零点（微秒）
+_origin = time.perf_counter()
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def set_enabled(enabled: bool):
+    """开启或关闭记录（已记录的数据保留，reset()清除）"""
+    global _enabled
+    _enabled = bool(enabled)
+    logger.info(f"⏱️ 性能计时已{'开启' if _enabled else '关闭'}")
+
+
+def reset():
+    """清除全部记录"""
+    with _lock:
+        _samples.clear()
+        _counts.clear()
+        _totals.clear()
+        _events.clear()
+
+
+def record(name: str, seconds: float, start: Optional[float] = None, args: Optional[dict] = None):
+    """
+    记录一次耗时
+
+    Args:
+        name: 名称，用点号分层（如 predict.infer）
+        seconds: 耗时（秒）
+        start: 开始时刻（time.perf_counter()），省略时按结束于当前时刻推算
+        args: 附加到trace事件中的参数
+    """
+    if not _enabled:
+        return
+    if start is None:
+        start = time.perf_counter() - seconds
+    event = {'name': name, 'ph': 'X', 'ts': (start - _origin) * 1e6, 'dur': seconds * 1e6,
+             'pid': os.getpid(), 'tid': threading.get_ident()}
+    if args:
+        event['args'] = args
+    with _lock:
+        samples = _samples.get(name)
+        if samples is None:
+            samples = _samples[name] = deque(maxlen=MAX_SAMPLES_PER_NAME)
+        samples.append(seconds)
+        _counts[name] = _counts.get(name, 0) + 1
+        _totals[name] = _totals.get(name, 0.0) + seconds
+        _events.append(event)
+
+
+class _Span:
+    __slots__ = ('name', 'args', 'start')
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        record(self.name, time.perf_counter() - self.start, self.start, self.args)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name: str, **args):
+    """计时上下文；关闭时返回共享的空上下文"""
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, args or None)
+
+
+def timed(name: str):
+    """计时装饰器（是否记录在每次调用时判断）"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - start, start)
+        return wrapper
+    return decorator
+
+
+def summary() -> List[dict]:
+    """按名称汇总的耗时统计（毫秒），分位数基于最近MAX_SAMPLES_PER_NAME个样本"""
+    with _lock:
+        snapshot = [(name, np.fromiter(samples, dtype=np.float64), _counts[name], _totals[name])
+                    for name, samples in _samples.items()]
+    rows = []
+    for name, values, count, total in sorted(snapshot, key=lambda item: item[0]):
+        p50, p95, p99 = np.percentile(values, [50, 95, 99]) * 1e3
+        rows.append({'name': name, 'count': count, 'total_ms': total * 1e3, 'mean_ms': total / count * 1e3,
+                     'p50_ms': float(p50), 'p95_ms': float(p95), 'p99_ms': float(p99),
+                     'max_ms': float(values.max() * 1e3)})
+    return rows
+
+
+def dump_json(path: str) -> str:
+    """导出汇总统计为JSON"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'created': time.strftime('%Y-%m-%d %H:%M:%S'), 'pid': os.getpid(), 'spans': summary()},
+                  f, ensure_ascii=False, indent=2)
+    return path
+
+
+def dump_chrome_trace(path: str) -> str:
+    """导出Chrome trace（Trace Event格式），线程名一并写入"""
+    with _lock:
+        events = list(_events)
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    metadata = [{'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': tid,
+                 'args': {'name': names.get(tid, str(tid))}}
+                for tid in sorted({event['tid'] for event in events})]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'traceEvents': metadata + events, 'displayTimeUnit': 'ms'}, f, ensure_ascii=False)
+    return path
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+界面刷新合并
+
+调用方只标记哪些面板需要刷新，由一个零延迟（或短延迟）的单次定时器在
+事件循环的下一轮统一刷新，每个面板每轮最多刷新一次。
+批量操作（加载几千个标注框、应用几百个预测结果）因此只触发一次刷新。
+"""
+
+import logging
+from collections import OrderedDict
+from typing import Callable
+
+try:
+    from PyQt5.QtCore import QObject, QTimer
+except ImportError:
+    from PyQt4.QtCore import QObject, QTimer
+
+from libs import perf_trace
+
+logger = logging.getLogger(__name__)
+
+
+class RefreshScheduler(QObject):
+    """
+    按名称登记刷新函数，mark()标记为需要刷新，定时器触发时按登记顺序执行
+
+    刷新函数中标记的、登记顺序在其后的面板在同一轮刷新；
+    标记在其前的面板留到下一轮。
+    """
+
+    def __init__(self, parent=None, delay_ms: int = 0):
+        super().__init__(parent)
+        self._handlers = OrderedDict()
+        self._dirty = set()
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(delay_ms)
+        self._timer.timeout.connect(self.flush)
+
+    def register(self, name: str, handler: Callable[[], None]):
+        """登记面板的刷新函数（登记顺序即刷新顺序）"""
+        self._handlers[name] = handler
+
+    def mark(self, *names: str):
+        """标记面板需要刷新"""
+        self._dirty.update(names)
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def is_dirty(self, name: str) -> bool:
+        return name in self._dirty
+
+    def flush(self):
+        """立即刷新全部已标记的面板"""
+        self._timer.stop()
+        for name, handler in self._handlers.items():
+            if name not in self._dirty:
+                continue
+            self._dirty.discard(name)
+            try:
+                with perf_trace.span(f'refresh.{name}'):
+                    handler()
+            except Exception as e:
+                logger.error(f"刷新 {name} 失败: {e}")
+        if self._dirty:
+            self._timer.start()
+
+    def cancel(self):
+        """丢弃尚未执行的刷新"""
+        self._timer.stop()
+        self._dirty.clear()
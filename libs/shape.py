@@ -9,8 +9,9 @@ except ImportError:
     from PyQt4.QtGui import *
     from PyQt4.QtCore import *
 
+import math
+
 from libs.utils import distance
-import sys
 
 DEFAULT_LINE_COLOR = QColor(0, 255, 0, 128)
 DEFAULT_FILL_COLOR = QColor(255, 0, 0, 128)
@@ -38,7 +39,27 @@ class Shape(object):
     scale = 1.0
     label_font_size = 8
 
+    # Pens, fonts and vertex sprites are shared by all shapes.
+    _pens = {}
+    _fonts = {}
+    _sprites = {}
+    MAX_CACHED_PENS = 1024
+
+    # Setting any of these drops the cached paths, see invalidate().
+    _RENDER_ATTRIBUTES = frozenset(('points', 'label', 'line_color', 'paint_label', '_closed'))
+
     def __init__(self, label=None, line_color=None, difficult=False, paint_label=False):
+        # Render cache: paths are rebuilt only after the points change.
+        self._polygon = None
+        self._line_path = None
+        self._vertex_path = None
+        self._vertex_key = None
+        self._label_origin = None
+        self._paint_rect = None
+        self._paint_rect_key = None
+        # Canvas.StaticLayer this shape has been rendered into, if any.
+        self.static_layer = None
+
         self.label = label
         self.points = []
         self.fill = False
@@ -61,6 +82,23 @@ class Shape(object):
             # is used for drawing the pending line a different color.
             self.line_color = line_color
 
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if name in self._RENDER_ATTRIBUTES:
+            self.invalidate()
+
+    def invalidate(self):
+        """Drop the cached paths. Needed after mutating the points list in place."""
+        self._polygon = None
+        self._line_path = None
+        self._vertex_path = None
+        self._label_origin = None
+        self._paint_rect = None
+        layer = self.static_layer
+        if layer is not None:
+            layer.dirty = True
+            self.static_layer = None
+
     def close(self):
         self._closed = True
 
@@ -72,10 +110,13 @@ class Shape(object):
     def add_point(self, point):
         if not self.reach_max_points():
             self.points.append(point)
+            self.invalidate()
 
     def pop_point(self):
         if self.points:
-            return self.points.pop()
+            point = self.points.pop()
+            self.invalidate()
+            return point
         return None
 
     def is_closed(self):
@@ -84,56 +125,190 @@ class Shape(object):
     def set_open(self):
         self._closed = False
 
+    @classmethod
+    def pen(cls, color, width):
+        key = (color.rgba(), width)
+        pen = cls._pens.get(key)
+        if pen is None:
+            if len(cls._pens) >= cls.MAX_CACHED_PENS:
+                cls._pens.clear()
+            pen = cls._pens[key] = QPen(color)
+            pen.setWidth(width)
+        return pen
+
+    @classmethod
+    def font(cls, size):
+        font = cls._fonts.get(size)
+        if font is None:
+            font = cls._fonts[size] = QFont()
+            font.setPointSize(size)
+            font.setBold(True)
+        return font
+
+    @classmethod
+    def pen_width(cls):
+        # Try using integer sizes for smoother drawing(?)
+        return max(1, int(round(2.0 / cls.scale)))
+
+    def polygon(self):
+        if self._polygon is None:
+            self._polygon = QPolygonF(self.points)
+        return self._polygon
+
+    def line_path(self):
+        if self._line_path is None:
+            polygon = QPolygonF(self.polygon())
+            if self.is_closed():
+                polygon.append(self.points[0])
+            path = QPainterPath()
+            path.addPolygon(polygon)
+            self._line_path = path
+        return self._line_path
+
+    def vertex_path(self):
+        index = self._highlight_index
+        key = (self.point_size / self.scale, self.point_type, index, self._highlight_mode)
+        if self._vertex_path is not None and self._vertex_key == key:
+            return self._vertex_path
+        d, shape = key[0], key[1]
+        path = QPainterPath()
+        for i, point in enumerate(self.points):
+            size = d
+            point_type = shape
+            if i == index:
+                factor, point_type = self._highlight_settings[self._highlight_mode]
+                size *= factor
+            if point_type == self.P_SQUARE:
+                path.addRect(point.x() - size / 2, point.y() - size / 2, size, size)
+            elif point_type == self.P_ROUND:
+                path.addEllipse(point, size / 2.0, size / 2.0)
+            else:
+                assert False, "unsupported vertex shape"
+        self._vertex_path, self._vertex_key = path, key
+        return path
+
     def paint(self, painter):
         if self.points:
             color = self.select_line_color if self.selected else self.line_color
-            pen = QPen(color)
-            # Try using integer sizes for smoother drawing(?)
-            pen.setWidth(max(1, int(round(2.0 / self.scale))))
-            painter.setPen(pen)
-
-            line_path = QPainterPath()
-            vertex_path = QPainterPath()
-
-            line_path.moveTo(self.points[0])
-            # Uncommenting the following line will draw 2 paths
-            # for the 1st vertex, and make it non-filled, which
-            # may be desirable.
-            # self.drawVertex(vertex_path, 0)
-
-            for i, p in enumerate(self.points):
-                line_path.lineTo(p)
-                self.draw_vertex(vertex_path, i)
-            if self.is_closed():
-                line_path.lineTo(self.points[0])
+            painter.setPen(self.pen(color, self.pen_width()))
 
+            line_path = self.line_path()
+            vertex_path = self.vertex_path()
             painter.drawPath(line_path)
             painter.drawPath(vertex_path)
+            if self._highlight_index is not None:
+                self.vertex_fill_color = self.h_vertex_fill_color
+            else:
+                self.vertex_fill_color = Shape.vertex_fill_color
             painter.fillPath(vertex_path, self.vertex_fill_color)
 
             # Draw text at the top-left
             if self.paint_label:
-                min_x = sys.maxsize
-                min_y = sys.maxsize
-                min_y_label = int(1.25 * self.label_font_size)
-                for point in self.points:
-                    min_x = min(min_x, point.x())
-                    min_y = min(min_y, point.y())
-                if min_x != sys.maxsize and min_y != sys.maxsize:
-                    font = QFont()
-                    font.setPointSize(self.label_font_size)
-                    font.setBold(True)
-                    painter.setFont(font)
-                    if self.label is None:
-                        self.label = ""
-                    if min_y < min_y_label:
-                        min_y += min_y_label
-                    painter.drawText(int(min_x), int(min_y), self.label)
+                painter.setFont(self.font(self.label_font_size))
+                self.draw_label(painter)
 
             if self.fill:
                 color = self.select_fill_color if self.selected else self.fill_color
                 painter.fillPath(line_path, color)
 
+    def label_position(self):
+        if self._label_origin is None:
+            self._label_origin = (min(point.x() for point in self.points),
+                                  min(point.y() for point in self.points))
+        min_x, min_y = self._label_origin
+        min_y_label = int(1.25 * self.label_font_size)
+        if min_y < min_y_label:
+            min_y += min_y_label
+        return int(min_x), int(min_y)
+
+    def draw_label(self, painter):
+        if self.label is None:
+            self.label = ""
+        x, y = self.label_position()
+        painter.drawText(x, y, self.label)
+
+    def paint_rect(self):
+        """Bounding rect, in image coordinates, of everything paint() draws."""
+        if not self.points:
+            return QRectF()
+        key = (self.scale, self.label_font_size, self._highlight_index, self._highlight_mode)
+        if self._paint_rect is None or self._paint_rect_key != key:
+            rect = self.polygon().boundingRect().united(self.vertex_path().boundingRect())
+            margin = self.pen_width()
+            rect.adjust(-margin, -margin, margin, margin)
+            if self.paint_label and self.label:
+                x, y = self.label_position()
+                metrics = QFontMetricsF(self.font(self.label_font_size))
+                rect = rect.united(metrics.boundingRect(self.label).translated(x, y))
+            self._paint_rect, self._paint_rect_key = rect, key
+        return self._paint_rect
+
+    @classmethod
+    def vertex_sprite(cls, color, width, ratio):
+        """A vertex (outline and fill) pre-rendered at its on-screen size."""
+        key = (color.rgba(), Shape.vertex_fill_color.rgba(), cls.point_size, cls.point_type, width, ratio)
+        sprite = cls._sprites.get(key)
+        if sprite is None:
+            if len(cls._sprites) >= cls.MAX_CACHED_PENS:
+                cls._sprites.clear()
+            d = cls.point_size
+            size = int(math.ceil(d + width)) + 2
+            sprite = QPixmap(int(math.ceil(size * ratio)), int(math.ceil(size * ratio)))
+            sprite.setDevicePixelRatio(ratio)
+            sprite.fill(Qt.transparent)
+            painter = QPainter(sprite)
+            painter.setRenderHint(QPainter.Antialiasing)
+            pen = QPen(color)
+            pen.setWidthF(width)
+            painter.setPen(pen)
+            painter.setBrush(Shape.vertex_fill_color)
+            if cls.point_type == cls.P_SQUARE:
+                painter.drawRect(QRectF(size / 2.0 - d / 2.0, size / 2.0 - d / 2.0, d, d))
+            else:
+                painter.drawEllipse(QPointF(size / 2.0, size / 2.0), d / 2.0, d / 2.0)
+            painter.end()
+            sprite = cls._sprites[key] = (sprite, size / 2.0)
+        return sprite
+
+    @classmethod
+    def paint_batch(cls, painter, shapes, ratio=1.0):
+        """
+        Paint shapes as they look when neither selected, filled nor highlighted,
+        grouped by line colour. Outlines are drawn as polygons and vertices are
+        blitted from a pre-rendered sprite, which is several times faster than
+        stroking and filling a path per shape.
+        """
+        groups = {}
+        for shape in shapes:
+            if shape.points:
+                groups.setdefault(shape.line_color.rgba(), (shape.line_color, []))[1].append(shape)
+
+        width = cls.pen_width()
+        transform = painter.transform()
+        for color, members in groups.values():
+            painter.setPen(cls.pen(color, width))
+            for shape in members:
+                if shape.is_closed():
+                    painter.drawPolygon(shape.polygon())
+                else:
+                    painter.drawPolyline(shape.polygon())
+
+            sprite, half = cls.vertex_sprite(color, width * cls.scale, ratio)
+            painter.save()
+            painter.resetTransform()
+            for shape in members:
+                for point in shape.points:
+                    point = transform.map(point)
+                    painter.drawPixmap(QPointF(point.x() - half, point.y() - half), sprite)
+            painter.restore()
+
+        labelled = [shape for shape in shapes if shape.points and shape.paint_label]
+        if labelled:
+            painter.setFont(cls.font(cls.label_font_size))
+            for shape in labelled:
+                painter.setPen(cls.pen(shape.line_color, width))
+                shape.draw_label(painter)
+
     def draw_vertex(self, path, i):
         d = self.point_size / self.scale
         shape = self.point_type
@@ -165,9 +340,8 @@ class Shape(object):
         return self.make_path().contains(point)
 
     def make_path(self):
-        path = QPainterPath(self.points[0])
-        for p in self.points[1:]:
-            path.lineTo(p)
+        path = QPainterPath()
+        path.addPolygon(QPolygonF(self.points))
         return path
 
     def bounding_rect(self):
@@ -178,6 +352,7 @@ class Shape(object):
 
     def move_vertex_by(self, i, offset):
         self.points[i] = self.points[i] + offset
+        self.invalidate()
 
     def highlight_vertex(self, i, action):
         self._highlight_index = i
@@ -207,3 +382,4 @@ class Shape(object):
 
     def __setitem__(self, key, value):
         self.points[key] = value
+        self.invalidate()
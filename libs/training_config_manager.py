@@ -37,7 +37,8 @@ class TrainingConfigManager:
             "model_type": "yolov8n",
             "device": "auto",
             "user_adjustments": {},  # 用户手动调整的记录
-            "smart_calc_history": []  # 智能计算历史
+            "smart_calc_history": [],  # 智能计算历史
+            "autotune_results": {}  # CPU批次/线程自动调优结果
         }
     
     def ensure_config_dir(self):
@@ -212,6 +213,62 @@ class TrainingConfigManager:
             logger.error(f"获取用户偏好设置失败: {str(e)}")
             return None
     
+    @staticmethod
+    def autotune_key(dataset_path: str, model_path: str, imgsz: int = 640) -> str:
+        """
+        自动调优结果的键：数据集 + 模型文件 + 图像尺寸 + CPU核数
+
+        模型按完整路径、大小和修改时间区分（与PredictionCache.model_key相同），
+        不同运行目录下的best.pt/last.pt不会共用结果，模型被覆盖后重新探测。
+        """
+        try:
+            stat = os.stat(model_path)
+            model = f"{os.path.abspath(model_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+        except OSError:
+            # 尚未下载的预训练模型（如yolov8n.pt）按名称区分
+            model = os.path.basename(model_path)
+        return f"{os.path.abspath(dataset_path)}|{model}|{imgsz}|cpu{os.cpu_count()}"
+
+    def save_autotune_result(self, dataset_path: str, model_path: str, result: Dict[str, Any],
+                             imgsz: int = 640):
+        """
+        保存CPU训练的自动调优结果，同一数据集和模型下次训练时跳过探测
+        
+        Args:
+            dataset_path: 数据集配置路径
+            model_path: 模型路径
+            result: 调优结果（AutoTuneResult的字典形式）
+            imgsz: 探测时的训练图像尺寸
+        """
+        try:
+            config = self.load_config()
+            config.setdefault("autotune_results", {})[self.autotune_key(dataset_path, model_path, imgsz)] = {
+                "batch_size": result["batch_size"],
+                "workers": result["workers"],
+                "images_per_second": result.get("images_per_second"),
+                "peak_rss_mb": result.get("peak_rss_mb"),
+                "timestamp": self._get_timestamp()
+            }
+            self.save_config(config)
+            
+        except Exception as e:
+            logger.error(f"保存自动调优结果失败: {str(e)}")
+    
+    def get_autotune_result(self, dataset_path: str, model_path: str,
+                            imgsz: int = 640) -> Optional[Dict[str, Any]]:
+        """
+        获取已记录的自动调优结果
+        
+        Returns:
+            Optional[Dict[str, Any]]: 包含batch_size和workers，没有记录时返回None
+        """
+        try:
+            return self.load_config().get("autotune_results", {}).get(
+                self.autotune_key(dataset_path, model_path, imgsz))
+        except Exception as e:
+            logger.error(f"获取自动调优结果失败: {str(e)}")
+            return None
+    
     def get_similar_dataset_recommendations(self, current_dataset_info: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
         基于历史记录获取相似数据集的推荐
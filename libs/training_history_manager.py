@@ -10,7 +10,7 @@ import os
 import json
 import logging
 from datetime import datetime
-from typing import List, Dict, Set, Optional
+from typing import List, Dict, Set, Optional, Tuple
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
@@ -219,6 +219,55 @@ class TrainingHistoryManager:
             logger.error(f"过滤未训练图片失败: {str(e)}")
             return image_paths  # 出错时返回原列表
 
+    def partition_images(self, image_paths: List[str]) -> Tuple[List[str], List[str]]:
+        """
+        把图片分为未训练和已训练两组
+
+        匹配规则与is_image_trained（非严格模式）相同，但已训练集合只构建一次，
+        适合整个数据集的划分。
+
+        Args:
+            image_paths: 图片路径列表
+
+        Returns:
+            Tuple[List[str], List[str]]: (未训练图片, 已训练图片)，保持原顺序
+        """
+        trained_images = self.get_trained_images()
+        trained_names = {os.path.basename(path) for path in trained_images}
+
+        untrained, trained = [], []
+        for img_path in image_paths:
+            try:
+                normalized_path = os.path.relpath(img_path)
+            except ValueError:
+                normalized_path = img_path
+            image_name = os.path.basename(img_path)
+            # 文件名太短或太常见时只按路径匹配
+            name_matches = (len(image_name) >= 8
+                            and image_name.lower() not in ['image.jpg', 'photo.png', 'picture.jpg']
+                            and image_name in trained_names)
+            if normalized_path in trained_images or name_matches:
+                trained.append(img_path)
+            else:
+                untrained.append(img_path)
+
+        logger.info(f"划分结果: {len(untrained)} 张未训练, {len(trained)} 张已训练")
+        return untrained, trained
+
+    def get_latest_model(self) -> Optional[str]:
+        """
+        获取最近一次完成的训练生成的模型
+
+        Returns:
+            Optional[str]: 模型路径，没有可用模型时返回None
+        """
+        sessions = [session for session in self.history_data.get("training_sessions", [])
+                    if session.get("status") == "completed" and session.get("model_path")]
+        for session in sorted(sessions, key=lambda x: x.get("timestamp", ""), reverse=True):
+            if os.path.exists(session["model_path"]):
+                return session["model_path"]
+        return None
+
     def get_training_statistics(self) -> Dict:
         """
         获取训练统计信息
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+训练指标存储
+每次训练在运行目录（runs/train/<name>）下保存一个SQLite数据库，
+记录每轮指标和可选的每次迭代指标，用于实时曲线和不同训练之间的对比
+"""
+
+import os
+import sqlite3
+import time
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 运行目录下的指标数据库文件名
+METRICS_DB_NAME = 'metrics.db'
+
+# 指标粒度
+KIND_EPOCH = 'epoch'
+KIND_ITERATION = 'iteration'
+
+# 每次迭代的指标缓冲到这么多行或这么多秒才提交一次
+ITERATION_COMMIT_ROWS = 200
+ITERATION_COMMIT_SECONDS = 2.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scalars (
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    step INTEGER NOT NULL,
+    value REAL NOT NULL,
+    wall_time REAL NOT NULL,
+    PRIMARY KEY (kind, name, step)
+) WITHOUT ROWID;
+"""
+
+
+def metrics_db_path(run_dir: str) -> str:
+    """运行目录对应的指标数据库路径"""
+    return os.path.join(run_dir, METRICS_DB_NAME)
+
+
+def list_runs(runs_dir: str) -> List[str]:
+    """
+    列出runs_dir下有指标记录的运行目录
+
+    Returns:
+        List[str]: 运行目录，最新的在前
+    """
+    runs = [path.parent for path in Path(runs_dir).glob(f"*/{METRICS_DB_NAME}")]
+    runs.sort(key=lambda path: path.stat().st_mtime, reverse=True)
+    return [str(path) for path in runs]
+
+
+def minmax_downsample(steps: np.ndarray, values: np.ndarray, buckets: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    最小/最大值降采样
+
+    把序列均分为buckets段，每段只保留最小值和最大值两个点（按原顺序），
+    画出的折线与原序列的包络一致，尖峰不会丢失。点数不超过2*buckets。
+
+    Args:
+        steps: (N,) 横坐标
+        values: (N,) 纵坐标，不能含NaN
+        buckets: 分段数，通常为绘图区域的像素宽度
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: 降采样后的 (steps, values)
+    """
+    count = len(values)
+    if buckets <= 0 or count <= 2 * buckets:
+        return steps, values
+
+    size = -(-count // buckets)  # 向上取整，保证段数不超过buckets
+    full = count // size * size
+    blocks = values[:full].reshape(-1, size)
+    offsets = np.arange(0, full, size)
+    indices = [offsets + blocks.argmin(axis=1), offsets + blocks.argmax(axis=1)]
+    if full < count:
+        tail = values[full:]
+        indices.append(np.array([full + tail.argmin(), full + tail.argmax()]))
+    keep = np.unique(np.concatenate(indices))
+    return steps[keep], values[keep]
+
+
+class TrainingMetricsStore:
+    """单次训练的指标数据库"""
+
+    def __init__(self, db_path: str, readonly: bool = False):
+        """
+        打开（或创建）指标数据库
+
+        Args:
+            db_path: 数据库路径，通常为 metrics_db_path(run_dir)
+            readonly: 只读打开，用于GUI在训练进程写入的同时读取
+        """
+        self.db_path = db_path
+        self.readonly = readonly
+        if readonly:
+            uri = Path(os.path.abspath(db_path)).as_uri() + '?mode=ro'
+            self.conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            self.conn = sqlite3.connect(db_path, check_same_thread=False)
+            # WAL：训练进程写入时GUI仍可读取
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.executescript(_SCHEMA)
+        self._pending = []
+        self._last_commit = time.monotonic()
+
+    def close(self):
+        """提交缓冲的数据并关闭"""
+        if self.conn is None:
+            return
+        self.flush()
+        self.conn.close()
+        self.conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def log_epoch(self, epoch: int, values: Dict[str, float]):
+        """记录一轮的指标（立即提交）"""
+        self._append(KIND_EPOCH, epoch, values)
+        self.flush()
+
+    def log_iteration(self, step: int, values: Dict[str, float]):
+        """记录一次迭代的指标（批量提交）"""
+        self._append(KIND_ITERATION, step, values)
+        if (len(self._pending) >= ITERATION_COMMIT_ROWS
+                or time.monotonic() - self._last_commit >= ITERATION_COMMIT_SECONDS):
+            self.flush()
+
+    def _append(self, kind: str, step: int, values: Dict[str, float]):
+        now = time.time()
+        self._pending.extend((kind, name, int(step), float(value), now)
+                             for name, value in values.items() if value is not None)
+
+    def flush(self):
+        """提交缓冲的指标"""
+        if self._pending:
+            with self.conn:
+                self.conn.executemany("INSERT OR REPLACE INTO scalars VALUES (?, ?, ?, ?, ?)", self._pending)
+            self._pending = []
+        self._last_commit = time.monotonic()
+
+    def names(self, kind: str = KIND_EPOCH) -> List[str]:
+        """已记录的指标名称"""
+        rows = self.conn.execute("SELECT DISTINCT name FROM scalars WHERE kind = ? ORDER BY name", (kind,))
+        return [row[0] for row in rows]
+
+    def series(self, name: str, kind: str = KIND_EPOCH, since_step: Optional[int] = None
+               ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        读取一个指标的序列
+
+        Args:
+            name: 指标名称
+            kind: KIND_EPOCH 或 KIND_ITERATION
+            since_step: 只读取大于该步数的点（增量刷新）
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: 按步数升序的 (steps, values)，不含NaN/Inf
+        """
+        query = "SELECT step, value FROM scalars WHERE kind = ? AND name = ?"
+        params = [kind, name]
+        if since_step is not None:
+            query += " AND step > ?"
+            params.append(since_step)
+        data = np.array(self.conn.execute(query + " ORDER BY step", params).fetchall(),
+                        dtype=np.float64).reshape(-1, 2)
+        data = data[np.isfinite(data[:, 1])]
+        return data[:, 0], data[:, 1]
+
+    def latest_epoch(self) -> Dict[str, float]:
+        """最后一轮的全部指标"""
+        rows = self.conn.execute(
+            "SELECT name, value FROM scalars WHERE kind = ? AND step = "
+            "(SELECT MAX(step) FROM scalars WHERE kind = ?)", (KIND_EPOCH, KIND_EPOCH))
+        return dict(rows.fetchall())
+
+    def best(self, name: str, maximize: bool = True) -> Optional[Tuple[int, float]]:
+        """指标的最佳值及所在轮次"""
+        order = 'DESC' if maximize else 'ASC'
+        row = self.conn.execute(
+            f"SELECT step, value FROM scalars WHERE kind = ? AND name = ? ORDER BY value {order} LIMIT 1",
+            (KIND_EPOCH, name)).fetchone()
+        return (int(row[0]), row[1]) if row else None
+
+
+def compare_runs(run_dirs: List[str], names: List[str]) -> Dict[str, Dict[str, Optional[float]]]:
+    """
+    比较多次训练的最终指标
+
+    Returns:
+        Dict[str, Dict[str, Optional[float]]]: {运行目录名: {指标: 最后一轮的值}}
+    """
+    comparison = {}
+    for run_dir in run_dirs:
+        try:
+            with TrainingMetricsStore(metrics_db_path(run_dir), readonly=True) as store:
+                latest = store.latest_epoch()
+        except sqlite3.Error as e:
+            logger.warning(f"读取训练指标失败 {run_dir}: {e}")
+            latest = {}
+        comparison[os.path.basename(run_dir)] = {name: latest.get(name) for name in names}
+    return comparison
@@ -129,6 +129,20 @@ class YOLOExportDialog(QDialog):
         self.shuffle_checkbox.setChecked(True)
         config_layout.addWidget(self.shuffle_checkbox)
 
+        # 训练图像缓存
+        cache_layout = QHBoxLayout()
+        self.cache_checkbox = QCheckBox("生成训练图像缓存")
+        self.cache_checkbox.setToolTip("把图片预先缩小到训练尺寸，训练时不再反复解码原始大图")
+        cache_layout.addWidget(self.cache_checkbox)
+        self.cache_size_spinbox = QSpinBox()
+        self.cache_size_spinbox.setRange(160, 2048)
+        self.cache_size_spinbox.setSingleStep(32)
+        self.cache_size_spinbox.setValue(640)
+        self.cache_size_spinbox.setSuffix(" px")
+        cache_layout.addWidget(self.cache_size_spinbox)
+        cache_layout.addStretch()
+        config_layout.addLayout(cache_layout)
+
         main_layout.addWidget(config_group)
 
         # 进度组
@@ -308,6 +322,8 @@ class YOLOExportDialog(QDialog):
         self.name_edit.setEnabled(False)
         self.ratio_spinbox.setEnabled(False)
         self.shuffle_checkbox.setEnabled(False)
+        self.cache_checkbox.setEnabled(False)
+        self.cache_size_spinbox.setEnabled(False)
 
         # 显示进度控件
         self.progress_bar.setVisible(True)
@@ -322,7 +338,8 @@ class YOLOExportDialog(QDialog):
             dataset_name=self.name_edit.text(),
             train_ratio=train_ratio,
             use_class_config=True,      # 启用固定类别配置
-            class_config_dir="configs"  # 配置文件目录
+            class_config_dir="configs",  # 配置文件目录
+            image_cache_size=self.cache_size_spinbox.value() if self.cache_checkbox.isChecked() else None
         )
 
         # 启动转换线程
@@ -356,6 +373,8 @@ class YOLOExportDialog(QDialog):
         self.name_edit.setEnabled(True)
         self.ratio_spinbox.setEnabled(True)
         self.shuffle_checkbox.setEnabled(True)
+        self.cache_checkbox.setEnabled(True)
+        self.cache_size_spinbox.setEnabled(True)
         self.cancel_btn.setText("关闭")
 
         if success:
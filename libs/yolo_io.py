@@ -1,13 +1,162 @@
 #!/usr/bin/env python
 # -*- coding: utf8 -*-
-import codecs
+import io
 import os
+import threading
 
+import numpy as np
+
+from libs.atomic_file import atomic_write_text
 from libs.constants import DEFAULT_ENCODING
 
 TXT_EXT = '.txt'
+CLASSES_FILE = 'classes.txt'
 ENCODE_METHOD = DEFAULT_ENCODING
 
+# classes.txt cache: abs path -> ((mtime_ns, size), classes)
+_class_list_cache = {}
+_class_list_lock = threading.Lock()
+
+
+def load_class_list(class_list_path):
+    """
+    Return the class names listed in class_list_path.
+
+    The parsed list is cached by path and invalidated when the file's
+    mtime or size changes, so bulk readers do not re-read classes.txt for
+    every label file. A fresh list is returned on each call.
+    """
+    key = os.path.abspath(class_list_path)
+    stat = os.stat(key)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    with _class_list_lock:
+        cached = _class_list_cache.get(key)
+        if cached is not None and cached[0] == stamp:
+            return list(cached[1])
+
+    with open(key, 'r', encoding=ENCODE_METHOD) as classes_file:
+        classes = tuple(classes_file.read().strip('\n').split('\n'))
+
+    with _class_list_lock:
+        _class_list_cache[key] = (stamp, classes)
+    return list(classes)
+
+
+def invalidate_class_list_cache(class_list_path=None):
+    """Drop one cached class list, or all of them when no path is given."""
+    with _class_list_lock:
+        if class_list_path is None:
+            _class_list_cache.clear()
+        else:
+            _class_list_cache.pop(os.path.abspath(class_list_path), None)
+
+
+def parse_yolo_text(text, dtype=np.float32):
+    """
+    Parse the content of a YOLO label file into an (N, 5) array of
+    [class_index, x_center, y_center, w, h] rows.
+
+    The text is tokenised and converted once by NumPy's C text parser,
+    which also checks that every row has the same number of values, so a
+    6-value row followed by a 4-value row is rejected instead of being
+    reshaped across the lines. Files with ragged rows (e.g. segmentation
+    points) fall back to a per-line parse that keeps the first five values
+    of each row. A row with fewer than five values raises ValueError, like
+    the original per-line reader did.
+    """
+    if not text.strip():
+        return np.zeros((0, 5), dtype=dtype)
+
+    try:
+        values = np.loadtxt(io.StringIO(text), dtype=dtype, comments=None, ndmin=2)
+    except ValueError:
+        values = None
+    if values is not None and values.shape[1] >= 5:
+        return np.ascontiguousarray(values[:, :5])
+
+    lines = [line.split() for line in text.splitlines() if line.strip()]
+    for number, parts in enumerate(lines, 1):
+        if len(parts) < 5:
+            raise ValueError('row %d has %d values, expected at least 5' % (number, len(parts)))
+    return np.array([parts[:5] for parts in lines], dtype=dtype)
+
+
+def parse_yolo_labels(file_path, dtype=np.float32):
+    """Read a YOLO .txt label file into an (N, 5) array, see parse_yolo_text."""
+    with open(file_path, 'r', encoding=ENCODE_METHOD) as label_file:
+        return parse_yolo_text(label_file.read(), dtype=dtype)
+
+
+class YoloLabelSet:
+    """
+    All labels of one directory (a dataset split) in a single array.
+
+    boxes holds every row of every file concatenated; the rows of files[i]
+    are boxes[offsets[i]:offsets[i + 1]]. errors maps file paths that could
+    not be parsed to the error message.
+    """
+
+    def __init__(self, files, boxes, offsets, classes=None, errors=None):
+        self.files = files
+        self.boxes = boxes
+        self.offsets = offsets
+        self.classes = classes or []
+        self.errors = errors or {}
+
+    def __len__(self):
+        return len(self.files)
+
+    def labels_for(self, index):
+        return self.boxes[self.offsets[index]:self.offsets[index + 1]]
+
+    def file_index(self):
+        """Return an array with the index into files of every row in boxes."""
+        return np.repeat(np.arange(len(self.files)), np.diff(self.offsets))
+
+    def class_counts(self):
+        """Return {class_index: box count} over the whole set."""
+        if len(self.boxes) == 0:
+            return {}
+        ids, counts = np.unique(self.boxes[:, 0].astype(np.int64), return_counts=True)
+        return dict(zip(ids.tolist(), counts.tolist()))
+
+
+def read_yolo_label_dir(label_dir, class_list_path=None, dtype=np.float32):
+    """
+    Load every YOLO label file in label_dir into a YoloLabelSet.
+
+    classes.txt itself is skipped; it is loaded (through the cache) from
+    class_list_path or label_dir when present.
+    """
+    files = []
+    blocks = []
+    errors = {}
+    for name in sorted(os.listdir(label_dir)):
+        if not name.endswith(TXT_EXT) or name == CLASSES_FILE:
+            continue
+        path = os.path.join(label_dir, name)
+        if not os.path.isfile(path):
+            continue
+        try:
+            blocks.append(parse_yolo_labels(path, dtype=dtype))
+        except (OSError, ValueError) as e:
+            errors[path] = str(e)
+            continue
+        files.append(path)
+
+    offsets = np.zeros(len(blocks) + 1, dtype=np.int64)
+    if blocks:
+        np.cumsum([len(block) for block in blocks], out=offsets[1:])
+        boxes = np.concatenate(blocks)
+    else:
+        boxes = np.zeros((0, 5), dtype=dtype)
+
+    if class_list_path is None:
+        class_list_path = os.path.join(label_dir, CLASSES_FILE)
+    classes = load_class_list(class_list_path) if os.path.isfile(class_list_path) else []
+
+    return YoloLabelSet(files, boxes, offsets, classes, errors)
+
 class YOLOWriter:
 
     def __init__(self, folder_name, filename, img_size, database_src='Unknown', local_img_path=None):
@@ -46,41 +195,29 @@ class YOLOWriter:
 
         return class_index, x_center, y_center, w, h
 
-    def save(self, class_list=[], target_file=None):
-
-        out_file = None  # Update yolo .txt
-        out_class_file = None   # Update class list .txt
+    def save(self, class_list=[], target_file=None, write_classes=True):
 
         if target_file is None:
-            out_file = open(
-            self.filename + TXT_EXT, 'w', encoding=ENCODE_METHOD)
-            classes_file = os.path.join(os.path.dirname(os.path.abspath(self.filename)), "classes.txt")
-            out_class_file = open(classes_file, 'w', encoding=ENCODE_METHOD)
-
-        else:
-            out_file = codecs.open(target_file, 'w', encoding=ENCODE_METHOD)
-            classes_file = os.path.join(os.path.dirname(os.path.abspath(target_file)), "classes.txt")
-            out_class_file = open(classes_file, 'w', encoding=ENCODE_METHOD)
-
+            target_file = self.filename + TXT_EXT
+        classes_file = os.path.join(os.path.dirname(os.path.abspath(target_file)), CLASSES_FILE)
 
+        lines = []
         for box in self.box_list:
             class_index, x_center, y_center, w, h = self.bnd_box_to_yolo_line(box, class_list)
             # print (classIndex, x_center, y_center, w, h)
-            out_file.write("%d %.6f %.6f %.6f %.6f\n" % (class_index, x_center, y_center, w, h))
-
-        # print (classList)
-        # print (out_class_file)
-        for c in class_list:
-            out_class_file.write(c+'\n')
+            lines.append("%d %.6f %.6f %.6f %.6f\n" % (class_index, x_center, y_center, w, h))
 
-        out_class_file.close()
-        out_file.close()
+        atomic_write_text(target_file, ''.join(lines), ENCODE_METHOD)
+        # Bulk writers that share one classes.txt per folder pass write_classes=False
+        if write_classes:
+            atomic_write_text(classes_file, ''.join(c + '\n' for c in class_list), ENCODE_METHOD)
+            invalidate_class_list_cache(classes_file)
 
 
 
 class YoloReader:
 
-    def __init__(self, file_path, image, class_list_path=None):
+    def __init__(self, file_path, image, class_list_path=None, img_size=None):
         # shapes type:
         # [labbel, [(x1,y1), (x2,y2), (x3,y3), (x4,y4)], color, color, difficult]
         self.shapes = []
@@ -94,13 +231,15 @@ class YoloReader:
 
         # print (file_path, self.class_list_path)
 
-        classes_file = open(self.class_list_path, 'r')
-        self.classes = classes_file.read().strip('\n').split('\n')
+        self.classes = load_class_list(self.class_list_path)
 
         # print (self.classes)
 
-        img_size = [image.height(), image.width(),
-                    1 if image.isGrayscale() else 3]
+        # img_size ([height, width, depth]) lets callers without a decoded
+        # image pass the size from the annotation or an image header probe
+        if img_size is None:
+            img_size = [image.height(), image.width(),
+                        1 if image.isGrayscale() else 3]
 
         self.img_size = img_size
 
@@ -134,9 +273,9 @@ class YoloReader:
         return label, x_min, y_min, x_max, y_max
 
     def parse_yolo_format(self):
-        bnd_box_file = open(self.file_path, 'r')
-        for bndBox in bnd_box_file:
-            class_index, x_center, y_center, w, h = bndBox.strip().split(' ')
+        # float64 keeps the pixel rounding identical to parsing each token with float()
+        bnd_boxes = parse_yolo_labels(self.file_path, dtype=np.float64)
+        for class_index, x_center, y_center, w, h in bnd_boxes.tolist():
             label, x_min, y_min, x_max, y_max = self.yolo_line_to_shape(class_index, x_center, y_center, w, h)
 
             # Caveat: difficult flag is discarded when saved as yolo format.
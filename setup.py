@@ -10,7 +10,7 @@ import os
 here = os.path.abspath(os.path.dirname(__file__))
 NAME = 'labelImg'
 REQUIRES_PYTHON = '>=3.0.0'
-REQUIRED_DEP = ['pyqt5', 'lxml', 'PyYAML']
+REQUIRED_DEP = ['pyqt5', 'lxml', 'PyYAML', 'numpy']
 about = {}
 
 with open(os.path.join(here, 'libs', '__init__.py')) as f:
@@ -95,7 +95,8 @@ setup(
     packages=required_packages,
     entry_points={
         'console_scripts': [
-            'labelImg=labelImg.labelImg:main'
+            'labelImg=labelImg.labelImg:main',
+            'labelImg-predict=libs.ai_assistant.headless_predict:main'
         ]
     },
     include_package_data=True,
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, '..'))
+from libs.annotation_database import SOURCE_AI, AnnotationBox, AnnotationDatabase
+from libs.dataset_query import BoxTable
+from libs.pascal_voc_io import PascalVocWriter
+
+
+class TestAnnotationDatabase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db = AnnotationDatabase(os.path.join(self.tmp_dir, '.labelImg', 'annotations.db'))
+
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def write_voc(self, name, objects):
+        image_path = os.path.join(self.tmp_dir, name + '.jpg')
+        shutil.copy(os.path.join(dir_name, u'臉書.jpg'), image_path)
+        writer = PascalVocWriter('tests', name + '.jpg', (32, 33, 3), local_img_path=image_path)
+        for label, box in objects:
+            writer.add_bnd_box(*box, name=label, difficult=0)
+        writer.save(os.path.join(self.tmp_dir, name + '.xml'))
+        return image_path
+
+    def write_yolo(self, name, lines, classes):
+        image_path = os.path.join(self.tmp_dir, name + '.bmp')
+        shutil.copy(os.path.join(dir_name, 'test.512.512.bmp'), image_path)
+        with open(os.path.join(self.tmp_dir, name + '.txt'), 'w') as f:
+            f.write('\n'.join(lines))
+        with open(os.path.join(self.tmp_dir, 'classes.txt'), 'w') as f:
+            f.write('\n'.join(classes))
+        return image_path
+
+    def test_sync_and_queries(self):
+        a = self.write_voc('a', [('cat', (1, 2, 10, 12)), ('dog', (3, 4, 30, 31))])
+        b = self.write_voc('b', [('cat', (1, 1, 5, 5))])
+        c = self.write_yolo('c', ['0 0.5 0.5 0.25 0.25', '1 0.5 0.5 2 2'], ['dog', 'bird'])
+
+        stats = self.db.sync([a, b, c])
+        self.assertEqual((3, 0), (stats['updated'], stats['errors']))
+        self.assertEqual({'cat': 2, 'dog': 2, 'bird': 1}, self.db.class_counts())
+        self.assertEqual({'cat': 2, 'dog': 2, 'bird': 1}, self.db.images_per_class())
+        self.assertEqual([b], self.db.images_containing(['cat'], ['dog']))
+        self.assertEqual([c], self.db.images_containing(['dog'], ['cat']))
+        self.assertEqual([a], self.db.images_containing(['cat', 'dog']))
+        self.assertEqual([], self.db.images_containing(['horse']))
+        self.assertEqual([c], self.db.images_containing(exclude=['cat', 'horse']))
+
+        # 128x128 YOLO box, 512x512 box clamped from 2x2
+        histogram = self.db.box_size_histogram(bins=(0, 16, 128, 512))
+        self.assertEqual([(0, 16, 2), (16, 128, 1), (128, 512, 1), (512, None, 1)], histogram)
+        self.assertEqual(1, self.db.box_size_histogram(bins=(0, 0.5), class_name='bird', normalized=True)[1][2])
+
+        table = BoxTable.from_database(self.db)
+        self.assertEqual(self.db.class_counts(), table.class_counts())
+        self.assertEqual([b], table.image_paths_for(table.select_images({'classes': ['cat'],
+                                                                         'exclude_classes': ['dog']})))
+
+        self.assertEqual(0, self.db.sync([a, b, c])['updated'])
+        stats = self.db.sync([a, c])
+        self.assertEqual((0, 1), (stats['updated'], stats['removed']))
+        self.assertEqual({'cat': 1, 'dog': 2, 'bird': 1}, self.db.class_counts())
+
+    def test_record_annotation_skips_next_sync(self):
+        image_path = self.write_voc('a', [('cat', (1, 2, 10, 12))])
+        self.db.sync([image_path])
+
+        self.write_voc('a', [('dog', (1, 2, 10, 12))])
+        self.db.record_annotation(image_path, os.path.join(self.tmp_dir, 'a.xml'),
+                                  [AnnotationBox('dog', 10, 12, 1, 2, source=SOURCE_AI, confidence=0.9)],
+                                  [32, 33, 3], verified=True)
+        self.assertEqual({'dog': 1}, self.db.class_counts())
+        self.assertEqual(0, self.db.sync([image_path])['updated'])
+        self.assertEqual(1, self.db.box_count())
+
+
+if __name__ == '__main__':
+    unittest.main()
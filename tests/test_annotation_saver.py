@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+import os
+import sys
+import threading
+import unittest
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, '..'))
+from PyQt5.QtCore import Qt
+
+from libs.annotation_saver import AnnotationSaveQueue
+
+
+class TestAnnotationSaveQueue(unittest.TestCase):
+
+    def test_coalesce_and_flush(self):
+        queue = AnnotationSaveQueue()
+        gate = threading.Event()
+        written = []
+
+        queue.enqueue('block.xml', gate.wait)
+        for i in range(5):
+            queue.enqueue('a.xml', lambda i=i: written.append(('a.xml', i)))
+        queue.enqueue('b.xml', lambda: written.append(('b.xml', 0)))
+        self.assertTrue(queue.is_pending('a.xml'))
+
+        gate.set()
+        self.assertTrue(queue.flush(timeout=5))
+        self.assertEqual([('a.xml', 4), ('b.xml', 0)], written)
+        self.assertEqual(0, queue.pending_count())
+        queue.stop(timeout=5)
+
+    def test_failure_signal(self):
+        queue = AnnotationSaveQueue()
+        failures = []
+        # No event loop here, so deliver the signal on the worker thread
+        queue.save_failed.connect(lambda path, error: failures.append((path, error)), Qt.DirectConnection)
+
+        def fail():
+            raise OSError('disk full')
+
+        queue.enqueue('a.xml', fail)
+        self.assertTrue(queue.wait_for(['a.xml'], timeout=5))
+        queue.stop(timeout=5)
+        self.assertEqual([('a.xml', 'disk full')], failures)
+
+
+if __name__ == '__main__':
+    unittest.main()
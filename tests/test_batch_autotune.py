@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+import os
+import sys
+import unittest
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, '..'))
+from libs.ai_assistant.batch_autotune import ProbeResult, auto_tune, candidate_workers
+
+
+def fake_probe(model_path, data_yaml, batch_size, workers, imgsz=640):
+    # 吞吐量随批次增大而饱和，线程数2最快；内存随批次线性增长
+    images_per_second = {4: 10.0, 8: 16.0, 16: 16.4, 32: 16.5}[batch_size] * (1.2 if workers == 2 else 1.0)
+    return ProbeResult(batch_size, workers, images_per_second, peak_rss_mb=100.0 * batch_size)
+
+
+class TestBatchAutoTune(unittest.TestCase):
+
+    def test_candidate_workers(self):
+        self.assertEqual([0, 1], candidate_workers(1))
+        self.assertEqual([0, 2, 8], candidate_workers(16))
+
+    def test_stops_when_throughput_saturates(self):
+        result = auto_tune('m.pt', 'data.yaml', workers_options=[0, 2, 4], memory_budget_mb=10000,
+                           log=lambda message: None, probe_func=fake_probe)
+        self.assertEqual((16, 2), (result.batch_size, result.workers))
+        # batch 32不再探测
+        self.assertNotIn(32, [p.batch_size for p in result.probes])
+
+    def test_memory_budget(self):
+        result = auto_tune('m.pt', 'data.yaml', workers_options=[0, 2, 4], memory_budget_mb=1000,
+                           log=lambda message: None, probe_func=fake_probe)
+        self.assertEqual((8, 2), (result.batch_size, result.workers))
+        self.assertIsNone(auto_tune('m.pt', 'data.yaml', workers_options=[0], memory_budget_mb=100,
+                                    log=lambda message: None, probe_func=fake_probe))
+
+    def test_failed_probe(self):
+        def failing_probe(model_path, data_yaml, batch_size, workers, imgsz=640):
+            if batch_size >= 8:
+                return ProbeResult(batch_size, workers, error="out of memory")
+            return fake_probe(model_path, data_yaml, batch_size, workers)
+        result = auto_tune('m.pt', 'data.yaml', workers_options=[0, 2], memory_budget_mb=None,
+                           log=lambda message: None, probe_func=failing_probe)
+        self.assertEqual((4, 2), (result.batch_size, result.workers))
+
+
+if __name__ == '__main__':
+    unittest.main()
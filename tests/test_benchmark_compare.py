@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, '..', 'benchmarks'))
+from compare_baselines import compare, format_report, main
+
+
+class TestBenchmarkCompare(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def write_results(self, name, stats):
+        path = os.path.join(self.tmp_dir, name)
+        with open(path, 'w') as f:
+            json.dump({'benchmarks': [{'fullname': key, 'stats': {'median': value, 'mean': value, 'min': value}}
+                                      for key, value in stats.items()]}, f)
+        return path
+
+    def test_compare_flags_regressions(self):
+        rows, regressed = compare({'a': 1.0, 'b': 1.0, 'gone': 1.0}, {'a': 1.1, 'b': 1.5, 'new': 2.0}, 20)
+        statuses = {row[0]: row[4] for row in rows}
+        self.assertTrue(regressed)
+        self.assertEqual({'a': 'ok', 'b': 'regression', 'gone': 'removed', 'new': 'new'}, statuses)
+        report = format_report(rows, 20)
+        self.assertIn('+50.0%', report)
+        self.assertIn('1 regression(s)', report)
+
+    def test_exit_status(self):
+        baseline = self.write_results('baseline.json', {'x': 0.002})
+        faster = self.write_results('faster.json', {'x': 0.001})
+        slower = self.write_results('slower.json', {'x': 0.004})
+        self.assertEqual(0, main([baseline, faster]))
+        self.assertEqual(1, main([baseline, slower, '--threshold', '50']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+import os
+import sys
+import unittest
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, '..'))
+from PyQt5.QtCore import QEvent, QObject, QPointF, Qt
+from PyQt5.QtGui import QColor, QImage, QMouseEvent, QPixmap
+from PyQt5.QtWidgets import QApplication, QLabel, QMainWindow
+from libs.canvas import Canvas
+from libs.shape import Shape
+
+
+class PaintRecorder(QObject):
+    """记录画布每次重绘的区域面积"""
+
+    def __init__(self):
+        super().__init__()
+        self.areas = []
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint:
+            self.areas.append(sum(rect.width() * rect.height() for rect in event.region().rects()))
+        return False
+
+
+class Host(QMainWindow):
+    """画布在鼠标移动时会更新主窗口的坐标标签"""
+
+    def __init__(self):
+        super().__init__()
+        self.file_path = 'image.jpg'
+        self.label_coordinates = QLabel()
+
+
+def make_box(x, y, w, h):
+    shape = Shape(label='box', paint_label=True)
+    for point in ((x, y), (x + w, y), (x + w, y + h), (x, y + h)):
+        shape.add_point(QPointF(*point))
+    shape.close()
+    return shape
+
+
+def mouse(event_type, x, y, button=Qt.NoButton):
+    return QMouseEvent(event_type, QPointF(x, y), button if event_type != QEvent.MouseMove else Qt.NoButton,
+                       button, Qt.NoModifier)
+
+
+class TestCanvasRepaint(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.app = None
+
+    def setUp(self):
+        self.host = Host()
+        self.canvas = Canvas()
+        self.host.setCentralWidget(self.canvas)
+        self.host.resize(400, 300)
+        pixmap = QPixmap(400, 300)
+        pixmap.fill(QColor(90, 90, 90))
+        self.canvas.load_pixmap(pixmap)
+        self.canvas.load_shapes([make_box(20, 20, 80, 60), make_box(150, 100, 100, 80), make_box(260, 30, 60, 120)])
+        self.host.show()
+        self.app.processEvents()
+        self.recorder = PaintRecorder()
+        self.canvas.installEventFilter(self.recorder)
+
+    def tearDown(self):
+        self.canvas.removeEventFilter(self.recorder)
+        self.host.close()
+        self.host.deleteLater()
+        self.app.processEvents()
+
+    def move(self, x, y, button=Qt.NoButton):
+        self.canvas.mouseMoveEvent(mouse(QEvent.MouseMove, x, y, button))
+        self.app.processEvents()
+
+    def assert_matches_full_repaint(self):
+        """屏幕上的内容（由多次局部重绘拼成）与一次完整重绘一致"""
+        shown = self.app.primaryScreen().grabWindow(self.host.winId()).toImage()
+        origin = self.canvas.mapTo(self.host, self.canvas.rect().topLeft())
+        shown = shown.copy(origin.x(), origin.y(), self.canvas.width(), self.canvas.height())
+        full = self.canvas.grab().toImage()
+        self.assertEqual(full.convertToFormat(QImage.Format_RGB32), shown.convertToFormat(QImage.Format_RGB32))
+
+    def test_moving_shape_repaints_its_area_only(self):
+        self.move(200, 140)
+        self.canvas.mousePressEvent(mouse(QEvent.MouseButtonPress, 200, 140, Qt.LeftButton))
+        self.app.processEvents()
+        del self.recorder.areas[:]
+        for step in range(1, 15):
+            self.move(200 - step * 5, 140 - step * 3, Qt.LeftButton)
+        full_area = self.canvas.width() * self.canvas.height()
+        self.assertTrue(self.recorder.areas)
+        self.assertLess(max(self.recorder.areas), full_area / 4)
+        self.assert_matches_full_repaint()
+
+    def test_drawing_repaints_crosshair_and_rubber_band_only(self):
+        self.canvas.set_editing(False)
+        self.move(40, 210)
+        del self.recorder.areas[:]
+        for step in range(5):
+            self.move(50 + step * 20, 200 - step * 10)
+        self.canvas.mousePressEvent(mouse(QEvent.MouseButtonPress, 130, 160, Qt.LeftButton))
+        self.app.processEvents()
+        crosshair_areas = self.recorder.areas[:]
+        del self.recorder.areas[:]
+        for step in range(1, 10):
+            self.move(130 + step * 12, 160 + step * 7, Qt.LeftButton)
+        full_area = self.canvas.width() * self.canvas.height()
+        # 最后一次是按下鼠标开始画框时的完整重绘
+        self.assertLess(max(crosshair_areas[:-1]), full_area / 4)
+        self.assertLess(max(self.recorder.areas), full_area / 4)
+        self.assert_matches_full_repaint()
+
+
+if __name__ == '__main__':
+    unittest.main()
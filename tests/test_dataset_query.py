@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, '..'))
+from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import QApplication
+from libs.annotation_database import AnnotationDatabase
+from libs.batch_operations import BatchOperationsDialog
+from libs.create_ml_io import CreateMLWriter
+from libs.dataset_query import BoxTable
+from libs.pascal_voc_io import PascalVocWriter
+
+
+class TestBoxTable(unittest.TestCase):
+
+    def make_table(self):
+        # image 0: 3 small persons, image 1: 1 small person + car, image 2: car only
+        image_ids = np.array([0, 0, 0, 1, 1, 2], dtype=np.int32)
+        class_ids = np.array([0, 0, 0, 0, 1, 1], dtype=np.int32)
+        boxes = np.array([[0, 0, 10, 10], [0, 0, 12, 8], [0, 0, 40, 40],
+                          [5, 5, 15, 15], [0, 0, 100, 50], [0, 0, 20, 20]], dtype=np.float32)
+        difficult = np.array([False, True, False, False, False, False])
+        return BoxTable(['a.jpg', 'b.jpg', 'c.jpg'], ['a.xml', 'b.xml', 'c.xml'], ['person', 'car'],
+                        image_ids, class_ids, boxes, difficult)
+
+    def test_select_images(self):
+        table = self.make_table()
+        small_persons = {'classes': ['person'], 'max_size': 16}
+        self.assertEqual([0, 1], table.select_images(small_persons).tolist())
+        self.assertEqual([0], table.select_images(dict(small_persons, min_boxes=2)).tolist())
+        self.assertEqual([1], table.select_images(dict(small_persons, max_boxes=1)).tolist())
+        self.assertEqual([0, 1], table.select_images(dict(small_persons, max_boxes=1,
+                                                          exclude_difficult=True)).tolist())
+        self.assertEqual([0], table.select_images({'classes': ['person'], 'exclude_classes': ['car']}).tolist())
+        self.assertEqual([2], table.select_images({'classes': ['person'], 'min_boxes': 0,
+                                                   'max_boxes': 0}).tolist())
+        self.assertEqual([], table.select_images({'classes': ['horse']}).tolist())
+        self.assertEqual({'person': 3, 'car': 1}, table.class_counts({'max_size': 20}))
+
+    def test_subset(self):
+        subset = self.make_table().subset([2, 0])
+        self.assertEqual(['c.jpg', 'a.jpg'], subset.image_paths)
+        self.assertEqual(['c.xml', 'a.xml'], subset.annotation_files)
+        self.assertEqual([1, 1, 1, 0], subset.image_ids.tolist())
+        self.assertEqual([0, 0, 0, 1], subset.class_ids.tolist())
+        self.assertEqual([10, 12, 40, 20], subset.boxes[:, 2].tolist())
+        self.assertEqual(['person', 'car'], subset.class_names)
+
+    def test_from_annotation_dir(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            for name, objects in (('a', [('person', (1, 1, 10, 10))]), ('b', [('car', (1, 1, 30, 30))])):
+                shutil.copy(os.path.join(dir_name, u'臉書.jpg'), os.path.join(tmp_dir, name + '.jpg'))
+                writer = PascalVocWriter('tests', name + '.jpg', (32, 33, 3))
+                for label, box in objects:
+                    writer.add_bnd_box(*box, name=label, difficult=0)
+                writer.save(os.path.join(tmp_dir, name + '.xml'))
+            shutil.copy(os.path.join(dir_name, 'test.512.512.bmp'), os.path.join(tmp_dir, 'c.bmp'))
+            with open(os.path.join(tmp_dir, 'c.txt'), 'w') as f:
+                f.write('0 0.5 0.5 0.25 0.25\n')
+            with open(os.path.join(tmp_dir, 'classes.txt'), 'w') as f:
+                f.write('person\n')
+
+            table = BoxTable.from_annotation_dir(tmp_dir, workers=1)
+            self.assertEqual({'person': 2, 'car': 1}, table.class_counts())
+            self.assertEqual([192, 192, 320, 320], table.boxes[-1].tolist())
+            image_ids = table.select_images({'classes': ['person'], 'min_size': 64})
+            self.assertEqual([os.path.join(tmp_dir, 'c.bmp')], table.image_paths_for(image_ids))
+            self.assertEqual([os.path.join(tmp_dir, 'c.txt')], table.annotation_files_for(image_ids))
+        finally:
+            shutil.rmtree(tmp_dir)
+
+
+class TestFilterDialog(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.app = None
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.images = []
+        for name, label in (('a', 'person'), ('b', 'car')):
+            image = os.path.join(self.tmp_dir, name + '.jpg')
+            shutil.copy(os.path.join(dir_name, u'臉書.jpg'), image)
+            writer = PascalVocWriter('tests', name + '.jpg', (32, 33, 3))
+            writer.add_bnd_box(1, 1, 30, 30, name=label, difficult=0)
+            writer.save(os.path.join(self.tmp_dir, name + '.xml'))
+            self.images.append(image)
+        self.dialog = BatchOperationsDialog()
+        self.dialog.filter_source_edit.setText(self.tmp_dir)
+        self.dialog.filter_classes_edit.setText('person')
+        self.dialog.filter_min_size_spin.setValue(0)
+        self.selected = []
+        self.dialog.images_selected.connect(self.selected.append)
+
+    def tearDown(self):
+        self.dialog.deleteLater()
+        self.app.processEvents()
+        shutil.rmtree(self.tmp_dir)
+
+    def run_filter(self):
+        self.dialog.start_filter_operation()
+        self.assertFalse(self.dialog.start_btn.isEnabled())
+        while self.dialog.query_thread is not None:
+            self.app.processEvents()
+
+    def test_query_runs_in_background(self):
+        self.run_filter()
+        self.assertEqual([[self.images[0]]], self.selected)
+
+    def test_query_uses_project_database(self):
+        database = AnnotationDatabase(os.path.join(self.tmp_dir, 'db', 'annotations.db'))
+        try:
+            database.sync(self.images)
+            # 数据库中的记录优先：删掉标注文件后仍能查询
+            os.remove(os.path.join(self.tmp_dir, 'a.xml'))
+            self.dialog.set_annotation_database(database, [self.tmp_dir])
+            self.run_filter()
+        finally:
+            database.close()
+        self.assertEqual([[os.path.abspath(self.images[0])]], self.selected)
+
+    def test_database_images_without_annotation_skipped(self):
+        unlabeled = os.path.join(self.tmp_dir, 'c.jpg')
+        shutil.copy(self.images[0], unlabeled)
+        database = AnnotationDatabase(os.path.join(self.tmp_dir, 'db', 'annotations.db'))
+        target_dir = os.path.join(self.tmp_dir, 'copy')
+        try:
+            database.sync(self.images + [unlabeled])
+            self.dialog.set_annotation_database(database, [self.tmp_dir])
+            # 不含person的图片：b.jpg和没有标注文件的c.jpg
+            self.dialog.filter_max_boxes_spin.setValue(0)
+            self.dialog.filter_min_boxes_spin.setValue(0)
+            self.dialog.filter_exclude_classes_edit.setText('person')
+            self.dialog.filter_target_edit.setText(target_dir)
+            self.dialog.filter_action_combo.setCurrentIndex(1)
+            self.close_message_boxes()
+            self.run_filter()
+        finally:
+            database.close()
+        self.assertEqual(['b.jpg', 'b.xml'], sorted(os.listdir(target_dir)))
+
+    def close_message_boxes(self):
+        """关闭操作过程中弹出的提示框"""
+        self.closer = QTimer()
+        self.closer.timeout.connect(lambda: self.app.activeModalWidget() and self.app.activeModalWidget().reject())
+        self.closer.start(20)
+        self.addCleanup(self.closer.stop)
+
+    def test_shared_createml_file_refused(self):
+        json_path = os.path.join(self.tmp_dir, 'annotations.json')
+        for name, label in (('c.jpg', 'person'), ('d.jpg', 'car')):
+            shapes = [{'label': label, 'points': [(1, 1), (30, 1), (30, 30), (1, 30)], 'difficult': False}]
+            CreateMLWriter('tests', name, (32, 33, 3), shapes, json_path).write()
+        target_dir = os.path.join(self.tmp_dir, 'copy')
+        self.dialog.filter_target_edit.setText(target_dir)
+        self.dialog.filter_action_combo.setCurrentIndex(1)
+        self.close_message_boxes()
+        self.run_filter()
+        # 复制会连带未匹配图片d.jpg的标注，整个操作被拒绝
+        self.assertFalse(os.path.exists(target_dir))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+from PIL import Image
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, '..'))
+from libs.ai_assistant.export_benchmark import (benchmark_latency, benchmark_report_path, letterbox,
+                                                measure_latency, run_export_benchmark, summarize_accuracy,
+                                                summarize_latency)
+
+try:
+    import torch
+    TORCH_INSTALLED = True
+except ImportError:
+    TORCH_INSTALLED = False
+
+
+class TestExportBenchmark(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_latency_percentiles(self):
+        calls = []
+        samples = measure_latency(lambda: calls.append(1), warmup=2, max_runs=10, min_runs=3, max_seconds=60)
+        self.assertEqual(12, len(calls))
+        self.assertEqual(10, len(samples))
+
+        stats = summarize_latency(np.array([0.01] * 9 + [0.1]), batch_size=4, threads=2)
+        self.assertAlmostEqual(10.0, stats.p50_ms)
+        self.assertGreater(stats.p99_ms, 90.0)
+        self.assertAlmostEqual(4 / 0.019, stats.images_per_second, places=3)
+
+    @unittest.skipUnless(TORCH_INSTALLED, "requires torch")
+    def test_torchscript_threads_restored(self):
+        model_path = os.path.join(self.tmp_dir, 'model.torchscript')
+        torch.jit.script(torch.nn.Conv2d(3, 4, 3)).save(model_path)
+        previous = torch.get_num_threads()
+        samples = [np.zeros((3, 32, 32), dtype=np.float32)]
+        results = benchmark_latency(model_path, 'torchscript', 32, samples, batch_sizes=[1],
+                                    thread_counts=[previous + 1], log=lambda message: None)
+        self.assertEqual(1, len(results))
+        self.assertEqual(previous, torch.get_num_threads())
+
+    def test_letterbox_pads_to_square(self):
+        path = os.path.join(self.tmp_dir, 'wide.png')
+        Image.new('RGB', (400, 200), (255, 255, 255)).save(path)
+        tensor = letterbox(path, 64)
+        self.assertEqual((3, 64, 64), tensor.shape)
+        self.assertAlmostEqual(114 / 255, float(tensor[0, 0, 0]), places=5)
+        self.assertAlmostEqual(1.0, float(tensor[0, 32, 32]), places=5)
+
+    def test_accuracy_comparison(self):
+        reference = np.array([[0, 0, 10, 10, 0.9, 0], [20, 20, 40, 40, 0.8, 1]])
+        exported = np.array([[0, 0, 10, 11, 0.88, 0], [20, 20, 40, 40, 0.7, 0]])
+        accuracy = summarize_accuracy([(reference, exported), (np.zeros((0, 6)), np.zeros((0, 6)))])
+        self.assertEqual(2, accuracy.images)
+        self.assertEqual(1, accuracy.matched_boxes)
+        self.assertAlmostEqual(0.5, accuracy.match_rate)
+        self.assertAlmostEqual(100 / 110, accuracy.mean_iou, places=6)
+        self.assertAlmostEqual(0.02, accuracy.max_score_drift, places=6)
+
+    def test_report_saved_when_runtime_missing(self):
+        exported = os.path.join(self.tmp_dir, 'model.xyz')
+        open(exported, 'wb').close()
+        logs = []
+        report = run_export_benchmark('model.pt', exported, 'onnx', 64, [], log=logs.append)
+        try:
+            import onnxruntime  # noqa: F401
+        except ImportError:
+            self.assertEqual([], report.latency)
+            self.assertTrue(any('onnxruntime' in note for note in report.notes))
+        with open(benchmark_report_path(exported), encoding='utf-8') as f:
+            saved = json.load(f)
+        self.assertEqual('onnx', saved['export_format'])
+        self.assertEqual(report.notes, saved['notes'])
+
+
+if __name__ == '__main__':
+    unittest.main()
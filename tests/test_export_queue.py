@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, '..'))
+from libs.ai_assistant.export_queue import (MANIFEST_NAME, STATUS_QUEUED, ExportJob, ExportQueue, JobResult,
+                                            artifact_sha256, artifact_size, write_manifest)
+
+try:
+    import ultralytics  # noqa: F401
+    ULTRALYTICS_INSTALLED = True
+except ImportError:
+    ULTRALYTICS_INSTALLED = False
+
+
+class TestExportQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def write(self, relative, data):
+        path = os.path.join(self.tmp_dir, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def test_job_label(self):
+        job = ExportJob('1', 'onnx', 'model', {'imgsz': 640, 'dynamic': True, 'opset': 12})
+        self.assertEqual('onnx(dynamic=True, opset=12)', job.label)
+        self.assertEqual('tflite', ExportJob('2', 'tflite', 'model', {'imgsz': 640}).label)
+
+    def test_artifact_size_and_hash(self):
+        model = self.write('model.onnx', b'weights')
+        self.assertEqual(7, artifact_size(model))
+        self.assertEqual(hashlib.sha256(b'weights').hexdigest(), artifact_sha256(model))
+
+        self.write('pkg.mlpackage/a.bin', b'abc')
+        self.write('pkg.mlpackage/sub/b.bin', b'de')
+        package = os.path.join(self.tmp_dir, 'pkg.mlpackage')
+        self.assertEqual(5, artifact_size(package))
+        first = artifact_sha256(package)
+        self.write('pkg.mlpackage/sub/b.bin', b'dx')
+        self.assertNotEqual(first, artifact_sha256(package))
+
+    def test_manifest(self):
+        source = self.write('best.pt', b'checkpoint')
+        results = [JobResult('1', 'onnx', True, 'best.onnx', 10, 'abc', 1.5, {'dynamic': True}),
+                   JobResult('2', 'tflite', False, error='boom')]
+        path = write_manifest(self.tmp_dir, source, results)
+        with open(path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        self.assertEqual(hashlib.sha256(b'checkpoint').hexdigest(), manifest['source_sha256'])
+        self.assertEqual(['onnx', 'tflite'], [a['export_format'] for a in manifest['artifacts']])
+        self.assertEqual('boom', manifest['artifacts'][1]['error'])
+
+    @unittest.skipIf(ULTRALYTICS_INSTALLED, "checks the failure path without ultralytics")
+    def test_queue_reports_failures_and_writes_manifest(self):
+        source = self.write('best.pt', b'checkpoint')
+        output_dir = os.path.join(self.tmp_dir, 'out')
+        events = []
+        jobs = [ExportJob('1', 'onnx', 'a'), ExportJob('2', 'torchscript', 'b')]
+        results = ExportQueue(source, jobs, output_dir, max_workers=2, on_event=events.append).run()
+        self.assertEqual(['1', '2'], [result.job_id for result in results])
+        self.assertFalse(any(result.success for result in results))
+        self.assertIn(('status', '1', STATUS_QUEUED), events)
+        self.assertEqual(2, sum(1 for event in events if event[0] == 'result'))
+        self.assertTrue(os.path.exists(os.path.join(output_dir, MANIFEST_NAME)))
+
+
+if __name__ == '__main__':
+    unittest.main()
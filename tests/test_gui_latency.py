@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, '..', 'benchmarks'))
+from gui_latency import build_report, format_table, image_dimensions, make_scenario, summarize
+
+from libs.pascal_voc_io import PascalVocReader
+
+
+class TestGuiLatency(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_make_scenario(self):
+        width, height = image_dimensions(0.012)
+        self.assertAlmostEqual(4 / 3, width / height, places=1)
+        folder = make_scenario(self.tmp_dir, 0.012, 25, 3)
+        names = sorted(os.listdir(folder))
+        self.assertEqual(['image_0000.jpg', 'image_0000.xml', 'image_0001.jpg', 'image_0001.xml',
+                          'image_0002.jpg', 'image_0002.xml'], names)
+        shapes = PascalVocReader(os.path.join(folder, 'image_0001.xml')).get_shapes()
+        self.assertEqual(25, len(shapes))
+        for _, points, _, _, _ in shapes:
+            self.assertTrue(all(0 <= x <= width and 0 <= y <= height for x, y in points))
+
+    def test_report(self):
+        stats = summarize([0.001 * i for i in range(1, 101)])
+        self.assertEqual(100, stats['rounds'])
+        self.assertAlmostEqual(0.0505, stats['median'])
+        self.assertAlmostEqual(0.09901, stats['p99'], places=6)
+        self.assertEqual({'rounds': 0}, summarize([]))
+
+        report = build_report([({'megapixels': 1, 'boxes': 10}, {'paint': [0.002, 0.004], 'hover.repaint': []})])
+        self.assertEqual(['mp1_boxes10::paint', 'mp1_boxes10::hover.repaint'],
+                         [bench['fullname'] for bench in report['benchmarks']])
+        table = format_table(report)
+        self.assertIn('| mp1_boxes10 | paint | 2 | 3.00 |', table)
+        self.assertIn('| mp1_boxes10 | hover.repaint | 0 | - |', table)
+
+
+if __name__ == '__main__':
+    unittest.main()
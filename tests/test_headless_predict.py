@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, '..'))
+from libs.ai_assistant.batch_processor import scan_images
+from libs.ai_assistant.headless_predict import (EXIT_MODEL_ERROR, ThroughputMeter, annotation_path,
+                                                detection_shapes, ensure_class_list, main, plan_work, run,
+                                                write_annotation)
+from libs.ai_assistant.yolo_predictor import Detection
+from libs.create_ml_io import CreateMLReader
+from libs.pascal_voc_io import PascalVocReader
+from libs.yolo_io import YoloReader, load_class_list
+
+try:
+    import ultralytics  # noqa: F401
+    ULTRALYTICS_INSTALLED = True
+except ImportError:
+    ULTRALYTICS_INSTALLED = False
+
+IMAGE_SHAPE = [200, 300, 3]
+
+
+class KillWorker:
+    """在工作进程中反序列化时直接结束该进程，模拟内存耗尽等异常退出"""
+
+    def __reduce__(self):
+        return os._exit, (1,)
+
+
+class TestHeadlessPredict(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def touch(self, relative):
+        path = os.path.join(self.tmp_dir, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        open(path, 'wb').close()
+        return path
+
+    def test_scan_images(self):
+        expected = [self.touch('a.jpg'), self.touch('b.PNG'), self.touch('sub/c.Jpeg')]
+        self.touch('notes.txt')
+        self.touch('sub/d.xml')
+        self.assertEqual(sorted(expected), scan_images(self.tmp_dir))
+        self.assertEqual(sorted(expected[:2]), scan_images(self.tmp_dir, recursive=False))
+        self.assertEqual([], scan_images(os.path.join(self.tmp_dir, 'missing')))
+
+    def test_annotation_path(self):
+        image = os.path.join(self.tmp_dir, 'sub', 'img.jpg')
+        self.assertEqual(os.path.join(self.tmp_dir, 'sub', 'img.xml'), annotation_path(image, self.tmp_dir, 'voc'))
+        out = os.path.join(self.tmp_dir, 'labels')
+        self.assertEqual(os.path.join(out, 'sub', 'img.txt'), annotation_path(image, self.tmp_dir, 'yolo', out))
+
+    def test_plan_skips_existing_annotations(self):
+        images = [self.touch('a.jpg'), self.touch('b.jpg'), self.touch('sub/c.jpg')]
+        self.touch('a.xml')
+        todo, skipped = plan_work(images, self.tmp_dir, 'voc')
+        self.assertEqual(1, skipped)
+        self.assertEqual([images[1], images[2]], [image for image, _ in todo])
+        self.assertEqual(os.path.join(self.tmp_dir, 'sub', 'c.xml'), todo[1][1])
+
+        # 其他格式的标注不算已完成
+        todo, skipped = plan_work(images, self.tmp_dir, 'yolo')
+        self.assertEqual((3, 0), (len(todo), skipped))
+        todo, skipped = plan_work(images, self.tmp_dir, 'voc', overwrite=True)
+        self.assertEqual((3, 0), (len(todo), skipped))
+
+    def detections(self):
+        return [Detection((10.0, 20.0, 110.0, 80.0), 0.9, 0, 'person', 300, 200),
+                Detection((150.0, 40.0, 250.0, 190.0), 0.7, 2, 'car', 300, 200)]
+
+    def assert_boxes(self, shapes):
+        boxes = [(label, [tuple(round(v) for v in point) for point in points]) for label, points, *_ in shapes]
+        self.assertEqual([('person', [(10, 20), (110, 20), (110, 80), (10, 80)]),
+                          ('car', [(150, 40), (250, 40), (250, 190), (150, 190)])], boxes)
+
+    def test_write_voc(self):
+        image = self.touch('img.jpg')
+        target = os.path.join(self.tmp_dir, 'img.xml')
+        write_annotation('voc', target, image, IMAGE_SHAPE, detection_shapes(self.detections()))
+        self.assert_boxes(PascalVocReader(target).get_shapes())
+
+    def test_write_yolo_keeps_existing_class_ids(self):
+        image = self.touch('img.jpg')
+        with open(os.path.join(self.tmp_dir, 'classes.txt'), 'w') as f:
+            f.write('dog\ncar\n')
+        class_list = ensure_class_list(self.tmp_dir, ['person', 'bicycle', 'car'])
+        self.assertEqual(['dog', 'car', 'person', 'bicycle'], class_list)
+        self.assertEqual(class_list, load_class_list(os.path.join(self.tmp_dir, 'classes.txt')))
+
+        target = os.path.join(self.tmp_dir, 'img.txt')
+        write_annotation('yolo', target, image, IMAGE_SHAPE, detection_shapes(self.detections()), class_list)
+        with open(target) as f:
+            self.assertEqual(['2', '1'], [line.split()[0] for line in f])
+        self.assert_boxes(YoloReader(target, None, img_size=IMAGE_SHAPE).get_shapes())
+
+    def test_write_createml_and_empty_annotation(self):
+        image = self.touch('img.jpg')
+        target = os.path.join(self.tmp_dir, 'img.json')
+        write_annotation('createml', target, image, IMAGE_SHAPE, detection_shapes(self.detections()))
+        self.assert_boxes(CreateMLReader(target, image).get_shapes())
+
+        # 没有检测结果也写出标注文件，下次运行时跳过
+        empty = self.touch('empty.jpg')
+        target = os.path.join(self.tmp_dir, 'empty.xml')
+        write_annotation('voc', target, empty, IMAGE_SHAPE, [])
+        self.assertEqual([], PascalVocReader(target).get_shapes())
+        self.assertEqual(([], 1), plan_work([empty], self.tmp_dir, 'voc'))
+
+    def test_throughput_meter(self):
+        meter = ThroughputMeter(10)
+        meter.add(4, 1, 12)
+        self.assertEqual((4, 1, 12), (meter.done, meter.failed, meter.boxes))
+        self.assertGreater(meter.overall_rate(), 0)
+        self.assertIn('4/10', meter.format_line())
+
+    @unittest.skipIf(ULTRALYTICS_INSTALLED, "checks the failure path without ultralytics")
+    def test_model_error_stops_run(self):
+        images = [self.touch(f'{i}.jpg') for i in range(5)]
+        items, _ = plan_work(images, self.tmp_dir, 'voc')
+        options = {'format': 'voc', 'conf': 0.25, 'iou': 0.45, 'max_det': 100, 'class_conf': {},
+                   'min_box_size': 10, 'max_overlap': 0.8, 'device': 'cpu', 'threads': 1, 'log_level': 40}
+        meter, failures, model_error = run('missing.pt', items, options, workers=1, chunk_size=2,
+                                           out=io.StringIO())
+        self.assertIn('加载模型失败', model_error)
+        self.assertEqual(0, meter.done)
+        self.assertFalse(any(os.path.exists(target) for _, target in items))
+
+    def test_worker_crash_fails_chunks(self):
+        images = [self.touch(f'{i}.jpg') for i in range(6)]
+        items, _ = plan_work(images, self.tmp_dir, 'voc')
+        out = io.StringIO()
+        meter, failures, model_error = run('missing.pt', items, {'crash': KillWorker()}, workers=1, chunk_size=2,
+                                           out=out)
+        self.assertEqual('', model_error)
+        self.assertEqual((6, 6), (meter.done, meter.failed))
+        self.assertEqual(images, sorted(image_path for image_path, _ in failures))
+        self.assertIn('重建进程池', out.getvalue())
+
+    @unittest.skipIf(ULTRALYTICS_INSTALLED, "checks the failure path without ultralytics")
+    def test_main_exit_code_without_yolo(self):
+        self.touch('a.jpg')
+        self.assertEqual(EXIT_MODEL_ERROR, main(['missing.pt', self.tmp_dir]))
+
+
+if __name__ == '__main__':
+    unittest.main()
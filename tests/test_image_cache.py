@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+import yaml
+from PIL import Image
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, '..'))
+from libs.image_cache import build_image_cache
+from libs.incremental_training import dataset_images, label_path_for
+from libs.pascal_to_yolo_converter import PascalToYOLOConverter
+from libs.pascal_voc_io import PascalVocWriter
+
+
+class TestImageCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def make_image(self, name, size):
+        path = os.path.join(self.tmp_dir, name)
+        Image.new('RGB', size, (200, 30, 30)).save(path)
+        return path
+
+    def test_build_is_incremental(self):
+        big = self.make_image('big.jpg', (2000, 1000))
+        small = self.make_image('small.png', (300, 200))
+        cache_dir = os.path.join(self.tmp_dir, 'cache')
+        pairs = [(big, os.path.join(cache_dir, 'big.jpg')), (small, os.path.join(cache_dir, 'small.png'))]
+
+        stats = build_image_cache(pairs, 640, workers=1)
+        self.assertEqual((1, 1, 0), (stats['resized'], stats['copied'], stats['skipped']))
+        with Image.open(pairs[0][1]) as img:
+            self.assertEqual((640, 320), img.size)
+
+        self.assertEqual(2, build_image_cache(pairs, 640, workers=1)['skipped'])
+        later = time.time() + 10
+        os.utime(big, (later, later))
+        stats = build_image_cache(pairs, 640, workers=1)
+        self.assertEqual((1, 1), (stats['resized'], stats['skipped']))
+
+    def test_converter_points_data_yaml_at_cache(self):
+        source_dir = os.path.join(self.tmp_dir, 'source')
+        os.makedirs(source_dir)
+        for i in range(4):
+            name = f'img{i}.jpg'
+            Image.new('RGB', (1200, 800)).save(os.path.join(source_dir, name))
+            writer = PascalVocWriter('source', name, (800, 1200, 3))
+            writer.add_bnd_box(100, 100, 600, 400, 'cat', 0)
+            writer.save(os.path.join(source_dir, f'img{i}.xml'))
+
+        converter = PascalToYOLOConverter(source_dir, os.path.join(self.tmp_dir, 'out'), train_ratio=0.5,
+                                          use_class_config=False, image_cache_size=320, cache_workers=1)
+        converter.classes = ['cat']
+        converter.class_to_id = {'cat': 0}
+        success, report = converter.convert()
+        self.assertTrue(success, report)
+
+        data_yaml = os.path.join(converter.dataset_path, 'data.yaml')
+        with open(data_yaml, encoding='utf-8') as f:
+            self.assertEqual('cache_320/train.txt', yaml.safe_load(f)['train'])
+        images = dataset_images(data_yaml, 'train') + dataset_images(data_yaml, 'val')
+        self.assertEqual(4, len(images))
+        for image in images:
+            self.assertIn(os.path.join('cache_320', 'images'), image)
+            self.assertTrue(os.path.exists(label_path_for(image)))
+            with Image.open(image) as img:
+                self.assertEqual((320, 213), img.size)
+        self.assertEqual(4, converter.cache_stats['resized'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+import os
+import struct
+import sys
+import tempfile
+import unittest
+import zlib
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, '..'))
+from libs.image_geometry import probe_image_geometry, read_image_geometry
+
+
+def png_bytes(width, height, color_type):
+    ihdr = struct.pack('>IIBBBBB', width, height, 8, color_type, 0, 0, 0)
+    chunk = struct.pack('>I', len(ihdr)) + b'IHDR' + ihdr + struct.pack('>I', zlib.crc32(b'IHDR' + ihdr))
+    return b'\x89PNG\r\n\x1a\n' + chunk
+
+
+class TestImageGeometry(unittest.TestCase):
+
+    def test_bmp_and_jpeg(self):
+        bmp = read_image_geometry(os.path.join(dir_name, 'test.512.512.bmp'))
+        self.assertEqual((512, 512), (bmp.width, bmp.height))
+        jpeg = read_image_geometry(os.path.join(dir_name, u'臉書.jpg'))
+        self.assertEqual((33, 32, 3, 1), tuple(jpeg))
+        self.assertEqual([32, 33, 3], jpeg.to_image_shape())
+
+    def test_png_cache_follows_mtime(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'a.png')
+            with open(path, 'wb') as f:
+                f.write(png_bytes(640, 480, 0))
+            geometry = probe_image_geometry(path)
+            self.assertEqual((640, 480, 1), (geometry.width, geometry.height, geometry.channels))
+
+            with open(path, 'wb') as f:
+                f.write(png_bytes(1920, 1080, 6))
+            os.utime(path, ns=(0, 10 ** 9))
+            geometry = probe_image_geometry(path)
+            self.assertEqual((1920, 1080, 4), (geometry.width, geometry.height, geometry.channels))
+
+    def test_unknown_format(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'a.jpg')
+            with open(path, 'wb') as f:
+                f.write(b'not an image')
+            self.assertIsNone(probe_image_geometry(path))
+            self.assertIsNone(probe_image_geometry(os.path.join(tmp_dir, 'missing.jpg')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import yaml
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, '..'))
+from libs.incremental_training import (MAX_EPOCHS, MIN_EPOCHS, choose_epochs, dataset_images,
+                                       plan_incremental_training, sample_replay, write_incremental_dataset)
+from libs.training_history_manager import TrainingHistoryManager
+
+
+class TestIncrementalTraining(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.data_yaml = os.path.join(self.tmp_dir, 'data.yaml')
+        for split in ('train', 'val'):
+            os.makedirs(os.path.join(self.tmp_dir, 'images', split))
+            os.makedirs(os.path.join(self.tmp_dir, 'labels', split))
+        with open(self.data_yaml, 'w') as f:
+            yaml.dump({'path': self.tmp_dir, 'train': 'images/train', 'val': 'images/val',
+                       'names': {0: 'person', 1: 'car', 2: 'bike'}}, f)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def add_image(self, name, class_ids, split='train'):
+        image = os.path.join(self.tmp_dir, 'images', split, name + '.jpg')
+        open(image, 'wb').close()
+        with open(os.path.join(self.tmp_dir, 'labels', split, name + '.txt'), 'w') as f:
+            f.writelines(f"{c} 0.5 0.5 0.1 0.1\n" for c in class_ids)
+        return image
+
+    def test_sample_replay_covers_rare_classes(self):
+        old = [self.add_image(f"person_{i:04d}", [0]) for i in range(90)]
+        old += [self.add_image(f"bike_{i:04d}", [2]) for i in range(3)]
+        replay, class_counts = sample_replay(old, 10)
+        self.assertEqual(10, len(replay))
+        self.assertEqual(3, class_counts[2])
+        self.assertEqual(replay, sample_replay(old, 10)[0])
+
+    def test_plan_and_write(self):
+        old = [self.add_image(f"old_image_{i:04d}", [i % 2]) for i in range(100)]
+        new = [self.add_image(f"new_image_{i:04d}", [2]) for i in range(20)]
+        self.add_image('val_image_0000', [0], 'val')
+        history = TrainingHistoryManager(os.path.join(self.tmp_dir, 'history.json'))
+        history.add_training_session('s', self.data_yaml, old, model_path='best.pt')
+
+        plan = plan_incremental_training(self.data_yaml, history, batch_size=16, learning_rate=0.01)
+        self.assertEqual(new, plan.new_images)
+        self.assertEqual(50, len(plan.replay_images))
+        self.assertTrue(set(plan.replay_images) <= set(old))
+        self.assertEqual({0: 25, 1: 25}, plan.replay_class_counts)
+        self.assertAlmostEqual(0.001, plan.learning_rate)
+
+        incremental_yaml = write_incremental_dataset(plan, self.data_yaml)
+        self.assertEqual(plan.train_images, dataset_images(incremental_yaml, 'train'))
+        self.assertEqual(dataset_images(self.data_yaml, 'val'), dataset_images(incremental_yaml, 'val'))
+
+        history.add_training_session('s2', incremental_yaml, new)
+        self.assertIsNone(plan_incremental_training(self.data_yaml, history, 16, 0.01))
+
+    def test_choose_epochs(self):
+        self.assertEqual(MAX_EPOCHS, choose_epochs(50, 16))
+        self.assertEqual(MIN_EPOCHS, choose_epochs(100000, 16))
+        self.assertEqual(10, choose_epochs(960, 16))
+
+
+if __name__ == '__main__':
+    unittest.main()
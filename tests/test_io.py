@@ -96,6 +96,158 @@ class TestCreateMLRW(unittest.TestCase):
         self.assertEqual(250, y_min, 'ymin is wrong')
         self.assertEqual(365, y_max, 'ymax is wrong')
 
+class TestYoloIO(unittest.TestCase):
+
+    def setUp(self):
+        dir_name = os.path.abspath(os.path.dirname(__file__))
+        sys.path.insert(0, os.path.join(dir_name, '..'))
+        import tempfile
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.label_dir = self.tmp_dir.name
+        with open(os.path.join(self.label_dir, 'classes.txt'), 'w') as f:
+            f.write('person\nface\n')
+        with open(os.path.join(self.label_dir, 'a.txt'), 'w') as f:
+            f.write('0 0.500000 0.500000 0.250000 0.500000\n1 0.100000 0.200000 0.100000 0.100000\n')
+        with open(os.path.join(self.label_dir, 'b.txt'), 'w') as f:
+            f.write('')
+        with open(os.path.join(self.label_dir, 'c.txt'), 'w') as f:
+            f.write('1 0.5 0.5 0.2 0.2 0.1 0.1\n')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_parse_labels(self):
+        from libs.yolo_io import parse_yolo_labels
+        boxes = parse_yolo_labels(os.path.join(self.label_dir, 'a.txt'))
+        self.assertEqual((2, 5), boxes.shape)
+        self.assertEqual('float32', str(boxes.dtype))
+        self.assertEqual(1, int(boxes[1, 0]))
+        self.assertEqual((0, 5), parse_yolo_labels(os.path.join(self.label_dir, 'b.txt')).shape)
+        self.assertEqual((1, 5), parse_yolo_labels(os.path.join(self.label_dir, 'c.txt')).shape)
+
+    def test_parse_mixed_row_lengths(self):
+        from libs.yolo_io import parse_yolo_text
+        # 6 + 4 values add up to two rows' worth but must not be reshaped across lines
+        with self.assertRaises(ValueError):
+            parse_yolo_text('0 .5 .5 .1 .1 9\n1 .5 .5 .1')
+        boxes = parse_yolo_text('0 .5 .5 .1 .1 9\n1 .5 .5 .1 .1\n')
+        self.assertEqual([0, 1], boxes[:, 0].tolist())
+        self.assertEqual([0.5, 0.5], boxes[:, 1].tolist())
+
+    def test_class_list_cache(self):
+        from libs.yolo_io import load_class_list
+        classes_path = os.path.join(self.label_dir, 'classes.txt')
+        self.assertEqual(['person', 'face'], load_class_list(classes_path))
+        with open(classes_path, 'w') as f:
+            f.write('person\nface\ncar\n')
+        self.assertEqual(['person', 'face', 'car'], load_class_list(classes_path))
+
+    def test_read_dir(self):
+        from libs.yolo_io import read_yolo_label_dir
+        label_set = read_yolo_label_dir(self.label_dir)
+        self.assertEqual(3, len(label_set))
+        self.assertEqual((3, 5), label_set.boxes.shape)
+        self.assertEqual([0, 2, 2, 3], label_set.offsets.tolist())
+        self.assertEqual(0, len(label_set.labels_for(1)))
+        self.assertEqual({0: 1, 1: 2}, label_set.class_counts())
+        self.assertEqual(['person', 'face'], label_set.classes)
+
+class TestVocIO(unittest.TestCase):
+
+    def setUp(self):
+        dir_name = os.path.abspath(os.path.dirname(__file__))
+        sys.path.insert(0, os.path.join(dir_name, '..'))
+        import tempfile
+        from libs.pascal_voc_io import PascalVocWriter
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.xml_dir = self.tmp_dir.name
+        for i in range(3):
+            writer = PascalVocWriter('tests', 'img%d.jpg' % i, (480, 640, 3))
+            writer.verified = i == 0
+            writer.add_bnd_box(10, 20, 110, 220, 'person', 1)
+            writer.add_bnd_box(30, 40, 50, 60, 'face', 0)
+            writer.save(os.path.join(self.xml_dir, 'img%d.xml' % i))
+        with open(os.path.join(self.xml_dir, 'broken.xml'), 'w') as f:
+            f.write('<annotation><object>')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_parse_annotation(self):
+        from libs.pascal_voc_io import parse_voc_annotation
+        annotation = parse_voc_annotation(os.path.join(self.xml_dir, 'img0.xml'))
+        self.assertEqual('img0.jpg', annotation.filename)
+        self.assertEqual((480, 640, 3), annotation.img_size)
+        self.assertTrue(annotation.verified)
+        self.assertEqual(['person', 'face'], annotation.labels)
+        self.assertEqual([[10, 20, 110, 220], [30, 40, 50, 60]], annotation.boxes.tolist())
+        self.assertEqual([True, False], annotation.difficult.tolist())
+
+    def test_read_dir_reports_errors(self):
+        from libs.pascal_voc_io import read_voc_dir
+        label_set = read_voc_dir(self.xml_dir, workers=1)
+        self.assertEqual(3, len(label_set))
+        self.assertEqual({'person': 3, 'face': 3}, label_set.class_counts())
+        self.assertEqual(['person', 'face'], label_set.labels_for(2))
+        self.assertEqual([True, False, False], label_set.verified.tolist())
+        self.assertEqual([os.path.join(self.xml_dir, 'broken.xml')], list(label_set.errors))
+
+    def test_reader_keeps_error(self):
+        from libs.pascal_voc_io import PascalVocReader
+        reader = PascalVocReader(os.path.join(self.xml_dir, 'broken.xml'))
+        self.assertEqual([], reader.get_shapes())
+        self.assertIsNotNone(reader.error)
+
+class TestCreateMLStore(unittest.TestCase):
+
+    def setUp(self):
+        dir_name = os.path.abspath(os.path.dirname(__file__))
+        sys.path.insert(0, os.path.join(dir_name, '..'))
+        import tempfile
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    @staticmethod
+    def entry(image, label):
+        return {'image': image, 'verified': False,
+                'annotations': [{'label': label, 'coordinates': {'x': 5, 'y': 5, 'width': 4, 'height': 4}}]}
+
+    def test_write_behind_json(self):
+        import json
+        from libs.create_ml_io import CreateMLStore
+        path = os.path.join(self.tmp_dir.name, 'project.json')
+        store = CreateMLStore(path, flush_delay=None)
+        store.put(self.entry('a.jpg', 'person'))
+        store.put(self.entry('b.jpg', 'face'))
+        store.put(self.entry('a.jpg', 'car'))
+        self.assertTrue(store.is_dirty())
+        self.assertEqual('car', store.get('a.jpg')['annotations'][0]['label'])
+        store.flush()
+        with open(path) as f:
+            data = json.load(f)
+        self.assertEqual(['a.jpg', 'b.jpg'], [item['image'] for item in data])
+        self.assertEqual('car', data[0]['annotations'][0]['label'])
+
+    def test_json_lines_export(self):
+        import json
+        from libs.create_ml_io import CreateMLStore
+        path = os.path.join(self.tmp_dir.name, 'project.jsonl')
+        store = CreateMLStore(path, flush_delay=None)
+        for i in range(5):
+            store.put(self.entry('img%d.jpg' % i, 'person'), flush=True)
+        store.put(self.entry('img0.jpg', 'face'), flush=True)
+
+        reloaded = CreateMLStore(path, flush_delay=None)
+        self.assertEqual(5, len(reloaded.images()))
+        self.assertEqual('face', reloaded.get('img0.jpg')['annotations'][0]['label'])
+
+        export_path = os.path.join(self.tmp_dir.name, 'export.json')
+        reloaded.export_json(export_path)
+        with open(export_path) as f:
+            self.assertEqual(5, len(json.load(f)))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+import csv
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, '..'))
+sys.path.insert(0, os.path.join(dir_name, '..', 'tools'))
+from label_to_csv import convert
+from libs.create_ml_io import CreateMLWriter
+from libs.pascal_voc_io import PascalVocWriter
+
+
+def box_shape(label, x_min, y_min, x_max, y_max):
+    return {'label': label, 'points': [(x_min, y_min), (x_max, y_min), (x_max, y_max), (x_min, y_max)],
+            'difficult': False}
+
+
+class TestLabelToCsv(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.location = os.path.join(self.tmp_dir, 'labels')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def class_dir(self, set_name, class_name):
+        path = os.path.join(self.location, set_name, class_name)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def write(self, path, text):
+        with open(path, 'w') as f:
+            f.write(text)
+
+    def convert(self, mode, workers, class_labels=()):
+        output = os.path.join(self.tmp_dir, 'out_%d.csv' % workers)
+        count, errors = convert(self.location, mode, 'gs://bucket', output, class_labels, workers=workers,
+                                chunk_size=1)
+        with open(output, newline='') as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(count, len(rows))
+        return rows, sorted(os.path.basename(path) for path, _ in errors)
+
+    def assert_same_for_workers(self, mode, class_labels=()):
+        """单进程和进程池的结果（包括行顺序）相同"""
+        serial = self.convert(mode, 1, class_labels)
+        self.assertEqual(serial, self.convert(mode, 2, class_labels))
+        return serial
+
+    def test_yolo(self):
+        cat = self.class_dir('TRAINING', 'cat')
+        self.write(os.path.join(cat, 'a.txt'), '0 0.5 0.5 0.2 0.4\n1 0.05 0.5 0.2 0.2\n')
+        self.write(os.path.join(cat, 'b.txt'), '1 0.25 0.75 0.5 0.5\n')
+        self.write(os.path.join(cat, 'short_row.txt'), '0 0.5 0.5\n')
+        self.write(os.path.join(cat, 'bad_class.txt'), '7 0.5 0.5 0.1 0.1\n')
+        self.write(os.path.join(self.class_dir('TEST', 'dog'), 'c.txt'), '0 0.5 0.5 1.0 1.0\n')
+
+        rows, errors = self.assert_same_for_workers('txt', ['person', 'car'])
+        self.assertEqual(['bad_class.txt', 'short_row.txt'], errors)
+        self.assertEqual([['TEST', 'gs://bucket/dog/c.jpg', 'person', '0.0', '0.0', '', '', '1.0', '1.0', '', ''],
+                          ['TRAINING', 'gs://bucket/cat/a.jpg', 'person', '0.4', '0.3', '', '', '0.6', '0.7', '', ''],
+                          ['TRAINING', 'gs://bucket/cat/a.jpg', 'car', '0.0', '0.4', '', '', '0.15', '0.6', '', ''],
+                          ['TRAINING', 'gs://bucket/cat/b.jpg', 'car', '0.0', '0.5', '', '', '0.5', '1.0', '', '']],
+                         [row[:3] + [str(round(float(v), 6)) if v else v for v in row[3:]] for row in rows])
+
+    def test_voc_clamped(self):
+        cat = self.class_dir('TRAINING', 'cat')
+        for name, boxes in (('a', [(10, 20, 60, 120)]), ('b', [(-5, 0, 250, 90), (0, 0, 100, 100)])):
+            writer = PascalVocWriter('cat', name + '.jpg', (200, 100, 3))
+            for box in boxes:
+                writer.add_bnd_box(*box, name='cat', difficult=0)
+            writer.save(os.path.join(cat, name + '.xml'))
+        self.write(os.path.join(cat, 'broken.xml'), '<annotation><object>')
+
+        rows, errors = self.assert_same_for_workers('xml')
+        self.assertEqual(['broken.xml'], errors)
+        self.assertEqual(['gs://bucket/cat/a.jpg', 'gs://bucket/cat/b.jpg', 'gs://bucket/cat/b.jpg'],
+                         [row[1] for row in rows])
+        self.assertEqual([0.1, 0.1, 0.6, 0.6], [float(rows[0][i]) for i in (3, 4, 7, 8)])
+        # 超出图像的框裁剪到[0, 1]
+        self.assertEqual([0.0, 0.0, 1.0, 0.45], [float(rows[1][i]) for i in (3, 4, 7, 8)])
+
+    def test_createml_clamped(self):
+        cat = self.class_dir('VALIDATION', 'cat')
+        json_path = os.path.join(cat, 'annotations.json')
+        for name, shapes in (('x.bmp', [box_shape('cat', 0, 0, 256, 128)]),
+                             ('y.bmp', [box_shape('cat', 384, 256, 600, 512), box_shape('dog', 0, 0, 512, 512)])):
+            shutil.copy(os.path.join(dir_name, 'test.512.512.bmp'), os.path.join(cat, name))
+            CreateMLWriter('cat', name, (512, 512, 3), shapes, json_path).write()
+        self.write(os.path.join(cat, 'broken.json'), '[{"image": ')
+        # 找不到图像，无法换算坐标
+        CreateMLWriter('cat', 'missing.bmp', (512, 512, 3), [box_shape('cat', 0, 0, 10, 10)],
+                       os.path.join(cat, 'missing.json')).write()
+
+        rows, errors = self.assert_same_for_workers('json')
+        self.assertEqual(['broken.json', 'missing.json'], errors)
+        self.assertEqual([('x.bmp', 'cat'), ('y.bmp', 'cat'), ('y.bmp', 'dog')],
+                         [(row[1].rsplit('/', 1)[1], row[2]) for row in rows])
+        self.assertEqual([0.0, 0.0, 0.5, 0.25], [float(rows[0][i]) for i in (3, 4, 7, 8)])
+        self.assertEqual([0.75, 0.5, 1.0, 1.0], [float(rows[1][i]) for i in (3, 4, 7, 8)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, '..'))
+from PyQt5.QtWidgets import QApplication
+from libs.log_view import LogView
+
+
+class TestLogView(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    @classmethod
+    def tearDownClass(cls):
+        # 释放QApplication，后续测试会创建自己的实例
+        cls.app = None
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.spill_path = os.path.join(self.tmp_dir, 'spill.log')
+        self.view = LogView(max_lines=5, spill_path=self.spill_path)
+
+    def tearDown(self):
+        self.view = None
+        shutil.rmtree(self.tmp_dir)
+
+    def test_batched_and_bounded(self):
+        for i in range(4):
+            self.view.append(f"line {i}")
+        # 刷新前不插入控件
+        self.assertEqual('', self.view.toPlainText())
+        self.view.flush()
+        self.assertEqual(4, self.view.blockCount())
+
+        self.view.append("line 4\nline 5\nline 6")
+        self.view.flush()
+        self.assertEqual([f"line {i}" for i in range(2, 7)], self.view.toPlainText().splitlines())
+        with open(self.spill_path, encoding='utf-8') as f:
+            self.assertEqual("line 0\nline 1\n", f.read())
+
+    def test_filter(self):
+        for text in ("📦 Collecting torch", "ERROR: no matching distribution", "📦 Installing"):
+            self.view.append(text)
+        self.view.set_filter("error")
+        self.assertEqual(["ERROR: no matching distribution"], self.view.toPlainText().splitlines())
+        self.view.append("another error")
+        self.view.append("ok")
+        self.view.flush()
+        self.assertEqual(2, self.view.blockCount())
+        self.view.set_filter("")
+        self.assertEqual(5, len(self.view.toPlainText().splitlines()))
+
+
+if __name__ == '__main__':
+    unittest.main()
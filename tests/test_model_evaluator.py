@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+from PIL import Image
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, '..'))
+from libs.ai_assistant.model_evaluator import (ModelEvaluator, PredictionCache, box_iou, evaluate_predictions,
+                                               match_predictions)
+from libs.dataset_query import BoxTable
+from libs.pascal_voc_io import PascalVocWriter
+
+
+class TestModelEvaluator(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def write_voc(self, name, boxes):
+        image_path = os.path.join(self.tmp_dir, name + '.jpg')
+        Image.new('RGB', (200, 200)).save(image_path)
+        writer = PascalVocWriter(self.tmp_dir, name + '.jpg', [200, 200, 3], local_img_path=image_path)
+        for x1, y1, x2, y2, label in boxes:
+            writer.add_bnd_box(x1, y1, x2, y2, label, 0)
+        writer.save(os.path.join(self.tmp_dir, name + '.xml'))
+        return image_path
+
+    def test_box_iou(self):
+        iou = box_iou([[0, 0, 10, 10]], [[0, 0, 10, 10], [5, 0, 15, 10], [20, 20, 30, 30]])
+        np.testing.assert_allclose(iou, [[1.0, 1 / 3, 0.0]], atol=1e-6)
+
+    def test_match_is_one_to_one_and_class_aware(self):
+        gt_classes = np.array([0])
+        gt_boxes = np.array([[0, 0, 10, 10]])
+        pred_classes = np.array([0, 0, 1])
+        pred_boxes = np.array([[0, 0, 10, 10], [0, 0, 10, 9], [0, 0, 10, 10]])
+        correct = match_predictions(gt_classes, gt_boxes, pred_classes, pred_boxes, [0.5])
+        self.assertEqual([True, False, False], correct[:, 0].tolist())
+
+    def test_evaluate_folder(self):
+        self.write_voc('a', [(10, 10, 50, 50, 'cat'), (100, 100, 150, 150, 'dog')])
+        self.write_voc('b', [(20, 20, 80, 80, 'cat')])
+        table = BoxTable.from_annotation_dir(self.tmp_dir)
+        # 模型类别顺序与标注不同，并多出一个标注中没有的类别
+        names = ['dog', 'cat', 'bird']
+        predictions = {
+            'a': [[10, 10, 50, 50, 0.9, 1], [100, 100, 150, 150, 0.8, 0], [0, 0, 5, 5, 0.6, 2]],
+            'b': [[20, 20, 80, 80, 0.95, 1]],
+        }
+        ordered = [np.array(predictions[os.path.basename(path)[0]]) for path in table.image_paths]
+
+        result = evaluate_predictions(table, ordered, names)
+        # 101点插值在召回率为1处的梯形面积与ultralytics相同，为0.995
+        self.assertAlmostEqual(0.995, result.map50, places=3)
+        self.assertAlmostEqual(1.0, result.recall, places=2)
+        metrics = {m.name: m for m in result.per_class}
+        self.assertEqual(2, metrics['cat'].instances)
+        self.assertEqual(0, metrics['bird'].instances)
+        self.assertEqual(1, metrics['bird'].predictions)
+
+        classes = result.class_names
+        matrix = result.confusion_matrix
+        self.assertEqual(2, matrix[classes.index('cat'), classes.index('cat')])
+        self.assertEqual(1, matrix[-1, classes.index('bird')])
+        self.assertEqual(0, matrix[:-1, -1].sum())
+
+    def test_missed_boxes_lower_recall(self):
+        self.write_voc('a', [(10, 10, 50, 50, 'cat'), (100, 100, 150, 150, 'cat')])
+        table = BoxTable.from_annotation_dir(self.tmp_dir)
+        result = evaluate_predictions(table, [np.array([[10, 10, 50, 50, 0.9, 0]])], ['cat'])
+        self.assertAlmostEqual(0.5, result.recall, places=2)
+        self.assertEqual(1, result.confusion_matrix[0, -1])
+
+    def test_prediction_cache_invalidated_by_image_change(self):
+        image_path = self.write_voc('a', [])
+        model_path = os.path.join(self.tmp_dir, 'model.pt')
+        with open(model_path, 'wb') as f:
+            f.write(b'weights')
+        cache_path = os.path.join(self.tmp_dir, 'predictions.db')
+        pred = np.array([[1, 2, 3, 4, 0.5, 0]], dtype=np.float32)
+
+        with PredictionCache(cache_path) as cache:
+            model_id = cache.model_id(PredictionCache.model_key(model_path, 640), ['cat'])
+            cache.store(model_id, {image_path: pred})
+        with PredictionCache(cache_path) as cache:
+            model_id = cache.model_id(PredictionCache.model_key(model_path, 640))
+            self.assertEqual(['cat'], cache.model_names(model_id))
+            np.testing.assert_array_equal(pred, cache.lookup(model_id, [image_path])[image_path])
+            self.assertIsNone(cache.model_id(PredictionCache.model_key(model_path, 320)))
+
+            stat = os.stat(image_path)
+            os.utime(image_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+            self.assertEqual({}, cache.lookup(model_id, [image_path]))
+
+    def test_annotations_without_images_skipped(self):
+        image_path = self.write_voc('a', [(10, 10, 50, 50, 'cat')])
+        os.remove(self.write_voc('b', [(20, 20, 80, 80, 'cat')]))
+        model_path = os.path.join(self.tmp_dir, 'model.pt')
+        with open(model_path, 'wb') as f:
+            f.write(b'weights')
+        evaluator = ModelEvaluator(self.tmp_dir)
+        # 预测全部来自缓存，不需要加载模型
+        with PredictionCache(evaluator.cache_path) as cache:
+            model_id = cache.model_id(PredictionCache.model_key(model_path, evaluator.imgsz), ['cat'])
+            cache.store(model_id, {image_path: np.array([[10, 10, 50, 50, 0.9, 0]], dtype=np.float32)})
+
+        result = evaluator.evaluate(model_path)
+        self.assertEqual([image_path], evaluator.ground_truth.image_paths)
+        self.assertEqual([os.path.join(self.tmp_dir, 'b.xml')], result.missing_images)
+        self.assertEqual((1, 1, 1), (result.image_count, result.instance_count, result.cached_images))
+        self.assertAlmostEqual(1.0, result.recall, places=2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from PIL import Image
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, '..'))
+from libs.ai_assistant.onnx_quantizer import (QUANTIZATION_AVAILABLE, ImageCalibrationReader, int8_model_path,
+                                              quantize_and_validate, sample_images, sample_validation)
+from libs.dataset_query import BoxTable
+from libs.pascal_voc_io import PascalVocWriter
+
+
+class TestOnnxQuantizer(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def make_image(self, name, annotated=False):
+        path = os.path.join(self.tmp_dir, name)
+        Image.new('RGB', (80, 40)).save(path)
+        if annotated:
+            open(os.path.splitext(path)[0] + '.xml', 'w').close()
+        return path
+
+    def test_int8_model_path(self):
+        self.assertEqual(os.path.join('out', 'model_int8.onnx'), int8_model_path(os.path.join('out', 'model.onnx')))
+
+    def test_sample_prefers_annotated_images(self):
+        annotated = [self.make_image(f'a{i}.jpg', annotated=True) for i in range(3)]
+        plain = [self.make_image(f'p{i}.png') for i in range(3)]
+        self.assertEqual(sorted(annotated), sorted(sample_images(self.tmp_dir, 3)))
+
+        calibration = sample_images(self.tmp_dir, 2)
+        validation = sample_images(self.tmp_dir, 4, exclude=calibration, seed=1)
+        self.assertFalse(set(calibration) & set(validation))
+        self.assertEqual(4, len(validation))
+        self.assertTrue(set(validation) <= set(annotated + plain))
+
+    def test_calibration_reader(self):
+        paths = [self.make_image('a.jpg'), os.path.join(self.tmp_dir, 'missing.jpg'), self.make_image('b.jpg')]
+        reader = ImageCalibrationReader(paths, 'images', 32)
+        batches = []
+        while True:
+            feed = reader.get_next()
+            if feed is None:
+                break
+            batches.append(feed['images'])
+        self.assertEqual(2, len(batches))
+        self.assertEqual((1, 3, 32, 32), batches[0].shape)
+        reader.rewind()
+        self.assertIsNotNone(reader.get_next())
+
+    def test_sample_validation_uses_annotated_images(self):
+        images = [self.make_image(f'a{i}.jpg') for i in range(3)]
+        for image_path in images + [os.path.join(self.tmp_dir, 'missing.jpg')]:
+            name = os.path.basename(image_path)
+            writer = PascalVocWriter(self.tmp_dir, name, [40, 80, 3], local_img_path=image_path)
+            writer.add_bnd_box(1, 1, 20, 20, 'cat', 0)
+            writer.save(os.path.splitext(image_path)[0] + '.xml')
+        table = BoxTable.from_annotation_dir(self.tmp_dir)
+
+        # 图片不存在的标注不参与验证，且不与校准图片重复
+        validation = sample_validation(table, 5, exclude=images[:1])
+        self.assertEqual(sorted(images[1:]), sorted(validation.image_paths))
+        self.assertEqual([0, 1], validation.image_ids.tolist())
+        # 全部图片都用于校准时仍用它们验证
+        self.assertEqual(3, sample_validation(table, 5, exclude=images).image_count)
+
+    @unittest.skipIf(QUANTIZATION_AVAILABLE, "checks the failure path without onnxruntime")
+    def test_failed_quantization_removes_int8_model(self):
+        image_path = self.make_image('a.jpg')
+        writer = PascalVocWriter(self.tmp_dir, 'a.jpg', [40, 80, 3], local_img_path=image_path)
+        writer.add_bnd_box(1, 1, 20, 20, 'cat', 0)
+        writer.save(os.path.join(self.tmp_dir, 'a.xml'))
+        fp32_path = os.path.join(self.tmp_dir, 'model.onnx')
+        open(fp32_path, 'wb').close()
+        open(int8_model_path(fp32_path), 'wb').close()
+
+        with self.assertRaises(ImportError):
+            quantize_and_validate(fp32_path, self.tmp_dir, log=lambda message: None)
+        self.assertFalse(os.path.exists(int8_model_path(fp32_path)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, '..'))
+from libs import perf_trace
+
+
+class TestPerfTrace(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.was_enabled = perf_trace.is_enabled()
+        perf_trace.reset()
+
+    def tearDown(self):
+        perf_trace.set_enabled(self.was_enabled)
+        perf_trace.reset()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_disabled_records_nothing(self):
+        perf_trace.set_enabled(False)
+
+        @perf_trace.timed('decorated')
+        def work():
+            return 42
+
+        with perf_trace.span('block') as span:
+            self.assertEqual(42, work())
+        self.assertIs(span, perf_trace.span('other'))
+        perf_trace.record('direct', 0.5)
+        self.assertEqual([], perf_trace.summary())
+
+    def test_summary_percentiles(self):
+        perf_trace.set_enabled(True)
+        for i in range(1, 101):
+            perf_trace.record('load_file', i / 1000)
+        with perf_trace.span('save', path='a.xml'):
+            pass
+        with self.assertRaises(ValueError):
+            with perf_trace.span('predict'):
+                raise ValueError('boom')
+
+        rows = {row['name']: row for row in perf_trace.summary()}
+        self.assertEqual(['load_file', 'predict', 'save'], sorted(rows))
+        load = rows['load_file']
+        self.assertEqual(100, load['count'])
+        self.assertAlmostEqual(50.5, load['p50_ms'])
+        self.assertAlmostEqual(100.0, load['max_ms'])
+        self.assertAlmostEqual(5050.0, load['total_ms'])
+        self.assertEqual(1, rows['predict']['count'])
+
+    def test_dumps(self):
+        perf_trace.set_enabled(True)
+        worker = threading.Thread(target=lambda: perf_trace.record('batch.image', 0.002), name='BatchWorker')
+        worker.start()
+        worker.join()
+        with perf_trace.span('canvas.paint', shapes=3):
+            pass
+
+        with open(perf_trace.dump_json(os.path.join(self.tmp_dir, 'perf.json')), encoding='utf-8') as f:
+            self.assertEqual(['batch.image', 'canvas.paint'], [row['name'] for row in json.load(f)['spans']])
+
+        with open(perf_trace.dump_chrome_trace(os.path.join(self.tmp_dir, 'trace.json')), encoding='utf-8') as f:
+            events = json.load(f)['traceEvents']
+        complete = [event for event in events if event['ph'] == 'X']
+        self.assertEqual(['batch.image', 'canvas.paint'], [event['name'] for event in complete])
+        self.assertAlmostEqual(2000.0, complete[0]['dur'])
+        self.assertEqual({'shapes': 3}, complete[1]['args'])
+        self.assertEqual(2, len({event['tid'] for event in complete}))
+        self.assertEqual(2, sum(1 for event in events if event['ph'] == 'M'))
+
+
+if __name__ == '__main__':
+    unittest.main()
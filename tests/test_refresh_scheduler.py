@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+import os
+import sys
+import unittest
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, '..'))
+from PyQt5.QtWidgets import QApplication
+from libs.refresh_scheduler import RefreshScheduler
+
+
+class TestRefreshScheduler(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.app = None
+
+    def setUp(self):
+        self.calls = []
+        self.scheduler = RefreshScheduler()
+        for name in ('stats', 'combo', 'status'):
+            self.scheduler.register(name, lambda name=name: self.calls.append(name))
+
+    def test_marks_coalesce_into_one_refresh(self):
+        for _ in range(500):
+            self.scheduler.mark('status')
+            self.scheduler.mark('combo', 'stats')
+        self.assertEqual([], self.calls)
+        self.assertTrue(self.scheduler.is_dirty('combo'))
+        self.app.processEvents()
+        # 每个面板只刷新一次，按登记顺序
+        self.assertEqual(['stats', 'combo', 'status'], self.calls)
+        self.assertFalse(self.scheduler.is_dirty('combo'))
+
+    def test_mark_from_handler(self):
+        # 刷新中标记后面的面板：同一轮刷新；标记前面的面板：下一轮刷新
+        self.scheduler.register('stats', lambda: (self.calls.append('stats'), self.scheduler.mark('status')))
+        self.scheduler.register('status', lambda: (self.calls.append('status'), self.scheduler.mark('combo')))
+        self.scheduler.mark('stats')
+        self.scheduler.flush()
+        self.assertEqual(['stats', 'status'], self.calls)
+        self.assertTrue(self.scheduler.is_dirty('combo'))
+        self.app.processEvents()
+        self.assertEqual(['stats', 'status', 'combo'], self.calls)
+
+    def test_failing_handler_does_not_block_others(self):
+        def fail():
+            raise RuntimeError('boom')
+        self.scheduler.register('stats', fail)
+        self.scheduler.mark('stats', 'status')
+        self.scheduler.flush()
+        self.assertEqual(['status'], self.calls)
+
+    def test_cancel(self):
+        self.scheduler.mark('combo')
+        self.scheduler.cancel()
+        self.app.processEvents()
+        self.assertEqual([], self.calls)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+import os
+import sys
+import unittest
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, '..'))
+from PyQt5.QtCore import QPointF
+from PyQt5.QtGui import QColor, QPixmap
+from PyQt5.QtWidgets import QApplication
+from libs.canvas import Canvas
+from libs.shape import Shape
+
+
+def make_box(x, y, w, h, label='box'):
+    shape = Shape(label=label)
+    for point in ((x, y), (x + w, y), (x + w, y + h), (x, y + h)):
+        shape.add_point(QPointF(*point))
+    shape.close()
+    return shape
+
+
+class TestShapeRenderCache(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.app = None
+
+    def test_paths_cached_until_points_change(self):
+        shape = make_box(0, 0, 10, 10)
+        path = shape.line_path()
+        self.assertIs(path, shape.line_path())
+        self.assertIs(shape.vertex_path(), shape.vertex_path())
+
+        shape.move_by(QPointF(5, 0))
+        moved = shape.line_path()
+        self.assertIsNot(path, moved)
+        self.assertEqual(5, moved.boundingRect().x())
+
+        shape[0] = QPointF(-3, 0)
+        self.assertEqual(-3, shape.line_path().boundingRect().x())
+        shape.points = [QPointF(1, 1), QPointF(2, 1), QPointF(2, 2), QPointF(1, 2)]
+        self.assertEqual(1, shape.polygon().boundingRect().x())
+
+    def test_vertex_path_follows_highlight(self):
+        shape = make_box(0, 0, 100, 100)
+        plain = shape.vertex_path()
+        shape.highlight_vertex(0, Shape.MOVE_VERTEX)
+        highlighted = shape.vertex_path()
+        self.assertIsNot(plain, highlighted)
+        self.assertNotEqual(plain.boundingRect(), highlighted.boundingRect())
+        shape.highlight_clear()
+        self.assertEqual(plain.boundingRect(), shape.vertex_path().boundingRect())
+
+    def test_pens_and_fonts_shared(self):
+        color = QColor(1, 2, 3)
+        self.assertIs(Shape.pen(color, 2), Shape.pen(QColor(1, 2, 3), 2))
+        self.assertIsNot(Shape.pen(color, 2), Shape.pen(color, 3))
+        self.assertIs(Shape.font(8), Shape.font(8))
+
+
+class TestCanvasStaticLayer(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.app = None
+
+    def setUp(self):
+        self.canvas = Canvas()
+        pixmap = QPixmap(200, 100)
+        pixmap.fill(QColor(0, 0, 0))
+        self.canvas.load_pixmap(pixmap)
+        self.canvas.resize(200, 100)
+        self.shapes = [make_box(10, 10, 30, 30, 'a'), make_box(100, 20, 40, 40, 'b')]
+        self.canvas.load_shapes(self.shapes)
+
+    def tearDown(self):
+        self.canvas.deleteLater()
+
+    def render(self):
+        return self.canvas.grab().toImage()
+
+    def test_layer_reused_across_frames(self):
+        self.render()
+        layer = self.canvas._static_layer
+        self.assertIsNotNone(layer)
+        self.canvas.h_shape = self.shapes[0]
+        self.render()
+        self.assertIs(layer, self.canvas._static_layer)
+
+    def test_layer_rebuilt_when_static_shape_changes(self):
+        self.render()
+        layer = self.canvas._static_layer
+        self.shapes[0].move_by(QPointF(0, 40))
+        self.assertTrue(layer.dirty)
+        image = self.render()
+        self.assertIsNot(layer, self.canvas._static_layer)
+        # The box outline is now drawn at its new position only
+        self.assertEqual(image.pixel(25, 10), image.pixel(190, 90))
+        self.assertNotEqual(image.pixel(25, 50), image.pixel(190, 90))
+
+    def test_selected_shape_kept_out_of_layer(self):
+        self.canvas.select_shape(self.shapes[1])
+        self.render()
+        layer = self.canvas._static_layer
+        self.assertEqual([self.shapes[0]], self.canvas.static_shapes())
+        # Dragging the selected shape does not touch the layer
+        self.shapes[1].move_by(QPointF(-5, 0))
+        self.assertFalse(layer.dirty)
+        self.render()
+        self.assertIs(layer, self.canvas._static_layer)
+
+
+if __name__ == '__main__':
+    unittest.main()
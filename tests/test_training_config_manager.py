@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, '..'))
+from libs.training_config_manager import TrainingConfigManager
+
+
+class TestAutotuneResults(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.manager = TrainingConfigManager(os.path.join(self.tmp_dir, 'configs'))
+        self.dataset = os.path.join(self.tmp_dir, 'data.yaml')
+        self.result = {'batch_size': 8, 'workers': 2, 'images_per_second': 10.0, 'peak_rss_mb': 900.0}
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def make_model(self, relative):
+        path = os.path.join(self.tmp_dir, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(b'weights')
+        return path
+
+    def test_same_file_name_in_different_runs(self):
+        first = self.make_model('run1/weights/best.pt')
+        second = self.make_model('run2/weights/best.pt')
+        self.manager.save_autotune_result(self.dataset, first, self.result)
+        self.assertEqual(8, self.manager.get_autotune_result(self.dataset, first)['batch_size'])
+        self.assertIsNone(self.manager.get_autotune_result(self.dataset, second))
+        self.assertIsNone(self.manager.get_autotune_result(self.dataset, first, imgsz=1280))
+
+    def test_overwritten_model_is_probed_again(self):
+        model = self.make_model('run/weights/best.pt')
+        self.manager.save_autotune_result(self.dataset, model, self.result)
+        with open(model, 'ab') as f:
+            f.write(b'retrained')
+        self.assertIsNone(self.manager.get_autotune_result(self.dataset, model))
+
+    def test_pretrained_model_not_downloaded(self):
+        self.manager.save_autotune_result(self.dataset, 'yolov8n.pt', self.result)
+        self.assertEqual(2, self.manager.get_autotune_result(self.dataset, 'yolov8n.pt')['workers'])
+
+
+if __name__ == '__main__':
+    unittest.main()
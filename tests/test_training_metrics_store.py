@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, '..'))
+from libs.training_metrics_store import (KIND_ITERATION, TrainingMetricsStore, compare_runs, list_runs,
+                                         metrics_db_path, minmax_downsample)
+
+
+class TestTrainingMetricsStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_log_and_read(self):
+        run_dir = os.path.join(self.tmp_dir, 'yolo_training')
+        with TrainingMetricsStore(metrics_db_path(run_dir)) as store:
+            store.log_epoch(1, {'train/box_loss': 1.5, 'metrics/mAP50(B)': 0.2})
+            store.log_epoch(2, {'train/box_loss': 1.1, 'metrics/mAP50(B)': 0.4})
+            for step in range(1, 6):
+                store.log_iteration(step, {'train/box_loss': 2.0 / step})
+
+            # 训练进程写入期间只读打开
+            with TrainingMetricsStore(metrics_db_path(run_dir), readonly=True) as reader:
+                steps, values = reader.series('train/box_loss')
+                self.assertEqual([1, 2], steps.tolist())
+                self.assertEqual([1.5, 1.1], values.tolist())
+                self.assertEqual([2], reader.series('train/box_loss', since_step=1)[0].tolist())
+
+        with TrainingMetricsStore(metrics_db_path(run_dir), readonly=True) as reader:
+            self.assertEqual(5, len(reader.series('train/box_loss', KIND_ITERATION)[0]))
+            self.assertEqual((2, 0.4), reader.best('metrics/mAP50(B)'))
+            self.assertEqual(['metrics/mAP50(B)', 'train/box_loss'], reader.names())
+
+        self.assertEqual([run_dir], list_runs(self.tmp_dir))
+        self.assertEqual({'yolo_training': {'metrics/mAP50(B)': 0.4, 'lr': None}},
+                         compare_runs([run_dir], ['metrics/mAP50(B)', 'lr']))
+
+    def test_minmax_downsample(self):
+        steps = np.arange(10001, dtype=np.float64)
+        values = np.sin(steps / 100.0)
+        values[1234] = 5.0
+        values[8765] = -5.0
+        ds_steps, ds_values = minmax_downsample(steps, values, 300)
+        self.assertLessEqual(len(ds_steps), 600)
+        self.assertEqual(values.max(), ds_values.max())
+        self.assertEqual(values.min(), ds_values.min())
+        self.assertTrue(np.all(np.diff(ds_steps) > 0))
+        self.assertIs(values, minmax_downsample(steps, values, 6000)[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
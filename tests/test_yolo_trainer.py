@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, '..'))
+from libs.ai_assistant.yolo_trainer import (RESUME_CHECKPOINT, TRAINING_RUN_NAME, YOLOTrainer,
+                                            discard_resumable_checkpoint, find_resumable_checkpoint,
+                                            save_resumable_checkpoint)
+
+
+class TestResumableCheckpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.run_dir = os.path.join(self.tmp_dir, TRAINING_RUN_NAME)
+        weights = Path(self.run_dir) / 'weights'
+        weights.mkdir(parents=True)
+        # 与ultralytics训练器保存权重相关的属性
+        self.trainer = SimpleNamespace(wdir=weights, last=weights / 'last.pt')
+        self.trainer.last.write_text('epoch=3 optimizer')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def mark(self, interrupted):
+        trainer = YOLOTrainer()
+        trainer.run_dir = self.run_dir
+        trainer._set_interrupted_marker(interrupted)
+
+    def test_stop_then_resume(self):
+        # 停止：保存模型时另存，随后final_eval剥离last.pt
+        save_resumable_checkpoint(self.trainer)
+        self.trainer.last.write_text('epoch=-1')
+        self.mark(True)
+
+        checkpoint = find_resumable_checkpoint(self.tmp_dir)
+        self.assertEqual(RESUME_CHECKPOINT, os.path.basename(checkpoint))
+        self.assertEqual('epoch=3 optimizer', Path(checkpoint).read_text())
+
+        # 继续训练开始后resume.pt已恢复，之后异常退出时使用新的last.pt
+        discard_resumable_checkpoint(self.trainer)
+        self.trainer.last.write_text('epoch=5 optimizer')
+        self.mark(True)
+        self.assertEqual(str(self.trainer.last), find_resumable_checkpoint(self.tmp_dir))
+
+        # 训练完成后不再提示继续
+        self.mark(False)
+        self.assertIsNone(find_resumable_checkpoint(self.tmp_dir))
+
+    def test_discard_without_checkpoint(self):
+        discard_resumable_checkpoint(self.trainer)
+        self.assertIsNone(find_resumable_checkpoint(self.tmp_dir))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -9,124 +9,190 @@ Time: 2021.02.06
 """
 
 import os
+import sys
+import io
+import csv
 import argparse
 import codecs
-
-import pandas as pd
-
-
-def txt2csv(location, training_dir, path_prefix):
-    # Return list
-    temp_res = []
-
-    # Run through all the files
-    for file in os.listdir(location):
-        # Check the file name ends with txt
-        #  and not class.txt
-        if (not file.endswith(".txt")) | \
-                (file == "classes.txt"):
-            continue
-
-        # Get the file name
-        file_whole_name = f"{location}/{file}"
-
-        # Read in txt as csv
-        df_txt = pd.read_csv(file_whole_name, sep=" ", header=None)
-
-        # Create data for each labels
-        for index, row in df_txt.iterrows():
-            # Temp array for csv, initialized by the training types
-            temp_csv = [str(training_dir)]
-
-            # gs://prefix/name/{image_name}
-            cloud_path = f"{path_prefix}/{os.path.splitext(file)[0]}.jpg"
-            temp_csv.append(cloud_path)
-
-            # Class label
-            temp_csv.append(class_labels[int(row[0])])
-
-            # Add the upper left coordinate
-            x_min = min(max(0.0, row[1] - row[3] / 2), 1.0)
-            y_min = min(max(0.0, row[2] - row[4] / 2), 1.0)
-            temp_csv.extend([x_min, y_min])
-
-            # Add the lower left coordinate (not necessary, left blank)
-            temp_csv.extend(["", ""])
-
-            # Add the lower right coordinate
-            x_max = min(max(0.0, row[1] + row[3] / 2), 1.0)
-            y_max = min(max(0.0, row[2] + row[4] / 2), 1.0)
-            temp_csv.extend([x_max, y_max])
-
-            # Add the upper right coordinate (not necessary, left blank)
-            temp_csv.extend(["", ""])
-
-            # Append to the res
-            temp_res.append(temp_csv)
-
-    return temp_res
-
-
-def xml2csv(location, training_dir, path_prefix):
-    # To parse the xml files
-    import xml.etree.ElementTree as ET
-
-    # Return list
-    temp_res = []
-
-    # Run through all the files
-    for file in os.listdir(location):
-        # Check the file name ends with xml
-        if not file.endswith(".xml"):
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+# Use the project's annotation readers
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from libs.create_ml_io import CreateMLStore
+from libs.image_geometry import probe_image_geometry
+from libs.pascal_voc_io import parse_voc_annotation
+from libs.yolo_io import CLASSES_FILE, parse_yolo_labels
+
+MODES = {"txt": ".txt", "xml": ".xml", "json": ".json"}
+
+# Label files handled by one worker task
+DEFAULT_CHUNK_SIZE = 256
+
+
+def clamped_corners(boxes):
+    """
+    Convert YOLO rows [class, x_center, y_center, w, h] to normalised
+    [x_min, y_min, x_max, y_max], clamped to [0, 1].
+    """
+    half = boxes[:, 3:5] / 2
+    return np.clip(np.hstack([boxes[:, 1:3] - half, boxes[:, 1:3] + half]), 0.0, 1.0)
+
+
+def txt_rows(file_path, class_labels):
+    """Yield (image name, labels, corners) for one YOLO label file."""
+    boxes = parse_yolo_labels(file_path, dtype=np.float64)
+    class_ids = boxes[:, 0].astype(np.int64)
+    if len(class_ids) and (class_ids.min() < 0 or class_ids.max() >= len(class_labels)):
+        raise ValueError("class index out of range of the class list")
+    image_name = f"{os.path.splitext(os.path.basename(file_path))[0]}.jpg"
+    yield image_name, [class_labels[i] for i in class_ids.tolist()], clamped_corners(boxes)
+
+
+def xml_rows(file_path, class_labels):
+    """Yield (image name, labels, corners) for one Pascal VOC file."""
+    annotation = parse_voc_annotation(file_path, dtype=np.float64)
+    height, width = annotation.img_size[:2]
+    if not width or not height:
+        raise ValueError("missing <size> in annotation")
+    image_name = f"{os.path.splitext(os.path.basename(file_path))[0]}.jpg"
+    corners = annotation.boxes / np.array([width, height, width, height])
+    yield image_name, annotation.labels, np.clip(corners, 0.0, 1.0)
+
+
+def json_rows(file_path, class_labels):
+    """
+    Yield (image name, labels, corners) for every image of a CreateML file.
+    CreateML stores pixels only, so the images must sit next to the file.
+    """
+    location = os.path.dirname(file_path)
+    for entry in CreateMLStore(file_path, flush_delay=None).entries():
+        geometry = probe_image_geometry(os.path.join(location, entry["image"]))
+        if geometry is None:
+            raise ValueError(f"cannot read the size of {entry['image']}")
+        labels = [shape["label"] for shape in entry["annotations"]]
+        coords = np.array([[shape["coordinates"][key] for key in ("x", "y", "width", "height")]
+                           for shape in entry["annotations"]], dtype=np.float64).reshape(-1, 4)
+        half = coords[:, 2:4] / 2
+        corners = np.hstack([coords[:, 0:2] - half, coords[:, 0:2] + half])
+        size = np.array([geometry.width, geometry.height] * 2, dtype=np.float64)
+        yield entry["image"], labels, np.clip(corners / size, 0.0, 1.0)
+
+
+READERS = {"txt": txt_rows, "xml": xml_rows, "json": json_rows}
+
+
+def convert_chunk(mode, files, class_labels):
+    """
+    Convert label files to AutoML CSV text.
+
+    files holds (file path, set name, path prefix) tuples. Returns the CSV
+    text and a list of (file path, error) for files that were skipped.
+    """
+    output = io.StringIO()
+    writer = csv.writer(output, lineterminator="\n")
+    errors = []
+    for file_path, training_dir, path_prefix in files:
+        try:
+            for image_name, labels, corners in READERS[mode](file_path, class_labels):
+                cloud_path = f"{path_prefix}/{image_name}"
+                # Upper left and lower right corners; the other two are optional
+                writer.writerows([training_dir, cloud_path, label, x_min, y_min, "", "", x_max, y_max, "", ""]
+                                 for label, (x_min, y_min, x_max, y_max) in zip(labels, corners.tolist()))
+        except Exception as e:
+            errors.append((file_path, str(e)))
+    return output.getvalue(), errors
+
+
+def find_label_files(location, mode, prefix):
+    """
+    Walk <location>/<set>/<class dir>/ and yield (file path, set name,
+    gs://<bucket>/<class dir>) for each label file.
+    """
+    ext = MODES[mode]
+    for training_type_dir in sorted(os.listdir(location)):
+        dir_name = os.path.join(location, training_type_dir)
+        if not os.path.isdir(dir_name):
             continue
-
-        # Get the file name
-        file_whole_name = f"{location}/{file}"
-
-        # Open the xml name
-        tree = ET.parse(file_whole_name)
-        root = tree.getroot()
-
-        # Get the width, height of images
-        #  to normalize the bounding boxes
-        size = root.find("size")
-        width, height = float(size.find("width").text), float(size.find("height").text)
-
-        # Find all the bounding objects
-        for label_object in root.findall("object"):
-            # Temp array for csv, initialized by the training types
-            temp_csv = [str(training_dir)]
-
-            # gs://prefix/name/{image_name}
-            cloud_path = f"{path_prefix}/{os.path.splitext(file)[0]}.jpg"
-            temp_csv.append(cloud_path)
-
-            # Class label
-            temp_csv.append(label_object.find("name").text)
-
-            # Bounding box coordinate
-            bounding_box = label_object.find("bndbox")
-
-            # Add the upper left coordinate
-            x_min = float(bounding_box.find("xmin").text) / width
-            y_min = float(bounding_box.find("ymin").text) / height
-            temp_csv.extend([x_min, y_min])
-
-            # Add the lower left coordinate (not necessary, left blank)
-            temp_csv.extend(["", ""])
-
-            # Add the lower right coordinate
-            x_max = float(bounding_box.find("xmax").text) / width
-            y_max = float(bounding_box.find("ymax").text) / height
-            temp_csv.extend([x_max, y_max])
-
-            # Add the upper right coordinate (not necessary, left blank)
-            temp_csv.extend(["", ""])
-
-            # Append to the res
-            temp_res.append(temp_csv)
-
-    return temp_res
+        for class_type_dir in sorted(os.listdir(dir_name)):
+            class_dir = os.path.join(dir_name, class_type_dir)
+            if not os.path.isdir(class_dir):
+                continue
+            for file in sorted(os.listdir(class_dir)):
+                if file.lower().endswith(ext) and file != CLASSES_FILE:
+                    yield os.path.join(class_dir, file), training_type_dir, f"{prefix}/{class_type_dir}"
+
+
+def chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def convert(location, mode, prefix, output, class_labels=(), workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Stream every label file under location into the CSV file output.
+
+    Chunks are converted in a process pool; at most two chunks per worker
+    are in flight, so memory stays bounded however large the dataset is.
+    Rows are written in file order. Returns (rows written, errors).
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    class_labels = list(class_labels)
+    chunks = chunked(find_label_files(location, mode, prefix), chunk_size)
+    rows = 0
+    errors = []
+
+    with open(output, "w", encoding="utf-8", newline="") as out_file:
+        def write(result):
+            nonlocal rows
+            text, chunk_errors = result
+            out_file.write(text)
+            rows += text.count("\n")
+            errors.extend(chunk_errors)
+
+        # (chunk, future) pairs; a chunk leaves the queue only once it is written
+        pending = deque()
+        if workers > 1:
+            try:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    for chunk in chunks:
+                        # Queue the chunk before submitting so a failing submit leaves it to the fallback
+                        pending.append((chunk, None))
+                        pending[-1] = (chunk, executor.submit(convert_chunk, mode, chunk, class_labels))
+                        if len(pending) >= 2 * workers:
+                            write(pending[0][1].result())
+                            pending.popleft()
+                    while pending:
+                        write(pending[0][1].result())
+                        pending.popleft()
+            except (OSError, BrokenProcessPool) as e:
+                # Rows already written stay; redo the unwritten chunks here
+                print(f"Process pool failed ({e}), continuing in a single process", file=sys.stderr)
+        for chunk, _ in pending:
+            write(convert_chunk(mode, chunk, class_labels))
+        for chunk in chunks:
+            write(convert_chunk(mode, chunk, class_labels))
+
+    return rows, errors
+
+
+def load_class_labels(path):
+    class_labels = []
+    with codecs.open(path, 'r', 'utf8') as f:
+        for line in f:
+            line = line.strip()
+            class_labels.append(line)
+    return class_labels
 
 
 if __name__ == "__main__":
@@ -143,7 +209,8 @@ if __name__ == "__main__":
     arg_p.add_argument("-m", "--mode",
                        type=str,
                        required=True,
-                       help="'xml' for converting from xml and 'txt' for converting from txt")
+                       choices=sorted(MODES),
+                       help="'xml' for Pascal VOC, 'txt' for YOLO and 'json' for CreateML label files")
     arg_p.add_argument("-o", "--output",
                        type=str,
                        default="res.csv",
@@ -151,65 +218,28 @@ if __name__ == "__main__":
     arg_p.add_argument("-c", "--classes",
                        type=str,
                        default=os.path.join("..", "data", "predefined_classes.txt"),
-                       help="Label classes path")
+                       help="Label classes path (txt mode only)")
+    arg_p.add_argument("-w", "--workers",
+                       type=int,
+                       default=None,
+                       help="Worker processes (default: CPU count, 1 disables the pool)")
+    arg_p.add_argument("--chunk-size",
+                       type=int,
+                       default=DEFAULT_CHUNK_SIZE,
+                       help="Label files per worker task")
     args = vars(arg_p.parse_args())
 
-    # Class labels
+    # Class labels, only YOLO files store class indices
     class_labels = []
-
-    # Load in the defined classes
-    if os.path.exists(args["classes"]) is True:
-        with codecs.open(args["classes"], 'r', 'utf8') as f:
-            for line in f:
-                line = line.strip()
-                class_labels.append(line)
-    else:  # Exit if errors occurred
-        print(f"File: {args['classes']} not exists")
-        exit(1)
-
-    # Prefix of the cloud storage
-    ori_prefix = f"gs://{args['prefix']}"
-
-    # Array for final csv file
-    res = []
-    # Get all the file in dir
-    for training_type_dir in os.listdir(args["location"]):
-        # Get the dirname
-        dir_name = f"{args['location']}/{training_type_dir}"
-
-        # Check whether is dir
-        if not os.path.isdir(dir_name):
-            continue
-            # Process the files
-
-        for class_type_dir in os.listdir(dir_name):
-
-            # Check whether is dir
-            if not os.path.isdir(dir_name):
-                continue
-
-            prefix = f"{ori_prefix}/{class_type_dir}"
-
-            # Convert the chosen extension to csv
-            if args["mode"] == "txt":
-                res.extend(txt2csv(f"{dir_name}/{class_type_dir}",
-                                   training_type_dir,
-                                   prefix))
-            elif args["mode"] == "xml":
-                res.extend(xml2csv(f"{dir_name}/{class_type_dir}",
-                                   training_type_dir,
-                                   prefix))
-            else:
-                print("Wrong argument for convert mode.\n"
-                      "'xml' for converting from xml to csv\n"
-                      "'txt' for converting from txt to csv")
-                exit(1)
-
-    # Write to the result csv
-    res_csv = pd.DataFrame(res,
-                           columns=["set", "path", "label",
-                                    "x_min", "y_min",
-                                    "x_max", "y_min",
-                                    "x_max", "y_max",
-                                    "x_min", "y_max"])
-    res_csv.to_csv("res.csv", index=False, header=False)
+    if args["mode"] == "txt":
+        if os.path.exists(args["classes"]) is True:
+            class_labels = load_class_labels(args["classes"])
+        else:  # Exit if errors occurred
+            print(f"File: {args['classes']} not exists")
+            exit(1)
+
+    rows, errors = convert(args["location"], args["mode"], f"gs://{args['prefix']}", args["output"],
+                           class_labels, workers=args["workers"], chunk_size=args["chunk_size"])
+    for file_path, error in errors:
+        print(f"Skipped {file_path}: {error}", file=sys.stderr)
+    print(f"Wrote {rows} rows to {args['output']}")